@@ -10,6 +10,8 @@ from apscheduler.triggers.cron import CronTrigger
 import atexit
 import threading
 
+from calibration import CalibrationTable
+
 # Flask uygulaması oluştur
 app = Flask(__name__, 
             static_folder='dash/assets',
@@ -491,6 +493,50 @@ class TestConfiguration(db.Model):
         else:
             return self.value
 
+class InstrumentCalibration(db.Model):
+    """One correction table of an instrument calibration; a recalibration adds a new version"""
+    __tablename__ = 'instrument_calibrations'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    instrument_name = db.Column(db.String(100), nullable=False, index=True)  # Equipment name of the hardware setup
+    function = db.Column(db.String(20), nullable=False)  # VOLT:DC, CURR:DC, RES, CAP, DIOD, ...
+    range_value = db.Column(db.Float, nullable=True)  # None: any range, and auto range
+    version = db.Column(db.Integer, nullable=False)
+    gain = db.Column(db.Float, nullable=False, default=1.0)
+    offset = db.Column(db.Float, nullable=False, default=0.0)
+    points = db.Column(db.JSON, nullable=True)  # Piecewise-linear: {"raw": [...], "reference": [...]}
+    is_active = db.Column(db.Boolean, default=True)  # Only the newest version of an instrument is active
+    calibrated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    creator = db.relationship('User', backref='instrument_calibrations')
+    
+    def to_table(self):
+        """The correction as a calibration.CalibrationTable"""
+        points = self.points or {}
+        return CalibrationTable(self.instrument_name, self.function, self.range_value, self.version,
+                                self.gain, self.offset, points.get('raw'), points.get('reference'),
+                                self.calibrated_at)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'instrument_name': self.instrument_name,
+            'function': self.function,
+            'range_value': self.range_value,
+            'version': self.version,
+            'gain': self.gain,
+            'offset': self.offset,
+            'points': self.points,
+            'is_active': self.is_active,
+            'calibrated_at': self.calibrated_at.isoformat() if self.calibrated_at else None,
+            'created_by': self.created_by,
+            'creator_name': self.creator.username if self.creator else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
 # Simulator Management Models
 class Simulator(db.Model):
     __tablename__ = 'simulators'
@@ -1235,21 +1281,13 @@ def api_run_test():
             if test_results['current']['status'] == 'FAIL':
                 test_status = 'FAIL'
         
-        # Frekans testi
+        # Frekans testi (örneklenmiş sinyalin FFT analizi)
         if 'frequency_test' in test_params:
-            freq_test = test_params['frequency_test']
-            measured_freq = random.randint(
-                freq_test['target'] - freq_test['tolerance'] - 5,
-                freq_test['target'] + freq_test['tolerance'] + 5
-            )
-            test_results['frequency'] = {
-                'measured': measured_freq,
-                'expected': freq_test['target'],
-                'tolerance': freq_test['tolerance'],
-                'status': 'PASS' if abs(measured_freq - freq_test['target']) <= freq_test['tolerance'] else 'FAIL'
-            }
+            test_results['frequency'] = measure_frequency_test(test_params['frequency_test'])
             if test_results['frequency']['status'] == 'FAIL':
                 test_status = 'FAIL'
+            elif test_results['frequency']['status'] == 'ERROR' and test_status == 'PASS':
+                test_status = 'ERROR'
         
         # Test süresini simüle et
         test_duration = round(random.uniform(15, 120), 1)
@@ -3359,12 +3397,14 @@ def test_single_connection(connection):
         config = TestConfiguration.query.first()
         timeout = config.connection_timeout if config else 30
         
-        # Simulate connection test based on connection type
-        if connection.connection_type == 'TCP':
+        # Probe by transport; Modbus TCP connections are TCP, Modbus RTU connections serial
+        connection_type = {'MODBUS_TCP': 'TCP', 'MODBUS_RTU': 'SERIAL'}.get(connection.protocol_type,
+                                                                            connection.protocol_type)
+        if connection_type == 'TCP':
             return test_tcp_connection(connection, timeout)
-        elif connection.connection_type == 'SERIAL':
+        elif connection_type == 'SERIAL':
             return test_serial_connection(connection, timeout)
-        elif connection.connection_type == 'USB':
+        elif connection_type == 'USB':
             return test_usb_connection(connection, timeout)
         else:
             # Unknown connection type
@@ -3380,8 +3420,17 @@ def test_tcp_connection(connection, timeout):
         import socket
         
         # Parse host and port from connection details
-        host = connection.host or 'localhost'
-        port = connection.port or 8080
+        host = connection.ip_address or 'localhost'
+        port = connection.port or 502
+        
+        # An instrument the test manager holds a session to is asked for its
+        # identity through that session instead of opening a second socket
+        if hardware_test_manager:
+            from hardware_layer import ConnectionConfig, ConnectionType
+            config = ConnectionConfig(connection_type=ConnectionType.TCP_IP, address=host, port=port,
+                                      timeout=timeout)
+            if hardware_test_manager.session_pool.find(config) is not None:
+                return probe_pooled_session(config, timeout)
         
         # Create socket and test connection
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -3399,6 +3448,19 @@ def test_tcp_connection(connection, timeout):
 def test_serial_connection(connection, timeout):
     """Test Serial connection"""
     try:
+        # A serial port can only be opened once: a port the test manager holds
+        # a session to is probed through it, any other port is opened just for
+        # the probe and closed again, so it is free for the Modbus client
+        if connection.serial_port:
+            if hardware_test_manager:
+                from hardware_layer import ConnectionConfig, ConnectionType
+                config = ConnectionConfig(connection_type=ConnectionType.SERIAL_RTU,
+                                          address=connection.serial_port,
+                                          baud_rate=connection.baud_rate or 9600, timeout=timeout)
+                if hardware_test_manager.session_pool.find(config) is not None:
+                    return probe_pooled_session(config, timeout)
+            return probe_modbus_rtu(connection, timeout)
+        
         # For demo purposes, simulate serial connection test
         # In real implementation, you would use pyserial
         import time
@@ -3412,6 +3474,27 @@ def test_serial_connection(connection, timeout):
         print(f"Serial connection test failed: {e}")
         return False
 
+def probe_pooled_session(config, timeout):
+    """Ask the instrument on a pooled session for its identity"""
+    try:
+        with hardware_test_manager.session_pool.session(config) as interface:
+            return bool(interface.send_command("*IDN?", timeout=timeout))
+    except Exception as e:
+        print(f"Probe of {config.address} failed: {e}")
+        return False
+
+def probe_modbus_rtu(connection, timeout):
+    """Open the port, check the slave echoes a Modbus diagnostics request, and close the port"""
+    from modbus_test_client import ModbusRTUTestClient
+    client = ModbusRTUTestClient(port=connection.serial_port, baudrate=connection.baud_rate or 9600,
+                                 device_id=connection.modbus_address or 1, timeout=timeout)
+    if not client.connect():
+        return False
+    try:
+        return client.diagnostics().success
+    finally:
+        client.disconnect()
+
 def test_usb_connection(connection, timeout):
     """Test USB connection"""
     try:
@@ -4772,6 +4855,94 @@ import queue
 import random
 from datetime import datetime, timedelta
 
+from equipment_reservations import ReservationTimeout
+from frequency_analysis import analyze_tone, check_frequency, frequency_error, samples_from_registers
+
+# Periods of the DUT signal per frequency record and samples taken per period
+FREQUENCY_RECORD_CYCLES = 50
+FREQUENCY_SAMPLES_PER_CYCLE = 20
+# Seconds a frequency check waits for instruments held by a running execution
+FREQUENCY_RESERVATION_TIMEOUT = 2.0
+# One frequency check at a time opens the PLC's serial port
+plc_waveform_lock = threading.Lock()
+
+def read_plc_waveform():
+    """
+    Tone analysis of the DUT clock captured by the PLC
+    
+    The waveform registers (sample rate and count in input registers 30-31,
+    signed millivolt samples from 100 on) are read over the first active
+    Modbus RTU connection. Returns None without a connection or when the
+    PLC does not answer.
+    
+    Raises:
+        ReservationTimeout: The port is held by the test manager's session
+            pool or by another frequency check
+    """
+    connection = Connection.query.filter_by(protocol_type='MODBUS_RTU', is_active=True).filter(
+        Connection.serial_port.isnot(None)).first()
+    if connection is None:
+        return None
+    
+    # A serial port can only be opened once; never take it from an execution
+    if hardware_test_manager:
+        from hardware_layer import ConnectionConfig, ConnectionType
+        config = ConnectionConfig(connection_type=ConnectionType.SERIAL_RTU, address=connection.serial_port,
+                                  baud_rate=connection.baud_rate or 9600)
+        if hardware_test_manager.session_pool.find(config) is not None:
+            raise ReservationTimeout(f"{connection.serial_port} is held by a test session")
+    if not plc_waveform_lock.acquire(timeout=FREQUENCY_RESERVATION_TIMEOUT):
+        raise ReservationTimeout(f"{connection.serial_port} is held by another frequency check")
+    
+    from modbus_test_client import ModbusRTUTestClient
+    client = ModbusRTUTestClient(port=connection.serial_port, baudrate=connection.baud_rate or 9600,
+                                 device_id=connection.modbus_address or 1)
+    try:
+        if not client.connect():
+            return None
+        try:
+            result = client.read_waveform()
+        finally:
+            client.disconnect()
+    finally:
+        plc_waveform_lock.release()
+    if not result.success or not result.values["points"]:
+        print(f"PLC waveform read on {connection.serial_port} failed: {result.error_message}")
+        return None
+    return analyze_tone(samples_from_registers(result.values["registers"], 0.001), result.values["sample_rate"])
+
+def measure_frequency_test(frequency_params):
+    """
+    Run a scenario's frequency_test (target and tolerance in Hz, optional max_thd_percent)
+    
+    The DUT signal is captured by the connected oscilloscope or digitized by
+    the multimeter when the hardware manager has one, else read from the
+    PLC's waveform registers. Frequency and THD come from an FFT of the
+    record either way; with no signal source the result has ERROR status.
+    """
+    target = frequency_params['target']
+    tolerance = frequency_params['tolerance']
+    
+    analysis = None
+    try:
+        if hardware_test_manager:
+            analysis = hardware_test_manager.measure_frequency(target, cycles=FREQUENCY_RECORD_CYCLES,
+                                                               samples_per_cycle=FREQUENCY_SAMPLES_PER_CYCLE,
+                                                               reservation_timeout=FREQUENCY_RESERVATION_TIMEOUT)
+        if analysis is None:
+            analysis = read_plc_waveform()
+    except ReservationTimeout as e:
+        result = frequency_error(target, tolerance, f"Instruments busy: {e}")
+        result['timestamp'] = datetime.utcnow().isoformat()
+        return result
+    
+    if analysis is None:
+        result = frequency_error(target, tolerance, "No instrument or PLC available to capture the signal")
+    else:
+        result = check_frequency(analysis, target, tolerance, frequency_params.get('max_thd_percent'))
+    result['timestamp'] = datetime.utcnow().isoformat()
+    return result
+
 class TestRunner:
     """Individual test execution runner"""
     
@@ -4831,6 +5002,8 @@ class TestRunner:
                     if result.get('status') == 'FAIL':
                         final_result = 'FAIL'
                         break
+                    if result.get('status') == 'ERROR':
+                        final_result = 'ERROR'
                 
                 # Update execution record
                 self.execution.status = 'COMPLETED'
@@ -4947,33 +5120,7 @@ class TestRunner:
     
     def _test_frequency(self, frequency_params):
         """Execute frequency test"""
-        time.sleep(2)  # Simulate test duration
-        
-        # Simulate frequency measurement
-        target_freq = frequency_params['target']
-        tolerance = frequency_params['tolerance']
-        
-        # Generate realistic measurement with some variation
-        measured_freq = random.randint(
-            target_freq - tolerance - 5,
-            target_freq + tolerance + 5
-        )
-        
-        # Determine test result
-        min_freq = target_freq - tolerance
-        max_freq = target_freq + tolerance
-        status = 'PASS' if min_freq <= measured_freq <= max_freq else 'FAIL'
-        
-        # Store result
-        frequency_result = {
-            'measured': measured_freq,
-            'expected': target_freq,
-            'tolerance': tolerance,
-            'min_acceptable': min_freq,
-            'max_acceptable': max_freq,
-            'status': status,
-            'timestamp': datetime.utcnow().isoformat()
-        }
+        frequency_result = measure_frequency_test(frequency_params)
         
         if not self.execution.test_data:
             self.execution.test_data = {}
@@ -5401,7 +5548,7 @@ test_scheduler = TestScheduler()
 # Hardware integration - Test Manager instance
 try:
     from test_manager import TestManager
-    hardware_test_manager = TestManager()
+    hardware_test_manager = TestManager(settling_file=os.environ.get('SETTLING_FILE', 'instrument_settling.json'))
     print("✓ Hardware Test Manager initialized")
 except ImportError as e:
     hardware_test_manager = None
@@ -5419,13 +5566,25 @@ def api_hardware_status():
         return jsonify({'error': 'Hardware manager not available'}), 503
     
     try:
+        # Self-tests run concurrently, so the check takes as long as the slowest instrument
+        check_start = time.time()
         connected_equipment = hardware_test_manager.get_connected_equipment()
-        health_check = hardware_test_manager.perform_equipment_health_check()
+        health_check = hardware_test_manager.perform_equipment_health_check(
+            timeout=request.args.get('timeout', type=float))
+        check_duration = time.time() - check_start
+        
+        # Per-instrument, per-command latency; ?slowest=N sets how many of the slowest commands to list
+        command_metrics = hardware_test_manager.get_command_metrics(
+            slowest=request.args.get('slowest', 10, type=int))
         
         return jsonify({
             'success': True,
             'connected_equipment': connected_equipment,
             'health_check': health_check,
+            'check_duration': check_duration,
+            'command_metrics': command_metrics,
+            'session_pool': hardware_test_manager.session_pool.get_stats(),
+            'reservations': hardware_test_manager.get_reservation_stats(),
             'timestamp': datetime.utcnow().isoformat()
         })
     except Exception as e:
@@ -5447,13 +5606,15 @@ def api_hardware_setup():
         # Setup hardware
         setup_results = hardware_test_manager.setup_hardware(config_data['equipment_configs'])
         
-        # Connect to all hardware
-        connection_results = hardware_test_manager.connect_all_hardware()
+        # Connect to and initialize all hardware in parallel
+        connect_start = time.time()
+        connection_results = hardware_test_manager.connect_all_hardware(config_data.get('connect_timeout'))
         
         return jsonify({
             'success': True,
             'setup_results': setup_results,
             'connection_results': connection_results,
+            'connect_duration': time.time() - connect_start,
             'timestamp': datetime.utcnow().isoformat()
         })
     except Exception as e:
@@ -5511,8 +5672,13 @@ def api_hardware_test_voltage():
         if not voltage_points:
             return jsonify({'error': 'Voltage points required'}), 400
         
-        # Create voltage test sequence
-        sequence = hardware_test_manager.create_voltage_test_sequence(test_name, voltage_points)
+        # Create voltage test sequence; list mode runs all points from the supply's list memory
+        if data.get('list_mode'):
+            sequence = hardware_test_manager.create_voltage_sweep_sequence(
+                test_name, voltage_points, dwell=float(data.get('dwell', 0.05))
+            )
+        else:
+            sequence = hardware_test_manager.create_voltage_test_sequence(test_name, voltage_points)
         
         # Generate unique test ID
         test_id = f"hw_voltage_{int(datetime.utcnow().timestamp())}"
@@ -5616,6 +5782,101 @@ def api_hardware_test_stop(test_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def load_calibration_tables():
+    """Put the active calibration tables from the database in force in the hardware manager"""
+    if not hardware_test_manager:
+        return
+    try:
+        with app.app_context():
+            rows = InstrumentCalibration.query.filter_by(is_active=True).all()
+            hardware_test_manager.load_calibration([row.to_table() for row in rows])
+            print(f"✓ Loaded {len(rows)} calibration tables")
+    except Exception as e:
+        print(f"✗ Failed to load calibration tables: {str(e)}")
+
+@app.route('/api/hardware/calibration', methods=['GET'])
+@login_required
+def api_hardware_calibration():
+    """Calibration in force per instrument; ?instrument=NAME adds that instrument's version history"""
+    if not hardware_test_manager:
+        return jsonify({'error': 'Hardware manager not available'}), 503
+    
+    try:
+        response = {
+            'success': True,
+            'calibration': hardware_test_manager.get_calibration_status(),
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        instrument = request.args.get('instrument')
+        if instrument:
+            history = InstrumentCalibration.query.filter_by(instrument_name=instrument).order_by(
+                InstrumentCalibration.version.desc(), InstrumentCalibration.id).all()
+            response['history'] = [row.to_dict() for row in history]
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/hardware/calibration/<instrument>', methods=['POST'])
+@login_required
+@require_permission('manage_hardware')
+def api_hardware_calibration_update(instrument):
+    """
+    Store a new calibration version of an instrument and put it in force
+    
+    The body holds 'tables', each with function, optional range_value and
+    either gain / offset or raw and reference point lists.
+    """
+    if not hardware_test_manager:
+        return jsonify({'error': 'Hardware manager not available'}), 503
+    
+    try:
+        data = request.get_json()
+        if not data or not data.get('tables'):
+            return jsonify({'error': 'Calibration tables required'}), 400
+        
+        latest = db.session.query(db.func.max(InstrumentCalibration.version)).filter_by(
+            instrument_name=instrument).scalar()
+        version = (latest or 0) + 1
+        calibrated_at = datetime.fromisoformat(data['calibrated_at']) if data.get('calibrated_at') else datetime.utcnow()
+        
+        rows = []
+        for table in data['tables']:
+            points = {'raw': table['raw'], 'reference': table['reference']} if table.get('raw') is not None else None
+            row = InstrumentCalibration(
+                instrument_name=instrument,
+                function=table['function'],
+                range_value=table.get('range_value'),
+                version=version,
+                gain=table.get('gain', 1.0),
+                offset=table.get('offset', 0.0),
+                points=points,
+                calibrated_at=calibrated_at,
+                created_by=current_user.id
+            )
+            # Validates the points before anything is stored
+            row.to_table()
+            rows.append(row)
+        
+        InstrumentCalibration.query.filter_by(instrument_name=instrument, is_active=True).update({'is_active': False})
+        db.session.add_all(rows)
+        db.session.commit()
+        
+        hardware_test_manager.update_calibration(instrument, [row.to_table() for row in rows])
+        
+        return jsonify({
+            'success': True,
+            'instrument': instrument,
+            'version': version,
+            'tables': [row.to_dict() for row in rows],
+            'timestamp': datetime.utcnow().isoformat()
+        })
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # ================================
 # HARDWARE MANAGEMENT UI PAGES
 # ================================
@@ -6154,6 +6415,9 @@ if __name__ == '__main__':
     print("Zamanlanmış testler yükleniyor...")
     test_scheduler.load_existing_scheduled_tests()
     
+    # Put the active instrument calibrations in force
+    load_calibration_tables()
+    
     # Start background task processor
     print("Background task processor başlatılıyor...")
     task_processor.start()
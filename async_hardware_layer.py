@@ -0,0 +1,358 @@
+"""
+PCBA Test System - Asyncio Hardware Interfaces
+Non-blocking serial and TCP transports so one event loop can drive many
+instruments concurrently instead of one blocked thread per instrument.
+"""
+
+import asyncio
+import socket
+import time
+import logging
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+import serial
+
+from hardware_layer import ConnectionConfig, InstrumentInterfaceBase
+from command_metrics import instrumented
+from instrument_session import resilient
+
+logger = logging.getLogger(__name__)
+
+class AsyncResponseBuffer:
+    """
+    Receive buffer fed by an asyncio transport
+    
+    Readers wait on an event that the transport sets whenever data arrives,
+    so reads never block the event loop.
+    """
+    
+    def __init__(self):
+        self.buffer = bytearray()
+        self._data_ready = asyncio.Event()
+        self._closed = False
+    
+    def feed(self, data: bytes):
+        self.buffer += data
+        self._data_ready.set()
+    
+    def feed_eof(self):
+        self._closed = True
+        self._data_ready.set()
+    
+    async def _wait(self):
+        """Wait for more data"""
+        if self._closed:
+            raise ConnectionError("Connection closed by instrument")
+        self._data_ready.clear()
+        await self._data_ready.wait()
+    
+    def _take(self, size: int) -> bytes:
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+    
+    async def read_exact(self, size: int) -> bytes:
+        """Read exactly size bytes"""
+        while len(self.buffer) < size:
+            await self._wait()
+        return self._take(size)
+    
+    async def read_until(self, terminator: bytes = b'\n') -> bytes:
+        """Read up to and including terminator"""
+        start = 0
+        while True:
+            index = self.buffer.find(terminator, start)
+            if index >= 0:
+                return self._take(index + len(terminator))
+            start = max(0, len(self.buffer) - len(terminator) + 1)
+            await self._wait()
+    
+    def discard(self):
+        """Drop everything received so far"""
+        self.buffer.clear()
+
+class AsyncHardwareInterface(InstrumentInterfaceBase, ABC):
+    """Abstract base class for asyncio hardware interfaces"""
+    
+    def __init__(self, config: ConnectionConfig):
+        super().__init__(config)
+        self.response_buffer: Optional[AsyncResponseBuffer] = None
+        self._discard_input = False
+        self._lock: Optional[asyncio.Lock] = None
+    
+    @abstractmethod
+    async def connect(self) -> bool:
+        """Establish connection to equipment"""
+        pass
+    
+    @abstractmethod
+    async def disconnect(self) -> bool:
+        """Disconnect from equipment"""
+        pass
+    
+    @abstractmethod
+    def is_connected(self) -> bool:
+        """Check connection status"""
+        pass
+    
+    @abstractmethod
+    def _write(self, data: bytes):
+        """Queue raw bytes for transmission without blocking"""
+        pass
+    
+    def _begin(self):
+        """Prepare for a new command on an open connection"""
+        if not self.is_connected():
+            raise ConnectionError("Not connected to instrument")
+        if self._discard_input:
+            # A late answer to a timed out query must not be read as this command's response
+            self.response_buffer.discard()
+            self._discard_input = False
+    
+    def _get_lock(self) -> asyncio.Lock:
+        # Commands from concurrent tasks must not interleave on one connection
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+    
+    @instrumented
+    @resilient
+    async def send_command(self, command: str, timeout: Optional[float] = None) -> str:
+        """
+        Send command and get response (timeout overrides the adaptive deadline)
+        
+        Only queries are answered; for other commands nothing is read back
+        and an empty string is returned.
+        """
+        async with self._get_lock():
+            self._begin()
+            response_timeout = self._response_timeout(command, timeout)
+            try:
+                self._write((command + '\r\n').encode())
+                start_time = time.time()
+                
+                if not self.is_query(command):
+                    logger.debug(f"Sent: {command}")
+                    return ""
+                
+                try:
+                    raw = await asyncio.wait_for(self.response_buffer.read_until(b'\n'), response_timeout)
+                except asyncio.TimeoutError:
+                    self._discard_input = True
+                    self._record_response(command, time.time() - start_time, False, timeout is not None)
+                    raise TimeoutError(f"No response to '{command}' within {response_timeout * 1000:.0f} ms")
+                
+                self._record_response(command, time.time() - start_time, True, timeout is not None)
+                response = raw.decode().strip()
+                logger.debug(f"Sent: {command}, Received: {response}")
+                return response
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Communication error: {e}")
+                raise
+    
+    async def reconnect(self) -> bool:
+        """Re-open a dropped session with exponential backoff (see HardwareInterface.reconnect)"""
+        self._reconnecting = True
+        try:
+            for attempt, delay in enumerate(self._reconnect_delays(), 1):
+                await asyncio.sleep(delay)
+                await self.disconnect()
+                if await self.connect():
+                    self.reconnects += 1
+                    logger.info(f"Reconnected to {self.config.address} (attempt {attempt})")
+                    for callback in list(self.reconnect_callbacks.values()):
+                        result = callback()
+                        if asyncio.iscoroutine(result):
+                            await result
+                    return True
+                logger.warning(f"Reconnect attempt {attempt} to {self.config.address} failed")
+            return False
+        finally:
+            self._reconnecting = False
+            self.session_open = True
+    
+    async def query(self, command: str, timeout: Optional[float] = None) -> str:
+        """Send a query and return its response"""
+        if not self.is_query(command):
+            raise ValueError(f"'{command}' is not a query")
+        return await self.send_command(command, timeout)
+    
+    async def send_batch(self, commands: List[str], timeout: Optional[float] = None) -> List[str]:
+        """Send several commands in a single write (see HardwareInterface.send_batch)"""
+        response = await self.send_command(self.join_commands(commands), timeout)
+        return self._split_batch_response(commands, response)
+    
+    @instrumented
+    @resilient
+    async def query_binary_block(self, command: str, timeout: Optional[float] = None) -> bytes:
+        """Send a query answered by an IEEE 488.2 definite-length block and return the payload"""
+        async with self._get_lock():
+            self._begin()
+            response_timeout = self._response_timeout(command, timeout)
+            try:
+                self._write((command + '\r\n').encode())
+                start_time = time.time()
+                payload = await asyncio.wait_for(self._read_block(), response_timeout)
+                self._record_response(command, time.time() - start_time, True, timeout is not None)
+                logger.debug(f"Sent: {command}, Received: {len(payload)} byte block")
+                return payload
+            except asyncio.TimeoutError:
+                self._discard_input = True
+                self.last_error = f"Incomplete block response to '{command}' within {response_timeout * 1000:.0f} ms"
+                logger.error(f"Binary block transfer error: {self.last_error}")
+                raise TimeoutError(self.last_error)
+            except Exception as e:
+                self._discard_input = True
+                self.last_error = str(e)
+                logger.error(f"Binary block transfer error: {e}")
+                raise
+    
+    async def _read_block(self) -> bytes:
+        digits = self._block_length_digits(await self.response_buffer.read_exact(2))
+        length = int(await self.response_buffer.read_exact(digits))
+        payload = await self.response_buffer.read_exact(length)
+        await self.response_buffer.read_until(b'\n')
+        return payload
+
+class _InstrumentProtocol(asyncio.Protocol):
+    """Feeds received TCP data into a response buffer"""
+    
+    def __init__(self, response_buffer: AsyncResponseBuffer):
+        self.response_buffer = response_buffer
+    
+    def data_received(self, data: bytes):
+        self.response_buffer.feed(data)
+    
+    def connection_lost(self, exc: Optional[Exception]):
+        self.response_buffer.feed_eof()
+
+class AsyncTCPInterface(AsyncHardwareInterface):
+    """Asyncio TCP/IP interface implementation"""
+    
+    def __init__(self, config: ConnectionConfig):
+        super().__init__(config)
+        self.transport: Optional[asyncio.Transport] = None
+    
+    async def connect(self) -> bool:
+        """Connect via TCP/IP"""
+        try:
+            self.response_buffer = AsyncResponseBuffer()
+            loop = asyncio.get_running_loop()
+            self.transport, _ = await asyncio.wait_for(
+                loop.create_connection(lambda: _InstrumentProtocol(self.response_buffer),
+                                       self.config.address, self.config.port),
+                self.config.timeout)
+            
+            sock = self.transport.get_extra_info('socket')
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            
+            self._discard_input = False
+            self.connected = True
+            self._open_session()
+            logger.info(f"Connected to TCP {self.config.address}:{self.config.port}")
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Failed to connect to TCP {self.config.address}:{self.config.port}: {e}")
+            return False
+    
+    async def disconnect(self) -> bool:
+        """Disconnect TCP connection"""
+        try:
+            if self.transport:
+                self.transport.close()
+            self.transport = None
+            self.connected = False
+            self.session_open = False
+            logger.info(f"Disconnected from TCP {self.config.address}:{self.config.port}")
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Failed to disconnect from TCP: {e}")
+            return False
+    
+    def is_connected(self) -> bool:
+        """Check if TCP connection is active"""
+        return self.connected and self.transport is not None and not self.transport.is_closing()
+    
+    def _write(self, data: bytes):
+        self.transport.write(data)
+
+class AsyncSerialInterface(AsyncHardwareInterface):
+    """
+    Asyncio serial port interface implementation
+    
+    The port is opened non-blocking and its file descriptor registered with
+    the event loop, so received bytes are fed into the response buffer as
+    they arrive. Requires a selector based event loop (Linux/macOS).
+    """
+    
+    def __init__(self, config: ConnectionConfig):
+        super().__init__(config)
+        self.serial_connection = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    async def connect(self) -> bool:
+        """Connect to serial port"""
+        try:
+            self.serial_connection = serial.Serial(
+                port=self.config.address,
+                baudrate=self.config.baud_rate,
+                timeout=0,
+                write_timeout=self.config.timeout,
+                bytesize=self.config.additional_params.get('bytesize', 8),
+                parity=self.config.additional_params.get('parity', 'N'),
+                stopbits=self.config.additional_params.get('stopbits', 1)
+            )
+            self.response_buffer = AsyncResponseBuffer()
+            self._loop = asyncio.get_running_loop()
+            self._loop.add_reader(self.serial_connection.fileno(), self._on_readable)
+            
+            self._discard_input = False
+            self.connected = True
+            self._open_session()
+            logger.info(f"Connected to serial port {self.config.address}")
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Failed to connect to serial port {self.config.address}: {e}")
+            if self.serial_connection and self.serial_connection.is_open:
+                self.serial_connection.close()
+            return False
+    
+    def _on_readable(self):
+        try:
+            data = self.serial_connection.read(self.serial_connection.in_waiting or 1)
+        except serial.SerialException as e:
+            self.last_error = str(e)
+            self._loop.remove_reader(self.serial_connection.fileno())
+            self.response_buffer.feed_eof()
+            return
+        if data:
+            self.response_buffer.feed(data)
+    
+    async def disconnect(self) -> bool:
+        """Disconnect from serial port"""
+        try:
+            if self.serial_connection and self.serial_connection.is_open:
+                self._loop.remove_reader(self.serial_connection.fileno())
+                self.serial_connection.close()
+            self.connected = False
+            self.session_open = False
+            logger.info(f"Disconnected from serial port {self.config.address}")
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Failed to disconnect from serial port: {e}")
+            return False
+    
+    def is_connected(self) -> bool:
+        """Check if serial connection is active"""
+        return bool(self.connected and self.serial_connection and self.serial_connection.is_open)
+    
+    def _write(self, data: bytes):
+        # Commands are a few bytes and fit the driver's transmit buffer, so this does not stall the loop
+        self.serial_connection.write(data)
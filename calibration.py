@@ -0,0 +1,181 @@
+"""
+PCBA Test System - Calibration Corrections
+Per-instrument, per-function and per-range correction tables (gain/offset or
+piecewise-linear), kept in a memory cache and applied with NumPy to single
+readings and whole buffers alike before limits are checked.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# SCPI overload reading; passed through uncorrected, as are NaN readings
+OVERLOAD = 9.9e37
+
+def range_key(range_value: Union[None, str, float]) -> Optional[float]:
+    """Normalize a range setting; auto range (None, 0 or "AUTO") is None"""
+    if range_value is None or range_value == "AUTO" or not range_value:
+        return None
+    return float(range_value)
+
+@dataclass(eq=False)
+class CalibrationTable:
+    """
+    Correction of one instrument function on one range
+    
+    Without breakpoints a reading x becomes gain * x + offset. With
+    breakpoints a reading is mapped by linear interpolation from the raw
+    readings to the reference values measured at calibration, and beyond
+    the outer breakpoints by extending the outer segments.
+    """
+    instrument: str
+    function: str
+    range_value: Optional[float] = None  # None: any range, and auto range
+    version: int = 1
+    gain: float = 1.0
+    offset: float = 0.0
+    raw: Optional[Sequence[float]] = None  # Readings at the calibration points, ascending
+    reference: Optional[Sequence[float]] = None  # Reference values at the calibration points
+    calibrated_at: Optional[datetime] = None
+    _slopes: Tuple[float, float] = field(default=(1.0, 1.0), init=False, repr=False)
+    
+    def __post_init__(self):
+        self.range_value = range_key(self.range_value)
+        if (self.raw is None) != (self.reference is None):
+            raise ValueError("Piecewise-linear calibration needs raw and reference points")
+        if self.raw is None:
+            return
+        self.raw = np.asarray(self.raw, dtype=np.float64)
+        self.reference = np.asarray(self.reference, dtype=np.float64)
+        if self.raw.ndim != 1 or self.raw.size < 2 or self.raw.shape != self.reference.shape:
+            raise ValueError("Piecewise-linear calibration needs at least two raw/reference pairs")
+        if not (np.diff(self.raw) > 0).all():
+            raise ValueError("Calibration raw points must be strictly ascending")
+        self.raw.flags.writeable = False
+        self.reference.flags.writeable = False
+        slopes = np.diff(self.reference) / np.diff(self.raw)
+        self._slopes = (float(slopes[0]), float(slopes[-1]))
+    
+    @property
+    def piecewise(self) -> bool:
+        return self.raw is not None
+    
+    def apply(self, values: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        """Corrected readings; a scalar gives a float, an array an array of the same shape"""
+        raw = np.asarray(values, dtype=np.float64)
+        if self.raw is None:
+            corrected = raw * self.gain + self.offset
+        else:
+            corrected = np.interp(raw, self.raw, self.reference)
+            below, above = raw < self.raw[0], raw > self.raw[-1]
+            corrected = np.where(below, self.reference[0] + (raw - self.raw[0]) * self._slopes[0], corrected)
+            corrected = np.where(above, self.reference[-1] + (raw - self.raw[-1]) * self._slopes[1], corrected)
+        corrected = np.where(np.abs(raw) >= OVERLOAD, raw, corrected)
+        return float(corrected) if corrected.ndim == 0 else corrected
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CalibrationTable':
+        calibrated_at = data.get('calibrated_at')
+        if isinstance(calibrated_at, str):
+            calibrated_at = datetime.fromisoformat(calibrated_at)
+        return cls(data['instrument'], data['function'], data.get('range_value'), int(data.get('version', 1)),
+                   float(data.get('gain', 1.0)), float(data.get('offset', 0.0)), data.get('raw'),
+                   data.get('reference'), calibrated_at)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "instrument": self.instrument,
+            "function": self.function,
+            "range_value": self.range_value,
+            "version": self.version,
+            "gain": self.gain,
+            "offset": self.offset,
+            "raw": None if self.raw is None else self.raw.tolist(),
+            "reference": None if self.reference is None else self.reference.tolist(),
+            "calibrated_at": self.calibrated_at.isoformat() if self.calibrated_at else None
+        }
+
+class CalibrationStore:
+    """
+    Memory cache of the calibration tables in force
+    
+    Lookups run on every reading and take no lock: an update builds new
+    dictionaries and swaps them in, so a reader sees either the old or
+    the new calibration of an instrument, never a mix.
+    """
+    
+    def __init__(self, tables: Iterable[CalibrationTable] = ()):
+        self._lock = threading.Lock()
+        self._tables: Dict[Tuple[str, str, Optional[float]], CalibrationTable] = {}
+        self._instruments: Dict[str, List[CalibrationTable]] = {}
+        self.load(tables)
+    
+    def _install(self, instruments: Dict[str, List[CalibrationTable]]):
+        self._tables = {(table.instrument, table.function, table.range_value): table
+                        for tables in instruments.values() for table in tables}
+        self._instruments = instruments
+    
+    def load(self, tables: Iterable[CalibrationTable]):
+        """Replace every calibration (e.g. with the active tables from the database)"""
+        instruments: Dict[str, List[CalibrationTable]] = {}
+        for table in tables:
+            instruments.setdefault(table.instrument, []).append(table)
+        with self._lock:
+            self._install(instruments)
+    
+    def update(self, instrument: str, tables: Iterable[CalibrationTable]):
+        """Replace the calibration of one instrument (no tables removes it)"""
+        tables = list(tables)
+        if any(table.instrument != instrument for table in tables):
+            raise ValueError(f"Calibration tables do not all belong to {instrument}")
+        with self._lock:
+            instruments = dict(self._instruments)
+            if tables:
+                instruments[instrument] = tables
+            else:
+                instruments.pop(instrument, None)
+            self._install(instruments)
+    
+    def tables(self, instrument: str) -> List[CalibrationTable]:
+        return list(self._instruments.get(instrument, []))
+    
+    def version(self, instrument: str) -> Optional[int]:
+        """Newest calibration version of the instrument, None if it has none"""
+        tables = self._instruments.get(instrument)
+        return max(table.version for table in tables) if tables else None
+    
+    def calibrated_at(self, instrument: str) -> Optional[datetime]:
+        dates = [table.calibrated_at for table in self._instruments.get(instrument, []) if table.calibrated_at]
+        return max(dates) if dates else None
+    
+    def lookup(self, instrument: str, function: str,
+               range_value: Union[None, str, float] = None) -> Optional[CalibrationTable]:
+        """Table for the exact range, else the instrument function's table for any range"""
+        tables = self._tables
+        key = range_key(range_value)
+        table = tables.get((instrument, function, key))
+        if table is None and key is not None:
+            table = tables.get((instrument, function, None))
+        return table
+    
+    def apply(self, instrument: str, function: str, range_value: Union[None, str, float],
+              values: Union[float, np.ndarray]) -> Tuple[Union[float, np.ndarray], Optional[int]]:
+        """
+        Correct readings taken with function on range_value
+        
+        Returns:
+            The corrected readings and the version of the table applied
+            (the readings unchanged and None without a table)
+        """
+        table = self.lookup(instrument, function, range_value)
+        if table is None:
+            return values, None
+        return table.apply(values), table.version
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {instrument: {"version": self.version(instrument),
+                             "tables": [table.to_dict() for table in tables]}
+                for instrument, tables in self._instruments.items()}
@@ -0,0 +1,214 @@
+"""
+PCBA Test System - Command Latency Instrumentation
+Per-instrument, per-command latency histograms, byte counts, timeouts and
+errors, so a slow test can be traced to the instrument or link responsible.
+"""
+
+import asyncio
+import functools
+import heapq
+import itertools
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Upper bucket bounds in seconds (roughly 1-2.5-5 per decade); the last bucket is unbounded
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class VerbStats:
+    """Counters and latency histogram for one command verb"""
+    
+    __slots__ = ("count", "timeouts", "errors", "bytes_sent", "bytes_received",
+                 "total_time", "max_time", "histogram")
+    
+    def __init__(self):
+        self.count = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+    
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the histogram bucket holding the given fraction of samples"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.histogram):
+            seen += bucket_count
+            if seen >= rank:
+                return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else self.max_time
+        return self.max_time
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "mean_ms": self.total_time / self.count * 1000 if self.count else None,
+            "max_ms": self.max_time * 1000,
+            "p50_ms": self._ms(self.percentile(0.5)),
+            "p95_ms": self._ms(self.percentile(0.95)),
+            "p99_ms": self._ms(self.percentile(0.99)),
+            "histogram": {self._bucket_label(index): bucket_count
+                          for index, bucket_count in enumerate(self.histogram) if bucket_count}
+        }
+    
+    @staticmethod
+    def _ms(value: Optional[float]) -> Optional[float]:
+        return value * 1000 if value is not None else None
+    
+    @staticmethod
+    def _bucket_label(index: int) -> str:
+        if index < len(LATENCY_BUCKETS):
+            return f"<={LATENCY_BUCKETS[index] * 1000:g}ms"
+        return f">{LATENCY_BUCKETS[-1] * 1000:g}ms"
+
+class CommandMetrics:
+    """
+    Latency instrumentation for one instrument interface
+    
+    Every message sent is recorded under its verb, the command header
+    without arguments. A batch is recorded under the header of its last
+    query (the response it waits for), or of its first command if it has
+    no queries. Recording is a histogram bucket increment plus a bounded
+    heap update, so it can stay enabled in production.
+    """
+    
+    def __init__(self, slowest_capacity: int = 100):
+        """
+        Initialize metrics
+        
+        Args:
+            slowest_capacity: Number of slowest commands kept for dump_slowest
+        """
+        self.slowest_capacity = slowest_capacity
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Clear all recorded statistics"""
+        with self._lock:
+            self.verbs: Dict[str, VerbStats] = {}
+            self._slowest: List[tuple] = []
+            self._sequence = itertools.count()
+            self.started = datetime.now()
+    
+    @staticmethod
+    def verb(command: str) -> str:
+        """Header identifying the command (see class docstring for batches)"""
+        commands = command.split(';')
+        queries = [part for part in commands if '?' in part]
+        header = (queries[-1] if queries else commands[0]).strip().split(' ', 1)[0]
+        return header.lstrip(':').upper()
+    
+    def record(self, command: str, elapsed: float, bytes_sent: int, bytes_received: int,
+               timed_out: bool = False, failed: bool = False):
+        """Record one command round trip"""
+        with self._lock:
+            verb = self.verb(command)
+            stats = self.verbs.get(verb)
+            if stats is None:
+                stats = self.verbs[verb] = VerbStats()
+            stats.count += 1
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+            stats.total_time += elapsed
+            if elapsed > stats.max_time:
+                stats.max_time = elapsed
+            stats.histogram[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+            if timed_out:
+                stats.timeouts += 1
+            elif failed:
+                stats.errors += 1
+            
+            entry = (elapsed, next(self._sequence), command, time.time(), timed_out, failed)
+            if len(self._slowest) < self.slowest_capacity:
+                heapq.heappush(self._slowest, entry)
+            elif elapsed > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+    
+    def dump_slowest(self, count: int = 10) -> List[Dict[str, Any]]:
+        """The slowest recorded commands, slowest first"""
+        with self._lock:
+            entries = heapq.nlargest(count, self._slowest)
+        return [{
+            "command": command,
+            "elapsed_ms": elapsed * 1000,
+            "timestamp": datetime.fromtimestamp(timestamp).isoformat(),
+            "timed_out": timed_out,
+            "failed": failed
+        } for elapsed, _, command, timestamp, timed_out, failed in entries]
+    
+    def get_stats(self, slowest: int = 0) -> Dict[str, Any]:
+        """Statistics per verb and totals, with the slowest commands if requested"""
+        with self._lock:
+            verbs = {verb: stats.to_dict() for verb, stats in self.verbs.items()}
+            started = self.started
+        stats = {
+            "since": started.isoformat(),
+            "commands": sum(verb["count"] for verb in verbs.values()),
+            "timeouts": sum(verb["timeouts"] for verb in verbs.values()),
+            "errors": sum(verb["errors"] for verb in verbs.values()),
+            "bytes_sent": sum(verb["bytes_sent"] for verb in verbs.values()),
+            "bytes_received": sum(verb["bytes_received"] for verb in verbs.values()),
+            "verbs": verbs
+        }
+        if slowest:
+            stats["slowest"] = self.dump_slowest(slowest)
+        return stats
+
+def _response_size(response) -> int:
+    # Text responses are returned stripped; count the terminator the instrument sent
+    if isinstance(response, str):
+        return len(response) + 1 if response else 0
+    return len(response)
+
+def instrumented(method):
+    """
+    Record every call of an interface's send method in its CommandMetrics
+    
+    Wraps send_command / query_binary_block style methods (sync or async)
+    taking the command as first argument; interfaces without metrics are
+    passed through untouched.
+    """
+    if asyncio.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, command: str, *args, **kwargs):
+            if self.metrics is None:
+                return await method(self, command, *args, **kwargs)
+            start_time = time.perf_counter()
+            try:
+                response = await method(self, command, *args, **kwargs)
+            except Exception as e:
+                self.metrics.record(command, time.perf_counter() - start_time, len(command) + 2, 0,
+                                    timed_out=isinstance(e, TimeoutError), failed=True)
+                raise
+            self.metrics.record(command, time.perf_counter() - start_time, len(command) + 2,
+                                _response_size(response))
+            return response
+        return async_wrapper
+    
+    @functools.wraps(method)
+    def wrapper(self, command: str, *args, **kwargs):
+        if self.metrics is None:
+            return method(self, command, *args, **kwargs)
+        start_time = time.perf_counter()
+        try:
+            response = method(self, command, *args, **kwargs)
+        except Exception as e:
+            self.metrics.record(command, time.perf_counter() - start_time, len(command) + 2, 0,
+                                timed_out=isinstance(e, TimeoutError), failed=True)
+            raise
+        self.metrics.record(command, time.perf_counter() - start_time, len(command) + 2,
+                            _response_size(response))
+        return response
+    return wrapper
@@ -0,0 +1,194 @@
+"""
+PCBA Test System - Equipment Reservations
+Lets concurrent test executions (several DUTs on one station) reserve the
+instruments and channels they drive, all at once and in arrival order, so
+two executions never drive the same PSU channel and never deadlock.
+"""
+
+import threading
+import time
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (instrument, channel); a channel of None stands for the whole instrument
+Resource = Tuple[str, Optional[str]]
+
+class ReservationTimeout(TimeoutError):
+    """Raised when resources could not be reserved in time"""
+    pass
+
+def parse_resource(name: str) -> Resource:
+    """Split "psu:CH1" into ("psu", "CH1"); a plain "psu" is the whole instrument"""
+    instrument, _, channel = name.partition(':')
+    return instrument, channel or None
+
+def resources_conflict(first: Iterable[Resource], second: Iterable[Resource]) -> bool:
+    """Whether two resource sets overlap; a whole instrument overlaps each of its channels"""
+    for instrument, channel in first:
+        for other_instrument, other_channel in second:
+            if instrument == other_instrument and (channel is None or other_channel is None
+                                                   or channel == other_channel):
+                return True
+    return False
+
+class Reservation:
+    """Resources held by one execution; release it (or use it as a context manager) when done"""
+    
+    def __init__(self, manager: 'ResourceManager', resources: FrozenSet[Resource], holder: str):
+        self.manager = manager
+        self.resources = resources
+        self.holder = holder
+        self.requested_at = time.monotonic()
+        self.granted_at: Optional[float] = None
+        self.released = False
+    
+    @property
+    def instruments(self) -> Set[str]:
+        return {instrument for instrument, _ in self.resources}
+    
+    def release(self):
+        self.manager.release(self)
+    
+    def __enter__(self) -> 'Reservation':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+class _Usage:
+    __slots__ = ("reservations", "holding", "busy_since", "busy", "waited", "max_wait", "timeouts")
+    
+    def __init__(self):
+        self.reservations = 0
+        self.holding = 0  # Granted reservations on the instrument or its channels
+        self.busy_since = 0.0
+        self.busy = 0.0
+        self.waited = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+
+class ResourceManager:
+    """
+    Atomic, fair reservation of instruments and channels
+    
+    A request names everything it needs and is granted all of it or
+    nothing, so executions never hold one instrument while waiting for
+    another and cannot deadlock. Requests are served first come first
+    served: a request waits for every earlier conflicting request, so a
+    sequence needing the whole PSU is not starved by steps taking its
+    channels, while requests that do not conflict proceed in parallel.
+    """
+    
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._waiting: Deque[Reservation] = deque()
+        self._granted: Set[Reservation] = set()
+        self._usage: Dict[str, _Usage] = {}
+        self._created = time.monotonic()
+    
+    def _grantable(self, request: Reservation) -> bool:
+        for granted in self._granted:
+            if resources_conflict(request.resources, granted.resources):
+                return False
+        for waiting in self._waiting:
+            if waiting is request:
+                return True
+            if resources_conflict(request.resources, waiting.resources):
+                return False
+        return True
+    
+    def _usage_of(self, instrument: str) -> _Usage:
+        usage = self._usage.get(instrument)
+        if usage is None:
+            usage = self._usage[instrument] = _Usage()
+        return usage
+    
+    def reserve(self, resources: Iterable[str], holder: str = "", timeout: Optional[float] = None) -> Reservation:
+        """
+        Reserve resources all at once
+        
+        Args:
+            resources: Instrument names, or "instrument:channel" for a single channel
+            holder: Name of the execution, for status reporting
+            timeout: Longest time to wait in seconds (forever if None)
+        
+        Raises:
+            ReservationTimeout: The resources did not become free in time
+        """
+        request = Reservation(self, frozenset(parse_resource(name) for name in resources), holder)
+        deadline = None if timeout is None else request.requested_at + timeout
+        with self._condition:
+            self._waiting.append(request)
+            while not self._grantable(request):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._waiting.remove(request)
+                    for instrument in request.instruments:
+                        self._usage_of(instrument).timeouts += 1
+                    # Requests queued behind this one may be grantable now
+                    self._condition.notify_all()
+                    raise ReservationTimeout(f"{holder or 'Execution'} could not reserve "
+                                             f"{', '.join(sorted(request.instruments))} within {timeout:.1f}s")
+                self._condition.wait(remaining)
+            
+            self._waiting.remove(request)
+            self._granted.add(request)
+            request.granted_at = time.monotonic()
+            waited = request.granted_at - request.requested_at
+            for instrument in request.instruments:
+                usage = self._usage_of(instrument)
+                if usage.holding == 0:
+                    usage.busy_since = request.granted_at
+                usage.holding += 1
+                usage.reservations += 1
+                usage.waited += waited
+                usage.max_wait = max(usage.max_wait, waited)
+            # Later requests that only conflicted with this one while it waited may proceed
+            self._condition.notify_all()
+        
+        if waited > 0.1:
+            logger.info(f"{holder or 'Execution'} waited {waited:.2f}s for {', '.join(sorted(request.instruments))}")
+        return request
+    
+    def release(self, reservation: Reservation):
+        """Give back reserved resources (releasing twice is harmless)"""
+        with self._condition:
+            if reservation.released or reservation not in self._granted:
+                return
+            reservation.released = True
+            self._granted.discard(reservation)
+            now = time.monotonic()
+            for instrument in reservation.instruments:
+                usage = self._usage_of(instrument)
+                usage.holding -= 1
+                if usage.holding == 0:
+                    usage.busy += now - usage.busy_since
+            self._condition.notify_all()
+    
+    def holders(self, instrument: str) -> List[str]:
+        """Executions currently holding instrument or one of its channels"""
+        with self._condition:
+            return [reservation.holder for reservation in self._granted if instrument in reservation.instruments]
+    
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Utilization and waiting time per instrument"""
+        now = time.monotonic()
+        elapsed = max(now - self._created, 1e-9)
+        with self._condition:
+            stats = {}
+            for instrument, usage in self._usage.items():
+                busy = usage.busy + (now - usage.busy_since if usage.holding else 0.0)
+                stats[instrument] = {
+                    "reservations": usage.reservations,
+                    "utilization": busy / elapsed,  # Share of the time anything on the instrument was reserved
+                    "mean_wait_ms": usage.waited / usage.reservations * 1000 if usage.reservations else 0.0,
+                    "max_wait_ms": usage.max_wait * 1000,
+                    "timeouts": usage.timeouts,
+                    "holders": [reservation.holder for reservation in self._granted
+                                if instrument in reservation.instruments],
+                    "waiting": sum(1 for reservation in self._waiting if instrument in reservation.instruments)
+                }
+            return stats
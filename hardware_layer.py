@@ -5,13 +5,28 @@ This module provides an abstraction layer for different test equipment types.
 
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, Iterable, List, Set, Tuple, Callable, Union
 import serial
 import socket
+import struct
 import time
+import inspect
 import logging
-from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field, fields
 from datetime import datetime
+import numpy as np
+
+from rtt_estimator import RTTEstimator
+from command_metrics import CommandMetrics, instrumented
+from instrument_session import CircuitBreaker, resilient
+from instrument_settling import SettlingModel, read_until_stable, wait_for_operation_complete
+from io_worker import IOWorker, queued
+from calibration import CalibrationStore, CalibrationTable
+from equipment_reservations import ResourceManager
+from frequency_analysis import ToneAnalysis, analyze_tone
+from waveform import Waveform
+from modbus_test_client import create_frame, expected_response_length, verify_crc
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -41,15 +56,21 @@ class TestResult(Enum):
     ERROR = "ERROR"
     TIMEOUT = "TIMEOUT"
 
-@dataclass
+@dataclass(slots=True)
 class TestMeasurement:
-    """Data structure for test measurements"""
+    """
+    Data structure for test measurements
+    
+    Slotted to keep single readings small; large sets of readings belong in
+    a columnar measurement_buffer.MeasurementBuffer.
+    """
     parameter: str
     value: float
     unit: str
     min_limit: Optional[float] = None
     max_limit: Optional[float] = None
     timestamp: datetime = None
+    calibration_version: Optional[int] = None  # Version of the correction applied, None if uncorrected
     
     def __post_init__(self):
         if self.timestamp is None:
@@ -62,6 +83,70 @@ class TestMeasurement:
         if self.max_limit is not None and self.value > self.max_limit:
             return False
         return True
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable representation"""
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+@dataclass(eq=False)
+class BufferedMeasurement(TestMeasurement):
+    """Measurement backed by an array of buffered samples; value is the mean"""
+    samples: np.ndarray = field(default=None, repr=False)
+    
+    def __post_init__(self):
+        super().__post_init__()
+        if self.samples is None:
+            self.samples = np.array([self.value], dtype=np.float64)
+        self.value = float(self.samples.mean()) if self.samples.size else float('nan')
+    
+    @classmethod
+    def from_samples(cls, parameter: str, samples: np.ndarray, unit: str, **kwargs) -> 'BufferedMeasurement':
+        """Create a measurement from an array of samples"""
+        return cls(parameter, 0.0, unit, samples=samples, **kwargs)
+    
+    @property
+    def count(self) -> int:
+        return int(self.samples.size)
+    
+    @property
+    def mean(self) -> float:
+        return self.value
+    
+    @property
+    def stdev(self) -> float:
+        """Sample standard deviation"""
+        return float(self.samples.std(ddof=1)) if self.samples.size > 1 else 0.0
+    
+    @property
+    def min_value(self) -> float:
+        return float(self.samples.min()) if self.samples.size else float('nan')
+    
+    @property
+    def max_value(self) -> float:
+        return float(self.samples.max()) if self.samples.size else float('nan')
+    
+    @property
+    def peak_to_peak(self) -> float:
+        return self.max_value - self.min_value
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serializable representation with statistics in place of the raw samples
+        
+        Without samples the value, minimum and maximum are None rather than NaN,
+        which JSON cannot represent.
+        """
+        data = super().to_dict()
+        del data['samples']
+        data.update({
+            'count': self.count,
+            'stdev': self.stdev,
+            'min_value': self.min_value,
+            'max_value': self.max_value
+        })
+        if not self.count:
+            data.update(value=None, min_value=None, max_value=None)
+        return data
 
 @dataclass
 class ConnectionConfig:
@@ -72,18 +157,173 @@ class ConnectionConfig:
     baud_rate: Optional[int] = 9600
     timeout: float = 5.0
     additional_params: Dict[str, Any] = None
+    adaptive_timeout: bool = True  # Size response deadlines from observed round trips
+    min_timeout: float = 0.05  # Floor for adaptive deadlines (timeout is the ceiling)
+    command_metrics: bool = True  # Record per-command latency statistics
+    auto_reconnect: bool = True  # Reconnect dropped sessions and fail fast while the instrument is down
+    command_queue: bool = True  # Serialize I/O from all threads through one worker thread per interface
     
     def __post_init__(self):
         if self.additional_params is None:
             self.additional_params = {}
 
-class HardwareInterface(ABC):
-    """Abstract base class for hardware interfaces"""
+class InstrumentInterfaceBase:
+    """Transport independent parts shared by the blocking and asyncio interfaces"""
+    
+    # Commands that legitimately take far longer than a normal round trip;
+    # they always get the full configured timeout and are not used as RTT samples
+    SLOW_COMMANDS = ("*TST?", "*CAL?", "*OPC?", "*RST", "FETC?")
     
     def __init__(self, config: ConnectionConfig):
         self.config = config
         self.connected = False
         self.last_error = None
+        self.rtt_estimator = None
+        if config.adaptive_timeout:
+            self.rtt_estimator = RTTEstimator(
+                initial_timeout=config.timeout,
+                min_timeout=min(config.min_timeout, config.timeout),
+                max_timeout=config.timeout
+            )
+        self.metrics = CommandMetrics() if config.command_metrics else None
+        
+        self.session_open = False  # connect() succeeded and disconnect() was not called since
+        # Run after a transparent reconnect, keyed by owner so a newer owner replaces an older one
+        self.reconnect_callbacks: Dict[Any, Callable[[], Any]] = {}
+        self.reconnects = 0
+        self._reconnecting = False
+        self.circuit_breaker = None
+        if config.auto_reconnect:
+            self.circuit_breaker = CircuitBreaker(
+                failure_threshold=config.additional_params.get('failure_threshold', 3),
+                reset_timeout=config.additional_params.get('circuit_reset_timeout', 5.0),
+                max_reset_timeout=config.additional_params.get('max_circuit_reset_timeout', 60.0)
+            )
+        self.io_worker: Optional[IOWorker] = None
+    
+    def get_last_error(self) -> Optional[str]:
+        """Get last error message"""
+        return self.last_error
+    
+    @staticmethod
+    def is_query(command: str) -> bool:
+        """Check whether a command produces a response"""
+        return '?' in command
+    
+    @staticmethod
+    def join_commands(commands: List[str]) -> str:
+        """
+        Join commands into one SCPI program message
+        
+        Commands are separated by ';' and each subsystem command is prefixed
+        with ':' so its header is resolved from the root, not relative to the
+        previous command.
+        """
+        return ';'.join(command if index == 0 or command.startswith((':', '*')) else ':' + command
+                        for index, command in enumerate(commands))
+    
+    def _split_batch_response(self, commands: List[str], response: str) -> List[str]:
+        """Split the response line of a batch into one response per query"""
+        queries = sum(1 for command in commands if self.is_query(command))
+        if queries == 0:
+            return []
+        
+        responses = [part.strip() for part in response.split(';')]
+        if len(responses) != queries:
+            raise ValueError(f"Expected {queries} response(s) to batch, got {len(responses)}: {response}")
+        return responses
+    
+    @staticmethod
+    def _block_length_digits(header: bytes) -> int:
+        """Number of length digits announced by a definite-length block header (#<n>)"""
+        if header[:1] != b'#' or not header[1:2].isdigit() or header[1:2] == b'0':
+            raise ValueError(f"Expected a definite-length block, got {header!r}")
+        return int(header[1:2])
+    
+    def _is_slow_command(self, command: str) -> bool:
+        upper = command.upper()
+        return any(slow in upper for slow in self.SLOW_COMMANDS)
+    
+    def _response_timeout(self, command: str, timeout: Optional[float] = None) -> float:
+        """Deadline for the response to command"""
+        if timeout is not None:
+            return timeout
+        if self.rtt_estimator is None or self._is_slow_command(command):
+            return self.config.timeout
+        return self.rtt_estimator.timeout
+    
+    def _record_response(self, command: str, elapsed: float, answered: bool, explicit_timeout: bool):
+        """Feed a round trip into the estimator; unanswered queries back it off"""
+        if self.rtt_estimator is None or explicit_timeout or self._is_slow_command(command):
+            return
+        if answered:
+            self.rtt_estimator.observe(elapsed)
+        elif self.is_query(command):
+            self.rtt_estimator.on_timeout()
+    
+    def get_timing_stats(self) -> Optional[Dict[str, Any]]:
+        """Round-trip statistics of the adaptive timeout estimator"""
+        return self.rtt_estimator.get_stats() if self.rtt_estimator else None
+
+    def get_command_metrics(self, slowest: int = 0) -> Optional[Dict[str, Any]]:
+        """Per-command latency statistics, with the slowest commands if requested"""
+        return self.metrics.get_stats(slowest) if self.metrics else None
+
+    def add_reconnect_callback(self, callback: Callable[[], Any], owner: Any = None):
+        """
+        Register a callback run after a transparent reconnect (e.g. to restore configuration)
+        
+        Args:
+            callback: Called without arguments
+            owner: Key of the callback (the callback itself if None); a callback
+                   registered under the same owner is replaced
+        """
+        self.reconnect_callbacks[callback if owner is None else owner] = callback
+    
+    def remove_reconnect_callback(self, owner: Any, callback: Optional[Callable[[], Any]] = None):
+        """Remove the callback of owner; with callback given only if it is still the registered one"""
+        if callback is None or self.reconnect_callbacks.get(owner) == callback:
+            self.reconnect_callbacks.pop(owner, None)
+    
+    def _open_session(self):
+        """Mark the session open after a successful connect"""
+        self.session_open = True
+        if self.circuit_breaker:
+            self.circuit_breaker.record_success()
+    
+    def _reconnect_delays(self) -> List[float]:
+        """Delay before each reconnect attempt: immediately, then exponential backoff"""
+        attempts = self.config.additional_params.get('reconnect_attempts', 3)
+        delay = self.config.additional_params.get('reconnect_delay', 0.1)
+        return [0.0] + [delay * 2 ** attempt for attempt in range(attempts - 1)]
+    
+    def get_queue_stats(self) -> Optional[Dict[str, Any]]:
+        """Request queue statistics of the I/O worker"""
+        return self.io_worker.get_stats() if self.io_worker else None
+    
+    def get_session_stats(self) -> Dict[str, Any]:
+        """Reconnect and circuit breaker state for status reporting"""
+        return {
+            "session_open": self.session_open,
+            "reconnects": self.reconnects,
+            "circuit": self.circuit_breaker.get_stats() if self.circuit_breaker else None
+        }
+
+class HardwareInterface(InstrumentInterfaceBase, ABC):
+    """
+    Abstract base class for hardware interfaces
+    
+    Implementations are safe to share between threads: connect, disconnect
+    and every command run on the interface's I/O worker, so the response
+    read after a write always belongs to that write. Safety commands such
+    as OUTP OFF are served before queued requests.
+    """
+    
+    def __init__(self, config: ConnectionConfig):
+        super().__init__(config)
+        if config.command_queue:
+            name = f"{config.address}:{config.port}" if config.port else config.address
+            self.io_worker = IOWorker(name, queue_timeout=config.additional_params.get('queue_timeout', 30.0))
         
     @abstractmethod
     def connect(self) -> bool:
@@ -96,8 +336,13 @@ class HardwareInterface(ABC):
         pass
     
     @abstractmethod
-    def send_command(self, command: str) -> str:
-        """Send command and get response"""
+    def send_command(self, command: str, timeout: Optional[float] = None) -> str:
+        """
+        Send command and get response (timeout overrides the adaptive deadline)
+        
+        Only queries are answered by SCPI instruments; for other commands
+        nothing is read back and an empty string is returned.
+        """
         pass
     
     @abstractmethod
@@ -105,9 +350,122 @@ class HardwareInterface(ABC):
         """Check connection status"""
         pass
     
-    def get_last_error(self) -> Optional[str]:
-        """Get last error message"""
-        return self.last_error
+    @abstractmethod
+    def _write(self, data: bytes):
+        """Write raw bytes to the instrument"""
+        pass
+    
+    @abstractmethod
+    def _read_exact(self, size: int, timeout: float) -> bytes:
+        """Read exactly size bytes, raising TimeoutError if they do not arrive in time"""
+        pass
+    
+    def reconnect(self) -> bool:
+        """
+        Re-open a dropped session with exponential backoff
+        
+        On success the reconnect callbacks are run, so the instrument is
+        back in its previous configuration before the failed command is
+        retried. The session stays open either way; the circuit breaker
+        decides when the next attempt is made.
+        """
+        self._reconnecting = True
+        try:
+            for attempt, delay in enumerate(self._reconnect_delays(), 1):
+                time.sleep(delay)
+                self.disconnect()
+                if self.connect():
+                    self.reconnects += 1
+                    logger.info(f"Reconnected to {self.config.address} (attempt {attempt})")
+                    for callback in list(self.reconnect_callbacks.values()):
+                        callback()
+                    return True
+                logger.warning(f"Reconnect attempt {attempt} to {self.config.address} failed")
+            return False
+        finally:
+            self._reconnecting = False
+            self.session_open = True
+    
+    def send_batch(self, commands: List[str], timeout: Optional[float] = None) -> List[str]:
+        """
+        Send several commands in a single write
+        
+        The instrument answers all queries of the message in one response
+        line, so a batch costs one round trip when it contains queries and
+        none otherwise.
+        
+        Returns:
+            One response per query, in command order
+        """
+        response = self.send_command(self.join_commands(commands), timeout)
+        return self._split_batch_response(commands, response)
+    
+    @queued
+    @instrumented
+    @resilient
+    def query_binary_block(self, command: str, timeout: Optional[float] = None) -> bytes:
+        """
+        Send a query answered by an IEEE 488.2 definite-length block
+        
+        The block has the form #<n><length><payload> followed by the
+        message terminator; the payload is returned undecoded.
+        """
+        if not self.is_connected():
+            raise ConnectionError("Not connected to instrument")
+        
+        response_timeout = self._response_timeout(command, timeout)
+        try:
+            self._write((command + '\r\n').encode())
+            start_time = time.time()
+            
+            digits = self._block_length_digits(self._read_exact(2, response_timeout))
+            length = int(self._read_exact(digits, response_timeout))
+            payload = self._read_exact(length, response_timeout)
+            
+            # Consume the terminator (\n or \r\n) so the next response starts clean
+            if self._read_exact(1, response_timeout) == b'\r':
+                self._read_exact(1, response_timeout)
+            
+            self._record_response(command, time.time() - start_time, True, timeout is not None)
+            logger.debug(f"Sent: {command}, Received: {length} byte block")
+            return payload
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Binary block transfer error: {e}")
+            raise
+    
+    @queued
+    @resilient
+    def exchange(self, request: bytes, response_length: Callable[[bytes], Optional[int]],
+                 timeout: Optional[float] = None) -> bytes:
+        """
+        Send a binary request (e.g. a Modbus frame) and read its binary response
+        
+        Args:
+            request: Complete request frame
+            response_length: Total response length implied by the bytes received so far,
+                             None while that is not known yet
+            timeout: Deadline for each read (defaults to the full interface timeout)
+        """
+        if not self.is_connected():
+            raise ConnectionError("Not connected to instrument")
+        
+        response_timeout = self.config.timeout if timeout is None else timeout
+        try:
+            self._write(request)
+            response = b""
+            while True:
+                length = response_length(response)
+                if length is None:
+                    response += self._read_exact(1, response_timeout)
+                elif len(response) < length:
+                    response += self._read_exact(length - len(response), response_timeout)
+                else:
+                    return response
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Binary exchange error: {e}")
+            raise
 
 class SerialInterface(HardwareInterface):
     """Serial port interface implementation"""
@@ -115,9 +473,13 @@ class SerialInterface(HardwareInterface):
     def __init__(self, config: ConnectionConfig):
         super().__init__(config)
         self.serial_connection = None
+        self._discard_input = False
     
+    @queued
     def connect(self) -> bool:
-        """Connect to serial port"""
+        """Connect to serial port (a no-op while connected, so users of a shared session can all call it)"""
+        if self.is_connected():
+            return True
         try:
             self.serial_connection = serial.Serial(
                 port=self.config.address,
@@ -128,6 +490,7 @@ class SerialInterface(HardwareInterface):
                 stopbits=self.config.additional_params.get('stopbits', 1)
             )
             self.connected = True
+            self._open_session()
             logger.info(f"Connected to serial port {self.config.address}")
             return True
         except Exception as e:
@@ -135,12 +498,14 @@ class SerialInterface(HardwareInterface):
             logger.error(f"Failed to connect to serial port {self.config.address}: {e}")
             return False
     
+    @queued
     def disconnect(self) -> bool:
         """Disconnect from serial port"""
         try:
             if self.serial_connection and self.serial_connection.is_open:
                 self.serial_connection.close()
             self.connected = False
+            self.session_open = False
             logger.info(f"Disconnected from serial port {self.config.address}")
             return True
         except Exception as e:
@@ -148,17 +513,41 @@ class SerialInterface(HardwareInterface):
             logger.error(f"Failed to disconnect from serial port: {e}")
             return False
     
-    def send_command(self, command: str) -> str:
+    @queued
+    @instrumented
+    @resilient
+    def send_command(self, command: str, timeout: Optional[float] = None) -> str:
         """Send command via serial and get response"""
         if not self.connected or not self.serial_connection:
             raise ConnectionError("Not connected to serial port")
         
         try:
+            # A late answer to a timed out query must not be read as this command's response
+            if self._discard_input:
+                self.serial_connection.reset_input_buffer()
+                self._discard_input = False
+            
+            self.serial_connection.timeout = self._response_timeout(command, timeout)
+            
             # Send command
             self.serial_connection.write((command + '\r\n').encode())
+            start_time = time.time()
+            
+            if not self.is_query(command):
+                logger.debug(f"Sent: {command}")
+                return ""
             
             # Read response
-            response = self.serial_connection.readline().decode().strip()
+            raw = self.serial_connection.readline()
+            answered = raw.endswith(b'\n')
+            self._record_response(command, time.time() - start_time, answered, timeout is not None)
+            
+            if not answered:
+                self._discard_input = True
+                raise TimeoutError(f"No response to '{command}' within "
+                                   f"{self.serial_connection.timeout * 1000:.0f} ms")
+            
+            response = raw.decode().strip()
             logger.debug(f"Sent: {command}, Received: {response}")
             return response
         except Exception as e:
@@ -169,6 +558,118 @@ class SerialInterface(HardwareInterface):
     def is_connected(self) -> bool:
         """Check if serial connection is active"""
         return self.connected and self.serial_connection and self.serial_connection.is_open
+    
+    def _write(self, data: bytes):
+        if self._discard_input:
+            self.serial_connection.reset_input_buffer()
+            self._discard_input = False
+        self.serial_connection.write(data)
+    
+    def _read_exact(self, size: int, timeout: float) -> bytes:
+        self.serial_connection.timeout = timeout
+        data = self.serial_connection.read(size)
+        if len(data) < size:
+            self._discard_input = True
+            raise TimeoutError(f"Received {len(data)} of {size} bytes within {timeout * 1000:.0f} ms")
+        return data
+
+class SocketReader:
+    """
+    Buffered reader for one stream socket
+    
+    Data is received into a preallocated chunk with recv_into and appended
+    to a bytearray buffer, so responses split across TCP segments are
+    reassembled and bytes following a response are kept for the next read.
+    """
+    
+    def __init__(self, sock: socket.socket, chunk_size: int = 65536):
+        self.sock = sock
+        self.buffer = bytearray()
+        self._chunk = bytearray(chunk_size)
+        self._view = memoryview(self._chunk)
+    
+    def _fill(self, deadline: float):
+        """Receive one chunk into the buffer, waiting at most until deadline"""
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise socket.timeout()
+        self.sock.settimeout(remaining)
+        received = self.sock.recv_into(self._chunk)
+        if received == 0:
+            raise ConnectionError("Connection closed by instrument")
+        self.buffer += self._view[:received]
+    
+    def _take(self, size: int) -> bytes:
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+    
+    def read_exact(self, size: int, timeout: float) -> bytes:
+        """Read exactly size bytes"""
+        deadline = time.time() + timeout
+        try:
+            while len(self.buffer) < size:
+                self._fill(deadline)
+        except socket.timeout:
+            raise TimeoutError(f"Received {len(self.buffer)} of {size} bytes within {timeout * 1000:.0f} ms")
+        return self._take(size)
+    
+    def read_until(self, terminator: bytes, timeout: float) -> bytes:
+        """Read up to and including terminator"""
+        deadline = time.time() + timeout
+        start = 0
+        try:
+            while True:
+                index = self.buffer.find(terminator, start)
+                if index >= 0:
+                    return self._take(index + len(terminator))
+                # Only rescan the tail, the terminator may straddle two chunks
+                start = max(0, len(self.buffer) - len(terminator) + 1)
+                self._fill(deadline)
+        except socket.timeout:
+            raise TimeoutError(f"No terminator within {timeout * 1000:.0f} ms "
+                               f"({len(self.buffer)} bytes buffered)")
+    
+    def read_response(self, timeout: float, terminator: bytes = b'\n') -> bytes:
+        """
+        Read one complete response message
+        
+        A response starting with an IEEE 488.2 definite-length block header is
+        read by length (its payload may contain the terminator); anything else
+        is read up to the terminator. The terminator is included.
+        """
+        deadline = time.time() + timeout
+        try:
+            while len(self.buffer) < 2:
+                self._fill(deadline)
+            
+            if self.buffer[0:1] == b'#' and self.buffer[1:2].isdigit() and self.buffer[1:2] != b'0':
+                digits = int(self.buffer[1:2])
+                while len(self.buffer) < 2 + digits:
+                    self._fill(deadline)
+                size = 2 + digits + int(self.buffer[2:2 + digits])
+                while len(self.buffer) < size:
+                    self._fill(deadline)
+                block = self._take(size)
+                return block + self.read_until(terminator, max(0.0, deadline - time.time()))
+        except socket.timeout:
+            raise TimeoutError(f"Incomplete response within {timeout * 1000:.0f} ms "
+                               f"({len(self.buffer)} bytes buffered)")
+        
+        return self.read_until(terminator, max(0.0, deadline - time.time()))
+    
+    def discard(self):
+        """Drop buffered data and anything already waiting on the socket"""
+        self.buffer.clear()
+        previous_timeout = self.sock.gettimeout()
+        self.sock.settimeout(0)
+        try:
+            while self.sock.recv_into(self._chunk):
+                pass
+        except (BlockingIOError, socket.timeout):
+            pass
+        finally:
+            self.sock.settimeout(previous_timeout)
 
 class TCPInterface(HardwareInterface):
     """TCP/IP interface implementation"""
@@ -176,14 +677,39 @@ class TCPInterface(HardwareInterface):
     def __init__(self, config: ConnectionConfig):
         super().__init__(config)
         self.socket_connection = None
+        self.reader: Optional[SocketReader] = None
+        self._discard_input = False
     
+    def _configure_socket(self, sock: socket.socket):
+        """Disable Nagle (commands are small and latency bound) and enable keepalive"""
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        
+        # Detect a dead instrument link within seconds instead of the OS default of hours
+        keepalive = {
+            'TCP_KEEPIDLE': self.config.additional_params.get('keepalive_idle', 10),
+            'TCP_KEEPINTVL': self.config.additional_params.get('keepalive_interval', 5),
+            'TCP_KEEPCNT': self.config.additional_params.get('keepalive_count', 3)
+        }
+        for option, value in keepalive.items():
+            if hasattr(socket, option):
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+    
+    @queued
     def connect(self) -> bool:
-        """Connect via TCP/IP"""
+        """Connect via TCP/IP (a no-op while connected, so users of a shared session can all call it)"""
+        if self.is_connected():
+            return True
         try:
             self.socket_connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket_connection.settimeout(self.config.timeout)
             self.socket_connection.connect((self.config.address, self.config.port))
+            self._configure_socket(self.socket_connection)
+            self.reader = SocketReader(self.socket_connection,
+                                       self.config.additional_params.get('receive_chunk_size', 65536))
+            self._discard_input = False
             self.connected = True
+            self._open_session()
             logger.info(f"Connected to TCP {self.config.address}:{self.config.port}")
             return True
         except Exception as e:
@@ -191,12 +717,15 @@ class TCPInterface(HardwareInterface):
             logger.error(f"Failed to connect to TCP {self.config.address}:{self.config.port}: {e}")
             return False
     
+    @queued
     def disconnect(self) -> bool:
         """Disconnect TCP connection"""
         try:
             if self.socket_connection:
                 self.socket_connection.close()
+            self.reader = None
             self.connected = False
+            self.session_open = False
             logger.info(f"Disconnected from TCP {self.config.address}:{self.config.port}")
             return True
         except Exception as e:
@@ -204,17 +733,34 @@ class TCPInterface(HardwareInterface):
             logger.error(f"Failed to disconnect from TCP: {e}")
             return False
     
-    def send_command(self, command: str) -> str:
+    @queued
+    @instrumented
+    @resilient
+    def send_command(self, command: str, timeout: Optional[float] = None) -> str:
         """Send command via TCP and get response"""
         if not self.connected or not self.socket_connection:
             raise ConnectionError("Not connected to TCP port")
         
         try:
+            response_timeout = self._response_timeout(command, timeout)
+            
             # Send command
-            self.socket_connection.send((command + '\r\n').encode())
+            self._write((command + '\r\n').encode())
+            start_time = time.time()
+            
+            if not self.is_query(command):
+                logger.debug(f"Sent: {command}")
+                return ""
             
             # Read response
-            response = self.socket_connection.recv(1024).decode().strip()
+            try:
+                raw = self.read_response(response_timeout)
+            except TimeoutError:
+                self._record_response(command, time.time() - start_time, False, timeout is not None)
+                raise TimeoutError(f"No response to '{command}' within {response_timeout * 1000:.0f} ms")
+            
+            self._record_response(command, time.time() - start_time, True, timeout is not None)
+            response = raw.decode().strip()
             logger.debug(f"Sent: {command}, Received: {response}")
             return response
         except Exception as e:
@@ -222,19 +768,50 @@ class TCPInterface(HardwareInterface):
             logger.error(f"TCP communication error: {e}")
             raise
     
+    def read_response(self, timeout: float) -> bytes:
+        """Read one complete response message (see SocketReader.read_response)"""
+        try:
+            return self.reader.read_response(timeout)
+        except TimeoutError:
+            # A partial or late answer must not be read as the next command's response
+            self._discard_input = True
+            raise
+    
     def is_connected(self) -> bool:
         """Check if TCP connection is active"""
         return self.connected and self.socket_connection
+    
+    def _write(self, data: bytes):
+        if self._discard_input:
+            self.reader.discard()
+            self._discard_input = False
+        self.socket_connection.settimeout(self.config.timeout)
+        self.socket_connection.sendall(data)
+    
+    def _read_exact(self, size: int, timeout: float) -> bytes:
+        try:
+            return self.reader.read_exact(size, timeout)
+        except TimeoutError:
+            self._discard_input = True
+            raise
 
 class TestEquipment(ABC):
     """Abstract base class for test equipment"""
     
+    # Measurement function -> (parameter, unit), also the calibration keys of the readings
+    FUNCTIONS: Dict[str, Tuple[str, str]] = {}
+    
     def __init__(self, name: str, equipment_type: TestEquipmentType, interface: HardwareInterface):
         self.name = name
         self.equipment_type = equipment_type
         self.interface = interface
         self.calibrated = False
         self.last_calibration = None
+        self.calibration: Optional[CalibrationStore] = None  # Shared by HardwareManager; readings are raw without it
+        self.state: Dict[str, Any] = {}  # Shadow of the instrument configuration; missing keys are unknown
+        self.settling = SettlingModel()  # Learned settling times (HardwareManager shares a persisted one)
+    
+        self.attach_reconnect()
     
     @abstractmethod
     def initialize(self) -> bool:
@@ -251,21 +828,195 @@ class TestEquipment(ABC):
         """Perform equipment self-test"""
         pass
     
+    def _reconnect_callback(self) -> Callable[[], Any]:
+        if inspect.iscoroutinefunction(self.interface.send_batch):
+            return self._restore_state_async
+        return self._restore_state
+    
+    def attach_reconnect(self):
+        """
+        Put the configuration back after the interface transparently reconnects
+        
+        The callback is registered under the equipment name, so equipment
+        created again on a shared (pooled) session replaces its predecessor.
+        """
+        self.interface.add_reconnect_callback(self._reconnect_callback(), self.name)
+    
+    def detach_reconnect(self):
+        """Stop restoring this equipment's configuration on reconnect (disconnected, replaced or released)"""
+        self.interface.remove_reconnect_callback(self.name, self._reconnect_callback())
+    
     def connect(self) -> bool:
         """Connect to equipment"""
+        self.invalidate_state()
+        self.attach_reconnect()
         return self.interface.connect()
     
     def disconnect(self) -> bool:
         """Disconnect from equipment"""
+        self.invalidate_state()
+        self.detach_reconnect()
         return self.interface.disconnect()
     
     def is_connected(self) -> bool:
         """Check connection status"""
         return self.interface.is_connected()
+    
+    def invalidate_state(self):
+        """Forget the shadow configuration (after *RST, errors and reconnects)"""
+        self.state.clear()
+    
+    def _calibrate(self, function: str, range_value: Union[None, str, float],
+                   values: Union[float, np.ndarray]) -> Tuple[Union[float, np.ndarray], Optional[int]]:
+        """Apply this instrument's correction for function and range; returns the values and the version applied"""
+        if self.calibration is None:
+            return values, None
+        return self.calibration.apply(self.name, function, range_value, values)
+    
+    def _measurement(self, function: str, range_value: Union[None, str, float], value: float) -> TestMeasurement:
+        """Calibrated measurement from a raw reading of function"""
+        parameter, unit = self.FUNCTIONS.get(function, (function.replace(':', '_'), ""))
+        value, version = self._calibrate(function, range_value, value)
+        return TestMeasurement(parameter, value, unit, calibration_version=version)
+    
+    def _buffered(self, function: str, range_value: Union[None, str, float],
+                  samples: np.ndarray) -> BufferedMeasurement:
+        """Calibrated measurement from raw samples of function, corrected in one array operation"""
+        parameter, unit = self.FUNCTIONS.get(function, (function.replace(':', '_'), ""))
+        samples, version = self._calibrate(function, range_value, samples)
+        return BufferedMeasurement.from_samples(parameter, samples, unit, calibration_version=version)
+    
+    @staticmethod
+    def _require(state: Dict[str, Any], commands: List[str], key: str, value: Any, command: str):
+        """Queue command unless state already holds value for key"""
+        if key not in state or state[key] != value:
+            commands.append(command)
+            state[key] = value
+    
+    def _send_state(self, commands: List[str], state: Dict[str, Any]) -> List[str]:
+        """
+        Send commands and adopt the configuration they lead to
+        
+        On any failure the instrument state is unknown, so the shadow model is
+        dropped and the next call sends its full configuration again.
+        """
+        try:
+            responses = self.interface.send_batch(commands) if commands else []
+        except Exception:
+            self.invalidate_state()
+            raise
+        self.state = state
+        return responses
+
+    def _restore_commands(self, state: Dict[str, Any]) -> Tuple[List[str], Dict[str, Any]]:
+        """Commands that bring a freshly connected instrument back to state, and the resulting state"""
+        return [], {}
+    
+    def wait_until_complete(self, operation: str, max_wait: Optional[float] = None) -> float:
+        """
+        Wait for the instrument to finish its pending operations (e.g. a reset)
+        
+        Args:
+            operation: Settling profile that bounds the wait and learns from it
+            max_wait: Bound overriding the learned one
+        
+        Returns:
+            Seconds the operations took
+        """
+        bound = max_wait if max_wait is not None else self.settling.bound(self.name, operation)
+        elapsed, completed = wait_for_operation_complete(self.interface, bound)
+        self.settling.observe(self.name, operation, elapsed, completed)
+        if not completed:
+            raise TimeoutError(f"{self.name} did not complete {operation} within {bound:.2f}s")
+        return elapsed
+    
+    def _read_until_stable(self, operation: str, read: Callable[[], float], tolerance: float,
+                           consecutive: int = 3, max_wait: Optional[float] = None, interval: float = 0.0) -> float:
+        """Re-read until consecutive readings agree within tolerance, bounded by the learned settling time"""
+        bound = max_wait if max_wait is not None else self.settling.bound(self.name, operation)
+        value, elapsed, settled = read_until_stable(read, tolerance, bound, consecutive, interval)
+        self.settling.observe(self.name, operation, elapsed, settled)
+        if not settled:
+            logger.warning(f"{self.name}: {operation} not settled within {bound:.2f}s, using last reading")
+        return value
+    
+    def _restore_state(self):
+        """Re-apply the shadow configuration after a reconnect"""
+        saved, self.state = self.state, {}
+        commands, state = self._restore_commands(saved)
+        if commands:
+            logger.info(f"Restoring {self.name} configuration: {commands}")
+            self._send_state(commands, state)
+
+    # Async wrappers for equipment constructed on an AsyncHardwareInterface
+    # (async_hardware_layer); the blocking methods above need a HardwareInterface.
+    
+    async def connect_async(self) -> bool:
+        """Connect to equipment"""
+        self.invalidate_state()
+        self.attach_reconnect()
+        return await self.interface.connect()
+    
+    async def disconnect_async(self) -> bool:
+        """Disconnect from equipment"""
+        self.invalidate_state()
+        self.detach_reconnect()
+        return await self.interface.disconnect()
+    
+    async def identify_async(self) -> str:
+        """Query the identification string"""
+        return await self.interface.query("*IDN?")
+    
+    async def reset_async(self) -> bool:
+        """Reset equipment to default state"""
+        try:
+            await self.interface.send_command("*RST")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to reset {self.name}: {e}")
+            return False
+        finally:
+            self.invalidate_state()
+    
+    async def self_test_async(self) -> bool:
+        """Perform equipment self-test"""
+        try:
+            response = await self.interface.query("*TST?")
+            return response.strip() == "0"
+        except Exception as e:
+            logger.error(f"{self.name} self-test failed: {e}")
+            return False
+    
+    async def _send_state_async(self, commands: List[str], state: Dict[str, Any]) -> List[str]:
+        """Async counterpart of _send_state"""
+        try:
+            responses = await self.interface.send_batch(commands) if commands else []
+        except Exception:
+            self.invalidate_state()
+            raise
+        self.state = state
+        return responses
+    
+    async def _restore_state_async(self):
+        """Async counterpart of _restore_state"""
+        saved, self.state = self.state, {}
+        commands, state = self._restore_commands(saved)
+        if commands:
+            logger.info(f"Restoring {self.name} configuration: {commands}")
+            await self._send_state_async(commands, state)
 
 class Multimeter(TestEquipment):
     """Digital Multimeter implementation"""
     
+    # Measurement function -> (parameter name, unit)
+    FUNCTIONS = {
+        "VOLT:DC": ("DC_VOLTAGE", "V"),
+        "VOLT:AC": ("AC_VOLTAGE", "V"),
+        "CURR:DC": ("DC_CURRENT", "A"),
+        "CURR:AC": ("AC_CURRENT", "A"),
+        "RES": ("RESISTANCE", "Ohm")
+    }
+    
     def __init__(self, name: str, interface: HardwareInterface):
         super().__init__(name, TestEquipmentType.MULTIMETER, interface)
     
@@ -275,13 +1026,11 @@ class Multimeter(TestEquipment):
             if not self.connect():
                 return False
             
-            # Send identification query
-            response = self.interface.send_command("*IDN?")
+            # Identify and reset to known state in one message
+            response = self.interface.send_batch(["*IDN?", "*RST"])[0]
+            self.invalidate_state()
             logger.info(f"Multimeter identified: {response}")
-            
-            # Reset to known state
-            self.interface.send_command("*RST")
-            time.sleep(1)
+            self.wait_until_complete("reset")
             
             return True
         except Exception as e:
@@ -292,10 +1041,13 @@ class Multimeter(TestEquipment):
         """Reset multimeter"""
         try:
             self.interface.send_command("*RST")
+            self.wait_until_complete("reset")
             return True
         except Exception as e:
             logger.error(f"Failed to reset multimeter: {e}")
             return False
+        finally:
+            self.invalidate_state()
     
     def self_test(self) -> bool:
         """Perform multimeter self-test"""
@@ -306,47 +1058,247 @@ class Multimeter(TestEquipment):
             logger.error(f"Multimeter self-test failed: {e}")
             return False
     
-    def measure_voltage_dc(self, range_value: Optional[float] = None) -> TestMeasurement:
+    def _configure(self, function: str, range_value: Optional[float] = None, nplc: Optional[float] = None,
+                   sample_count: int = 1, data_format: str = "ASC", trigger_count: int = 1,
+                   trigger_source: str = "IMM", trigger_delay: Optional[float] = None,
+                   sample_interval: Optional[float] = None) -> Tuple[List[str], Dict[str, Any]]:
+        """
+        Commands needed to reach a measurement configuration, and the resulting state
+        
+        Only settings that differ from the shadow state are sent; a 100 point
+        sweep on an unchanged configuration is 100 bare READ? queries.
+        """
+        state = dict(self.state)
+        commands = []
+        
+        if state.get("function") != function:
+            commands.append(f"CONF:{function}")
+            # CONF restores auto range, default resolution, a single sample/trigger,
+            # immediate triggering and sampling and automatic trigger delay
+            state.pop("nplc", None)
+            state.update(function=function, range="AUTO", sample_count=1, trigger_count=1,
+                         trigger_source="IMM", trigger_delay="AUTO", sample_source="IMM")
+        
+        if range_value:
+            self._require(state, commands, "range", range_value, f"{function}:RANG {range_value}")
+        else:
+            self._require(state, commands, "range", "AUTO", f"{function}:RANG:AUTO ON")
+        if nplc is not None:
+            self._require(state, commands, "nplc", nplc, f"{function}:NPLC {nplc}")
+        self._require(state, commands, "sample_count", sample_count, f"SAMP:COUN {sample_count}")
+        if sample_interval is None:
+            self._require(state, commands, "sample_source", "IMM", "SAMP:SOUR IMM")
+        else:
+            self._require(state, commands, "sample_source", "TIM", "SAMP:SOUR TIM")
+            self._require(state, commands, "sample_interval", sample_interval, f"SAMP:TIM {sample_interval}")
+        self._require(state, commands, "trigger_count", trigger_count, f"TRIG:COUN {trigger_count}")
+        self._require(state, commands, "trigger_source", trigger_source, f"TRIG:SOUR {trigger_source}")
+        if trigger_delay is None:
+            self._require(state, commands, "trigger_delay", "AUTO", "TRIG:DEL:AUTO ON")
+        else:
+            self._require(state, commands, "trigger_delay", trigger_delay, f"TRIG:DEL {trigger_delay}")
+        # READ? answers in the data format too, so a binary acquisition must be undone
+        self._require(state, commands, "format", data_format, f"FORM:DATA {data_format}")
+        
+        return commands, state
+    
+    def _restore_commands(self, state: Dict[str, Any]) -> Tuple[List[str], Dict[str, Any]]:
+        """Reconfigure the measurement function, range, NPLC, sample/trigger setup, sample timer and format"""
+        if "function" not in state:
+            return [], {}
+        range_value = state.get("range")
+        trigger_delay = state.get("trigger_delay", "AUTO")
+        timed = state.get("sample_source") == "TIM"
+        return self._configure(state["function"], None if range_value == "AUTO" else range_value,
+                               state.get("nplc"), state.get("sample_count", 1), state.get("format", "ASC"),
+                               state.get("trigger_count", 1), state.get("trigger_source", "IMM"),
+                               None if trigger_delay == "AUTO" else trigger_delay,
+                               state.get("sample_interval") if timed else None)
+    
+    def _read(self, function: str, range_value: Optional[float] = None, nplc: Optional[float] = None) -> float:
+        """Configure a measurement function if needed and take a raw reading in a single round trip"""
+        commands, state = self._configure(function, range_value, nplc)
+        return float(self._send_state(commands + ["READ?"], state)[0])
+    
+    async def measure_async(self, function: str = "VOLT:DC", range_value: Optional[float] = None,
+                            nplc: Optional[float] = None) -> TestMeasurement:
+        """Take one reading of function through an async interface"""
+        commands, state = self._configure(function, range_value, nplc)
+        try:
+            response = await self._send_state_async(commands + ["READ?"], state)
+            return self._measurement(function, range_value, float(response[0]))
+        except Exception as e:
+            logger.error(f"Failed to measure {function}: {e}")
+            raise
+    
+    def measure_voltage_dc(self, range_value: Optional[float] = None,
+                           nplc: Optional[float] = None) -> TestMeasurement:
         """Measure DC voltage"""
         try:
-            if range_value:
-                self.interface.send_command(f"VOLT:DC:RANG {range_value}")
-            
-            self.interface.send_command("CONF:VOLT:DC")
-            response = self.interface.send_command("READ?")
-            
-            voltage = float(response.strip())
-            return TestMeasurement("DC_VOLTAGE", voltage, "V")
+            return self._measurement("VOLT:DC", range_value, self._read("VOLT:DC", range_value, nplc))
         except Exception as e:
             logger.error(f"Failed to measure DC voltage: {e}")
             raise
     
-    def measure_current_dc(self, range_value: Optional[float] = None) -> TestMeasurement:
+    def measure_until_stable(self, function: str = "VOLT:DC", tolerance: float = 1e-3,
+                             range_value: Optional[float] = None, nplc: Optional[float] = None,
+                             consecutive: int = 3, max_wait: Optional[float] = None,
+                             interval: float = 0.0) -> TestMeasurement:
+        """
+        Re-read until the reading has settled (e.g. after a supply or relay change)
+        
+        The readings are paced by the integration time; with very short
+        integration times use an interval so a slow drift is not mistaken
+        for a settled value.
+        
+        Args:
+            function: Measurement function (VOLT:DC, CURR:DC, RES, ...)
+            tolerance: Largest spread of the last consecutive readings, in the function's unit
+            range_value: Fixed range (auto range if None)
+            nplc: Integration time in power line cycles (instrument default if None)
+            consecutive: Number of readings that must agree
+            max_wait: Bound overriding the learned settling time
+            interval: Delay between readings
+        """
+        try:
+            value = self._read_until_stable(f"stable_{function}", lambda: self._read(function, range_value, nplc),
+                                            tolerance, consecutive, max_wait, interval)
+            return self._measurement(function, range_value, value)
+        except Exception as e:
+            logger.error(f"Failed to measure settled {function}: {e}")
+            raise
+    
+    def measure_current_dc(self, range_value: Optional[float] = None,
+                           nplc: Optional[float] = None) -> TestMeasurement:
         """Measure DC current"""
         try:
-            if range_value:
-                self.interface.send_command(f"CURR:DC:RANG {range_value}")
-            
-            self.interface.send_command("CONF:CURR:DC")
-            response = self.interface.send_command("READ?")
-            
-            current = float(response.strip())
-            return TestMeasurement("DC_CURRENT", current, "A")
+            return self._measurement("CURR:DC", range_value, self._read("CURR:DC", range_value, nplc))
         except Exception as e:
             logger.error(f"Failed to measure DC current: {e}")
             raise
     
-    def measure_resistance(self, range_value: Optional[float] = None) -> TestMeasurement:
+    def acquire(self, function: str = "VOLT:DC", count: int = 100, range_value: Optional[float] = None,
+                binary: bool = True, timeout: Optional[float] = None, nplc: Optional[float] = None,
+                sample_interval: Optional[float] = None) -> BufferedMeasurement:
+        """
+        Take count readings into the instrument buffer and fetch them in one transfer
+        
+        Args:
+            function: Measurement function (VOLT:DC, CURR:DC, RES, ...)
+            count: Number of samples (SAMP:COUN) for a single trigger
+            range_value: Fixed range (auto range if None)
+            binary: Transfer samples as a REAL,64 block instead of ASCII
+            timeout: Deadline for the acquisition (defaults to the full interface timeout)
+            nplc: Integration time in power line cycles (instrument default if None)
+            sample_interval: Digitize: seconds between samples (SAMP:SOUR TIM); the
+                             integration time must be shorter
+        """
+        commands, state = self._configure(function, range_value, nplc, sample_count=count,
+                                          data_format="REAL,64" if binary else "ASC",
+                                          sample_interval=sample_interval)
+        message = HardwareInterface.join_commands(commands + ["INIT", "FETC?"])
+        
+        try:
+            samples = self._fetch_samples(message, count, binary, timeout)
+            self.state = state
+            return self._buffered(function, range_value, samples)
+        except Exception as e:
+            self.invalidate_state()
+            logger.error(f"Failed to acquire {function} samples: {e}")
+            raise
+    
+    def measure_tone(self, count: int = 4096, sample_interval: float = 1e-4, function: str = "VOLT:DC",
+                     range_value: Optional[float] = None, nplc: Optional[float] = 0.001,
+                     timeout: Optional[float] = None, max_harmonic: int = 5) -> ToneAnalysis:
+        """
+        Digitize the input and estimate its frequency and THD by FFT
+        
+        The frequency must be below half the sample rate (1 / sample_interval).
+        
+        Args:
+            count: Number of samples; more samples give a finer frequency resolution
+            sample_interval: Seconds between samples
+            function: Measurement function to digitize (DC coupled so the waveform is kept)
+            range_value: Fixed range (auto range if None)
+            nplc: Integration time in power line cycles, short enough for the sample interval
+            timeout: Deadline for the acquisition (defaults to the full interface timeout)
+            max_harmonic: Highest harmonic included in THD
+        """
+        measurement = self.acquire(function, count, range_value, timeout=timeout, nplc=nplc,
+                                   sample_interval=sample_interval)
+        return analyze_tone(measurement.samples, 1.0 / sample_interval, max_harmonic)
+    
+    def _fetch_samples(self, message: str, count: int, binary: bool, timeout: Optional[float]) -> np.ndarray:
+        """Send a message ending in FETC? and decode the readings it returns"""
+        if binary:
+            # IEEE 488.2 blocks are big-endian unless FORM:BORD SWAP is set
+            payload = self.interface.query_binary_block(message, timeout)
+            samples = np.frombuffer(payload, dtype='>f8').astype(np.float64)
+        else:
+            response = self.interface.send_command(message, timeout).strip()
+            samples = np.array(response.split(',') if response else [], dtype=np.float64)
+        
+        if samples.size == 0:
+            raise ValueError("Acquisition returned no samples")
+        if samples.size != count:
+            raise ValueError(f"Expected {count} samples, received {samples.size}")
+        return samples
+    
+    def arm(self, function: str = "VOLT:DC", count: int = 1, range_value: Optional[float] = None,
+            nplc: Optional[float] = None, trigger_source: str = "EXT", trigger_delay: Optional[float] = None,
+            binary: bool = True):
+        """
+        Wait for count triggers, taking one reading per trigger into the instrument buffer
+        
+        The readings are collected with fetch() once the triggering
+        instrument (e.g. a power supply running a list) is done.
+        
+        Args:
+            function: Measurement function (VOLT:DC, CURR:DC, RES, ...)
+            count: Number of triggers (TRIG:COUN)
+            range_value: Fixed range (auto range if None); use one for sweeps
+            nplc: Integration time in power line cycles (instrument default if None)
+            trigger_source: EXT for the rear panel trigger input, BUS for *TRG
+            trigger_delay: Settling time after each trigger (automatic if None)
+            binary: Transfer the readings as a REAL,64 block instead of ASCII
+        """
+        commands, state = self._configure(function, range_value, nplc, sample_count=1,
+                                          data_format="REAL,64" if binary else "ASC", trigger_count=count,
+                                          trigger_source=trigger_source, trigger_delay=trigger_delay)
+        # The query makes sure the meter is armed before anything can trigger it
+        self._send_state(commands + ["INIT", "TRIG:SOUR?"], state)
+    
+    def abort(self) -> bool:
+        """Abort a pending acquisition"""
+        try:
+            self.interface.send_command("ABOR")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to abort acquisition: {e}")
+            return False
+    
+    def fetch(self, timeout: Optional[float] = None) -> BufferedMeasurement:
+        """
+        Collect the readings of an armed acquisition (blocks until all triggers arrived)
+        
+        Args:
+            timeout: Deadline for the acquisition to finish (defaults to the full interface timeout)
+        """
+        function = self.state.get("function", "VOLT:DC")
+        count = self.state.get("sample_count", 1) * self.state.get("trigger_count", 1)
+        try:
+            samples = self._fetch_samples("FETC?", count, self.state.get("format") == "REAL,64", timeout)
+            return self._buffered(function, self.state.get("range"), samples)
+        except Exception as e:
+            self.invalidate_state()
+            logger.error(f"Failed to fetch {function} samples: {e}")
+            raise
+    
+    def measure_resistance(self, range_value: Optional[float] = None,
+                           nplc: Optional[float] = None) -> TestMeasurement:
         """Measure resistance"""
         try:
-            if range_value:
-                self.interface.send_command(f"RES:RANG {range_value}")
-            
-            self.interface.send_command("CONF:RES")
-            response = self.interface.send_command("READ?")
-            
-            resistance = float(response.strip())
-            return TestMeasurement("RESISTANCE", resistance, "Ohm")
+            return self._measurement("RES", range_value, self._read("RES", range_value, nplc))
         except Exception as e:
             logger.error(f"Failed to measure resistance: {e}")
             raise
@@ -354,6 +1306,11 @@ class Multimeter(TestEquipment):
 class PowerSupply(TestEquipment):
     """Programmable Power Supply implementation"""
     
+    FUNCTIONS = {
+        "VOLT:DC": ("OUTPUT_VOLTAGE", "V"),
+        "CURR:DC": ("OUTPUT_CURRENT", "A")
+    }
+    
     def __init__(self, name: str, interface: HardwareInterface):
         super().__init__(name, TestEquipmentType.POWER_SUPPLY, interface)
         self.output_enabled = False
@@ -364,13 +1321,10 @@ class PowerSupply(TestEquipment):
             if not self.connect():
                 return False
             
-            # Send identification query
-            response = self.interface.send_command("*IDN?")
+            # Identify, reset and turn off output in one message
+            response = self.interface.send_batch(["*IDN?", "*RST", "OUTP OFF"])[0]
             logger.info(f"Power supply identified: {response}")
-            
-            # Reset and turn off output
-            self.interface.send_command("*RST")
-            self.interface.send_command("OUTP OFF")
+            self.state = {"output": False}
             self.output_enabled = False
             
             return True
@@ -387,6 +1341,8 @@ class PowerSupply(TestEquipment):
         except Exception as e:
             logger.error(f"Failed to reset power supply: {e}")
             return False
+        finally:
+            self.invalidate_state()
     
     def self_test(self) -> bool:
         """Perform power supply self-test"""
@@ -397,10 +1353,42 @@ class PowerSupply(TestEquipment):
             logger.error(f"Power supply self-test failed: {e}")
             return False
     
+    def _plan_output(self, voltage: Optional[float] = None, current: Optional[float] = None,
+                     enable: Optional[bool] = None) -> Tuple[List[str], Dict[str, Any]]:
+        """Commands for the setpoints that differ from the shadow state, and the resulting state"""
+        state = dict(self.state)
+        commands = []
+        if state.get("mode") == "LIST" and (voltage is not None or current is not None):
+            # Fixed setpoints are ignored while the supply is in list mode
+            commands += ["VOLT:MODE FIX", "CURR:MODE FIX"]
+            state["mode"] = "FIX"
+        if voltage is not None:
+            self._require(state, commands, "voltage", voltage, f"VOLT {voltage}")
+        if current is not None:
+            self._require(state, commands, "current", current, f"CURR {current}")
+        if enable:
+            self._require(state, commands, "output", True, "OUTP ON")
+        elif enable is not None:
+            # Never skip switching the output off; the front panel may have turned it on
+            commands.append("OUTP OFF")
+            state["output"] = False
+        return commands, state
+        
+    def _restore_commands(self, state: Dict[str, Any]) -> Tuple[List[str], Dict[str, Any]]:
+        """Re-apply the setpoints and output state of state"""
+        return self._plan_output(state.get("voltage"), state.get("current"), state.get("output"))
+        
+    def _apply(self, voltage: Optional[float] = None, current: Optional[float] = None,
+               enable: Optional[bool] = None):
+        """Send the setpoints that differ from the shadow state in one batch"""
+        self._send_state(*self._plan_output(voltage, current, enable))
+        if enable is not None:
+            self.output_enabled = enable
+    
     def set_voltage(self, voltage: float) -> bool:
         """Set output voltage"""
         try:
-            self.interface.send_command(f"VOLT {voltage}")
+            self._apply(voltage=voltage)
             return True
         except Exception as e:
             logger.error(f"Failed to set voltage: {e}")
@@ -409,7 +1397,7 @@ class PowerSupply(TestEquipment):
     def set_current_limit(self, current: float) -> bool:
         """Set current limit"""
         try:
-            self.interface.send_command(f"CURR {current}")
+            self._apply(current=current)
             return True
         except Exception as e:
             logger.error(f"Failed to set current limit: {e}")
@@ -418,20 +1406,131 @@ class PowerSupply(TestEquipment):
     def enable_output(self, enable: bool = True) -> bool:
         """Enable or disable output"""
         try:
-            command = "OUTP ON" if enable else "OUTP OFF"
-            self.interface.send_command(command)
-            self.output_enabled = enable
+            self._apply(enable=enable)
             return True
         except Exception as e:
             logger.error(f"Failed to set output state: {e}")
             return False
     
+    def configure_output(self, voltage: float, current: Optional[float] = None,
+                         enable: Optional[bool] = None) -> bool:
+        """
+        Set voltage, current limit and output state in a single write
+        
+        Args:
+            voltage: Output voltage
+            current: Current limit (unchanged if None)
+            enable: Output state (unchanged if None)
+        """
+        try:
+            self._apply(voltage, current, enable)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to configure output: {e}")
+            return False
+    
+    async def configure_output_async(self, voltage: float, current: Optional[float] = None,
+                                     enable: Optional[bool] = None) -> bool:
+        """Async counterpart of configure_output"""
+        try:
+            await self._send_state_async(*self._plan_output(voltage, current, enable))
+            if enable is not None:
+                self.output_enabled = enable
+            return True
+        except Exception as e:
+            logger.error(f"Failed to configure output: {e}")
+            return False
+    
+    async def measure_output_async(self) -> Tuple[TestMeasurement, TestMeasurement]:
+        """Async counterpart of measure_output"""
+        try:
+            voltage, current = await self.interface.send_batch(["MEAS:VOLT?", "MEAS:CURR?"])
+            return (self._measurement("VOLT:DC", None, float(voltage)),
+                    self._measurement("CURR:DC", None, float(current)))
+        except Exception as e:
+            logger.error(f"Failed to measure output: {e}")
+            raise
+    
+    def load_list(self, voltages: List[float], currents: Optional[List[float]] = None,
+                  dwell: Union[float, List[float]] = 0.05) -> bool:
+        """
+        Load a voltage (and optionally current limit) list into sequence memory
+        
+        The list runs once when start_list() triggers it, holding each point
+        for its dwell time and pulsing the trigger output at the beginning
+        of every step. Fixed setpoints are restored by the next
+        set_voltage/set_current_limit/configure_output.
+        
+        Args:
+            voltages: Voltage of each point
+            currents: Current limit of each point (fixed current limit if None)
+            dwell: Seconds per point, one value for all points or one per point
+        """
+        dwells = dwell if isinstance(dwell, (list, tuple)) else [dwell]
+        commands = [f"LIST:VOLT {','.join(str(voltage) for voltage in voltages)}",
+                    f"LIST:DWEL {','.join(str(value) for value in dwells)}",
+                    "LIST:COUN 1", "LIST:TOUT:BOST ON", "VOLT:MODE LIST"]
+        if currents is not None:
+            commands[1:1] = [f"LIST:CURR {','.join(str(current) for current in currents)}"]
+            commands.append("CURR:MODE LIST")
+        commands.append("TRIG:SOUR BUS")
+        
+        # The last list point is held afterwards, so the fixed setpoints are no longer known
+        state = {key: value for key, value in self.state.items() if key not in ("voltage", "current")}
+        state["mode"] = "LIST"
+        try:
+            self._send_state(commands, state)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to load list: {e}")
+            return False
+    
+    def start_list(self) -> bool:
+        """Enable the output and trigger the loaded list"""
+        state = dict(self.state, output=True)
+        try:
+            self._send_state(["OUTP ON", "INIT", "*TRG"], state)
+            self.output_enabled = True
+            return True
+        except Exception as e:
+            logger.error(f"Failed to start list: {e}")
+            return False
+    
+    def measure_output(self) -> Tuple[TestMeasurement, TestMeasurement]:
+        """Measure output voltage and current with one compound query"""
+        try:
+            voltage, current = self.interface.send_batch(["MEAS:VOLT?", "MEAS:CURR?"])
+            return (self._measurement("VOLT:DC", None, float(voltage)),
+                    self._measurement("CURR:DC", None, float(current)))
+        except Exception as e:
+            logger.error(f"Failed to measure output: {e}")
+            raise
+    
+    def wait_for_output(self, tolerance: float = 0.01, consecutive: int = 3,
+                        max_wait: Optional[float] = None, interval: float = 0.01) -> TestMeasurement:
+        """
+        Re-read the output voltage until it has settled after a setpoint change
+        
+        Args:
+            tolerance: Largest spread of the last consecutive readings in volts
+            consecutive: Number of readings that must agree
+            max_wait: Bound overriding the learned settling time
+            interval: Delay between readings, so a slow slew is not taken for a settled output
+        """
+        readings = []
+        
+        def read() -> float:
+            readings.append(self.measure_output_voltage())
+            return readings[-1].value
+        
+        value = self._read_until_stable("output", read, tolerance, consecutive, max_wait, interval)
+        return TestMeasurement("OUTPUT_VOLTAGE", value, "V", calibration_version=readings[-1].calibration_version)
+    
     def measure_output_voltage(self) -> TestMeasurement:
         """Measure actual output voltage"""
         try:
             response = self.interface.send_command("MEAS:VOLT?")
-            voltage = float(response.strip())
-            return TestMeasurement("OUTPUT_VOLTAGE", voltage, "V")
+            return self._measurement("VOLT:DC", None, float(response.strip()))
         except Exception as e:
             logger.error(f"Failed to measure output voltage: {e}")
             raise
@@ -440,57 +1539,823 @@ class PowerSupply(TestEquipment):
         """Measure actual output current"""
         try:
             response = self.interface.send_command("MEAS:CURR?")
-            current = float(response.strip())
-            return TestMeasurement("OUTPUT_CURRENT", current, "A")
+            return self._measurement("CURR:DC", None, float(response.strip()))
         except Exception as e:
             logger.error(f"Failed to measure output current: {e}")
             raise
 
+class Oscilloscope(TestEquipment):
+    """Digital oscilloscope implementation (Keysight InfiniiVision style command set)"""
+    
+    # Waveform measurement -> (Waveform method, parameter suffix, unit)
+    MEASUREMENTS = {
+        "vpp": ("vpp", "VPP", "V"),
+        "mean": ("mean", "VAVG", "V"),
+        "rms": ("rms", "VRMS", "V"),
+        "frequency": ("frequency", "FREQUENCY", "Hz"),
+        "fft_frequency": ("fft_frequency", "FFT_FREQUENCY", "Hz"),
+        "thd": ("thd", "THD", "%"),
+        "period": ("period", "PERIOD", "s"),
+        "rise_time": ("rise_time", "RISE_TIME", "s"),
+        "fall_time": ("fall_time", "FALL_TIME", "s")
+    }
+    
+    def __init__(self, name: str, interface: HardwareInterface):
+        super().__init__(name, TestEquipmentType.OSCILLOSCOPE, interface)
+    
+    def initialize(self) -> bool:
+        """Initialize oscilloscope"""
+        try:
+            if not self.connect():
+                return False
+            
+            # Identify and reset to known state in one message
+            response = self.interface.send_batch(["*IDN?", "*RST"])[0]
+            self.invalidate_state()
+            logger.info(f"Oscilloscope identified: {response}")
+            self.wait_until_complete("reset")
+            
+            return True
+        except Exception as e:
+            logger.error(f"Failed to initialize oscilloscope: {e}")
+            return False
+    
+    def reset(self) -> bool:
+        """Reset oscilloscope"""
+        try:
+            self.interface.send_command("*RST")
+            self.wait_until_complete("reset")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to reset oscilloscope: {e}")
+            return False
+        finally:
+            self.invalidate_state()
+    
+    def self_test(self) -> bool:
+        """Perform oscilloscope self-test"""
+        try:
+            response = self.interface.send_command("*TST?")
+            return response.strip() == "0"
+        except Exception as e:
+            logger.error(f"Oscilloscope self-test failed: {e}")
+            return False
+    
+    def _restore_commands(self, state: Dict[str, Any]) -> Tuple[List[str], Dict[str, Any]]:
+        """Replay every setting of state (the shadow state is keyed by command header)"""
+        return [f"{header} {value}" for header, value in state.items()], dict(state)
+    
+    def _apply(self, settings: Dict[str, Any]):
+        """Send the settings (command header -> value) that differ from the shadow state in one batch"""
+        state = dict(self.state)
+        commands = []
+        for header, value in settings.items():
+            self._require(state, commands, header, value, f"{header} {value}")
+        self._send_state(commands, state)
+    
+    def configure_channel(self, channel: int, scale: float, offset: float = 0.0, coupling: str = "DC",
+                          enabled: bool = True) -> bool:
+        """
+        Set up a vertical channel
+        
+        Args:
+            channel: Channel number
+            scale: Volts per division (the screen is 8 divisions high)
+            offset: Voltage at the screen center
+            coupling: DC or AC
+            enabled: Display (and acquire) the channel
+        """
+        try:
+            self._apply({f"CHAN{channel}:DISP": "ON" if enabled else "OFF", f"CHAN{channel}:SCAL": scale,
+                         f"CHAN{channel}:OFFS": offset, f"CHAN{channel}:COUP": coupling.upper()})
+            return True
+        except Exception as e:
+            logger.error(f"Failed to configure channel {channel}: {e}")
+            return False
+    
+    def configure_timebase(self, scale: float, position: float = 0.0) -> bool:
+        """
+        Set up the horizontal axis
+        
+        Args:
+            scale: Seconds per division (the screen is 10 divisions wide)
+            position: Time of the screen center relative to the trigger
+        """
+        try:
+            self._apply({"TIM:SCAL": scale, "TIM:POS": position})
+            return True
+        except Exception as e:
+            logger.error(f"Failed to configure timebase: {e}")
+            return False
+    
+    def configure_trigger(self, channel: int, level: float, slope: str = "POS") -> bool:
+        """
+        Set up an edge trigger
+        
+        Args:
+            channel: Source channel
+            level: Trigger level in volts
+            slope: POS (rising), NEG (falling) or EITH
+        """
+        try:
+            self._apply({"TRIG:MODE": "EDGE", "TRIG:EDGE:SOUR": f"CHAN{channel}",
+                         "TRIG:EDGE:LEV": level, "TRIG:EDGE:SLOP": slope.upper()})
+            return True
+        except Exception as e:
+            logger.error(f"Failed to configure trigger: {e}")
+            return False
+    
+    def _read_waveform(self, channel: int, commands: List[str], state: Dict[str, Any],
+                       timeout: Optional[float]) -> Waveform:
+        """Select channel as waveform source after commands and transfer its record"""
+        self._require(state, commands, "WAV:SOUR", f"CHAN{channel}", f"WAV:SOUR CHAN{channel}")
+        preamble = self._send_state(commands + ["WAV:PRE?"], state)[0]
+        payload = self.interface.query_binary_block("WAV:DATA?", timeout)
+        waveform = Waveform.from_block(preamble, payload, f"CHAN{channel}")
+        # Channels are calibrated per vertical scale, the scope's equivalent of a range
+        volts, version = self._calibrate(waveform.source, self.state.get(f"{waveform.source}:SCAL"), waveform.volts)
+        if version is not None:
+            waveform.correct(volts, version)
+        return waveform
+    
+    def capture(self, channels: Union[int, List[int]] = 1, points: int = 1000, word: bool = False,
+                timeout: Optional[float] = None) -> Dict[int, Waveform]:
+        """
+        Acquire one triggered record of channels and transfer them as binary blocks
+        
+        The acquisition, the waveform setup and the first preamble go out in
+        one message, and each channel's record is one binary block.
+        
+        Args:
+            channels: Channel number or list of channel numbers
+            points: Record length to transfer
+            word: Transfer 16 bit (WORD) instead of 8 bit (BYTE) codes
+            timeout: Deadline for the acquisition (defaults to the full interface timeout)
+        
+        Returns:
+            Waveform per channel
+        """
+        channels = [channels] if isinstance(channels, int) else list(channels)
+        state = dict(self.state)
+        commands = []
+        data_format = "WORD" if word else "BYTE"
+        self._require(state, commands, "WAV:FORM", data_format, f"WAV:FORM {data_format}")
+        self._require(state, commands, "WAV:BYT", "MSBF", "WAV:BYT MSBF")
+        self._require(state, commands, "WAV:POIN", points, f"WAV:POIN {points}")
+        # DIGitize runs a single acquisition; commands after it wait until it has finished
+        commands.append("DIG " + ",".join(f"CHAN{channel}" for channel in channels))
+        
+        try:
+            waveforms = {}
+            for channel in channels:
+                waveforms[channel] = self._read_waveform(channel, commands, state, timeout)
+                state, commands = dict(self.state), []
+            return waveforms
+        except Exception as e:
+            self.invalidate_state()
+            logger.error(f"Failed to capture {channels}: {e}")
+            raise
+    
+    def measure(self, waveform: Waveform, names: List[str]) -> List[TestMeasurement]:
+        """
+        Measure a captured waveform
+        
+        Args:
+            waveform: Captured record
+            names: Keys of MEASUREMENTS (vpp, mean, rms, frequency, fft_frequency, thd, period, rise_time,
+                   fall_time)
+        """
+        measurements = []
+        for name in names:
+            method, suffix, unit = self.MEASUREMENTS[name]
+            measurements.append(TestMeasurement(f"{waveform.source}_{suffix}", getattr(waveform, method)(), unit,
+                                                calibration_version=waveform.calibration_version))
+        return measurements
+
+class RelayBoard(TestEquipment):
+    """
+    Relay board / multiplexer switched with SCPI ROUT commands (e.g. a 34970A style switch unit)
+    
+    The closed channels are kept as a bitmask, bit i standing for
+    channels[i]. A change of any number of channels is one message that
+    opens before it closes (break-before-make), and a change that would
+    not move a relay is not sent at all.
+    """
+    
+    def __init__(self, name: str, interface: HardwareInterface, channels: List[int],
+                 break_before_make: bool = True):
+        """
+        Args:
+            name: Equipment name
+            interface: Hardware interface
+            channels: Channel numbers of the board (e.g. 101-120)
+            break_before_make: Open relays before closing others when switching
+        """
+        super().__init__(name, TestEquipmentType.RELAY_BOARD, interface)
+        self.channels = list(channels)
+        self._bits = {channel: 1 << index for index, channel in enumerate(self.channels)}
+        self.all_channels = (1 << len(self.channels)) - 1
+        self.break_before_make = break_before_make
+        self.transactions = 0
+        self.skipped = 0
+        self.cycles = [0] * len(self.channels)  # Closures per channel, for relay wear
+    
+    def initialize(self) -> bool:
+        """Initialize relay board (*RST opens every relay)"""
+        try:
+            if not self.connect():
+                return False
+            
+            response = self.interface.send_batch(["*IDN?", "*RST"])[0]
+            logger.info(f"Relay board identified: {response}")
+            self.wait_until_complete("reset")
+            self.state = {"closed": 0}
+            
+            return True
+        except Exception as e:
+            logger.error(f"Failed to initialize relay board: {e}")
+            self.invalidate_state()
+            return False
+    
+    def reset(self) -> bool:
+        """Reset relay board, opening every relay"""
+        try:
+            self.interface.send_command("*RST")
+            self.wait_until_complete("reset")
+            self.state = {"closed": 0}
+            return True
+        except Exception as e:
+            logger.error(f"Failed to reset relay board: {e}")
+            self.invalidate_state()
+            return False
+    
+    def self_test(self) -> bool:
+        """Perform relay board self-test"""
+        try:
+            response = self.interface.send_command("*TST?")
+            return response.strip() == "0"
+        except Exception as e:
+            logger.error(f"Relay board self-test failed: {e}")
+            return False
+    
+    def mask(self, channels: Iterable[int]) -> int:
+        """Bitmask of channels"""
+        mask = 0
+        for channel in channels:
+            if channel not in self._bits:
+                raise ValueError(f"{self.name} has no channel {channel}")
+            mask |= self._bits[channel]
+        return mask
+    
+    def channels_of(self, mask: int) -> List[int]:
+        """Channels set in mask"""
+        return [channel for index, channel in enumerate(self.channels) if mask >> index & 1]
+    
+    def channel_list(self, mask: int) -> str:
+        """SCPI channel list of mask, consecutive channels as ranges, e.g. (@101:104,110)"""
+        runs = []
+        for channel in self.channels_of(mask):
+            if runs and channel == runs[-1][1] + 1:
+                runs[-1][1] = channel
+            else:
+                runs.append([channel, channel])
+        return "(@" + ",".join(str(first) if first == last else f"{first}:{last}" for first, last in runs) + ")"
+    
+    @property
+    def closed_channels(self) -> Optional[List[int]]:
+        """Channels believed closed, None while the relay state is unknown"""
+        return self.channels_of(self.state["closed"]) if "closed" in self.state else None
+    
+    def read_closed(self) -> int:
+        """Read the closed channels from the board as a bitmask"""
+        response = self.interface.send_command(f"ROUT:CLOS? {self.channel_list(self.all_channels)}")
+        return sum(bit for bit, value in zip(self._bits.values(), response.split(',')) if int(value))
+    
+    def _send_switch(self, current: int, opening: int, closing: int, target: int):
+        """Move the relays from current to target (opening and closing are the relays that change)"""
+        commands = []
+        if opening:
+            commands.append(f"ROUT:OPEN {self.channel_list(opening)}")
+        if closing:
+            commands.append(f"ROUT:CLOS {self.channel_list(closing)}")
+        if not self.break_before_make:
+            commands.reverse()
+        self.interface.send_batch(commands)
+        self.transactions += 1
+    
+    def _switch(self, change: Callable[[int], int], description: str) -> bool:
+        """
+        Move the relays to change(closed channels)
+        
+        With an unknown relay state (after connecting or an error) the
+        board is read back first, so only relays that move are switched.
+        """
+        try:
+            if "closed" not in self.state:
+                self.state["closed"] = self.read_closed()
+            current = self.state["closed"]
+            target = change(current)
+            if target == current:
+                self.skipped += 1
+                return True
+            
+            opening, closing = current & ~target, target & ~current
+            self._send_switch(current, opening, closing, target)
+            self.state["closed"] = target
+            for index in range(len(self.channels)):
+                if closing >> index & 1:
+                    self.cycles[index] += 1
+            return True
+        except Exception as e:
+            self.invalidate_state()
+            logger.error(f"Failed to {description} on {self.name}: {e}")
+            return False
+    
+    def apply_mask(self, mask: int) -> bool:
+        """Close exactly the channels of mask and open every other one"""
+        return self._switch(lambda closed: mask, f"switch to {self.channels_of(mask)}")
+    
+    def set_channels(self, channels: Iterable[int]) -> bool:
+        """Close exactly channels and open every other one"""
+        return self.apply_mask(self.mask(channels))
+    
+    def close(self, channels: Iterable[int]) -> bool:
+        """Close channels, leaving the others as they are"""
+        mask = self.mask(channels)
+        return self._switch(lambda closed: closed | mask, f"close {self.channels_of(mask)}")
+    
+    def open(self, channels: Iterable[int]) -> bool:
+        """Open channels, leaving the others as they are"""
+        mask = self.mask(channels)
+        return self._switch(lambda closed: closed & ~mask, f"open {self.channels_of(mask)}")
+    
+    def open_all(self) -> bool:
+        """Open every relay"""
+        return self.apply_mask(0)
+    
+    def _restore_commands(self, state: Dict[str, Any]) -> Tuple[List[str], Dict[str, Any]]:
+        """Open everything outside the saved closed channels, then close them"""
+        if "closed" not in state:
+            return [], {}
+        commands = [f"ROUT:OPEN {self.channel_list(self.all_channels & ~state['closed'])}"]
+        if state["closed"]:
+            commands.append(f"ROUT:CLOS {self.channel_list(state['closed'])}")
+        return commands, {"closed": state["closed"]}
+    
+    def get_switch_stats(self) -> Dict[str, Any]:
+        """Switching transactions, skipped no-op changes and closures per channel"""
+        return {
+            "transactions": self.transactions,
+            "skipped": self.skipped,
+            "closed": self.closed_channels,
+            "cycles": dict(zip(self.channels, self.cycles))
+        }
+
+class ModbusRelayBoard(RelayBoard):
+    """
+    Relay board driven through Modbus coils, one coil per relay
+    
+    The whole board is written with a single Write Multiple Coils (FC15)
+    request. Break-before-make needs the opening relays released first, so
+    a change that both opens and closes relays takes two writes; any other
+    change takes one. Serial interfaces use RTU framing, others Modbus TCP.
+    """
+    
+    MAX_COILS = 1968  # Largest FC15 request
+    
+    def __init__(self, name: str, interface: HardwareInterface, coil_count: int, start_coil: int = 0,
+                 unit_id: int = 1, first_channel: int = 1, break_before_make: bool = True):
+        """
+        Args:
+            name: Equipment name
+            interface: Serial (RTU) or TCP (Modbus TCP) interface
+            coil_count: Number of relays
+            start_coil: Coil address of the first relay
+            unit_id: Modbus slave address
+            first_channel: Channel number of the first relay
+            break_before_make: Open relays before closing others when switching
+        """
+        if not 0 < coil_count <= self.MAX_COILS:
+            raise ValueError(f"coil_count must be 1-{self.MAX_COILS}, got {coil_count}")
+        super().__init__(name, interface, list(range(first_channel, first_channel + coil_count)), break_before_make)
+        self.start_coil = start_coil
+        self.unit_id = unit_id
+        self.rtu = interface.config.connection_type == ConnectionType.SERIAL_RTU
+        self._transaction_id = 0
+    
+    def initialize(self) -> bool:
+        """Initialize relay board, opening every relay"""
+        try:
+            if not self.connect():
+                return False
+            self._write_coils(0)
+            self.state = {"closed": 0}
+            logger.info(f"Relay board {self.name} ready: {len(self.channels)} coils from {self.start_coil}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to initialize relay board: {e}")
+            self.invalidate_state()
+            return False
+    
+    def reset(self) -> bool:
+        """Open every relay"""
+        try:
+            self._write_coils(0)
+            self.state = {"closed": 0}
+            return True
+        except Exception as e:
+            logger.error(f"Failed to reset relay board: {e}")
+            self.invalidate_state()
+            return False
+    
+    def self_test(self) -> bool:
+        """Read the coils back and compare them with the expected relay state"""
+        try:
+            closed = self.read_closed()
+            return self.state.get("closed", closed) == closed
+        except Exception as e:
+            logger.error(f"Relay board self-test failed: {e}")
+            return False
+    
+    def _response_length(self, response: bytes) -> Optional[int]:
+        """Total response length implied by the bytes received so far (None if unknown yet)"""
+        if not self.rtu:
+            return None if len(response) < 6 else 6 + struct.unpack('>H', response[4:6])[0]
+        return expected_response_length(response)
+    
+    def _transact(self, pdu: bytes) -> bytes:
+        """Send a request PDU and return the response PDU"""
+        if self.rtu:
+            response = self.interface.exchange(create_frame(self.unit_id, pdu), self._response_length)
+            if not verify_crc(response):
+                raise ValueError("Invalid CRC in Modbus response")
+            unit_id, reply = response[0], response[1:-2]
+        else:
+            self._transaction_id = (self._transaction_id + 1) & 0xFFFF
+            header = struct.pack('>HHHB', self._transaction_id, 0, len(pdu) + 1, self.unit_id)
+            response = self.interface.exchange(header + pdu, self._response_length)
+            if struct.unpack('>H', response[:2])[0] != self._transaction_id:
+                raise ValueError("Modbus response belongs to another transaction")
+            unit_id, reply = response[6], response[7:]
+        
+        if unit_id != self.unit_id:
+            raise ValueError(f"Modbus response from unit {unit_id}, expected {self.unit_id}")
+        if reply[0] == pdu[0] | 0x80:
+            raise ValueError(f"Modbus exception {reply[1]} for function 0x{pdu[0]:02X}")
+        return reply
+    
+    def _write_coils(self, mask: int):
+        """Write the state of every relay in one FC15 request"""
+        count = len(self.channels)
+        data = mask.to_bytes((count + 7) // 8, 'little')  # First coil is the least significant bit
+        self._transact(struct.pack('>BHHB', 0x0F, self.start_coil, count, len(data)) + data)
+        self.transactions += 1
+    
+    def read_closed(self) -> int:
+        """Read the closed relays from the coils (FC01) as a bitmask"""
+        reply = self._transact(struct.pack('>BHH', 0x01, self.start_coil, len(self.channels)))
+        return int.from_bytes(reply[2:2 + reply[1]], 'little') & self.all_channels
+    
+    def _send_switch(self, current: int, opening: int, closing: int, target: int):
+        if self.break_before_make and opening and closing:
+            self._write_coils(current & ~opening)
+        self._write_coils(target)
+    
+    def _restore_state(self):
+        """Write the saved relay state back after a reconnect"""
+        saved, self.state = self.state, {}
+        if "closed" in saved:
+            logger.info(f"Restoring {self.name} relays: {self.channels_of(saved['closed'])}")
+            self._write_coils(saved["closed"])
+            self.state = {"closed": saved["closed"]}
+
+class ICTTester(TestEquipment):
+    """
+    In-circuit tester measuring through a scanning switch matrix
+    
+    Every test point of the fixture is wired to one scan channel. A batch
+    of points sharing a measurement function and range is one scan list
+    (CONF, ROUT:SCAN and READ? in a single message) whose readings come
+    back as one REAL,64 block in ascending channel order.
+    """
+    
+    # Measurement function -> (parameter name, unit)
+    FUNCTIONS = {
+        "RES": ("RESISTANCE", "Ohm"),
+        "CAP": ("CAPACITANCE", "F"),
+        "DIOD": ("DIODE_VOLTAGE", "V")
+    }
+    
+    def __init__(self, name: str, interface: HardwareInterface, max_scan: int = 1000):
+        """
+        Args:
+            name: Equipment name
+            interface: Hardware interface
+            max_scan: Most channels the tester accepts in one scan list
+        """
+        super().__init__(name, TestEquipmentType.ICT_TESTER, interface)
+        self.max_scan = max_scan
+    
+    def initialize(self) -> bool:
+        """Initialize ICT tester"""
+        try:
+            if not self.connect():
+                return False
+            
+            response = self.interface.send_batch(["*IDN?", "*RST"])[0]
+            self.invalidate_state()
+            logger.info(f"ICT tester identified: {response}")
+            self.wait_until_complete("reset")
+            
+            return True
+        except Exception as e:
+            logger.error(f"Failed to initialize ICT tester: {e}")
+            return False
+    
+    def reset(self) -> bool:
+        """Reset ICT tester"""
+        try:
+            self.interface.send_command("*RST")
+            self.wait_until_complete("reset")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to reset ICT tester: {e}")
+            return False
+        finally:
+            self.invalidate_state()
+    
+    def self_test(self) -> bool:
+        """Perform ICT tester self-test"""
+        try:
+            response = self.interface.send_command("*TST?")
+            return response.strip() == "0"
+        except Exception as e:
+            logger.error(f"ICT tester self-test failed: {e}")
+            return False
+    
+    @staticmethod
+    def scan_list(channels: np.ndarray) -> str:
+        """SCPI channel list of ascending channels, consecutive channels as ranges"""
+        channels = np.asarray(channels, dtype=np.int64)
+        breaks = np.flatnonzero(np.diff(channels) != 1)
+        firsts = channels[np.concatenate(([0], breaks + 1))].tolist()
+        lasts = channels[np.concatenate((breaks, [channels.size - 1]))].tolist()
+        return "(@" + ",".join(str(first) if first == last else f"{first}:{last}"
+                               for first, last in zip(firsts, lasts)) + ")"
+    
+    def scan(self, function: str, channels: np.ndarray, range_value: Optional[float] = None,
+             timeout: Optional[float] = None) -> BufferedMeasurement:
+        """
+        Measure function on every channel in one scan
+        
+        Args:
+            function: RES, CAP or DIOD
+            channels: Ascending channel numbers, at most max_scan of them
+            range_value: Fixed range (auto range if None); a fixed range is faster
+            timeout: Deadline for the scan (defaults to the full interface timeout)
+        
+        Returns:
+            Calibrated readings as samples, one per channel in channel order (9.9E37 for an overload or open)
+        """
+        if function not in self.FUNCTIONS:
+            raise ValueError(f"Unsupported ICT function {function}")
+        channels = np.asarray(channels, dtype=np.int64)
+        if not 0 < channels.size <= self.max_scan:
+            raise ValueError(f"Scan list needs 1 to {self.max_scan} channels, got {channels.size}")
+        
+        scan_list = self.scan_list(channels)
+        state = dict(self.state)
+        commands = [f"CONF:{function} {range_value if range_value else 'AUTO'},{scan_list}",
+                    f"ROUT:SCAN {scan_list}"]
+        self._require(state, commands, "format", "REAL,64", "FORM:DATA REAL,64")
+        
+        try:
+            payload = self.interface.query_binary_block(HardwareInterface.join_commands(commands + ["READ?"]),
+                                                        timeout)
+            self.state = state
+        except Exception as e:
+            self.invalidate_state()
+            logger.error(f"Failed to scan {function} on {channels.size} channels: {e}")
+            raise
+        
+        readings = np.frombuffer(payload, dtype='>f8').astype(np.float64)
+        if readings.size != channels.size:
+            raise ValueError(f"Expected {channels.size} readings, received {readings.size}")
+        return self._buffered(function, range_value, readings)
+
 class HardwareManager:
     """Manager class for handling multiple test equipment"""
     
-    def __init__(self):
+    # Deadline for connecting/initializing or self-testing one instrument
+    DEFAULT_OPERATION_TIMEOUT = 30.0
+    
+    def __init__(self, settling_file: Optional[str] = None, session_pool=None):
+        """
+        Initialize manager
+        
+        Args:
+            settling_file: JSON file the learned settling times are kept in (in memory only if None)
+            session_pool: SessionPool the interfaces of pooled equipment belong to
+        """
         self.equipment: Dict[str, TestEquipment] = {}
         self.active_connections: List[str] = []
+        self.operation_timeouts: Dict[str, float] = {}
+        self.settling = SettlingModel(settling_file)
+        self.calibration = CalibrationStore()
+        self.session_pool = session_pool
+        self.pooled_sessions: Set[str] = set()  # Equipment holding a session pool reference
+        self.reservations = ResourceManager()  # Keeps concurrent test executions off each other's instruments
     
-    def add_equipment(self, equipment: TestEquipment) -> bool:
-        """Add equipment to manager"""
+    def add_equipment(self, equipment: TestEquipment, timeout: Optional[float] = None) -> bool:
+        """
+        Add equipment to manager
+        
+        Args:
+            equipment: Equipment instance
+            timeout: Deadline for its connect/initialize and self-test (manager default if None)
+        """
         try:
+            previous = self.equipment.get(equipment.name)
+            if previous is not None and previous is not equipment:
+                self._retire(previous)
             self.equipment[equipment.name] = equipment
+            equipment.attach_reconnect()
+            equipment.settling = self.settling
+            equipment.calibration = self.calibration
+            self._mark_calibration(equipment)
+            if timeout is not None:
+                self.operation_timeouts[equipment.name] = timeout
             logger.info(f"Added equipment: {equipment.name}")
             return True
         except Exception as e:
             logger.error(f"Failed to add equipment: {e}")
             return False
     
-    def connect_all(self) -> Dict[str, bool]:
-        """Connect to all equipment"""
+    def _mark_calibration(self, equipment: TestEquipment):
+        """Reflect the calibration in force in the equipment's calibrated / last_calibration fields"""
+        equipment.calibrated = self.calibration.version(equipment.name) is not None
+        equipment.last_calibration = self.calibration.calibrated_at(equipment.name)
+    
+    def load_calibration(self, tables: Iterable[CalibrationTable]):
+        """Replace the calibration tables of all equipment (e.g. with the active ones from the database)"""
+        self.calibration.load(tables)
+        for equipment in self.equipment.values():
+            self._mark_calibration(equipment)
+    
+    def update_calibration(self, name: str, tables: Iterable[CalibrationTable]):
+        """Put a new calibration of one instrument in force"""
+        self.calibration.update(name, tables)
+        if name in self.equipment:
+            self._mark_calibration(self.equipment[name])
+    
+    def _run_parallel(self, names: List[str], action: str, operation: Callable[[TestEquipment], bool],
+                      timeout: Optional[float] = None,
+                      on_result: Optional[Callable[[str, bool], None]] = None,
+                      on_late: Optional[Callable[[TestEquipment, bool], None]] = None) -> Dict[str, bool]:
+        """
+        Run operation on several instruments concurrently
+        
+        Each instrument gets its own thread and deadline; results are
+        collected (and on_result called) in completion order. An instrument
+        that misses its deadline is reported as failed without holding up
+        the others; its worker thread is left to finish in the background
+        and on_late is called with its eventual result.
+        """
         results = {}
-        for name, equipment in self.equipment.items():
-            try:
-                success = equipment.connect() and equipment.initialize()
-                results[name] = success
-                if success:
-                    self.active_connections.append(name)
-                logger.info(f"Connection to {name}: {'Success' if success else 'Failed'}")
-            except Exception as e:
-                results[name] = False
-                logger.error(f"Failed to connect to {name}: {e}")
+        if not names:
+            return results
+        
+        start_time = time.time()
+        default_timeout = timeout if timeout is not None else self.DEFAULT_OPERATION_TIMEOUT
+        executor = ThreadPoolExecutor(max_workers=len(names), thread_name_prefix=f"hw-{action}")
+        futures = {executor.submit(operation, self.equipment[name]): name for name in names}
+        deadlines = {name: start_time + self.operation_timeouts.get(name, default_timeout) for name in names}
+        
+        def report(name: str, success: bool):
+            results[name] = success
+            if on_result:
+                try:
+                    on_result(name, success)
+                except Exception as e:
+                    logger.error(f"Result callback failed for {name}: {e}")
+        
+        pending = set(futures)
+        try:
+            while pending:
+                next_deadline = min(deadlines[futures[future]] for future in pending)
+                done, pending = wait(pending, timeout=max(0.0, next_deadline - time.time()),
+                                     return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    name = futures[future]
+                    try:
+                        success = bool(future.result())
+                    except Exception as e:
+                        success = False
+                        logger.error(f"{action} failed for {name}: {e}")
+                    logger.info(f"{action} {name}: {'Success' if success else 'Failed'} "
+                                f"({time.time() - start_time:.2f}s)")
+                    report(name, success)
+                
+                now = time.time()
+                expired = {future for future in pending if deadlines[futures[future]] <= now}
+                for future in expired:
+                    name = futures[future]
+                    logger.error(f"{action} {name}: no result within "
+                                 f"{deadlines[name] - start_time:.1f}s deadline")
+                    report(name, False)
+                    if on_late:
+                        future.add_done_callback(
+                            lambda late, equipment=self.equipment[name]: self._late_result(equipment, late, on_late))
+                pending -= expired
+        finally:
+            executor.shutdown(wait=False)
+        
         return results
     
+    @staticmethod
+    def _late_result(equipment: TestEquipment, future: Future,
+                     on_late: Callable[[TestEquipment, bool], None]):
+        """Hand the result of an operation that missed its deadline to on_late"""
+        try:
+            success = not future.cancelled() and future.exception() is None and bool(future.result())
+            on_late(equipment, success)
+        except Exception as e:
+            logger.error(f"Late result handling failed for {equipment.name}: {e}")
+    
+    def connect_all(self, timeout: Optional[float] = None,
+                    on_result: Optional[Callable[[str, bool], None]] = None) -> Dict[str, bool]:
+        """
+        Connect to and initialize all equipment in parallel
+        
+        Args:
+            timeout: Per-instrument deadline (overridden by add_equipment timeouts)
+            on_result: Called with (name, success) as each instrument finishes
+        """
+        results = self._run_parallel(list(self.equipment), "Connection to", self._connect, timeout, on_result,
+                                     on_late=self._abandon_connect)
+        
+        for name, success in results.items():
+            if success and name not in self.active_connections:
+                self.active_connections.append(name)
+        return results
+    
+    def _connect(self, equipment: TestEquipment) -> bool:
+        """Connect and initialize one instrument, taking a reference if its session is pooled"""
+        pool = self.session_pool
+        if pool is not None and equipment.name not in self.pooled_sessions and pool.owns(equipment.interface):
+            pool.acquire(equipment.interface.config)
+            self.pooled_sessions.add(equipment.name)
+        success = False
+        try:
+            success = equipment.connect() and equipment.initialize()
+            return success
+        finally:
+            if not success and equipment.name in self.pooled_sessions:
+                self._disconnect(equipment)
+    
+    def _abandon_connect(self, equipment: TestEquipment, success: bool):
+        """Close a connection that came up after connect_all gave up on it, releasing its pooled session"""
+        if success:
+            logger.warning(f"{equipment.name} connected after its deadline; disconnecting")
+            self._disconnect(equipment)
+    
+    def _disconnect(self, equipment: TestEquipment) -> bool:
+        """Disconnect one instrument; a pooled session is released and stays open for other users"""
+        if equipment.name not in self.pooled_sessions:
+            return equipment.disconnect()
+        self.pooled_sessions.discard(equipment.name)
+        equipment.invalidate_state()
+        equipment.detach_reconnect()
+        self.session_pool.release(equipment.interface)
+        return True
+    
+    def _retire(self, equipment: TestEquipment):
+        """
+        Let go of equipment replaced under its name
+        
+        Its pooled session reference is released; in any case it no longer
+        restores its (now stale) configuration when the session reconnects.
+        """
+        if equipment.name in self.pooled_sessions:
+            self._disconnect(equipment)
+        else:
+            equipment.detach_reconnect()
+    
     def disconnect_all(self) -> Dict[str, bool]:
         """Disconnect from all equipment"""
         results = {}
         for name in self.active_connections:
             equipment = self.equipment[name]
             try:
-                success = equipment.disconnect()
+                success = self._disconnect(equipment)
                 results[name] = success
                 logger.info(f"Disconnection from {name}: {'Success' if success else 'Failed'}")
             except Exception as e:
                 results[name] = False
                 logger.error(f"Failed to disconnect from {name}: {e}")
         self.active_connections.clear()
+        self.settling.save()
         return results
     
     def get_equipment(self, name: str) -> Optional[TestEquipment]:
@@ -502,17 +2367,38 @@ class HardwareManager:
         return [self.equipment[name] for name in self.active_connections 
                 if self.equipment[name].is_connected()]
     
-    def perform_system_check(self) -> Dict[str, bool]:
-        """Perform self-test on all connected equipment"""
-        results = {}
-        for name in self.active_connections:
-            equipment = self.equipment[name]
-            try:
-                if equipment.is_connected():
-                    results[name] = equipment.self_test()
-                else:
-                    results[name] = False
-            except Exception as e:
-                results[name] = False
-                logger.error(f"Self-test failed for {name}: {e}")
-        return results
\ No newline at end of file
+    def get_reservation_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Utilization and reservation waiting time of every reserved instrument"""
+        return self.reservations.get_stats()
+    
+    def get_command_metrics(self, slowest: int = 0) -> Dict[str, Dict[str, Any]]:
+        """
+        Command latency statistics of every instrument
+        
+        Args:
+            slowest: Number of slowest commands to include per instrument
+        """
+        metrics = {}
+        for name, equipment in self.equipment.items():
+            stats = equipment.interface.get_command_metrics(slowest)
+            if stats is not None:
+                stats["adaptive_timeout"] = equipment.interface.get_timing_stats()
+                stats["session"] = equipment.interface.get_session_stats()
+                stats["queue"] = equipment.interface.get_queue_stats()
+                stats["settling"] = self.settling.get_stats().get(name, {})
+                metrics[name] = stats
+        return metrics
+    
+    def perform_system_check(self, timeout: Optional[float] = None,
+                             on_result: Optional[Callable[[str, bool], None]] = None) -> Dict[str, bool]:
+        """
+        Perform self-test on all connected equipment in parallel
+        
+        Args:
+            timeout: Per-instrument deadline (overridden by add_equipment timeouts)
+            on_result: Called with (name, success) as each instrument finishes
+        """
+        return self._run_parallel(
+            list(self.active_connections), "Self-test of",
+            lambda equipment: equipment.is_connected() and equipment.self_test(),
+            timeout, on_result)
@@ -0,0 +1,234 @@
+"""
+PCBA Test System - In-Circuit Test Engine
+Runs a netlist test table (resistor, capacitor and diode points with limits)
+on an ICT tester as a few large hardware scan lists, evaluates every limit in
+one NumPy pass and keeps the results as columns, so a board with thousands
+of points costs a handful of instrument round trips and no per-point Python.
+"""
+
+import csv
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from hardware_layer import ICTTester
+from measurement_buffer import UNCORRECTED, MeasurementBuffer, version_column
+
+# Component kind -> ICT tester measurement function
+KINDS = {"R": "RES", "C": "CAP", "D": "DIOD"}
+KIND_NAMES = tuple(KINDS)
+
+@dataclass
+class ICTBatch:
+    """Points measured by one scan list"""
+    function: str
+    range_value: Optional[float]
+    indices: np.ndarray  # Table rows, in ascending channel order
+    channels: np.ndarray
+
+class ICTTestTable:
+    """
+    Test points of a board as columns
+    
+    Each point has a name (e.g. R12 or D3), a component kind (R, C or D),
+    the tester channel its nets are wired to, a nominal value, limits and
+    an optional fixed range. Missing limits and ranges are NaN.
+    """
+    
+    def __init__(self, names: Sequence[str], kinds: Sequence[str], channels: Sequence[int],
+                 nominal: Sequence[float], min_limits: Sequence[float], max_limits: Sequence[float],
+                 ranges: Optional[Sequence[float]] = None):
+        self.names = np.asarray(names, dtype=object)
+        unknown = set(kinds) - set(KINDS)
+        if unknown:
+            raise ValueError(f"Unknown component kinds {sorted(unknown)}, expected one of {KIND_NAMES}")
+        self.kinds = np.array([KIND_NAMES.index(kind) for kind in kinds], dtype=np.uint8)
+        self.channels = np.asarray(channels, dtype=np.int64)
+        self.nominal = np.asarray(nominal, dtype=np.float64)
+        self.min_limits = np.asarray(min_limits, dtype=np.float64)
+        self.max_limits = np.asarray(max_limits, dtype=np.float64)
+        self.ranges = np.full(len(self.names), np.nan) if ranges is None else np.asarray(ranges, dtype=np.float64)
+        
+        columns = (self.kinds, self.channels, self.nominal, self.min_limits, self.max_limits, self.ranges)
+        if any(column.shape != self.names.shape for column in columns):
+            raise ValueError("Test table columns differ in length")
+        if np.unique(self.channels).size != self.channels.size:
+            raise ValueError("Test table uses a tester channel more than once")
+    
+    @staticmethod
+    def _number(value: Any) -> float:
+        return np.nan if value is None or value == "" else float(value)
+    
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]]) -> 'ICTTestTable':
+        """
+        Build a table from one dictionary per point
+        
+        A point gives name, kind, channel and nominal, plus either
+        min_limit / max_limit or a tolerance in percent of nominal (both
+        may be given; explicit limits win), and optionally range.
+        """
+        number = cls._number
+        nominal = np.array([number(record.get('nominal')) for record in records], dtype=np.float64)
+        tolerance = np.array([number(record.get('tolerance')) for record in records], dtype=np.float64)
+        min_limits = np.array([number(record.get('min_limit')) for record in records], dtype=np.float64)
+        max_limits = np.array([number(record.get('max_limit')) for record in records], dtype=np.float64)
+        
+        # Fill the limits a point leaves out from its tolerance
+        band = np.abs(nominal) * tolerance / 100
+        min_limits = np.where(np.isnan(min_limits), nominal - band, min_limits)
+        max_limits = np.where(np.isnan(max_limits), nominal + band, max_limits)
+        
+        return cls([str(record['name']) for record in records],
+                   [str(record['kind']).upper() for record in records],
+                   [int(record['channel']) for record in records], nominal, min_limits, max_limits,
+                   [number(record.get('range')) for record in records])
+    
+    @classmethod
+    def from_csv(cls, path: str) -> 'ICTTestTable':
+        """Load a table from a CSV file with a header row of the from_records keys"""
+        with open(path, newline='') as file:
+            return cls.from_records(list(csv.DictReader(file)))
+    
+    def __len__(self) -> int:
+        return int(self.names.size)
+    
+    def plan(self, max_scan: int) -> List[ICTBatch]:
+        """
+        Split the table into scan lists
+        
+        Points are grouped by measurement function and range and each group
+        is cut into scan lists of at most max_scan channels. Within a scan
+        list the points are in channel order, the order a scanner reports in.
+        """
+        ranges = np.nan_to_num(self.ranges, nan=-1.0)
+        order = np.lexsort((self.channels, ranges, self.kinds))
+        kinds, ranges = self.kinds[order], ranges[order]
+        # A new scan list starts where the function or range changes ...
+        starts = np.flatnonzero((np.diff(kinds) != 0) | (np.diff(ranges) != 0)) + 1
+        bounds = np.concatenate(([0], starts, [len(order)]))
+        
+        batches = []
+        for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            # ... and every max_scan points
+            for first in range(start, end, max_scan):
+                indices = order[first:min(first + max_scan, end)]
+                range_value = ranges[first]
+                batches.append(ICTBatch(KINDS[KIND_NAMES[kinds[first]]],
+                                        None if range_value < 0 else float(range_value),
+                                        indices, self.channels[indices]))
+        return batches
+
+def evaluate_limits(values: np.ndarray, min_limits: np.ndarray, max_limits: np.ndarray) -> np.ndarray:
+    """
+    Pass mask of all readings in one pass
+    
+    A NaN limit is not checked, but a NaN reading (a point that was not
+    measured) fails unless the point has no limits at all.
+    """
+    with np.errstate(invalid='ignore'):
+        return (np.isnan(min_limits) | (values >= min_limits)) & (np.isnan(max_limits) | (values <= max_limits))
+
+class ICTResult:
+    """Readings and verdicts of one ICT run, as columns aligned with the test table"""
+    
+    def __init__(self, table: ICTTestTable, values: np.ndarray, elapsed: float, scans: int,
+                 calibration_versions: Optional[np.ndarray] = None):
+        self.table = table
+        self.values = values
+        self.passed = evaluate_limits(values, table.min_limits, table.max_limits)
+        self.elapsed = elapsed
+        self.scans = scans
+        # Tester calibration each reading was corrected with (ranges have their own tables)
+        self.calibration_versions = (np.full(values.size, UNCORRECTED, dtype=np.uint16)
+                                     if calibration_versions is None else calibration_versions)
+    
+    def __len__(self) -> int:
+        return int(self.values.size)
+    
+    def all_passed(self) -> bool:
+        return bool(self.passed.all())
+    
+    def failures(self) -> np.ndarray:
+        """Table rows of the points outside their limits"""
+        return np.flatnonzero(~self.passed)
+    
+    def failed_points(self) -> List[Dict[str, Any]]:
+        """The failing points, for a repair ticket"""
+        table, rows = self.table, self.failures()
+        return [{"name": name, "kind": KIND_NAMES[kind], "channel": channel, "value": value,
+                 "min_limit": min_limit, "max_limit": max_limit}
+                for name, kind, channel, value, min_limit, max_limit in zip(
+                    table.names[rows].tolist(), table.kinds[rows].tolist(), table.channels[rows].tolist(),
+                    self.values[rows].tolist(), table.min_limits[rows].tolist(), table.max_limits[rows].tolist())]
+    
+    def to_buffer(self) -> MeasurementBuffer:
+        """The readings as a MeasurementBuffer, one parameter per component kind"""
+        buffer = MeasurementBuffer(capacity=len(self))
+        for kind, name in enumerate(KIND_NAMES):
+            rows = np.flatnonzero(self.table.kinds == kind)
+            if rows.size:
+                parameter, unit = ICTTester.FUNCTIONS[KINDS[name]]
+                buffer.extend(parameter, self.values[rows], unit, self.table.min_limits[rows],
+                              self.table.max_limits[rows], self.calibration_versions[rows])
+        return buffer
+    
+    @staticmethod
+    def _column(values: np.ndarray) -> List[Optional[float]]:
+        return [None if np.isnan(value) else value for value in values.tolist()]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Columnar JSON representation"""
+        failures = self.failures()
+        return {
+            "count": len(self),
+            "failed": int(failures.size),
+            "elapsed": self.elapsed,
+            "scans": self.scans,
+            "name": self.table.names.tolist(),
+            "kind": [KIND_NAMES[kind] for kind in self.table.kinds.tolist()],
+            "channel": self.table.channels.tolist(),
+            "value": self._column(self.values),
+            "min_limit": self._column(self.table.min_limits),
+            "max_limit": self._column(self.table.max_limits),
+            "calibration_version": version_column(self.calibration_versions),
+            "passed": self.passed.tolist()
+        }
+
+class ICTEngine:
+    """
+    Runs a test table on an ICT tester
+    
+    The scan lists are planned once, so testing one board after another
+    costs one scan per batch and one limit evaluation per board.
+    """
+    
+    def __init__(self, tester: ICTTester, table: ICTTestTable, point_time: float = 0.005):
+        """
+        Initialize engine
+        
+        Args:
+            tester: ICT tester the fixture is wired to
+            table: Test points of the board
+            point_time: Expected seconds per point (switching, settling and integration), for scan deadlines
+        """
+        self.tester = tester
+        self.table = table
+        self.point_time = point_time
+        self.batches = table.plan(tester.max_scan)
+    
+    def run(self) -> ICTResult:
+        """Measure every point and evaluate the limits"""
+        start = time.monotonic()
+        values = np.full(len(self.table), np.nan)
+        versions = np.full(len(self.table), UNCORRECTED, dtype=np.uint16)
+        for batch in self.batches:
+            timeout = self.tester.interface.config.timeout + batch.channels.size * self.point_time
+            measurement = self.tester.scan(batch.function, batch.channels, batch.range_value, timeout)
+            values[batch.indices] = measurement.samples
+            # Each scan list is corrected with the table for its function and range in force at the time
+            if measurement.calibration_version is not None:
+                versions[batch.indices] = measurement.calibration_version
+        return ICTResult(self.table, values, time.monotonic() - start, len(self.batches), versions)
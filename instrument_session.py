@@ -0,0 +1,179 @@
+"""
+PCBA Test System - Resilient Instrument Sessions
+Transparent reconnect with exponential backoff, and a circuit breaker that
+fails fast while an instrument is known to be down instead of letting every
+step wait out its full timeout.
+"""
+
+import asyncio
+import functools
+import threading
+import time
+import logging
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(ConnectionError):
+    """Raised without touching the link while an instrument's circuit is open"""
+    pass
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one instrument
+    
+    After failure_threshold consecutive failures (timeouts or failed
+    reconnects) the circuit opens and requests are refused for
+    reset_timeout seconds. Then a single trial request is let through
+    (half open): success closes the circuit, failure reopens it for twice
+    as long, up to max_reset_timeout.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 5.0,
+                 max_reset_timeout: float = 60.0):
+        """
+        Initialize breaker
+        
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: First open interval in seconds
+            max_reset_timeout: Ceiling for the doubling open interval
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.open_interval = reset_timeout
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+    
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a trial request through"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.open_interval - time.monotonic())
+    
+    def allow_request(self) -> bool:
+        """Check whether a request may use the link"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.retry_in() == 0.0:
+                # Only the trial request goes through; others keep failing fast until it reports
+                self.state = self.HALF_OPEN
+                return True
+            self.rejected += 1
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Circuit closed")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.open_interval = self.reset_timeout
+    
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN:
+                self.open_interval = min(self.open_interval * 2, self.max_reset_timeout)
+            elif self.state == self.OPEN or self.consecutive_failures < self.failure_threshold:
+                return
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            logger.warning(f"Circuit opened for {self.open_interval:.1f}s after "
+                           f"{self.consecutive_failures} consecutive failures")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Breaker state for status reporting"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in": self.retry_in(),
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
+
+def is_link_failure(error: Exception) -> bool:
+    """Check whether error means the link itself is gone (as opposed to a slow or confused instrument)"""
+    return isinstance(error, OSError) and not isinstance(error, (TimeoutError, CircuitOpenError))
+
+def _circuit_open_error(interface) -> CircuitOpenError:
+    return CircuitOpenError(f"{interface.config.address} is down; failing fast for another "
+                            f"{interface.circuit_breaker.retry_in():.1f}s")
+
+def resilient(method):
+    """
+    Reconnect and retry once on link failures, and fail fast while the circuit is open
+    
+    Wraps send_command / query_binary_block style methods (sync or async)
+    of an interface with a circuit_breaker. Only open sessions are guarded,
+    i.e. connect() succeeded and disconnect() has not been called since;
+    commands sent by reconnect callbacks pass straight through.
+    """
+    if asyncio.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, command: str, *args, **kwargs):
+            breaker = self.circuit_breaker
+            if breaker is None or self._reconnecting or not self.session_open:
+                return await method(self, command, *args, **kwargs)
+            if not breaker.allow_request():
+                raise _circuit_open_error(self)
+            try:
+                try:
+                    response = await method(self, command, *args, **kwargs)
+                except OSError as e:
+                    if not is_link_failure(e):
+                        raise
+                    logger.warning(f"Link to {self.config.address} lost ({e}); reconnecting")
+                    if not await self.reconnect():
+                        raise ConnectionError(f"Reconnect to {self.config.address} failed: {self.last_error}") from e
+                    response = await method(self, command, *args, **kwargs)
+            except OSError:
+                breaker.record_failure()
+                raise
+            except Exception:
+                # The instrument answered, even if not as expected
+                breaker.record_success()
+                raise
+            breaker.record_success()
+            return response
+        return async_wrapper
+    
+    @functools.wraps(method)
+    def wrapper(self, command: str, *args, **kwargs):
+        breaker = self.circuit_breaker
+        if breaker is None or self._reconnecting or not self.session_open:
+            return method(self, command, *args, **kwargs)
+        if not breaker.allow_request():
+            raise _circuit_open_error(self)
+        try:
+            try:
+                response = method(self, command, *args, **kwargs)
+            except OSError as e:
+                if not is_link_failure(e):
+                    raise
+                logger.warning(f"Link to {self.config.address} lost ({e}); reconnecting")
+                if not self.reconnect():
+                    raise ConnectionError(f"Reconnect to {self.config.address} failed: {self.last_error}") from e
+                response = method(self, command, *args, **kwargs)
+        except OSError:
+            breaker.record_failure()
+            raise
+        except Exception:
+            # The instrument answered, even if not as expected
+            breaker.record_success()
+            raise
+        breaker.record_success()
+        return response
+    return wrapper
@@ -0,0 +1,215 @@
+"""
+PCBA Test System - Adaptive Settling
+Settle-until-done primitives (operation complete polling, re-reading until
+stable) bounded by per-instrument settling times learned from observation
+and persisted between runs, replacing fixed sleeps.
+"""
+
+import json
+import os
+import threading
+import time
+import logging
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from rtt_estimator import RTTEstimator
+
+logger = logging.getLogger(__name__)
+
+class SettlingProfile:
+    """
+    Learned settling time of one operation on one instrument
+    
+    Settling times are tracked by an RTTEstimator, so the wait bound is
+    mean + k * deviation, clamped to [min_wait, max_wait], and an operation
+    that did not settle in time doubles the bound until it settles again.
+    This class adds persistence of the estimator state.
+    """
+    
+    def __init__(self, initial_wait: float = 2.0, min_wait: float = 0.05, max_wait: float = 30.0,
+                 alpha: float = 0.125, beta: float = 0.25, k: float = 4.0):
+        """
+        Initialize profile
+        
+        Args:
+            initial_wait: Bound used before the first observation
+            min_wait: Floor for the learned bound
+            max_wait: Ceiling for the learned bound
+            alpha: Gain for the mean settling time
+            beta: Gain for the deviation
+            k: Deviation multiplier in the bound
+        """
+        self.estimator = RTTEstimator(initial_wait, min_wait, max_wait, alpha, beta, k)
+        
+    @property
+    def bound(self) -> float:
+        """Longest time to wait for the operation to settle"""
+        return self.estimator.timeout
+    
+    def observe(self, elapsed: float, settled: bool = True):
+        """Record how long the operation took to settle, or that it had not settled after elapsed"""
+        if settled:
+            self.estimator.observe(elapsed)
+        else:
+            self.estimator.on_timeout()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        estimator = self.estimator
+        return {
+            "mean": estimator.srtt,
+            "deviation": estimator.rttvar,
+            "bound": estimator.rto,
+            "samples": estimator.samples,
+            "timeouts": estimator.timeouts
+        }
+    
+    def load(self, data: Dict[str, Any]):
+        """Adopt a persisted profile"""
+        estimator = self.estimator
+        with estimator._lock:
+            estimator.srtt = data.get("mean")
+            estimator.rttvar = data.get("deviation")
+            estimator.rto = estimator._clamp(data.get("bound", estimator.rto))
+            estimator.samples = data.get("samples", 0)
+            estimator.timeouts = data.get("timeouts", 0)
+
+class SettlingModel:
+    """
+    Settling profiles of all instruments, keyed by instrument and operation
+    
+    With a path, profiles are loaded from and saved to a JSON file so the
+    next run starts from the learned bounds instead of the defaults.
+    """
+    
+    def __init__(self, path: Optional[str] = None, initial_wait: float = 2.0, max_wait: float = 30.0):
+        """
+        Initialize model
+        
+        Args:
+            path: JSON file for persistence (in memory only if None)
+            initial_wait: Bound for operations not observed yet
+            max_wait: Ceiling for every bound
+        """
+        self.path = path
+        self.initial_wait = initial_wait
+        self.max_wait = max_wait
+        self.profiles: Dict[str, Dict[str, SettlingProfile]] = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+    
+    def _profile(self, instrument: str, operation: str) -> SettlingProfile:
+        operations = self.profiles.setdefault(instrument, {})
+        profile = operations.get(operation)
+        if profile is None:
+            profile = operations[operation] = SettlingProfile(self.initial_wait, max_wait=self.max_wait)
+        return profile
+    
+    def bound(self, instrument: str, operation: str) -> float:
+        """Longest time to wait for operation to settle on instrument"""
+        with self._lock:
+            return self._profile(instrument, operation).bound
+    
+    def observe(self, instrument: str, operation: str, elapsed: float, settled: bool = True):
+        """Record an observed settling time"""
+        with self._lock:
+            self._profile(instrument, operation).observe(elapsed, settled)
+            self.dirty = True
+    
+    def load(self):
+        """Read the profiles from path"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring settling profiles in {self.path}: {e}")
+            return
+        with self._lock:
+            for instrument, operations in data.items():
+                for operation, profile in operations.items():
+                    self._profile(instrument, operation).load(profile)
+            self.dirty = False
+    
+    def save(self) -> bool:
+        """Write the profiles to path if anything was learned since the last save"""
+        if not self.path or not self.dirty:
+            return False
+        with self._lock:
+            data = self.get_stats()
+            self.dirty = False
+        try:
+            # Write a temporary file first so a crash never leaves a truncated file behind
+            temporary = f"{self.path}.tmp"
+            with open(temporary, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(temporary, self.path)
+            return True
+        except OSError as e:
+            logger.error(f"Failed to save settling profiles to {self.path}: {e}")
+            self.dirty = True
+            return False
+    
+    def get_stats(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Learned profiles per instrument and operation"""
+        return {instrument: {operation: profile.to_dict() for operation, profile in operations.items()}
+                for instrument, operations in self.profiles.items()}
+
+def wait_for_operation_complete(interface, max_wait: float, poll_interval: float = 0.001,
+                                max_poll_interval: float = 0.05) -> Tuple[float, bool]:
+    """
+    Wait until the instrument has finished its pending operations
+    
+    Sends *OPC, then polls the OPC bit of the event status register with
+    *ESR? at intervals doubling from poll_interval to max_poll_interval,
+    so a fast operation is seen within a millisecond or two while a slow
+    one does not flood the link. Unlike a blocking *OPC? this never leaves
+    a late response behind when max_wait runs out.
+    
+    Args:
+        interface: Hardware interface of the instrument
+        max_wait: Longest time to wait in seconds
+        poll_interval: First delay between polls
+        max_poll_interval: Longest delay between polls
+    
+    Returns:
+        Elapsed seconds and whether the operations completed
+    """
+    start_time = time.monotonic()
+    interface.send_command("*OPC")
+    while True:
+        completed = int(interface.send_command("*ESR?")) & 1
+        elapsed = time.monotonic() - start_time
+        if completed or elapsed >= max_wait:
+            return elapsed, bool(completed)
+        time.sleep(min(poll_interval, max_wait - elapsed))
+        poll_interval = min(poll_interval * 2, max_poll_interval)
+
+def read_until_stable(read: Callable[[], float], tolerance: float, max_wait: float,
+                      consecutive: int = 3, interval: float = 0.0) -> Tuple[float, float, bool]:
+    """
+    Re-read until consecutive readings agree
+    
+    Args:
+        read: Takes one reading
+        tolerance: Largest spread of the last consecutive readings that counts as settled
+        max_wait: Longest time to keep reading in seconds
+        consecutive: Number of readings that must agree
+        interval: Delay between readings
+    
+    Returns:
+        Last reading, elapsed seconds and whether the readings settled
+    """
+    start_time = time.monotonic()
+    window = deque(maxlen=consecutive)
+    while True:
+        value = read()
+        window.append(value)
+        elapsed = time.monotonic() - start_time
+        if len(window) == consecutive and max(window) - min(window) <= tolerance:
+            return value, elapsed, True
+        if elapsed >= max_wait:
+            return value, elapsed, False
+        if interval:
+            time.sleep(interval)
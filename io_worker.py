@@ -0,0 +1,150 @@
+"""
+PCBA Test System - Per-Interface I/O Worker
+One thread owns each instrument link and executes requests from a priority
+queue, so callers on any thread (test runner, API requests, health checks)
+get their own responses and safety commands jump ahead of queued work.
+"""
+
+import functools
+import itertools
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Request priorities; lower values are served first
+PRIORITY_SAFETY = 0
+PRIORITY_NORMAL = 10
+
+# Commands that put an instrument in a safe state; they are served before anything queued
+SAFETY_COMMANDS = ("OUTP OFF", "OUTP 0", "OUTP:STAT OFF", "OUTP:STAT 0", "ABOR")
+
+class IOWorker:
+    """
+    Single I/O thread with a priority request queue
+    
+    Requests are served in priority order, first come first served within
+    a priority. The thread is started on the first request and exits after
+    idle_timeout seconds without requests, so idle interfaces hold no
+    thread. Requests made from the worker thread itself (reconnects, the
+    reconnect callbacks restoring configuration) run immediately.
+    """
+    
+    def __init__(self, name: str, queue_timeout: float = 30.0, idle_timeout: float = 30.0,
+                 safety_commands: Sequence[str] = SAFETY_COMMANDS):
+        """
+        Initialize worker
+        
+        Args:
+            name: Thread name (e.g. the instrument address)
+            queue_timeout: Longest time a request may wait for the worker before it is withdrawn
+            idle_timeout: Seconds without requests after which the thread exits
+            safety_commands: Command headers served with PRIORITY_SAFETY
+        """
+        self.name = name
+        self.queue_timeout = queue_timeout
+        self.idle_timeout = idle_timeout
+        self.safety_commands = tuple(command.upper() for command in safety_commands)
+        
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        
+        self.processed = 0
+        self.withdrawn = 0
+        self.max_depth = 0
+        self.max_wait = 0.0
+    
+    def priority(self, command: str) -> int:
+        """Priority of a command; a batch containing a safety command is a safety request"""
+        for part in command.split(';'):
+            if part.strip().lstrip(':').upper().startswith(self.safety_commands):
+                return PRIORITY_SAFETY
+        return PRIORITY_NORMAL
+    
+    def in_worker(self) -> bool:
+        return threading.current_thread() is self._thread
+    
+    def submit(self, function: Callable, *args, priority: int = PRIORITY_NORMAL, **kwargs) -> Future:
+        """Queue function(*args, **kwargs) for the worker thread"""
+        future = Future()
+        with self._lock:
+            self._queue.put((priority, next(self._sequence), time.monotonic(), future, function, args, kwargs))
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"io-{self.name}", daemon=True)
+                self._thread.start()
+        return future
+    
+    def call(self, function: Callable, *args, priority: int = PRIORITY_NORMAL, **kwargs) -> Any:
+        """
+        Run function on the worker thread and return its result
+        
+        Waits at most queue_timeout for the request to start; once started
+        it is bounded by its own I/O timeout.
+        """
+        if self.in_worker():
+            return function(*args, **kwargs)
+        future = self.submit(function, *args, priority=priority, **kwargs)
+        try:
+            return future.result(self.queue_timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                self.withdrawn += 1
+                logger.warning(f"Request withdrawn after waiting {self.queue_timeout:.1f}s for {self.name}")
+                raise TimeoutError(f"Request waited more than {self.queue_timeout:.1f}s for {self.name}")
+        return future.result()
+    
+    def _run(self):
+        while True:
+            try:
+                _, _, queued_at, future, function, args, kwargs = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    if self._queue.empty():
+                        self._thread = None
+                        return
+                continue
+            
+            if not future.set_running_or_notify_cancel():
+                continue
+            self.max_wait = max(self.max_wait, time.monotonic() - queued_at)
+            try:
+                future.set_result(function(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            self.processed += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue state for status reporting"""
+        return {
+            "queued": self._queue.qsize(),
+            "processed": self.processed,
+            "withdrawn": self.withdrawn,
+            "max_depth": self.max_depth,
+            "max_wait_ms": self.max_wait * 1000
+        }
+
+def queued(method):
+    """
+    Run an interface method on the interface's I/O worker
+    
+    Wraps send_command / query_binary_block style methods taking the
+    command as first argument, and connect / disconnect. The priority
+    follows from the command unless given as a priority keyword argument.
+    Interfaces without an io_worker are passed through untouched.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, priority: Optional[int] = None, **kwargs):
+        worker = self.io_worker
+        if worker is None:
+            return method(self, *args, **kwargs)
+        if priority is None:
+            priority = worker.priority(args[0]) if args and isinstance(args[0], str) else PRIORITY_NORMAL
+        return worker.call(method, self, *args, priority=priority, **kwargs)
+    return wrapper
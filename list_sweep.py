@@ -0,0 +1,85 @@
+"""
+PCBA Test System - Hardware-Timed List Sweeps
+Runs a voltage point list from power supply sequence memory while the
+multimeter takes one triggered reading per point, so an N point
+characterization costs a few round trips instead of 2N plus Python-driven
+settling.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from hardware_layer import Multimeter, PowerSupply
+from measurement_buffer import MeasurementBuffer
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class SweepPoint:
+    """One point of a list sweep with the limits of its reading"""
+    voltage: float
+    current_limit: Optional[float] = None
+    min_limit: Optional[float] = None
+    max_limit: Optional[float] = None
+    
+    @classmethod
+    def from_dict(cls, point: Dict[str, Any]) -> 'SweepPoint':
+        """Create a point from a voltage_points style dictionary"""
+        return cls(point['voltage'], point.get('current_limit'), point.get('min_limit'), point.get('max_limit'))
+
+def run_list_sweep(psu: PowerSupply, dmm: Multimeter, points: List[SweepPoint], function: str = "VOLT:DC",
+                   dwell: float = 0.05, range_value: Optional[float] = None, nplc: Optional[float] = None,
+                   trigger_source: str = "EXT", trigger_delay: Optional[float] = None,
+                   timeout: Optional[float] = None) -> MeasurementBuffer:
+    """
+    Sweep the power supply through points and read the DMM once per point
+    
+    The DMM is armed for one trigger per point, the list is loaded into the
+    supply and triggered, and all readings come back in one buffered fetch.
+    With trigger_source EXT the supply's trigger output must be wired to the
+    DMM trigger input so each step triggers a reading.
+    
+    Args:
+        psu: Power supply running the list
+        dmm: Multimeter taking the readings
+        points: Sweep points in order
+        function: DMM measurement function
+        dwell: Seconds the supply holds each point
+        range_value: Fixed DMM range (auto range if None; a fixed range is faster)
+        nplc: DMM integration time in power line cycles
+        trigger_source: DMM trigger source
+        trigger_delay: DMM settling time after each trigger (automatic if None)
+        timeout: Deadline for the readings (list duration plus the interface timeout if None)
+    
+    Returns:
+        One reading per point with the point's limits applied
+    """
+    if not points:
+        raise ValueError("Sweep needs at least one point")
+    currents = [point.current_limit for point in points]
+    if any(current is None for current in currents):
+        if any(current is not None for current in currents):
+            raise ValueError("Give a current limit for every sweep point or for none")
+        currents = None
+    if timeout is None:
+        timeout = dwell * len(points) + dmm.interface.config.timeout
+    
+    dmm.arm(function, len(points), range_value, nplc, trigger_source, trigger_delay)
+    try:
+        if not psu.load_list([point.voltage for point in points], currents, dwell):
+            raise RuntimeError(f"Failed to load list into {psu.name}")
+        if not psu.start_list():
+            raise RuntimeError(f"Failed to start list on {psu.name}")
+        measurement = dmm.fetch(timeout)
+    except Exception:
+        # Do not leave the DMM waiting for triggers that will never come
+        dmm.abort()
+        raise
+    
+    buffer = MeasurementBuffer(capacity=len(points))
+    buffer.extend(measurement.parameter, measurement.samples, measurement.unit,
+                  [point.min_limit for point in points], [point.max_limit for point in points],
+                  measurement.calibration_version)
+    logger.info(f"List sweep of {len(points)} points: {len(buffer.failures())} out of limits")
+    return buffer
@@ -0,0 +1,271 @@
+"""
+PCBA Test System - Columnar Measurement Buffer
+Array-backed storage for large numbers of readings (sweeps, ICT runs) with
+vectorized limit evaluation and compact JSON / binary serialization.
+"""
+
+import json
+import struct
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from hardware_layer import TestMeasurement
+
+# Calibration version column entry of a reading that was not corrected
+UNCORRECTED = 0
+
+def version_column(versions: np.ndarray) -> List[Optional[int]]:
+    """Calibration versions as a JSON column, None for uncorrected readings"""
+    return [None if version == UNCORRECTED else version for version in versions.tolist()]
+
+class MeasurementBuffer:
+    """
+    Columnar store of measurements
+    
+    Values, limits and timestamps live in preallocated float64 arrays and
+    the (parameter, unit) of each reading is a uint16 index into a small
+    table, so a reading costs 36 bytes instead of a TestMeasurement object.
+    Missing limits are stored as NaN. Timestamps are monotonic seconds
+    since start_time, so they are immune to wall clock adjustments. Each
+    reading keeps the version of the calibration it was corrected with
+    (uint16, UNCORRECTED if none), so readings taken across a calibration
+    update are never attributed to the wrong table.
+    """
+    
+    MAGIC = b"PMB2"
+    # Magic, reading count, length of the JSON key table, start time (epoch seconds)
+    HEADER = struct.Struct("<4sIId")
+    
+    def __init__(self, capacity: int = 1024):
+        """
+        Initialize buffer
+        
+        Args:
+            capacity: Initial number of readings; the arrays double when full
+        """
+        self.start_time = time.time()
+        self._start_monotonic = time.monotonic()
+        self.keys: List[Tuple[str, str]] = []
+        self._key_index: Dict[Tuple[str, str], int] = {}
+        self._size = 0
+        self._allocate(max(1, capacity))
+    
+    def _allocate(self, capacity: int):
+        self._values = np.empty(capacity, dtype=np.float64)
+        self._min_limits = np.empty(capacity, dtype=np.float64)
+        self._max_limits = np.empty(capacity, dtype=np.float64)
+        self._timestamps = np.empty(capacity, dtype=np.float64)
+        self._key_ids = np.empty(capacity, dtype=np.uint16)
+        self._versions = np.empty(capacity, dtype=np.uint16)
+    
+    def _reserve(self, count: int):
+        """Make room for count more readings"""
+        needed = self._size + count
+        capacity = len(self._values)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        columns = (self._values, self._min_limits, self._max_limits, self._timestamps, self._key_ids,
+                   self._versions)
+        self._allocate(capacity)
+        for old, new in zip(columns, (self._values, self._min_limits, self._max_limits,
+                                      self._timestamps, self._key_ids, self._versions)):
+            new[:self._size] = old[:self._size]
+    
+    def _key_id(self, parameter: str, unit: str) -> int:
+        key = (parameter, unit)
+        key_id = self._key_index.get(key)
+        if key_id is None:
+            key_id = self._key_index[key] = len(self.keys)
+            self.keys.append(key)
+        return key_id
+    
+    @staticmethod
+    def _limit(limit: Optional[float]) -> float:
+        return np.nan if limit is None else limit
+    
+    @classmethod
+    def _limit_column(cls, limits: Union[None, float, Sequence[Optional[float]]]) -> Union[float, np.ndarray]:
+        if limits is None or np.isscalar(limits):
+            return cls._limit(limits)
+        if isinstance(limits, np.ndarray) and limits.dtype.kind == 'f':
+            # Already a column with NaN for missing limits
+            return limits
+        return np.array([cls._limit(limit) for limit in limits], dtype=np.float64)
+    
+    @staticmethod
+    def _version(version: Optional[int]) -> int:
+        return UNCORRECTED if version is None else version
+    
+    def append(self, parameter: str, value: float, unit: str,
+               min_limit: Optional[float] = None, max_limit: Optional[float] = None,
+               calibration_version: Optional[int] = None):
+        """Add one reading"""
+        self._reserve(1)
+        index = self._size
+        self._values[index] = value
+        self._min_limits[index] = self._limit(min_limit)
+        self._max_limits[index] = self._limit(max_limit)
+        self._timestamps[index] = time.monotonic() - self._start_monotonic
+        self._key_ids[index] = self._key_id(parameter, unit)
+        self._versions[index] = self._version(calibration_version)
+        self._size += 1
+    
+    def add(self, measurement: TestMeasurement):
+        """Add a measurement (a BufferedMeasurement is stored as its mean)"""
+        self.append(measurement.parameter, measurement.value, measurement.unit,
+                    measurement.min_limit, measurement.max_limit, measurement.calibration_version)
+    
+    def extend(self, parameter: str, values: np.ndarray, unit: str,
+               min_limit: Union[None, float, Sequence[Optional[float]]] = None,
+               max_limit: Union[None, float, Sequence[Optional[float]]] = None,
+               calibration_version: Union[None, int, np.ndarray] = None):
+        """Add many readings of one parameter; limits and calibration versions are shared or given per reading"""
+        values = np.asarray(values, dtype=np.float64)
+        count = values.size
+        self._reserve(count)
+        window = slice(self._size, self._size + count)
+        self._values[window] = values
+        self._min_limits[window] = self._limit_column(min_limit)
+        self._max_limits[window] = self._limit_column(max_limit)
+        self._timestamps[window] = time.monotonic() - self._start_monotonic
+        self._key_ids[window] = self._key_id(parameter, unit)
+        self._versions[window] = (calibration_version if isinstance(calibration_version, np.ndarray)
+                                  else self._version(calibration_version))
+        self._size += count
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __getitem__(self, index: int) -> TestMeasurement:
+        """Materialize one reading as a TestMeasurement"""
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("measurement index out of range")
+        parameter, unit = self.keys[self._key_ids[index]]
+        min_limit, max_limit = self._min_limits[index], self._max_limits[index]
+        return TestMeasurement(
+            parameter, float(self._values[index]), unit,
+            None if np.isnan(min_limit) else float(min_limit),
+            None if np.isnan(max_limit) else float(max_limit),
+            datetime.fromtimestamp(self.start_time + self._timestamps[index]),
+            None if self._versions[index] == UNCORRECTED else int(self._versions[index])
+        )
+    
+    def __iter__(self) -> Iterator[TestMeasurement]:
+        for index in range(self._size):
+            yield self[index]
+    
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[:self._size]
+    
+    @property
+    def min_limits(self) -> np.ndarray:
+        return self._min_limits[:self._size]
+    
+    @property
+    def max_limits(self) -> np.ndarray:
+        return self._max_limits[:self._size]
+    
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Seconds since start_time"""
+        return self._timestamps[:self._size]
+    
+    @property
+    def calibration_versions(self) -> np.ndarray:
+        """Calibration version of every reading, UNCORRECTED for raw readings"""
+        return self._versions[:self._size]
+    
+    @property
+    def parameters(self) -> np.ndarray:
+        """Parameter name of every reading"""
+        names = np.array([parameter for parameter, _ in self.keys] or [""], dtype=object)
+        return names[self._key_ids[:self._size]]
+    
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the filled part of the columns"""
+        return self._size * (4 * 8 + 2 + 2)
+    
+    def select(self, parameter: str) -> np.ndarray:
+        """Mask of the readings of parameter"""
+        key_ids = [key_id for key_id, (name, _) in enumerate(self.keys) if name == parameter]
+        return np.isin(self._key_ids[:self._size], key_ids)
+    
+    def within_limits(self) -> np.ndarray:
+        """Per reading pass mask, with the semantics of TestMeasurement.is_within_limits"""
+        values = self.values
+        with np.errstate(invalid='ignore'):
+            return ~((values < self.min_limits) | (values > self.max_limits))
+    
+    def all_within_limits(self) -> bool:
+        return bool(self.within_limits().all())
+    
+    def failures(self) -> np.ndarray:
+        """Indices of the readings outside their limits"""
+        return np.flatnonzero(~self.within_limits())
+    
+    @staticmethod
+    def _column(values: np.ndarray) -> List[Optional[float]]:
+        return [None if np.isnan(value) else value for value in values.tolist()]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Columnar JSON representation"""
+        return {
+            "start_time": datetime.fromtimestamp(self.start_time).isoformat(),
+            "count": self._size,
+            "keys": [list(key) for key in self.keys],
+            "key": self._key_ids[:self._size].tolist(),
+            "value": self._column(self.values),
+            "min_limit": self._column(self.min_limits),
+            "max_limit": self._column(self.max_limits),
+            "timestamp": self.timestamps.tolist(),
+            "calibration_version": version_column(self.calibration_versions),
+            "passed": self.within_limits().tolist()
+        }
+    
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+    
+    def to_bytes(self) -> bytes:
+        """
+        Binary representation: header, JSON key table, then the columns as
+        little-endian float64 values, limits and timestamps and uint16 keys
+        and calibration versions
+        """
+        keys = json.dumps({"keys": self.keys}).encode()
+        columns = [self.values, self.min_limits, self.max_limits, self.timestamps]
+        return b"".join([self.HEADER.pack(self.MAGIC, self._size, len(keys), self.start_time), keys]
+                        + [column.astype('<f8').tobytes() for column in columns]
+                        + [column[:self._size].astype('<u2').tobytes() for column in (self._key_ids, self._versions)])
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'MeasurementBuffer':
+        """Rebuild a buffer serialized with to_bytes"""
+        magic, count, keys_length, start_time = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise ValueError(f"Not a measurement buffer (magic {magic!r})")
+        
+        buffer = cls(capacity=count)
+        buffer.start_time = start_time
+        offset = cls.HEADER.size
+        table = json.loads(data[offset:offset + keys_length])
+        for parameter, unit in table["keys"]:
+            buffer._key_id(parameter, unit)
+        offset += keys_length
+        
+        for column in (buffer._values, buffer._min_limits, buffer._max_limits, buffer._timestamps):
+            column[:count] = np.frombuffer(data, dtype='<f8', count=count, offset=offset)
+            offset += count * 8
+        for column in (buffer._key_ids, buffer._versions):
+            column[:count] = np.frombuffer(data, dtype='<u2', count=count, offset=offset)
+            offset += count * 2
+        buffer._size = count
+        return buffer
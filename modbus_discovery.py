@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Modbus RTU Bus Discovery for PCBA Test System
+Finds live slave IDs on serial ports using Diagnostics (0x08) probes and
+Read Device Identification (0x2B/0x0E), scanning all ports in parallel
+"""
+
+import struct
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from modbus_test_client import ModbusRTUTestClient
+from rtt_estimator import RTTEstimator
+
+@dataclass
+class DiscoveredDevice:
+    """A slave that answered a discovery probe"""
+    port: str
+    unit_id: int
+    response_time: float
+    supports_diagnostics: bool
+    identification: Dict[str, Any] = field(default_factory=dict)
+
+class ModbusBusScanner:
+    """
+    Discovers Modbus RTU slaves on one or more serial ports
+    
+    Ports are scanned concurrently (one thread each, since a serial line is
+    half duplex); addresses on a port are probed back to back with adaptive
+    timeouts.
+    """
+    
+    def __init__(self, baudrate: int = 9600, initial_timeout: float = 0.05,
+                 min_timeout: float = 0.01, max_timeout: float = 0.5,
+                 identify: bool = True):
+        """
+        Initialize bus scanner
+        
+        Args:
+            baudrate: Communication speed for all ports
+            initial_timeout: Probe timeout until the first device answers
+            min_timeout: Lower bound for adaptive probe timeouts
+            max_timeout: Upper bound for adaptive probe timeouts
+            identify: Read device identification from each device found
+        """
+        self.baudrate = baudrate
+        self.initial_timeout = initial_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.identify = identify
+        self.logger = logging.getLogger("ModbusDiscovery")
+    
+    def probe(self, client: ModbusRTUTestClient, unit_id: int,
+              timeout: float) -> Optional[DiscoveredDevice]:
+        """Probe one address with a Diagnostics echo, None if nothing answered"""
+        start_time = time.time()
+        response = client.execute_pdu(unit_id, struct.pack('>BHH', 0x08, 0x0000, 0xA55A), timeout)
+        if response is None:
+            return None
+        
+        # An exception reply (e.g. 0x88/01 from slaves without 0x08) still proves the device is there
+        return DiscoveredDevice(
+            port=client.port,
+            unit_id=unit_id,
+            response_time=time.time() - start_time,
+            supports_diagnostics=not (response[0] & 0x80)
+        )
+    
+    def scan_port(self, port: str, unit_ids: Iterable[int] = range(1, 248),
+                  client: Optional[ModbusRTUTestClient] = None) -> Dict[str, Any]:
+        """
+        Scan addresses on one serial port
+        
+        Args:
+            port: Serial port to scan
+            unit_ids: Slave addresses to probe
+            client: Already connected client to reuse (opened and closed here otherwise)
+        """
+        start_time = time.time()
+        own_client = client is None
+        result = {"port": port, "devices": [], "probed": 0, "error": None}
+        
+        if own_client:
+            client = ModbusRTUTestClient(port=port, baudrate=self.baudrate, timeout=self.max_timeout)
+            if not client.connect():
+                result["error"] = f"Failed to open {port}"
+                result["scan_time"] = time.time() - start_time
+                return result
+        
+        # Silence from an unused address is expected, so only answers move the deadline (no backoff)
+        timeout = RTTEstimator(self.initial_timeout, self.min_timeout, self.max_timeout)
+        
+        try:
+            for unit_id in unit_ids:
+                device = self.probe(client, unit_id, timeout.timeout)
+                result["probed"] += 1
+                if device is None:
+                    continue
+                
+                timeout.observe(device.response_time)
+                
+                if self.identify:
+                    identification = client.read_device_identification(
+                        read_code=0x02, unit_id=unit_id,
+                        timeout=min(self.max_timeout, timeout.timeout * 2))
+                    if identification.success:
+                        device.identification = identification.values
+                
+                self.logger.info(f"Found device {unit_id} on {port} "
+                                 f"({device.response_time * 1000:.1f} ms)")
+                result["devices"].append(device)
+        except Exception as e:
+            result["error"] = str(e)
+            self.logger.error(f"Scan of {port} aborted: {e}")
+        finally:
+            if own_client:
+                client.disconnect()
+        
+        result["scan_time"] = time.time() - start_time
+        result["probe_timeout"] = timeout.timeout
+        return result
+    
+    def scan(self, ports: List[str], unit_ids: Iterable[int] = range(1, 248)) -> Dict[str, Any]:
+        """
+        Scan several serial ports in parallel and build a device inventory
+        
+        Returns:
+            Inventory with per-port results and a flat device list
+        """
+        start_time = time.time()
+        unit_ids = list(unit_ids)
+        port_results = {}
+        
+        with ThreadPoolExecutor(max_workers=max(1, len(ports))) as executor:
+            futures = {executor.submit(self.scan_port, port, unit_ids): port for port in ports}
+            for future in as_completed(futures):
+                port_results[futures[future]] = future.result()
+        
+        devices = [device for port in ports for device in port_results[port]["devices"]]
+        
+        inventory = {
+            "timestamp": datetime.now().isoformat(),
+            "scan_time": time.time() - start_time,
+            "total_devices": len(devices),
+            "devices": [asdict(device) for device in devices],
+            "ports": {
+                port: {
+                    "device_ids": [device.unit_id for device in port_results[port]["devices"]],
+                    "probed": port_results[port]["probed"],
+                    "scan_time": port_results[port]["scan_time"],
+                    "error": port_results[port]["error"]
+                }
+                for port in ports
+            }
+        }
+        
+        self.logger.info(f"Discovery finished: {len(devices)} device(s) on {len(ports)} port(s) "
+                         f"in {inventory['scan_time']:.2f}s")
+        return inventory
+
+def main():
+    """Main function for running a bus scan"""
+    import argparse
+    import json
+    
+    parser = argparse.ArgumentParser(description="Modbus RTU Bus Discovery for PCBA Testing")
+    parser.add_argument("ports", nargs="+", help="Serial ports to scan")
+    parser.add_argument("--baudrate", type=int, default=9600, help="Baud rate (default: 9600)")
+    parser.add_argument("--first-id", type=int, default=1, help="First slave ID (default: 1)")
+    parser.add_argument("--last-id", type=int, default=247, help="Last slave ID (default: 247)")
+    parser.add_argument("--no-identify", action="store_true", help="Skip device identification")
+    
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    
+    scanner = ModbusBusScanner(baudrate=args.baudrate, identify=not args.no_identify)
+    inventory = scanner.scan(args.ports, range(args.first_id, args.last_id + 1))
+    
+    print(json.dumps(inventory, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ Simulates a real PLC with Modbus RTU communication over serial port
 """
 
 import serial
+import math
 import time
 import threading
 import struct
@@ -18,6 +19,12 @@ class ModbusRTUSimulator:
     Simulates a Modbus RTU PLC with configurable registers and realistic responses
     """
     
+    # Captured DUT clock output: sample rate and count in input registers 30-31,
+    # signed millivolt samples from input register 100 on
+    WAVEFORM_START = 100
+    WAVEFORM_POINTS = 512
+    WAVEFORM_SAMPLE_RATE = 16000
+    
     def __init__(self, port: str = "COM3", baudrate: int = 9600, 
                  device_id: int = 1, timeout: float = 1.0):
         """
@@ -42,6 +49,21 @@ class ModbusRTUSimulator:
         self.holding_registers = [0] * 1000  # Holding registers (0x03, 0x06, 0x10)
         self.input_registers = [0] * 1000  # Input registers (0x04)
         
+        # File records (0x14, 0x15): file number -> 10000 16-bit records, created on first write
+        self.file_records: Dict[int, List[int]] = {}
+        
+        # Device identification objects (0x2B / 0x0E)
+        self.device_identification = {
+            0x00: "PCBA Test System",          # VendorName
+            0x01: "PLC-SIM",                   # ProductCode
+            0x02: "2.1.0",                     # MajorMinorRevision
+            0x04: "Modbus RTU PLC Simulator",  # ProductName
+            0x05: f"SIM-{device_id:03d}",      # ModelName
+        }
+        
+        # Additional slaves sharing this serial line (see attach_slave)
+        self.attached_slaves: List['ModbusRTUSimulator'] = []
+        
         # Logging
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger("ModbusRTU_PLC_Sim")
@@ -54,9 +76,21 @@ class ModbusRTUSimulator:
             "messages_received": 0,
             "messages_sent": 0,
             "errors": 0,
+            "bus_messages": 0,
+            "broadcasts_received": 0,
             "start_time": None
         }
     
+    def attach_slave(self, simulator: 'ModbusRTUSimulator'):
+        """
+        Serve another simulated slave on this simulator's serial line
+        
+        The attached simulator keeps its own memory and device ID but never
+        opens a port itself; frames addressed to it are dispatched from here.
+        """
+        self.attached_slaves.append(simulator)
+        self.logger.info(f"Attached slave device ID {simulator.device_id} on {self.port}")
+    
     def _initialize_test_data(self):
         """Initialize PLC with realistic test data for PCBA testing"""
         
@@ -91,9 +125,24 @@ class ModbusRTUSimulator:
         self.holding_registers[0] = 1  # Test mode (1=auto, 2=manual)
         self.holding_registers[1] = 0  # Test sequence step
         self.holding_registers[2] = 100  # Test timeout (seconds)
+        self.holding_registers[10] = 1000  # DUT clock frequency (Hz)
+        
+        # DUT clock waveform - Input registers 30-31 and 100-611
+        self._capture_waveform()
         
         self.logger.info("PLC simulator initialized with PCBA test data")
     
+    def _capture_waveform(self):
+        """Fill the waveform registers with a 3.3 V clock at the frequency in holding register 10"""
+        frequency = self.waveform_frequency = self.holding_registers[10]
+        self.input_registers[30] = self.WAVEFORM_SAMPLE_RATE
+        self.input_registers[31] = self.WAVEFORM_POINTS
+        for index in range(self.WAVEFORM_POINTS):
+            angle = 2 * math.pi * frequency * index / self.WAVEFORM_SAMPLE_RATE
+            # Sine with a little third harmonic, as seen through the DUT's output filter
+            millivolts = 1650 * (math.sin(angle) + 0.02 * math.sin(3 * angle))
+            self.input_registers[self.WAVEFORM_START + index] = int(round(millivolts)) & 0xFFFF
+    
     def _calculate_crc(self, data: bytes) -> int:
         """Calculate Modbus CRC16"""
         crc = 0xFFFF
@@ -223,6 +272,130 @@ class ModbusRTUSimulator:
         data = struct.pack('>HH', addr, value)
         return self._create_response(self.device_id, 0x06, data)
     
+    def _handle_write_multiple_coils(self, start_addr: int, count: int, values: bytes) -> bytes:
+        """Handle Write Multiple Coils (0x0F)"""
+        if not 1 <= count <= 1968 or len(values) != (count + 7) // 8:
+            return self._create_error_response(self.device_id, 0x0F, 0x03)
+        if start_addr + count > len(self.coils):
+            return self._create_error_response(self.device_id, 0x0F, 0x02)
+        
+        for i in range(count):
+            self.coils[start_addr + i] = bool(values[i // 8] & (1 << (i % 8)))
+        
+        data = struct.pack('>HH', start_addr, count)
+        return self._create_response(self.device_id, 0x0F, data)
+    
+    def _handle_write_multiple_registers(self, start_addr: int, count: int, values: bytes) -> bytes:
+        """Handle Write Multiple Registers (0x10)"""
+        if not 1 <= count <= 123 or len(values) != count * 2:
+            return self._create_error_response(self.device_id, 0x10, 0x03)
+        if start_addr + count > len(self.holding_registers):
+            return self._create_error_response(self.device_id, 0x10, 0x02)
+        
+        self.holding_registers[start_addr:start_addr + count] = struct.unpack(f'>{count}H', values)
+        
+        data = struct.pack('>HH', start_addr, count)
+        return self._create_response(self.device_id, 0x10, data)
+    
+    def _handle_read_file_record(self, request_data: bytes) -> bytes:
+        """Handle Read File Record (0x14)"""
+        if len(request_data) % 7 != 0 or not request_data:
+            return self._create_error_response(self.device_id, 0x14, 0x03)
+        
+        sub_responses = b""
+        for offset in range(0, len(request_data), 7):
+            ref_type, file_number, record_number, record_length = struct.unpack(
+                '>BHHH', request_data[offset:offset + 7])
+            records = self.file_records.get(file_number)
+            if (ref_type != 6 or records is None or record_number > 9999
+                    or record_number + record_length > len(records)):
+                return self._create_error_response(self.device_id, 0x14, 0x02)
+            
+            values = records[record_number:record_number + record_length]
+            sub_responses += struct.pack('BB', 1 + record_length * 2, 6)
+            sub_responses += struct.pack(f'>{record_length}H', *values)
+        
+        if len(sub_responses) > 251:
+            return self._create_error_response(self.device_id, 0x14, 0x03)
+        
+        return self._create_response(self.device_id, 0x14, struct.pack('B', len(sub_responses)) + sub_responses)
+    
+    def _handle_write_file_record(self, request_data: bytes) -> bytes:
+        """Handle Write File Record (0x15)"""
+        offset = 0
+        writes = []
+        while offset < len(request_data):
+            if offset + 7 > len(request_data):
+                return self._create_error_response(self.device_id, 0x15, 0x03)
+            ref_type, file_number, record_number, record_length = struct.unpack(
+                '>BHHH', request_data[offset:offset + 7])
+            values = request_data[offset + 7:offset + 7 + record_length * 2]
+            if len(values) != record_length * 2:
+                return self._create_error_response(self.device_id, 0x15, 0x03)
+            if ref_type != 6 or file_number == 0 or record_number + record_length > 10000:
+                return self._create_error_response(self.device_id, 0x15, 0x02)
+            writes.append((file_number, record_number, struct.unpack(f'>{record_length}H', values)))
+            offset += 7 + record_length * 2
+        
+        # Storage is only touched once every sub-request has been validated
+        for file_number, record_number, values in writes:
+            records = self.file_records.setdefault(file_number, [0] * 10000)
+            records[record_number:record_number + len(values)] = values
+        
+        # Normal response echoes the request
+        return self._create_response(self.device_id, 0x15, struct.pack('B', len(request_data)) + request_data)
+    
+    def _handle_diagnostics(self, sub_function: int, data: bytes) -> bytes:
+        """Handle Diagnostics (0x08)"""
+        if sub_function in (0x0000, 0x0001):  # Return query data / restart communications
+            if sub_function == 0x0001:
+                self._clear_diagnostic_counters()
+            return self._create_response(self.device_id, 0x08, struct.pack('>H', sub_function) + data)
+        
+        if sub_function == 0x000A:  # Clear counters
+            self._clear_diagnostic_counters()
+            return self._create_response(self.device_id, 0x08, struct.pack('>H', sub_function) + data)
+        
+        counters = {
+            0x000B: self.stats["bus_messages"],       # Bus message count
+            0x000C: self.stats["errors"],             # Bus communication error count
+            0x000E: self.stats["messages_received"],  # Slave message count
+        }
+        if sub_function not in counters:
+            return self._create_error_response(self.device_id, 0x08, 0x01)
+        
+        value = counters[sub_function] & 0xFFFF
+        return self._create_response(self.device_id, 0x08, struct.pack('>HH', sub_function, value))
+    
+    def _clear_diagnostic_counters(self):
+        """Reset the counters reported through diagnostics"""
+        self.stats["bus_messages"] = 0
+        self.stats["errors"] = 0
+        self.stats["messages_received"] = 0
+    
+    def _handle_read_device_identification(self, read_code: int, object_id: int) -> bytes:
+        """Handle Read Device Identification (0x2B / MEI type 0x0E)"""
+        if read_code not in (0x01, 0x02, 0x03, 0x04):
+            return self._create_error_response(self.device_id, 0x2B, 0x03)
+        
+        if read_code == 0x04:  # Individual access
+            if object_id not in self.device_identification:
+                return self._create_error_response(self.device_id, 0x2B, 0x02)
+            object_ids = [object_id]
+        else:
+            last_id = {0x01: 0x02, 0x02: 0x7F, 0x03: 0xFF}[read_code]
+            if object_id not in self.device_identification or object_id > last_id:
+                object_id = 0x00  # Restart from the first object of the category
+            object_ids = sorted(oid for oid in self.device_identification if object_id <= oid <= last_id)
+        
+        # Conformity level: regular identification, individual access supported
+        data = struct.pack('BBBBBB', 0x0E, read_code, 0x82, 0x00, 0x00, len(object_ids))
+        for oid in object_ids:
+            value = self.device_identification[oid].encode()
+            data += struct.pack('BB', oid, len(value)) + value
+        
+        return self._create_response(self.device_id, 0x2B, data)
+    
     def _process_frame(self, frame: bytes) -> Optional[bytes]:
         """Process received Modbus frame and return response"""
         try:
@@ -235,12 +408,17 @@ class ModbusRTUSimulator:
                 self.stats["errors"] += 1
                 return None
             
+            self.stats["bus_messages"] += 1
+            
             # Parse frame
             slave_id = frame[0]
             function_code = frame[1]
             
-            # Check if this message is for us
-            if slave_id != self.device_id:
+            # Check if this message is for us; address 0 is a broadcast to every
+            # slave and only write functions may be broadcast
+            if slave_id != self.device_id and slave_id != 0:
+                return None
+            if slave_id == 0 and function_code not in (0x05, 0x06, 0x0F, 0x10):
                 return None
             
             self.stats["messages_received"] += 1
@@ -270,10 +448,36 @@ class ModbusRTUSimulator:
                 addr, value = struct.unpack('>HH', frame[2:6])
                 response = self._handle_write_single_register(addr, value)
                 
+            elif function_code == 0x0F:  # Write Multiple Coils
+                start_addr, count, byte_count = struct.unpack('>HHB', frame[2:7])
+                response = self._handle_write_multiple_coils(start_addr, count, frame[7:7 + byte_count])
+                
+            elif function_code == 0x10:  # Write Multiple Registers
+                start_addr, count, byte_count = struct.unpack('>HHB', frame[2:7])
+                response = self._handle_write_multiple_registers(start_addr, count, frame[7:7 + byte_count])
+                
+            elif function_code == 0x14:  # Read File Record
+                response = self._handle_read_file_record(frame[3:3 + frame[2]])
+            
+            elif function_code == 0x15:  # Write File Record
+                response = self._handle_write_file_record(frame[3:3 + frame[2]])
+            
+            elif function_code == 0x08:  # Diagnostics
+                sub_function = struct.unpack('>H', frame[2:4])[0]
+                response = self._handle_diagnostics(sub_function, frame[4:-2])
+                
+            elif function_code == 0x2B and frame[2] == 0x0E:  # Read Device Identification
+                response = self._handle_read_device_identification(frame[3], frame[4])
+                
             else:
                 # Unsupported function code
                 response = self._create_error_response(self.device_id, function_code, 0x01)
             
+            # Broadcasts are executed but never answered
+            if slave_id == 0:
+                self.stats["broadcasts_received"] += 1
+                return None
+            
             self.stats["messages_sent"] += 1
             return response
             
@@ -301,6 +505,11 @@ class ModbusRTUSimulator:
                 ambient_temp = 250 + int(10 * (time.time() % 60) / 60)  # Slowly rising
                 self.input_registers[20] = ambient_temp
                 
+                # Recapture the DUT clock after its frequency was changed; the capture is
+                # otherwise left alone so a multi-request read never sees two captures
+                if self.holding_registers[10] != self.waveform_frequency:
+                    self._capture_waveform()
+                
                 # Toggle test status periodically
                 if int(time.time()) % 10 == 0:
                     self.coils[1] = not self.coils[1]  # Test in progress
@@ -311,6 +520,59 @@ class ModbusRTUSimulator:
                 self.logger.error(f"Error in dynamic simulation: {e}")
                 time.sleep(1)
     
+    def _expected_request_length(self, frame: bytes) -> Optional[int]:
+        """Total RTU request length implied by the bytes received so far (None if unknown yet)"""
+        if len(frame) < 2:
+            return None
+        
+        function_code = frame[1]
+        if function_code in (0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x08):
+            return 8
+        if function_code in (0x0F, 0x10):
+            return 9 + frame[6] if len(frame) >= 7 else None
+        if function_code in (0x14, 0x15):
+            return 5 + frame[2] if len(frame) >= 3 else None
+        if function_code == 0x2B:
+            return 7
+        return None
+    
+    def _read_frame(self) -> bytes:
+        """
+        Read one request frame
+        
+        Known function codes complete as soon as their length is reached,
+        anything else ends after 3.5 character times of line silence.
+        """
+        frame = b""
+        start_time = time.time()
+        last_rx_time = start_time
+        frame_gap = max(0.005, 3.5 * 11 / self.baudrate)
+        
+        while time.time() - start_time < self.timeout:
+            if self.serial_conn.in_waiting > 0:
+                frame += self.serial_conn.read(self.serial_conn.in_waiting)
+                last_rx_time = time.time()
+                expected = self._expected_request_length(frame)
+                if expected is not None and len(frame) >= expected:
+                    break
+            elif frame and time.time() - last_rx_time > frame_gap:
+                break
+            time.sleep(0.0005)
+        
+        return frame
+    
+    def _dispatch_frame(self, frame: bytes) -> Optional[bytes]:
+        """Hand a frame to whichever slave on this line it is addressed to"""
+        if frame and frame[0] == 0:
+            for simulator in [self] + self.attached_slaves:
+                simulator._process_frame(frame)
+            return None
+        
+        for simulator in self.attached_slaves:
+            if frame and frame[0] == simulator.device_id:
+                return simulator._process_frame(frame)
+        return self._process_frame(frame)
+    
     def start(self):
         """Start the Modbus RTU simulator"""
         try:
@@ -340,24 +602,13 @@ class ModbusRTUSimulator:
                 try:
                     # Read data from serial port
                     if self.serial_conn.in_waiting > 0:
-                        frame = b""
-                        start_time = time.time()
-                        
-                        # Read frame with timeout
-                        while time.time() - start_time < self.timeout:
-                            if self.serial_conn.in_waiting > 0:
-                                frame += self.serial_conn.read(self.serial_conn.in_waiting)
-                                time.sleep(0.01)  # Small delay to collect complete frame
-                            else:
-                                if len(frame) > 0:
-                                    break
-                                time.sleep(0.01)
+                        frame = self._read_frame()
                         
                         if frame:
                             self.logger.debug(f"Received: {frame.hex()}")
                             
                             # Process frame and send response
-                            response = self._process_frame(frame)
+                            response = self._dispatch_frame(frame)
                             if response:
                                 self.serial_conn.write(response)
                                 self.logger.debug(f"Sent: {response.hex()}")
@@ -401,6 +652,7 @@ class ModbusRTUSimulator:
             "port": self.port,
             "baudrate": self.baudrate,
             "device_id": self.device_id,
+            "attached_slaves": [slave.device_id for slave in self.attached_slaves],
             "stats": self.stats,
             "sample_data": {
                 "voltages": {
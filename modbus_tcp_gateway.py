@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Modbus TCP-to-RTU Gateway for PCBA Test System
+Lets many Modbus TCP clients (test stations) share RTU serial buses with fair request queuing
+"""
+
+import socket
+import struct
+import threading
+import time
+import logging
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional
+
+from modbus_test_client import BROADCAST_FUNCTIONS, ModbusRTUTestClient
+
+# Modbus exception codes used by gateways
+ILLEGAL_FUNCTION = 0x01
+GATEWAY_PATH_UNAVAILABLE = 0x0A
+GATEWAY_TARGET_FAILED = 0x0B
+
+@dataclass
+class GatewayRequest:
+    """A Modbus TCP request waiting for its turn on a serial bus"""
+    client_id: int
+    transaction_id: int
+    unit_id: int
+    pdu: bytes
+    priority: int
+    enqueued_at: float
+    reply: Callable[['GatewayRequest', bytes], None]
+
+class FairRequestQueue:
+    """
+    Request queue for one serial bus
+    
+    Higher priority levels are always served first. Within a level, clients are
+    served round-robin so one chatty station cannot starve the others.
+    """
+    
+    def __init__(self):
+        self._levels: Dict[int, 'OrderedDict[int, deque]'] = {}
+        self._condition = threading.Condition()
+        self._depth = 0
+    
+    def put(self, request: GatewayRequest):
+        """Queue a request behind the same client's earlier requests"""
+        with self._condition:
+            clients = self._levels.setdefault(request.priority, OrderedDict())
+            clients.setdefault(request.client_id, deque()).append(request)
+            self._depth += 1
+            self._condition.notify()
+    
+    def get(self, timeout: Optional[float] = None) -> Optional[GatewayRequest]:
+        """Take the next request to execute, or None if the queue stayed empty"""
+        with self._condition:
+            if not self._depth and not self._condition.wait_for(lambda: self._depth > 0, timeout):
+                return None
+            
+            priority = max(level for level, clients in self._levels.items() if clients)
+            clients = self._levels[priority]
+            client_id, requests = next(iter(clients.items()))
+            request = requests.popleft()
+            
+            # Rotate the client to the back of its level
+            if requests:
+                clients.move_to_end(client_id)
+            else:
+                del clients[client_id]
+            
+            self._depth -= 1
+            return request
+    
+    def __len__(self) -> int:
+        return self._depth
+
+class SerialBus:
+    """One RTU serial line behind the gateway with its own worker thread"""
+    
+    def __init__(self, name: str, client: ModbusRTUTestClient):
+        self.name = name
+        self.client = client
+        self.queue = FairRequestQueue()
+        self.running = False
+        self.worker_thread = None
+        self.logger = logging.getLogger(f"ModbusGateway.{name}")
+        
+        # Metrics
+        self.stats = {
+            "requests_processed": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "max_queue_depth": 0,
+            "total_wait_time": 0.0,
+            "max_wait_time": 0.0,
+            "total_bus_time": 0.0
+        }
+        self.recent_wait_times = deque(maxlen=1000)
+        self._stats_lock = threading.Lock()
+    
+    def submit(self, request: GatewayRequest):
+        """Queue a request for execution on this bus"""
+        self.queue.put(request)
+        with self._stats_lock:
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self.queue))
+    
+    def start(self):
+        """Start the bus worker"""
+        self.running = True
+        self.worker_thread = threading.Thread(target=self._worker)
+        self.worker_thread.daemon = True
+        self.worker_thread.start()
+    
+    def stop(self):
+        """Stop the bus worker"""
+        self.running = False
+        if self.worker_thread and self.worker_thread.is_alive():
+            self.worker_thread.join(timeout=2)
+    
+    def _worker(self):
+        """Execute queued requests one at a time on the serial line"""
+        while self.running:
+            request = self.queue.get(timeout=0.2)
+            if request is None:
+                continue
+            
+            started = time.time()
+            wait_time = started - request.enqueued_at
+            
+            try:
+                if request.unit_id == 0:
+                    # Broadcasts are forwarded but, as on the RTU side, never answered
+                    self.client.broadcast(request.pdu[0], request.pdu[1:])
+                    self._record_wait(wait_time, time.time() - started)
+                    continue
+                
+                response_pdu = self.client.execute_pdu(request.unit_id, request.pdu)
+                if response_pdu is None:
+                    response_pdu = struct.pack('BB', request.pdu[0] | 0x80, GATEWAY_TARGET_FAILED)
+                    self._record("timeouts")
+            except Exception as e:
+                self.logger.error(f"Bus error for unit {request.unit_id}: {e}")
+                response_pdu = struct.pack('BB', request.pdu[0] | 0x80, GATEWAY_TARGET_FAILED)
+                self._record("errors")
+            
+            self._record_wait(wait_time, time.time() - started)
+            request.reply(request, response_pdu)
+    
+    def _record_wait(self, wait_time: float, bus_time: float):
+        with self._stats_lock:
+            self.stats["requests_processed"] += 1
+            self.stats["total_wait_time"] += wait_time
+            self.stats["max_wait_time"] = max(self.stats["max_wait_time"], wait_time)
+            self.stats["total_bus_time"] += bus_time
+            self.recent_wait_times.append(wait_time)
+    
+    def _record(self, counter: str):
+        with self._stats_lock:
+            self.stats[counter] += 1
+    
+    def get_metrics(self) -> Dict:
+        """Queue depth and wait-time metrics for this bus"""
+        with self._stats_lock:
+            processed = self.stats["requests_processed"]
+            recent = sorted(self.recent_wait_times)
+            p95 = recent[int(len(recent) * 0.95) - 1] if recent else 0.0
+            return {
+                "port": self.client.port,
+                "queue_depth": len(self.queue),
+                "max_queue_depth": self.stats["max_queue_depth"],
+                "requests_processed": processed,
+                "timeouts": self.stats["timeouts"],
+                "errors": self.stats["errors"],
+                "avg_wait_ms": (self.stats["total_wait_time"] / processed) * 1000 if processed else 0.0,
+                "p95_wait_ms": p95 * 1000,
+                "max_wait_ms": self.stats["max_wait_time"] * 1000,
+                "bus_utilization_s": self.stats["total_bus_time"]
+            }
+
+class ModbusTCPGateway:
+    """
+    Modbus TCP server that forwards requests to RTU slaves on serial buses
+    
+    Responses are matched back to the originating TCP connection and
+    transaction ID, so clients may pipeline several requests.
+    """
+    
+    def __init__(self, host: str = "0.0.0.0", port: int = 502, default_priority: int = 1):
+        """
+        Initialize Modbus TCP gateway
+        
+        Args:
+            host: Address to listen on
+            port: TCP port to listen on (0 picks a free port)
+            default_priority: Queue priority for clients without an explicit one
+                              (higher value = served first)
+        """
+        self.host = host
+        self.port = port
+        self.default_priority = default_priority
+        self.running = False
+        self.server_socket = None
+        self.accept_thread = None
+        
+        self.buses: Dict[str, SerialBus] = {}
+        self.unit_routes: Dict[int, str] = {}
+        self.default_bus: Optional[str] = None
+        self.client_priorities: Dict[str, int] = {}
+        
+        self._connections: Dict[int, socket.socket] = {}
+        self._connections_lock = threading.Lock()
+        self._next_client_id = 1
+        
+        self.logger = logging.getLogger("ModbusGateway")
+        
+        self.stats = {
+            "connections_accepted": 0,
+            "requests_received": 0,
+            "unroutable_requests": 0,
+            "start_time": None
+        }
+        self._stats_lock = threading.Lock()
+    
+    def add_bus(self, name: str, client: ModbusRTUTestClient,
+                unit_ids: Optional[Iterable[int]] = None) -> SerialBus:
+        """
+        Attach an RTU serial bus
+        
+        Args:
+            name: Bus name used in metrics
+            client: Connected RTU client that owns the serial port
+            unit_ids: Slave addresses reachable on this bus; None makes it the default bus
+        """
+        bus = SerialBus(name, client)
+        self.buses[name] = bus
+        
+        if unit_ids is None:
+            self.default_bus = name
+        else:
+            for unit_id in unit_ids:
+                self.unit_routes[unit_id] = name
+        
+        if self.running:
+            bus.start()
+        return bus
+    
+    def set_client_priority(self, host: str, priority: int):
+        """Set queue priority for all connections from a client host"""
+        self.client_priorities[host] = priority
+    
+    def start(self) -> bool:
+        """Start listening for Modbus TCP clients"""
+        try:
+            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.server_socket.bind((self.host, self.port))
+            self.server_socket.listen(16)
+            self.server_socket.settimeout(0.5)
+            self.port = self.server_socket.getsockname()[1]
+            
+            self.running = True
+            self.stats["start_time"] = datetime.now()
+            
+            for bus in self.buses.values():
+                bus.start()
+            
+            self.accept_thread = threading.Thread(target=self._accept_loop)
+            self.accept_thread.daemon = True
+            self.accept_thread.start()
+            
+            self.logger.info(f"Modbus TCP gateway listening on {self.host}:{self.port}")
+            self.logger.info(f"Serial buses: {', '.join(self.buses) or 'none'}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to start gateway: {e}")
+            self.running = False
+            return False
+    
+    def stop(self):
+        """Stop the gateway and close all client connections"""
+        self.running = False
+        
+        if self.server_socket:
+            self.server_socket.close()
+        
+        with self._connections_lock:
+            for conn in self._connections.values():
+                try:
+                    conn.close()
+                except OSError:
+                    pass
+            self._connections.clear()
+        
+        for bus in self.buses.values():
+            bus.stop()
+        
+        if self.accept_thread and self.accept_thread.is_alive():
+            self.accept_thread.join(timeout=2)
+        
+        self.logger.info("Modbus TCP gateway stopped")
+    
+    def _accept_loop(self):
+        """Accept incoming TCP clients"""
+        while self.running:
+            try:
+                conn, addr = self.server_socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            
+            with self._connections_lock:
+                client_id = self._next_client_id
+                self._next_client_id += 1
+                self._connections[client_id] = conn
+            self._record("connections_accepted")
+            
+            self.logger.info(f"Client {client_id} connected from {addr[0]}:{addr[1]}")
+            
+            client_thread = threading.Thread(target=self._client_loop, args=(conn, addr, client_id))
+            client_thread.daemon = True
+            client_thread.start()
+    
+    def _recv_exact(self, conn: socket.socket, size: int) -> Optional[bytes]:
+        """Read exactly size bytes, or None if the connection closed"""
+        data = bytearray()
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return bytes(data)
+    
+    def _client_loop(self, conn: socket.socket, addr, client_id: int):
+        """Read MBAP framed requests from one client and queue them"""
+        priority = self.client_priorities.get(addr[0], self.default_priority)
+        send_lock = threading.Lock()
+        
+        def reply(request: GatewayRequest, response_pdu: bytes):
+            header = struct.pack('>HHHB', request.transaction_id, 0, len(response_pdu) + 1, request.unit_id)
+            try:
+                with send_lock:
+                    conn.sendall(header + response_pdu)
+            except OSError as e:
+                self.logger.debug(f"Client {client_id} gone before reply: {e}")
+        
+        try:
+            while self.running:
+                header = self._recv_exact(conn, 7)
+                if header is None:
+                    break
+                
+                transaction_id, protocol_id, length, unit_id = struct.unpack('>HHHB', header)
+                if protocol_id != 0 or length < 2 or length > 254:
+                    self.logger.warning(f"Client {client_id} sent invalid MBAP header, closing")
+                    break
+                
+                pdu = self._recv_exact(conn, length - 1)
+                if pdu is None:
+                    break
+                
+                self._record("requests_received")
+                request = GatewayRequest(
+                    client_id=client_id,
+                    transaction_id=transaction_id,
+                    unit_id=unit_id,
+                    pdu=pdu,
+                    priority=priority,
+                    enqueued_at=time.time(),
+                    reply=reply
+                )
+                
+                if unit_id == 0 and pdu[0] not in BROADCAST_FUNCTIONS:
+                    # Only writes can be broadcast; nobody would ever answer anything else
+                    reply(request, struct.pack('BB', pdu[0] | 0x80, ILLEGAL_FUNCTION))
+                    continue
+                
+                bus = self._route(unit_id)
+                if bus is None:
+                    self._record("unroutable_requests")
+                    reply(request, struct.pack('BB', pdu[0] | 0x80, GATEWAY_PATH_UNAVAILABLE))
+                else:
+                    bus.submit(request)
+        except OSError as e:
+            self.logger.debug(f"Client {client_id} connection error: {e}")
+        finally:
+            with self._connections_lock:
+                self._connections.pop(client_id, None)
+            try:
+                conn.close()
+            except OSError:
+                pass
+            self.logger.info(f"Client {client_id} disconnected")
+    
+    def _record(self, counter: str):
+        with self._stats_lock:
+            self.stats[counter] += 1
+    
+    def _route(self, unit_id: int) -> Optional[SerialBus]:
+        """Find the serial bus serving a unit ID"""
+        name = self.unit_routes.get(unit_id, self.default_bus)
+        return self.buses.get(name) if name else None
+    
+    def get_metrics(self) -> Dict:
+        """Gateway status with per-bus queue metrics"""
+        with self._connections_lock:
+            active_clients = len(self._connections)
+        with self._stats_lock:
+            stats = dict(self.stats)
+        
+        return {
+            "running": self.running,
+            "host": self.host,
+            "port": self.port,
+            "active_clients": active_clients,
+            "stats": stats,
+            "buses": {name: bus.get_metrics() for name, bus in self.buses.items()}
+        }
+
+def main():
+    """Main function for running the gateway"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Modbus TCP-to-RTU Gateway for PCBA Testing")
+    parser.add_argument("--listen-port", type=int, default=502, help="Modbus TCP port (default: 502)")
+    parser.add_argument("--serial-port", default="COM11", help="RTU serial port (default: COM11)")
+    parser.add_argument("--baudrate", type=int, default=9600, help="Baud rate (default: 9600)")
+    parser.add_argument("--timeout", type=float, default=0.5, help="RTU response timeout (default: 0.5)")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=getattr(logging, args.log_level))
+    
+    client = ModbusRTUTestClient(port=args.serial_port, baudrate=args.baudrate, timeout=args.timeout)
+    if not client.connect():
+        print(f"❌ Failed to open {args.serial_port}")
+        return
+    
+    gateway = ModbusTCPGateway(port=args.listen_port)
+    gateway.add_bus("bus0", client)
+    
+    if not gateway.start():
+        client.disconnect()
+        return
+    
+    try:
+        while True:
+            time.sleep(10)
+            for name, metrics in gateway.get_metrics()["buses"].items():
+                print(f"{name}: depth={metrics['queue_depth']} processed={metrics['requests_processed']} "
+                      f"avg_wait={metrics['avg_wait_ms']:.1f}ms timeouts={metrics['timeouts']}")
+    except KeyboardInterrupt:
+        print("\nShutting down gateway...")
+    finally:
+        gateway.stop()
+        client.disconnect()
+
+if __name__ == "__main__":
+    main()
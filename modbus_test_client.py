@@ -12,6 +12,65 @@ from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
 from datetime import datetime
 import json
+import zlib
+
+from rtt_estimator import RTTEstimator
+
+# File record transfer limits (function codes 0x14 / 0x15)
+RECORDS_PER_FILE = 10000
+MAX_READ_FILE_RECORDS = 124   # Largest record block fitting a 253 byte response PDU
+MAX_WRITE_FILE_RECORDS = 122  # Largest record block fitting a 253 byte request PDU
+MAX_READ_REGISTERS = 125      # Largest register block of one read request
+
+# Function codes slaves accept at the broadcast address 0 (the writes)
+BROADCAST_FUNCTIONS = (0x05, 0x06, 0x0F, 0x10)
+
+def calculate_crc(data: bytes) -> int:
+    """Calculate Modbus CRC16"""
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+    return crc
+
+def create_frame(unit_id: int, pdu: bytes) -> bytes:
+    """RTU frame of a PDU: unit id, PDU and CRC"""
+    frame = bytes([unit_id]) + pdu
+    return frame + struct.pack('<H', calculate_crc(frame))
+
+def verify_crc(frame: bytes) -> bool:
+    """Verify the CRC of an RTU frame"""
+    if len(frame) < 4:
+        return False
+    return struct.unpack('<H', frame[-2:])[0] == calculate_crc(frame[:-2])
+
+def expected_response_length(response: bytes) -> Optional[int]:
+    """Total RTU response length implied by the bytes received so far (None if unknown yet)"""
+    if len(response) < 2:
+        return None
+    
+    function_code = response[1]
+    if function_code & 0x80:
+        return 5  # Exception: id, fc, code, crc
+    if function_code in (0x01, 0x02, 0x03, 0x04, 0x14, 0x15):
+        return 5 + response[2] if len(response) >= 3 else None
+    if function_code in (0x05, 0x06, 0x08, 0x0F, 0x10):
+        return 8  # Echo of address/value, address/quantity or sub-function/data
+    if function_code == 0x2B:
+        # MEI header, then (object id, length, value) triples
+        if len(response) < 8:
+            return None
+        pos = 8
+        for _ in range(response[7]):
+            if len(response) < pos + 2:
+                return None
+            pos += 2 + response[pos + 1]
+        return pos + 2
+    return None
 
 @dataclass
 class ModbusTestResult:
@@ -31,7 +90,8 @@ class ModbusRTUTestClient:
     """
     
     def __init__(self, port: str = "COM11", baudrate: int = 9600, 
-                 device_id: int = 1, timeout: float = 2.0):
+                 device_id: int = 1, timeout: float = 2.0,
+                 adaptive_timeout: bool = True, min_timeout: float = 0.02):
         """
         Initialize Modbus RTU test client
         
@@ -39,14 +99,21 @@ class ModbusRTUTestClient:
             port: Serial port (should be paired with simulator port)
             baudrate: Communication speed
             device_id: Target Modbus device ID
-            timeout: Response timeout
+            timeout: Response timeout (ceiling when adaptive_timeout is enabled)
+            adaptive_timeout: Size deadlines per slave from observed round trips
+            min_timeout: Floor for adaptive deadlines
         """
         self.port = port
         self.baudrate = baudrate
         self.device_id = device_id
         self.timeout = timeout
+        self.adaptive_timeout = adaptive_timeout
+        self.min_timeout = min(min_timeout, timeout)
         self.serial_conn = None
         
+        # Round-trip estimators per slave address
+        self.rtt_estimators: Dict[int, RTTEstimator] = {}
+        
         # Setup logging
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger("ModbusRTU_TestClient")
@@ -54,6 +121,10 @@ class ModbusRTUTestClient:
         # Test results storage
         self.test_results: List[ModbusTestResult] = []
         
+        # Broadcast turnaround: slaves are busy executing a broadcast until this time
+        self.turnaround_delay = 0.1
+        self._bus_quiet_until = 0.0
+        
         # PCBA-specific register mappings (matching simulator)
         self.register_map = {
             # Input registers (read-only sensor data)
@@ -87,33 +158,21 @@ class ModbusRTUTestClient:
     
     def _calculate_crc(self, data: bytes) -> int:
         """Calculate Modbus CRC16"""
-        crc = 0xFFFF
-        for byte in data:
-            crc ^= byte
-            for _ in range(8):
-                if crc & 0x0001:
-                    crc = (crc >> 1) ^ 0xA001
-                else:
-                    crc >>= 1
-        return crc
-    
-    def _create_request(self, function_code: int, data: bytes) -> bytes:
+        return calculate_crc(data)
+    
+    def _create_request(self, function_code: int, data: bytes, unit_id: Optional[int] = None) -> bytes:
         """Create Modbus request frame with CRC"""
-        frame = struct.pack('BB', self.device_id, function_code) + data
-        crc = self._calculate_crc(frame)
-        frame += struct.pack('<H', crc)
-        return frame
+        if unit_id is None:
+            unit_id = self.device_id
+        return create_frame(unit_id, bytes([function_code]) + data)
     
     def _verify_response(self, response: bytes) -> bool:
         """Verify CRC of response frame"""
-        if len(response) < 4:
-            return False
-        
-        data = response[:-2]
-        received_crc = struct.unpack('<H', response[-2:])[0]
-        calculated_crc = self._calculate_crc(data)
-        
-        return received_crc == calculated_crc
+        return verify_crc(response)
+    
+    def _expected_response_length(self, response: bytes) -> Optional[int]:
+        """Total RTU frame length implied by the bytes received so far (None if unknown yet)"""
+        return expected_response_length(response)
     
     def connect(self) -> bool:
         """Connect to Modbus device"""
@@ -134,18 +193,34 @@ class ModbusRTUTestClient:
             self.logger.error(f"Failed to connect: {e}")
             return False
     
+    def _rtt_estimator(self, unit_id: int) -> RTTEstimator:
+        """Round-trip estimator for one slave, created on first use"""
+        if unit_id not in self.rtt_estimators:
+            self.rtt_estimators[unit_id] = RTTEstimator(
+                initial_timeout=self.timeout,
+                min_timeout=self.min_timeout,
+                max_timeout=self.timeout
+            )
+        return self.rtt_estimators[unit_id]
+    
+    def get_timing_stats(self) -> Dict[int, Dict[str, Any]]:
+        """Adaptive timeout state per slave address"""
+        return {unit_id: estimator.get_stats() for unit_id, estimator in self.rtt_estimators.items()}
+    
     def disconnect(self):
         """Disconnect from Modbus device"""
         if self.serial_conn and self.serial_conn.is_open:
             self.serial_conn.close()
             self.logger.info("Disconnected from Modbus device")
     
-    def _send_request(self, request: bytes) -> Optional[bytes]:
-        """Send request and receive response"""
+    def _send_request(self, request: bytes, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Send request and receive response (timeout overrides the client default)"""
         if not self.serial_conn or not self.serial_conn.is_open:
             raise ConnectionError("Not connected to Modbus device")
         
         try:
+            self._wait_turnaround()
+            
             # Clear input buffer
             self.serial_conn.reset_input_buffer()
             
@@ -153,17 +228,38 @@ class ModbusRTUTestClient:
             self.serial_conn.write(request)
             self.logger.debug(f"Sent: {request.hex()}")
             
-            # Read response
+            # Read response until the frame is complete; frames of unknown length
+            # end after 3.5 character times of line silence
             response = b""
             start_time = time.time()
+            last_rx_time = start_time
+            frame_gap = max(0.005, 3.5 * 11 / self.baudrate)
+            complete = False
+            
+            estimator = self._rtt_estimator(request[0]) if self.adaptive_timeout else None
+            adaptive = timeout is None and estimator is not None
+            if timeout is None:
+                timeout = estimator.timeout if adaptive else self.timeout
             
-            while time.time() - start_time < self.timeout:
+            while time.time() - start_time < timeout:
                 if self.serial_conn.in_waiting > 0:
                     response += self.serial_conn.read(self.serial_conn.in_waiting)
-                    # Check if we have a complete frame (minimum 5 bytes for error response)
-                    if len(response) >= 5:
+                    last_rx_time = time.time()
+                    expected = self._expected_response_length(response)
+                    if expected is not None and len(response) >= expected:
+                        complete = True
                         break
-                time.sleep(0.01)
+                elif response and time.time() - last_rx_time > frame_gap:
+                    if self._expected_response_length(response) is None:
+                        complete = True
+                        break
+                time.sleep(0.001)
+            
+            if estimator is not None:
+                if complete:
+                    estimator.observe(last_rx_time - start_time)
+                elif adaptive:
+                    estimator.on_timeout()
             
             self.logger.debug(f"Received: {response.hex()}")
             return response if response else None
@@ -172,6 +268,250 @@ class ModbusRTUTestClient:
             self.logger.error(f"Communication error: {e}")
             return None
     
+    def _wait_turnaround(self):
+        """Hold off the next request until slaves have finished a broadcast"""
+        remaining = self._bus_quiet_until - time.time()
+        if remaining > 0:
+            time.sleep(remaining)
+    
+    def broadcast(self, function_code: int, data: bytes,
+                  turnaround_delay: Optional[float] = None) -> ModbusTestResult:
+        """
+        Send a write request to every slave on the bus (slave address 0)
+        
+        Slaves execute broadcasts without replying, so the request succeeds as
+        soon as it is on the wire. The next request on this client is held back
+        by the turnaround delay to give slaves time to process the broadcast.
+        
+        Args:
+            function_code: 0x05, 0x06, 0x0F or 0x10
+            data: Request data following the function code
+            turnaround_delay: Seconds before the bus may be used again (default: client setting)
+        """
+        operation = f"broadcast({function_code:#04x})"
+        start_time = time.time()
+        request = self._create_request(function_code, data, unit_id=0)
+        
+        if function_code not in BROADCAST_FUNCTIONS:
+            return self._make_result(operation, False, request, None, None,
+                                     "Only write functions can be broadcast", start_time)
+        if not self.serial_conn or not self.serial_conn.is_open:
+            raise ConnectionError("Not connected to Modbus device")
+        
+        try:
+            self._wait_turnaround()
+            self.serial_conn.write(request)
+            self.serial_conn.flush()
+            self.logger.debug(f"Broadcast: {request.hex()}")
+        except Exception as e:
+            return self._make_result(operation, False, request, None, None, str(e), start_time)
+        
+        delay = self.turnaround_delay if turnaround_delay is None else turnaround_delay
+        self._bus_quiet_until = time.time() + delay
+        
+        result = self._make_result(operation, True, request, None, {"broadcast": True}, None, start_time)
+        self.test_results.append(result)
+        return result
+    
+    def broadcast_write_registers(self, start_addr: int, values: List[int],
+                                  turnaround_delay: Optional[float] = None) -> ModbusTestResult:
+        """Write the same holding registers on every slave (0x06 for one value, 0x10 otherwise)"""
+        if len(values) == 1:
+            return self.broadcast(0x06, struct.pack('>HH', start_addr, values[0]), turnaround_delay)
+        data = struct.pack('>HHB', start_addr, len(values), len(values) * 2)
+        data += struct.pack(f'>{len(values)}H', *values)
+        return self.broadcast(0x10, data, turnaround_delay)
+    
+    def broadcast_write_coils(self, start_addr: int, values: List[bool],
+                              turnaround_delay: Optional[float] = None) -> ModbusTestResult:
+        """Write the same coils on every slave (0x05 for one value, 0x0F otherwise)"""
+        if len(values) == 1:
+            return self.broadcast(0x05, struct.pack('>HH', start_addr, 0xFF00 if values[0] else 0x0000),
+                                  turnaround_delay)
+        return self.broadcast(0x0F, self._pack_coils(start_addr, values), turnaround_delay)
+    
+    def _pack_coils(self, start_addr: int, values: List[bool]) -> bytes:
+        """Request data for Write Multiple Coils"""
+        packed = bytearray((len(values) + 7) // 8)
+        for i, value in enumerate(values):
+            if value:
+                packed[i // 8] |= 1 << (i % 8)
+        return struct.pack('>HHB', start_addr, len(values), len(packed)) + bytes(packed)
+    
+    def _execute_write(self, operation: str, function_code: int, data: bytes) -> ModbusTestResult:
+        """Run a write request whose normal response echoes the first four data bytes"""
+        start_time = time.time()
+        request = self._create_request(function_code, data)
+        
+        try:
+            response = self._send_request(request)
+        except Exception as e:
+            return self._make_result(operation, False, request, None, None, str(e), start_time)
+        
+        if not response or not self._verify_response(response):
+            return self._make_result(operation, False, request, response, None,
+                                     "Invalid response or CRC", start_time)
+        if response[1] & 0x80:
+            return self._make_result(operation, False, request, response, None,
+                                     f"Modbus error code: {response[2]}", start_time)
+        
+        success = response[0] == self.device_id and response[1] == function_code and response[2:6] == data[:4]
+        result = self._make_result(operation, success, request, response,
+                                   {"echo": response[2:6].hex()} if success else None,
+                                   None if success else "Write operation failed", start_time)
+        self.test_results.append(result)
+        return result
+    
+    def write_single_coil(self, addr: int, value: bool) -> ModbusTestResult:
+        """Write single coil (function code 0x05)"""
+        return self._execute_write(f"write_single_coil({addr}, {value})", 0x05,
+                                   struct.pack('>HH', addr, 0xFF00 if value else 0x0000))
+    
+    def write_multiple_coils(self, start_addr: int, values: List[bool]) -> ModbusTestResult:
+        """Write multiple coils (function code 0x0F)"""
+        return self._execute_write(f"write_multiple_coils({start_addr}, {len(values)})", 0x0F,
+                                   self._pack_coils(start_addr, values))
+    
+    def write_multiple_registers(self, start_addr: int, values: List[int]) -> ModbusTestResult:
+        """Write multiple holding registers (function code 0x10)"""
+        data = struct.pack('>HHB', start_addr, len(values), len(values) * 2)
+        data += struct.pack(f'>{len(values)}H', *values)
+        return self._execute_write(f"write_multiple_registers({start_addr}, {len(values)})", 0x10, data)
+    
+    def _file_record_blocks(self, file_number: int, start_record: int, record_count: int,
+                            max_per_request: int):
+        """Split a record range into per-request blocks, continuing into the next file at record 9999"""
+        while record_count > 0:
+            block = min(record_count, max_per_request, RECORDS_PER_FILE - start_record)
+            yield file_number, start_record, block
+            record_count -= block
+            start_record += block
+            if start_record >= RECORDS_PER_FILE:
+                file_number += 1
+                start_record = 0
+    
+    def read_file_record(self, file_number: int, record_number: int, record_length: int) -> Optional[List[int]]:
+        """Read one block of file records (function code 0x14), None on failure"""
+        pdu = struct.pack('>BBBHHH', 0x14, 7, 6, file_number, record_number, record_length)
+        response = self.execute_pdu(self.device_id, pdu)
+        if not response or response[0] & 0x80 or len(response) != 4 + record_length * 2:
+            return None
+        return list(struct.unpack(f'>{record_length}H', response[4:]))
+    
+    def write_file_record(self, file_number: int, record_number: int, values: List[int]) -> bool:
+        """Write one block of file records (function code 0x15)"""
+        sub_request = struct.pack('>BHHH', 6, file_number, record_number, len(values))
+        sub_request += struct.pack(f'>{len(values)}H', *values)
+        pdu = struct.pack('BB', 0x15, len(sub_request)) + sub_request
+        response = self.execute_pdu(self.device_id, pdu)
+        return response == pdu
+    
+    def write_file(self, file_number: int, data: bytes, start_record: int = 0,
+                   verify: bool = True) -> ModbusTestResult:
+        """
+        Transfer a binary image into file records (e.g. calibration tables, firmware)
+        
+        Data is padded to whole 16-bit records and sent in the largest blocks a
+        PDU allows. RTU is strictly request/response, so blocks cannot be
+        pipelined on a serial line; throughput comes from filling every frame.
+        
+        Args:
+            file_number: First file to write; images over 10000 records continue in the next file
+            data: Bytes to store
+            start_record: First record number in file_number
+            verify: Read the image back and compare CRC-32
+        """
+        operation = f"write_file({file_number}, {len(data)} bytes)"
+        start_time = time.time()
+        padded = data + b'\x00' * (len(data) % 2)
+        registers = struct.unpack(f'>{len(padded) // 2}H', padded)
+        crc = zlib.crc32(data)
+        
+        try:
+            offset = 0
+            for file_no, record, count in self._file_record_blocks(
+                    file_number, start_record, len(registers), MAX_WRITE_FILE_RECORDS):
+                if not self.write_file_record(file_no, record, list(registers[offset:offset + count])):
+                    return self._make_result(operation, False, b'', None, None,
+                                             f"Write failed at file {file_no} record {record}", start_time)
+                offset += count
+            
+            values = {"file_number": file_number, "start_record": start_record,
+                      "length": len(data), "crc32": crc, "verified": False}
+            
+            if verify:
+                read_back = self.read_file(file_number, len(data), start_record)
+                if not read_back.success or read_back.values["crc32"] != crc:
+                    return self._make_result(operation, False, b'', None, values,
+                                             "CRC mismatch on read back", start_time)
+                values["verified"] = True
+            
+            result = self._make_result(operation, True, b'', None, values, None, start_time)
+            values["bytes_per_second"] = len(data) / result.duration if result.duration > 0 else 0.0
+            self.test_results.append(result)
+            return result
+        
+        except Exception as e:
+            return self._make_result(operation, False, b'', None, None, str(e), start_time)
+    
+    def read_file(self, file_number: int, length: int, start_record: int = 0,
+                  expected_crc: Optional[int] = None) -> ModbusTestResult:
+        """
+        Read a binary image from file records
+        
+        values["data"] holds the image as a hex string so results stay JSON
+        serializable; values["crc32"] can be compared with the source image.
+        """
+        operation = f"read_file({file_number}, {length} bytes)"
+        start_time = time.time()
+        data = bytearray()
+        
+        try:
+            for file_no, record, count in self._file_record_blocks(
+                    file_number, start_record, (length + 1) // 2, MAX_READ_FILE_RECORDS):
+                registers = self.read_file_record(file_no, record, count)
+                if registers is None:
+                    return self._make_result(operation, False, b'', None, None,
+                                             f"Read failed at file {file_no} record {record}", start_time)
+                data += struct.pack(f'>{count}H', *registers)
+            
+            data = bytes(data[:length])
+            crc = zlib.crc32(data)
+            success = expected_crc is None or crc == expected_crc
+            result = self._make_result(operation, success, b'', None, {
+                "file_number": file_number,
+                "start_record": start_record,
+                "length": length,
+                "crc32": crc,
+                "data": data.hex()
+            }, None if success else "CRC mismatch", start_time)
+            result.values["bytes_per_second"] = length / result.duration if result.duration > 0 else 0.0
+            self.test_results.append(result)
+            return result
+        
+        except Exception as e:
+            return self._make_result(operation, False, b'', None, None, str(e), start_time)
+    
+    def execute_pdu(self, unit_id: int, pdu: bytes, timeout: Optional[float] = None) -> Optional[bytes]:
+        """
+        Send a raw Modbus PDU to a slave and return the response PDU
+        
+        Args:
+            unit_id: Target slave address on the RTU bus
+            pdu: Function code followed by request data
+            timeout: Response timeout for this request (default: client timeout)
+        
+        Returns:
+            Response PDU (function code + data), or None on timeout, CRC error
+            or a reply from the wrong slave
+        """
+        request = self._create_request(pdu[0], pdu[1:], unit_id=unit_id)
+        response = self._send_request(request, timeout)
+        
+        if not response or not self._verify_response(response) or response[0] != unit_id:
+            return None
+        return response[1:-2]
+    
     def read_input_registers(self, start_addr: int, count: int) -> ModbusTestResult:
         """Read input registers (function code 0x04)"""
         operation = f"read_input_registers({start_addr}, {count})"
@@ -274,6 +614,44 @@ class ModbusRTUTestClient:
                 timestamp=datetime.now()
             )
     
+    def read_waveform(self, header_addr: int = 30, start_addr: int = 100) -> ModbusTestResult:
+        """
+        Read a captured waveform from input registers
+        
+        The sample rate and point count are read from header_addr and
+        header_addr + 1, then the samples in blocks of MAX_READ_REGISTERS.
+        values["registers"] holds the raw 16 bit samples (signed millivolts
+        on the PLC simulator).
+        """
+        operation = f"read_waveform({header_addr}, {start_addr})"
+        start_time = time.time()
+        
+        try:
+            header = self.read_input_registers(header_addr, 2)
+            if not header.success:
+                return self._make_result(operation, False, b'', None, None, header.error_message, start_time)
+            sample_rate = header.values[f"register_{header_addr}"]
+            points = header.values[f"register_{header_addr + 1}"]
+            
+            registers = []
+            for offset in range(0, points, MAX_READ_REGISTERS):
+                block = self.read_input_registers(start_addr + offset, min(MAX_READ_REGISTERS, points - offset))
+                if not block.success:
+                    return self._make_result(operation, False, b'', None, None,
+                                             f"Read failed at register {start_addr + offset}", start_time)
+                registers.extend(block.values.values())
+            
+            result = self._make_result(operation, True, b'', None, {
+                "sample_rate": sample_rate,
+                "points": points,
+                "registers": registers
+            }, None, start_time)
+            self.test_results.append(result)
+            return result
+        
+        except Exception as e:
+            return self._make_result(operation, False, b'', None, None, str(e), start_time)
+    
     def read_holding_registers(self, start_addr: int, count: int) -> ModbusTestResult:
         """Read holding registers (function code 0x03)"""
         operation = f"read_holding_registers({start_addr}, {count})"
@@ -453,6 +831,104 @@ class ModbusRTUTestClient:
                 timestamp=datetime.now()
             )
     
+    def diagnostics(self, sub_function: int = 0x0000, data: int = 0xA55A,
+                    unit_id: Optional[int] = None, timeout: Optional[float] = None) -> ModbusTestResult:
+        """Diagnostics (function code 0x08), sub-function 0x0000 echoes the data word"""
+        operation = f"diagnostics({sub_function:#06x})"
+        start_time = time.time()
+        unit_id = self.device_id if unit_id is None else unit_id
+        request = self._create_request(0x08, struct.pack('>HH', sub_function, data), unit_id=unit_id)
+        
+        try:
+            response = self._send_request(request, timeout)
+        except Exception as e:
+            return self._make_result(operation, False, request, None, None, str(e), start_time)
+        
+        if not response or not self._verify_response(response) or response[0] != unit_id:
+            return self._make_result(operation, False, request, response, None,
+                                     "No valid response received", start_time)
+        
+        if response[1] & 0x80:
+            return self._make_result(operation, False, request, response, None,
+                                     f"Modbus error code: {response[2]}", start_time)
+        
+        echoed_sub_function, value = struct.unpack('>HH', response[2:6])
+        success = echoed_sub_function == sub_function and (sub_function != 0x0000 or value == data)
+        result = self._make_result(operation, success, request, response,
+                                   {"sub_function": echoed_sub_function, "data": value},
+                                   None if success else "Echo mismatch", start_time)
+        self.test_results.append(result)
+        return result
+    
+    def read_device_identification(self, read_code: int = 0x01, object_id: int = 0x00,
+                                   unit_id: Optional[int] = None,
+                                   timeout: Optional[float] = None) -> ModbusTestResult:
+        """
+        Read Device Identification (function code 0x2B / MEI type 0x0E)
+        
+        Follows "more follows" continuations so values holds every object of the
+        requested category, keyed by object name where the standard defines one.
+        """
+        operation = f"read_device_identification({read_code}, {object_id})"
+        start_time = time.time()
+        unit_id = self.device_id if unit_id is None else unit_id
+        object_names = {
+            0x00: "vendor_name", 0x01: "product_code", 0x02: "revision",
+            0x03: "vendor_url", 0x04: "product_name", 0x05: "model_name",
+            0x06: "user_application_name"
+        }
+        values = {}
+        request = b''
+        response = None
+        
+        try:
+            while True:
+                request = self._create_request(0x2B, struct.pack('BBB', 0x0E, read_code, object_id),
+                                               unit_id=unit_id)
+                response = self._send_request(request, timeout)
+                
+                if not response or not self._verify_response(response) or response[0] != unit_id:
+                    return self._make_result(operation, False, request, response, None,
+                                             "No valid response received", start_time)
+                if response[1] & 0x80:
+                    return self._make_result(operation, False, request, response, None,
+                                             f"Modbus error code: {response[2]}", start_time)
+                
+                more_follows, next_object_id, object_count = response[5], response[6], response[7]
+                pos = 8
+                for _ in range(object_count):
+                    oid, length = response[pos], response[pos + 1]
+                    value = response[pos + 2:pos + 2 + length].decode(errors='replace')
+                    values[object_names.get(oid, f"object_{oid:#04x}")] = value
+                    pos += 2 + length
+                
+                if more_follows != 0xFF or read_code == 0x04:
+                    break
+                object_id = next_object_id
+            
+            values["conformity_level"] = response[4]
+            result = self._make_result(operation, True, request, response, values, None, start_time)
+            self.test_results.append(result)
+            return result
+            
+        except Exception as e:
+            return self._make_result(operation, False, request, response, None, str(e), start_time)
+    
+    def _make_result(self, operation: str, success: bool, request: bytes, response: Optional[bytes],
+                     values: Optional[Dict[str, Any]], error_message: Optional[str],
+                     start_time: float) -> ModbusTestResult:
+        """Build a ModbusTestResult timed from start_time"""
+        return ModbusTestResult(
+            operation=operation,
+            success=success,
+            request_data=request,
+            response_data=response,
+            values=values,
+            error_message=error_message,
+            duration=time.time() - start_time,
+            timestamp=datetime.now()
+        )
+    
     def run_pcba_comprehensive_test(self) -> Dict[str, Any]:
         """Run comprehensive PCBA-specific Modbus test suite"""
         self.logger.info("🧪 Starting comprehensive PCBA Modbus test suite...")
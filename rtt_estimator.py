@@ -0,0 +1,81 @@
+"""
+PCBA Test System - Adaptive Response Timeouts
+Jacobson/Karels round-trip time estimation used to size response deadlines
+per endpoint (serial instrument, TCP instrument, Modbus slave).
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+class RTTEstimator:
+    """
+    Smoothed RTT / retransmission-timeout estimator for one endpoint
+    
+    Follows the TCP algorithm (RFC 6298): SRTT and RTTVAR are exponentially
+    weighted averages of the observed round trips and the deadline is
+    SRTT + K * RTTVAR, clamped to [min_timeout, max_timeout]. Each timeout
+    doubles the deadline (Karn backoff) until a fresh sample arrives.
+    """
+    
+    def __init__(self, initial_timeout: float = 1.0, min_timeout: float = 0.02,
+                 max_timeout: float = 5.0, alpha: float = 0.125, beta: float = 0.25, k: float = 4.0):
+        """
+        Initialize estimator
+        
+        Args:
+            initial_timeout: Deadline used before the first sample
+            min_timeout: Floor for the computed deadline
+            max_timeout: Ceiling for the computed deadline
+            alpha: Gain for the smoothed RTT
+            beta: Gain for the RTT variance
+            k: Variance multiplier in the deadline
+        """
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.alpha = alpha
+        self.beta = beta
+        self.k = k
+        
+        self.srtt: Optional[float] = None
+        self.rttvar: Optional[float] = None
+        self.rto = self._clamp(initial_timeout)
+        self.samples = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+    
+    def _clamp(self, value: float) -> float:
+        return min(self.max_timeout, max(self.min_timeout, value))
+    
+    @property
+    def timeout(self) -> float:
+        """Current response deadline in seconds"""
+        return self.rto
+    
+    def observe(self, rtt: float):
+        """Record the round trip time of a request that was answered"""
+        with self._lock:
+            if self.srtt is None:
+                self.srtt = rtt
+                self.rttvar = rtt / 2
+            else:
+                self.rttvar = (1 - self.beta) * self.rttvar + self.beta * abs(self.srtt - rtt)
+                self.srtt = (1 - self.alpha) * self.srtt + self.alpha * rtt
+            
+            self.rto = self._clamp(self.srtt + self.k * self.rttvar)
+            self.samples += 1
+    
+    def on_timeout(self):
+        """Back off after a request went unanswered"""
+        with self._lock:
+            self.rto = self._clamp(self.rto * 2)
+            self.timeouts += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Estimator state for status reporting"""
+        return {
+            "srtt_ms": self.srtt * 1000 if self.srtt is not None else None,
+            "rttvar_ms": self.rttvar * 1000 if self.rttvar is not None else None,
+            "timeout_ms": self.rto * 1000,
+            "samples": self.samples,
+            "timeouts": self.timeouts
+        }
@@ -0,0 +1,1152 @@
+#!/usr/bin/env python3
+"""
+SCPI Instrument Emulator for PCBA Test System
+Emulates a bench multimeter, power supply, oscilloscope, relay
+multiplexer and in-circuit tester over TCP or a pseudo terminal, so
+TestManager sequences can run end to end without hardware (e.g. on CI).
+"""
+
+import os
+import random
+import select
+import socket
+import socketserver
+import struct
+import threading
+import time
+import logging
+import math
+import re
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Long form SCPI mnemonics accepted in addition to the short forms
+LONG_FORMS = {
+    "CONFIGURE": "CONF", "MEASURE": "MEAS", "VOLTAGE": "VOLT", "CURRENT": "CURR",
+    "RESISTANCE": "RES", "OUTPUT": "OUTP", "SAMPLE": "SAMP", "TRIGGER": "TRIG",
+    "COUNT": "COUN", "RANGE": "RANG", "FORMAT": "FORM", "FETCH": "FETC",
+    "SYSTEM": "SYST", "ERROR": "ERR", "INITIATE": "INIT", "SOURCE": "SOUR",
+    "LEVEL": "LEV", "STATE": "STAT", "DELAY": "DEL", "ABORT": "ABOR", "DWELL": "DWEL",
+    "TOUTPUT": "TOUT", "BOSTEP": "BOST", "TIMEBASE": "TIM", "WAVEFORM": "WAV", "DIGITIZE": "DIG",
+    "SCALE": "SCAL", "OFFSET": "OFFS", "COUPLING": "COUP", "DISPLAY": "DISP", "POSITION": "POS",
+    "SLOPE": "SLOP", "POINTS": "POIN", "PREAMBLE": "PRE", "BYTEORDER": "BYT",
+    "TIMER": "TIM", "ROUTE": "ROUT", "CLOSE": "CLOS", "CAPACITANCE": "CAP", "DIODE": "DIOD"
+}
+
+# Value an overloaded DMM range reads back as
+OVERLOAD = 9.9e37
+
+# Longest FETC? waits for outstanding triggers before reporting a trigger deadlock
+FETCH_TIMEOUT = 60.0
+
+class SimulatedBench:
+    """
+    Electrical model shared by the emulated instruments
+    
+    The power supply drives a resistive DUT load; the multimeter measures the
+    voltage across it and the current through it. The supply is a constant
+    voltage source that falls back to constant current at its current limit.
+    The supply's trigger output is wired to the multimeter's trigger input.
+    With a time constant the output settles exponentially after a change.
+    """
+    
+    def __init__(self, load_resistance: float = 100.0, time_constant: float = 0.0):
+        self.load_resistance = load_resistance
+        self.time_constant = time_constant
+        self.voltage_setpoint = 0.0
+        self.current_limit = 1.0
+        self.output_enabled = False
+        self._lock = threading.Lock()
+        self._settling_from = 0.0
+        self._changed_at = 0.0
+        self._trigger_listeners: List[Callable[[], None]] = []
+    
+    def reset_supply(self):
+        """Power supply *RST state"""
+        with self._lock:
+            self.voltage_setpoint = 0.0
+            self.current_limit = 1.0
+            self.output_enabled = False
+            self._settling_from = 0.0
+    
+    def set_supply(self, voltage: Optional[float] = None, current_limit: Optional[float] = None,
+                   output: Optional[bool] = None):
+        with self._lock:
+            self._settling_from = self._output_voltage()
+            self._changed_at = time.monotonic()
+            if voltage is not None:
+                self.voltage_setpoint = voltage
+            if current_limit is not None:
+                self.current_limit = current_limit
+            if output is not None:
+                self.output_enabled = output
+    
+    def _output_voltage(self) -> float:
+        target = 0.0
+        if self.output_enabled:
+            target = min(self.voltage_setpoint, self.current_limit * self.load_resistance)
+        if not self.time_constant:
+            return target
+        decay = math.exp(-(time.monotonic() - self._changed_at) / self.time_constant)
+        return target + (self._settling_from - target) * decay
+    
+    def output_voltage(self) -> float:
+        """Voltage across the DUT load"""
+        with self._lock:
+            return self._output_voltage()
+    
+    def output_current(self) -> float:
+        """Current through the DUT load"""
+        return self.output_voltage() / self.load_resistance
+    
+    def add_trigger_listener(self, listener: Callable[[], None]):
+        """Connect an instrument's external trigger input to the trigger line"""
+        self._trigger_listeners.append(listener)
+    
+    def fire_trigger(self):
+        """Pulse the trigger line; returns once the listeners have handled it"""
+        for listener in list(self._trigger_listeners):
+            listener()
+
+class _EmulatorTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropped by drop_connections() end up here
+        logger.debug(f"Connection from {client_address} closed with error", exc_info=True)
+
+class SCPIInstrumentEmulator:
+    """
+    Base class for emulated SCPI instruments
+    
+    Handles program message parsing, the IEEE 488.2 common commands, the
+    error queue and the TCP / pty transports. Subclasses implement
+    _execute for their own command tree.
+    """
+    
+    IDENTITY = "PCBA Test System,EMULATOR,0,1.0"
+    
+    def __init__(self, bench: Optional[SimulatedBench] = None, latency: float = 0.0,
+                 noise: float = 1e-4, seed: Optional[int] = None, identity: Optional[str] = None):
+        """
+        Initialize emulator
+        
+        Args:
+            bench: Shared electrical model (a private one is created if omitted)
+            latency: Delay in seconds before answering a query
+            noise: Relative standard deviation of the simulated readings
+            seed: Random seed for reproducible noise
+            identity: *IDN? response
+        """
+        self.bench = bench or SimulatedBench()
+        self.latency = latency
+        self.noise = noise
+        self.identity = identity or self.IDENTITY
+        self.random = random.Random(seed)
+        self.errors: List[Tuple[int, str]] = []
+        self.event_status = 0
+        self.commands_received = 0
+        self.running = False
+        
+        self._lock = threading.Lock()
+        self._tcp_server: Optional[_EmulatorTCPServer] = None
+        self._clients = set()
+        self._pty_fds: Optional[Tuple[int, int]] = None
+        self._threads: List[threading.Thread] = []
+        self.reset()
+    
+    def reset(self):
+        """Restore the *RST state"""
+        pass
+    
+    def _execute(self, nodes: List[str], args: str, query: bool) -> Optional[Union[str, bytes]]:
+        """Execute one instrument command; return its response for queries"""
+        raise KeyError
+    
+    def push_error(self, code: int, message: str):
+        self.errors.append((code, message))
+        logger.debug(f"{self.identity}: error {code}, {message}")
+    
+    def add_noise(self, value: float, floor: float = 1e-6) -> float:
+        """Apply Gaussian measurement noise to value"""
+        sigma = self.noise * abs(value) + floor
+        return value + self.random.gauss(0.0, sigma)
+    
+    @staticmethod
+    def format_number(value: float) -> str:
+        return f"{value:+.9E}"
+    
+    @staticmethod
+    def parse_bool(args: str) -> bool:
+        value = args.strip().upper()
+        if value in ("ON", "1"):
+            return True
+        if value in ("OFF", "0"):
+            return False
+        raise ValueError(f"Invalid boolean '{args}'")
+    
+    @staticmethod
+    def parse_header(header: str) -> Tuple[List[str], bool]:
+        """Split a command header into short form nodes and a query flag"""
+        query = header.endswith('?')
+        nodes = [LONG_FORMS.get(node, node) for node in header.rstrip('?').lstrip(':').upper().split(':')]
+        return nodes, query
+    
+    def handle(self, message: str) -> Optional[bytes]:
+        """
+        Execute a program message and return the response message
+        
+        Commands are separated by ';'. Responses to the queries are joined
+        with ';' and terminated by a newline; None is returned when the
+        message contained no answered query.
+        """
+        responses = []
+        with self._lock:
+            for command in message.split(';'):
+                command = command.strip()
+                if not command:
+                    continue
+                self.commands_received += 1
+                header, _, args = command.partition(' ')
+                nodes, query = self.parse_header(header)
+                try:
+                    response = self._execute_common(nodes, query)
+                    if response is None:
+                        response = self._execute(nodes, args.strip(), query)
+                except KeyError:
+                    self.push_error(-113, "Undefined header")
+                    continue
+                except (ValueError, IndexError):
+                    self.push_error(-104, "Data type error")
+                    continue
+                if query and response is not None:
+                    responses.append(response if isinstance(response, bytes) else response.encode())
+        
+        if not responses:
+            return None
+        if self.latency:
+            time.sleep(self.latency)
+        return b';'.join(responses) + b'\n'
+    
+    def _execute_common(self, nodes: List[str], query: bool) -> Optional[str]:
+        command = nodes[0]
+        if command == "*IDN" and query:
+            return self.identity
+        if command == "*RST":
+            self.reset()
+            return ""
+        if command == "*CLS":
+            self.errors.clear()
+            self.event_status = 0
+            return ""
+        if command == "*TST" and query:
+            return "0"
+        if command == "*OPC":
+            # Commands execute synchronously, so everything before *OPC is already complete
+            if query:
+                return "1"
+            self.event_status |= 1
+            return ""
+        if command == "*ESR" and query:
+            event_status, self.event_status = self.event_status, 0
+            return str(event_status)
+        if nodes == ["SYST", "ERR"] and query:
+            if not self.errors:
+                return '+0,"No error"'
+            code, message = self.errors.pop(0)
+            return f'{code:+d},"{message}"'
+        return None
+    
+    def start_tcp(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Serve on a TCP port (0 picks a free one) and return the port"""
+        emulator = self
+        
+        class Handler(socketserver.StreamRequestHandler):
+            def setup(self):
+                super().setup()
+                emulator._clients.add(self.request)
+            
+            def finish(self):
+                emulator._clients.discard(self.request)
+                super().finish()
+            
+            def handle(self):
+                for line in self.rfile:
+                    response = emulator.handle(line.decode(errors='replace'))
+                    if response is not None:
+                        self.wfile.write(response)
+        
+        self._tcp_server = _EmulatorTCPServer((host, port), Handler)
+        thread = threading.Thread(target=self._tcp_server.serve_forever, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        self.running = True
+        
+        port = self._tcp_server.server_address[1]
+        logger.info(f"{self.identity} listening on {host}:{port}")
+        return port
+    
+    def start_pty(self) -> str:
+        """Serve on a pseudo terminal and return the device path to open as a serial port"""
+        import tty
+        
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        self._pty_fds = (master, slave)
+        thread = threading.Thread(target=self._serve_pty, args=(master,), daemon=True)
+        self.running = True
+        thread.start()
+        self._threads.append(thread)
+        
+        path = os.ttyname(slave)
+        logger.info(f"{self.identity} listening on {path}")
+        return path
+    
+    def _serve_pty(self, master: int):
+        buffer = b""
+        while self.running:
+            try:
+                readable, _, _ = select.select([master], [], [], 0.1)
+                if not readable:
+                    continue
+                buffer += os.read(master, 4096)
+            except OSError:
+                # Nothing has the slave side open
+                time.sleep(0.05)
+                continue
+            while b'\n' in buffer:
+                line, buffer = buffer.split(b'\n', 1)
+                response = self.handle(line.decode(errors='replace'))
+                if response is not None:
+                    os.write(master, response)
+    
+    def stop_background(self):
+        """Stop background activity such as a running list (subclasses)"""
+        pass
+    
+    def drop_connections(self):
+        """Close all TCP client connections, as a power cycled or unplugged instrument would"""
+        for client in list(self._clients):
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+    
+    def stop(self):
+        """Stop all transports"""
+        self.running = False
+        self.stop_background()
+        if self._tcp_server:
+            self._tcp_server.shutdown()
+            self._tcp_server.server_close()
+            self._tcp_server = None
+        self.drop_connections()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads.clear()
+        if self._pty_fds:
+            for fd in self._pty_fds:
+                os.close(fd)
+            self._pty_fds = None
+
+class DMMEmulator(SCPIInstrumentEmulator):
+    """
+    Emulated digital multimeter
+    
+    Supports CONF, MEAS?, READ?, INIT / FETC? with sample and trigger
+    counts, per function range and NPLC, and ASCII or REAL,64 data.
+    Each reading takes NPLC power line cycles unless sample_time is given;
+    with SAMP:SOUR TIM readings are taken every SAMP:TIM seconds instead,
+    digitizing the signal connected to the DC voltage input.
+    With TRIG:SOUR EXT or BUS, INIT arms the meter and each pulse on the
+    bench trigger line or *TRG takes the samples of one trigger; FETC?
+    waits until all triggers arrived.
+    """
+    
+    IDENTITY = "PCBA Test System,DMM-EMULATOR,0,1.0"
+    FUNCTIONS = ("VOLT:DC", "VOLT:AC", "CURR:DC", "CURR:AC", "RES")
+    
+    def __init__(self, bench: Optional[SimulatedBench] = None, sample_time: Optional[float] = None,
+                 line_frequency: float = 50.0, signal: Optional[Callable[[float], float]] = None, **kwargs):
+        """
+        Initialize emulator
+        
+        Args:
+            bench: Shared electrical model
+            sample_time: Seconds per reading, overriding the NPLC integration time
+            line_frequency: Power line frequency used for NPLC
+            signal: Volts at the DC voltage input as a function of time (the bench supply output if None)
+            **kwargs: See SCPIInstrumentEmulator
+        """
+        self.sample_time = sample_time
+        self.line_frequency = line_frequency
+        self.signal = signal
+        super().__init__(bench, **kwargs)
+        # Waiting in FETC? releases the command lock so triggers and ABOR get through
+        self._trigger_condition = threading.Condition(self._lock)
+        self.bench.add_trigger_listener(self._external_trigger)
+    
+    def reset(self):
+        if hasattr(self, "_trigger_condition"):
+            self._abort()
+        self.function = "VOLT:DC"
+        self.ranges: Dict[str, Union[str, float]] = {function: "AUTO" for function in self.FUNCTIONS}
+        self.nplc: Dict[str, float] = {function: 1.0 for function in self.FUNCTIONS}
+        self.sample_count = 1
+        self.sample_source = "IMM"
+        self.sample_interval = 1e-3
+        self.trigger_count = 1
+        self.data_format = "ASC"
+        self.trigger_source = "IMM"
+        self.trigger_delay: Optional[float] = None
+        self.triggers_pending = 0
+        self.readings: Optional[List[float]] = None
+    
+    @staticmethod
+    def _function(nodes: List[str]) -> Tuple[str, List[str]]:
+        """Split nodes into a measurement function and the remaining nodes"""
+        if nodes[0] in ("VOLT", "CURR"):
+            if len(nodes) > 1 and nodes[1] in ("DC", "AC"):
+                return f"{nodes[0]}:{nodes[1]}", nodes[2:]
+            return f"{nodes[0]}:DC", nodes[1:]
+        if nodes[0] == "RES":
+            return "RES", nodes[1:]
+        raise KeyError(nodes[0])
+    
+    def _configure(self, function: str, args: str):
+        self.function = function
+        self.ranges[function] = float(args) if args and args.upper() != "AUTO" else "AUTO"
+        self.nplc[function] = 1.0
+        self.sample_count = 1
+        self.sample_source = "IMM"
+        self.trigger_count = 1
+        self.trigger_source = "IMM"
+        self.trigger_delay = None
+    
+    def _true_value(self, t: float) -> float:
+        if self.function == "VOLT:DC":
+            return self.signal(t) if self.signal else self.bench.output_voltage()
+        if self.function == "CURR:DC":
+            return self.bench.output_current()
+        if self.function == "RES":
+            return self.bench.load_resistance
+        # The bench is DC only
+        return 0.0
+    
+    def _sample(self, count: int) -> List[float]:
+        """Integrate and take count readings"""
+        sample_time = self.sample_time
+        if self.sample_source == "TIM":
+            sample_time = self.sample_interval
+        elif sample_time is None:
+            sample_time = self.nplc[self.function] / self.line_frequency
+        start = time.monotonic()
+        if sample_time:
+            time.sleep(sample_time * count)
+        
+        range_value = self.ranges[self.function]
+        readings = []
+        for index in range(count):
+            value = self.add_noise(self._true_value(start + index * sample_time))
+            if range_value != "AUTO" and abs(value) > range_value * 1.2:
+                value = OVERLOAD
+            readings.append(value)
+        return readings
+    
+    def _initiate(self):
+        if self.trigger_source == "IMM":
+            self.readings = self._sample(self.sample_count * self.trigger_count)
+        else:
+            self.readings = []
+            self.triggers_pending = self.trigger_count
+    
+    def _trigger(self, source: str):
+        """Take the samples of one trigger if armed for source (command lock held)"""
+        if self.trigger_source != source or not self.triggers_pending:
+            return
+        if self.trigger_delay:
+            time.sleep(self.trigger_delay)
+        self.readings.extend(self._sample(self.sample_count))
+        self.triggers_pending -= 1
+        self._trigger_condition.notify_all()
+    
+    def _external_trigger(self):
+        with self._trigger_condition:
+            self._trigger("EXT")
+    
+    def _abort(self):
+        if self.triggers_pending:
+            self.triggers_pending = 0
+            self.readings = None
+            self._trigger_condition.notify_all()
+    
+    def _fetch(self) -> Optional[Union[str, bytes]]:
+        if self.triggers_pending and not self._trigger_condition.wait_for(lambda: not self.triggers_pending,
+                                                                           FETCH_TIMEOUT):
+            self.push_error(-214, "Trigger deadlock")
+            return None
+        if self.readings is None:
+            self.push_error(-230, "Data corrupt or stale")
+            return None
+        if self.data_format == "ASC":
+            return ",".join(self.format_number(value) for value in self.readings)
+        payload = struct.pack(f">{len(self.readings)}d", *self.readings)
+        length = str(len(payload))
+        return f"#{len(length)}{length}".encode() + payload
+    
+    def _execute(self, nodes: List[str], args: str, query: bool) -> Optional[Union[str, bytes]]:
+        command = nodes[0]
+        if command == "CONF":
+            if query:
+                return f'"{self.function} {self.ranges[self.function]}"'
+            self._configure(self._function(nodes[1:])[0], args)
+        elif command == "MEAS" and query:
+            self._configure(self._function(nodes[1:])[0], args)
+            self._initiate()
+            return self._fetch()
+        elif command == "READ" and query:
+            self._initiate()
+            return self._fetch()
+        elif command == "INIT":
+            self._initiate()
+        elif command == "FETC" and query:
+            return self._fetch()
+        elif command == "ABOR":
+            self._abort()
+        elif command == "*TRG":
+            self._trigger("BUS")
+        elif command == "SAMP" and nodes[1:] == ["COUN"]:
+            if query:
+                return str(self.sample_count)
+            self.sample_count = int(args)
+        elif command == "SAMP" and nodes[1:] == ["SOUR"]:
+            if query:
+                return self.sample_source
+            source = args.upper()[:3]
+            if source not in ("IMM", "TIM"):
+                raise ValueError(source)
+            self.sample_source = source
+        elif command == "SAMP" and nodes[1:] == ["TIM"]:
+            if query:
+                return self.format_number(self.sample_interval)
+            self.sample_interval = float(args)
+        elif command == "TRIG" and nodes[1:] == ["COUN"]:
+            if query:
+                return str(self.trigger_count)
+            self.trigger_count = int(args)
+        elif command == "TRIG" and nodes[1:] == ["SOUR"]:
+            if query:
+                return self.trigger_source
+            source = args.upper()[:3]
+            if source not in ("IMM", "EXT", "BUS"):
+                raise ValueError(source)
+            self.trigger_source = source
+        elif command == "TRIG" and nodes[1:] == ["DEL"]:
+            if query:
+                return self.format_number(self.trigger_delay or 0.0)
+            self.trigger_delay = float(args)
+        elif command == "TRIG" and nodes[1:] == ["DEL", "AUTO"]:
+            if query:
+                return "1" if self.trigger_delay is None else "0"
+            if self.parse_bool(args):
+                self.trigger_delay = None
+        elif command == "FORM" and nodes[1:] in ([], ["DATA"]):
+            if query:
+                return self.data_format
+            data_format = args.upper().replace(" ", "")
+            if data_format not in ("ASC", "ASCII", "REAL", "REAL,64"):
+                raise ValueError(data_format)
+            self.data_format = "ASC" if data_format.startswith("ASC") else "REAL,64"
+        else:
+            function, rest = self._function(nodes)
+            if rest == ["RANG"]:
+                if query:
+                    return str(self.ranges[function])
+                self.ranges[function] = float(args)
+            elif rest == ["RANG", "AUTO"]:
+                if query:
+                    return "1" if self.ranges[function] == "AUTO" else "0"
+                if self.parse_bool(args):
+                    self.ranges[function] = "AUTO"
+            elif rest == ["NPLC"]:
+                if query:
+                    return str(self.nplc[function])
+                self.nplc[function] = float(args)
+            else:
+                raise KeyError(":".join(nodes))
+        return None
+
+class PSUEmulator(SCPIInstrumentEmulator):
+    """
+    Emulated single channel DC power supply driving the bench load
+    
+    Besides fixed setpoints it runs voltage / current lists: LIST:VOLT,
+    LIST:CURR and LIST:DWEL load the points, VOLT:MODE / CURR:MODE LIST
+    select them, and INIT followed by *TRG (TRIG:SOUR BUS) or INIT alone
+    (TRIG:SOUR IMM) steps through them in the background. With
+    LIST:TOUT:BOST ON a trigger is sent on the bench trigger line at the
+    beginning of every step.
+    """
+    
+    IDENTITY = "PCBA Test System,PSU-EMULATOR,0,1.0"
+    
+    def __init__(self, bench: Optional[SimulatedBench] = None, **kwargs):
+        """
+        Initialize emulator
+        
+        Args:
+            bench: Shared electrical model
+            **kwargs: See SCPIInstrumentEmulator
+        """
+        self._list_abort = threading.Event()
+        super().__init__(bench, **kwargs)
+    
+    def reset(self):
+        self._abort_list()
+        self.bench.reset_supply()
+        self.list_voltages: List[float] = []
+        self.list_currents: List[float] = []
+        self.list_dwells: List[float] = [0.01]
+        self.list_count = 1
+        self.voltage_mode = "FIX"
+        self.current_mode = "FIX"
+        self.trigger_source = "BUS"
+        self.trigger_on_step = False
+        self.initiated = False
+    
+    @staticmethod
+    def _parse_list(args: str) -> List[float]:
+        return [float(value) for value in args.split(',')]
+    
+    def _abort_list(self):
+        self._list_abort.set()
+        self._list_abort = threading.Event()
+    
+    def _start_list(self):
+        """Run the loaded list in the background"""
+        points = max(len(self.list_voltages) if self.voltage_mode == "LIST" else 0,
+                     len(self.list_currents) if self.current_mode == "LIST" else 0)
+        self.initiated = False
+        if not points:
+            self.push_error(-221, "Settings conflict")
+            return
+        
+        def point(values: List[float], index: int) -> float:
+            # A single value list applies to every point
+            return values[index if len(values) > 1 else 0]
+        
+        steps = []
+        for index in range(points):
+            voltage = point(self.list_voltages, index) if self.voltage_mode == "LIST" else None
+            current = point(self.list_currents, index) if self.current_mode == "LIST" else None
+            steps.append((voltage, current, point(self.list_dwells, index)))
+        steps *= self.list_count
+        trigger_on_step = self.trigger_on_step
+        abort = self._list_abort
+        
+        def run():
+            for voltage, current, dwell in steps:
+                if abort.is_set():
+                    return
+                self.bench.set_supply(voltage=voltage, current_limit=current)
+                if trigger_on_step:
+                    self.bench.fire_trigger()
+                abort.wait(dwell)
+        
+        thread = threading.Thread(target=run, daemon=True)
+        self._threads = [thread for thread in self._threads if thread.is_alive()] + [thread]
+        thread.start()
+    
+    def stop_background(self):
+        self._abort_list()
+    
+    def _execute(self, nodes: List[str], args: str, query: bool) -> Optional[str]:
+        if nodes[0] == "SOUR":
+            nodes = nodes[1:]
+        # VOLT:LEV and OUTP:STAT are the same settings as VOLT and OUTP
+        nodes = [node for node in nodes if node not in ("LEV", "STAT")]
+        
+        if nodes[0] == "LIST" and nodes[1:] in (["VOLT"], ["CURR"], ["DWEL"]):
+            attribute = {"VOLT": "list_voltages", "CURR": "list_currents", "DWEL": "list_dwells"}[nodes[1]]
+            if query:
+                return ",".join(self.format_number(value) for value in getattr(self, attribute))
+            setattr(self, attribute, self._parse_list(args))
+        elif nodes == ["LIST", "COUN"]:
+            if query:
+                return str(self.list_count)
+            self.list_count = int(args)
+        elif nodes == ["LIST", "TOUT", "BOST"]:
+            if query:
+                return "1" if self.trigger_on_step else "0"
+            self.trigger_on_step = self.parse_bool(args)
+        elif nodes in (["VOLT", "MODE"], ["CURR", "MODE"]):
+            attribute = "voltage_mode" if nodes[0] == "VOLT" else "current_mode"
+            if query:
+                return getattr(self, attribute)
+            mode = args.upper()[:3]
+            if mode not in ("FIX", "LIS"):
+                raise ValueError(mode)
+            setattr(self, attribute, "FIX" if mode == "FIX" else "LIST")
+        elif nodes == ["TRIG", "SOUR"]:
+            if query:
+                return self.trigger_source
+            source = args.upper()[:3]
+            if source not in ("IMM", "BUS"):
+                raise ValueError(source)
+            self.trigger_source = source
+        elif nodes == ["INIT"]:
+            self._abort_list()
+            self.initiated = True
+            if self.trigger_source == "IMM":
+                self._start_list()
+        elif nodes == ["*TRG"]:
+            if self.initiated:
+                self._start_list()
+        elif nodes == ["ABOR"]:
+            self._abort_list()
+            self.initiated = False
+        elif nodes == ["VOLT"]:
+            if query:
+                return self.format_number(self.bench.voltage_setpoint)
+            self.bench.set_supply(voltage=float(args))
+        elif nodes == ["CURR"]:
+            if query:
+                return self.format_number(self.bench.current_limit)
+            self.bench.set_supply(current_limit=float(args))
+        elif nodes == ["OUTP"]:
+            if query:
+                return "1" if self.bench.output_enabled else "0"
+            self.bench.set_supply(output=self.parse_bool(args))
+        elif nodes == ["MEAS", "VOLT"] and query:
+            return self.format_number(self.add_noise(self.bench.output_voltage()))
+        elif nodes == ["MEAS", "CURR"] and query:
+            return self.format_number(self.add_noise(self.bench.output_current()))
+        else:
+            raise KeyError(":".join(nodes))
+        return None
+
+def sine_wave(frequency: float, amplitude: float, offset: float = 0.0) -> Callable[[float], float]:
+    """Oscilloscope test signal: volts at time t of a sine wave"""
+    return lambda t: offset + amplitude * math.sin(2 * math.pi * frequency * t)
+
+def square_wave(frequency: float, low: float, high: float, rise_time: float = 0.0) -> Callable[[float], float]:
+    """Oscilloscope test signal: 50 % duty square wave with linear edges taking rise_time (0 to 100 %)"""
+    period = 1.0 / frequency
+    
+    def signal(t: float) -> float:
+        phase = t % period
+        if phase < rise_time:
+            return low + (high - low) * phase / rise_time
+        if phase < period / 2:
+            return high
+        if phase < period / 2 + rise_time:
+            return high - (high - low) * (phase - period / 2) / rise_time
+        return low
+    return signal
+
+class ScopeEmulator(SCPIInstrumentEmulator):
+    """
+    Emulated four channel oscilloscope
+    
+    Supports the channel (CHAN<n>:DISP/SCAL/OFFS/COUP), timebase (TIM:SCAL/
+    POS) and edge trigger (TRIG:EDGE:SOUR/LEV/SLOP) setup, DIG for a single
+    acquisition and WAV:SOUR/FORM/BYT/POIN/PRE?/DATA? for BYTE or WORD
+    transfers. Each channel shows a signal, a function of time in seconds;
+    channel 1 defaults to the bench supply output. An acquisition starts at
+    a random time and is placed on the first trigger edge after it, or
+    auto triggers when there is none.
+    """
+    
+    IDENTITY = "PCBA Test System,SCOPE-EMULATOR,0,1.0"
+    CHANNELS = (1, 2, 3, 4)
+    
+    def __init__(self, bench: Optional[SimulatedBench] = None,
+                 signals: Optional[Dict[int, Callable[[float], float]]] = None, **kwargs):
+        """
+        Initialize emulator
+        
+        Args:
+            bench: Shared electrical model
+            signals: Signal per channel (volts as a function of time); unlisted channels read 0 V
+            **kwargs: See SCPIInstrumentEmulator
+        """
+        super().__init__(bench, **kwargs)
+        self.signals: Dict[int, Callable[[float], float]] = {1: lambda t: self.bench.output_voltage()}
+        self.signals.update(signals or {})
+    
+    def reset(self):
+        self.display = {channel: channel == 1 for channel in self.CHANNELS}
+        self.scale = {channel: 1.0 for channel in self.CHANNELS}
+        self.offset = {channel: 0.0 for channel in self.CHANNELS}
+        self.coupling = {channel: "DC" for channel in self.CHANNELS}
+        self.time_scale = 1e-3
+        self.time_position = 0.0
+        self.trigger_source = 1
+        self.trigger_level = 0.0
+        self.trigger_slope = "POS"
+        self.waveform_source = 1
+        self.waveform_format = "BYTE"
+        self.byte_order = "MSBF"
+        self.points = 1000
+        # Acquired volts per channel with the vertical setup they were acquired with
+        self.records: Dict[int, Tuple[List[float], float, float]] = {}
+        self.x_increment = self.x_origin = 0.0
+    
+    @classmethod
+    def _channel(cls, name: str) -> int:
+        match = re.fullmatch(r"CHAN(?:NEL)?(\d)", name.strip().upper())
+        if not match or int(match.group(1)) not in cls.CHANNELS:
+            raise KeyError(name)
+        return int(match.group(1))
+    
+    def _signal(self, channel: int) -> Callable[[float], float]:
+        return self.signals.get(channel, lambda t: 0.0)
+    
+    def _find_trigger(self, start: float, step: float) -> float:
+        """Time of the first trigger edge after start (searching ten records), or start to auto trigger"""
+        signal, level = self._signal(self.trigger_source), self.trigger_level
+        previous = signal(start)
+        for index in range(1, 10 * self.points):
+            t = start + index * step
+            value = signal(t)
+            rising = previous < level <= value
+            falling = previous > level >= value
+            if (rising and self.trigger_slope in ("POS", "EITH")) or \
+                    (falling and self.trigger_slope in ("NEG", "EITH")):
+                return t - step + step * (level - previous) / (value - previous)
+            previous = value
+        return start
+    
+    def _digitize(self, channels: List[int]):
+        self.x_increment = 10 * self.time_scale / self.points
+        self.x_origin = self.time_position - 5 * self.time_scale
+        trigger_time = self._find_trigger(self.random.uniform(0.0, 1.0), self.x_increment)
+        self.records = {}
+        for channel in channels:
+            signal = self._signal(channel)
+            volts = [signal(trigger_time + self.x_origin + index * self.x_increment) for index in range(self.points)]
+            if self.coupling[channel] == "AC":
+                mean = sum(volts) / len(volts)
+                volts = [value - mean for value in volts]
+            self.records[channel] = ([self.add_noise(value) for value in volts],
+                                     self.scale[channel], self.offset[channel])
+    
+    def _vertical(self, scale: float) -> Tuple[int, float, int]:
+        """Largest code, volts per code and the code of the screen center for the waveform format"""
+        levels = 256 if self.waveform_format == "BYTE" else 65536
+        return levels - 1, 8 * scale / levels, levels // 2
+    
+    def _preamble(self) -> Optional[str]:
+        if self.waveform_source not in self.records:
+            self.push_error(-230, "Data corrupt or stale")
+            return None
+        volts, scale, offset = self.records[self.waveform_source]
+        _, y_increment, y_reference = self._vertical(scale)
+        data_format = 0 if self.waveform_format == "BYTE" else 1
+        return ",".join([str(data_format), "0", str(len(volts)), "1", self.format_number(self.x_increment),
+                         self.format_number(self.x_origin), "0", self.format_number(y_increment),
+                         self.format_number(offset), str(y_reference)])
+    
+    def _waveform_data(self) -> Optional[bytes]:
+        if self.waveform_source not in self.records:
+            self.push_error(-230, "Data corrupt or stale")
+            return None
+        volts, scale, offset = self.records[self.waveform_source]
+        top, y_increment, y_reference = self._vertical(scale)
+        codes = [min(top, max(0, round((value - offset) / y_increment) + y_reference)) for value in volts]
+        if self.waveform_format == "BYTE":
+            payload = bytes(codes)
+        else:
+            payload = struct.pack(f"{'>' if self.byte_order == 'MSBF' else '<'}{len(codes)}H", *codes)
+        length = str(len(payload))
+        return f"#{len(length)}{length}".encode() + payload
+    
+    def _execute(self, nodes: List[str], args: str, query: bool) -> Optional[Union[str, bytes]]:
+        command = nodes[0]
+        if command.startswith("CHAN") and len(nodes) == 2:
+            channel = self._channel(command)
+            setting = nodes[1]
+            if setting == "DISP":
+                if query:
+                    return "1" if self.display[channel] else "0"
+                self.display[channel] = self.parse_bool(args)
+            elif setting in ("SCAL", "OFFS"):
+                values = self.scale if setting == "SCAL" else self.offset
+                if query:
+                    return self.format_number(values[channel])
+                values[channel] = float(args)
+            elif setting == "COUP":
+                if query:
+                    return self.coupling[channel]
+                coupling = args.upper()
+                if coupling not in ("AC", "DC"):
+                    raise ValueError(coupling)
+                self.coupling[channel] = coupling
+            else:
+                raise KeyError(setting)
+        elif command == "TIM" and nodes[1:] in (["SCAL"], ["POS"]):
+            attribute = "time_scale" if nodes[1] == "SCAL" else "time_position"
+            if query:
+                return self.format_number(getattr(self, attribute))
+            setattr(self, attribute, float(args))
+        elif command == "TRIG" and nodes[1:] == ["MODE"]:
+            if query:
+                return "EDGE"
+            if args.upper() != "EDGE":
+                raise ValueError(args)
+        elif command == "TRIG" and nodes[1:] == ["EDGE", "SOUR"]:
+            if query:
+                return f"CHAN{self.trigger_source}"
+            self.trigger_source = self._channel(args)
+        elif command == "TRIG" and nodes[1:] == ["EDGE", "LEV"]:
+            if query:
+                return self.format_number(self.trigger_level)
+            self.trigger_level = float(args)
+        elif command == "TRIG" and nodes[1:] == ["EDGE", "SLOP"]:
+            if query:
+                return self.trigger_slope
+            slope = args.upper()
+            slope = "EITH" if slope.startswith("EITH") else slope[:3]
+            if slope not in ("POS", "NEG", "EITH"):
+                raise ValueError(args)
+            self.trigger_slope = slope
+        elif command == "DIG":
+            channels = [self._channel(name) for name in args.split(',')] if args else \
+                [channel for channel in self.CHANNELS if self.display[channel]]
+            for channel in channels:
+                self.display[channel] = True
+            self._digitize(channels)
+        elif command == "WAV" and nodes[1:] == ["SOUR"]:
+            if query:
+                return f"CHAN{self.waveform_source}"
+            self.waveform_source = self._channel(args)
+        elif command == "WAV" and nodes[1:] == ["FORM"]:
+            if query:
+                return self.waveform_format
+            data_format = args.upper()
+            if data_format not in ("BYTE", "WORD"):
+                raise ValueError(data_format)
+            self.waveform_format = data_format
+        elif command == "WAV" and nodes[1:] == ["BYT"]:
+            if query:
+                return self.byte_order
+            byte_order = args.upper()
+            if byte_order not in ("MSBF", "LSBF"):
+                raise ValueError(byte_order)
+            self.byte_order = byte_order
+        elif command == "WAV" and nodes[1:] == ["POIN"]:
+            if query:
+                return str(self.points)
+            self.points = int(args)
+            if not 2 <= self.points <= 100000:
+                raise ValueError(args)
+        elif command == "WAV" and nodes[1:] == ["PRE"] and query:
+            return self._preamble()
+        elif command == "WAV" and nodes[1:] == ["DATA"] and query:
+            return self._waveform_data()
+        else:
+            raise KeyError(":".join(nodes))
+        return None
+
+class SwitchEmulator(SCPIInstrumentEmulator):
+    """
+    Emulated relay multiplexer
+    
+    Supports ROUT:CLOS / ROUT:OPEN with channel lists such as
+    (@101,103:105), their queries (one 0/1 per listed channel) and
+    ROUT:OPEN:ALL. Every relay movement is logged in order, so tests can
+    check that switching was break-before-make.
+    """
+    
+    IDENTITY = "PCBA Test System,SWITCH-EMULATOR,0,1.0"
+    
+    def __init__(self, channels: Optional[List[int]] = None, **kwargs):
+        """
+        Initialize emulator
+        
+        Args:
+            channels: Channel numbers of the card (101-120 by default)
+            **kwargs: See SCPIInstrumentEmulator
+        """
+        self.channels = list(channels or range(101, 121))
+        self.operations: List[Tuple[str, List[int]]] = []  # ("OPEN" / "CLOS", channels) in execution order
+        super().__init__(**kwargs)
+    
+    def reset(self):
+        if getattr(self, "closed", None):
+            self.operations.append(("OPEN", sorted(self.closed)))
+        self.closed = set()
+    
+    def _channel_list(self, args: str) -> List[int]:
+        text = args.strip()
+        if not (text.startswith("(@") and text.endswith(")")):
+            raise ValueError(args)
+        channels = []
+        for item in text[2:-1].split(','):
+            first, _, last = item.partition(':')
+            channels.extend(range(int(first), int(last or first) + 1))
+        if any(channel not in self.channels for channel in channels):
+            raise ValueError(args)
+        return channels
+    
+    def _execute(self, nodes: List[str], args: str, query: bool) -> Optional[Union[str, bytes]]:
+        if nodes == ["ROUT", "OPEN", "ALL"] and not query:
+            channels = self.channels
+        elif nodes[0] == "ROUT" and nodes[1:] in (["CLOS"], ["OPEN"]):
+            channels = self._channel_list(args)
+            if query:
+                closed = nodes[1] == "CLOS"
+                return ",".join("1" if (channel in self.closed) == closed else "0" for channel in channels)
+            if nodes[1] == "CLOS":
+                self.closed.update(channels)
+                self.operations.append(("CLOS", channels))
+                return None
+        else:
+            raise KeyError(":".join(nodes))
+        self.closed.difference_update(channels)
+        self.operations.append(("OPEN", channels))
+        return None
+
+class ICTEmulator(SCPIInstrumentEmulator):
+    """
+    Emulated in-circuit tester
+    
+    The board under test is a map of scan channel to the value of the
+    component wired to it; unwired channels read open (9.9E37), as does
+    a value above 120 % of a fixed range. Supports CONF:RES / CAP / DIOD
+    with a range and channel list, ROUT:SCAN, READ? (the scan's readings
+    in ascending channel order) and ASCII or REAL,64 data.
+    """
+    
+    IDENTITY = "PCBA Test System,ICT-EMULATOR,0,1.0"
+    FUNCTIONS = ("RES", "CAP", "DIOD")
+    
+    def __init__(self, board: Optional[Dict[int, float]] = None, point_time: float = 0.0, **kwargs):
+        """
+        Initialize emulator
+        
+        Args:
+            board: Channel -> component value (resistance, capacitance or diode forward voltage)
+            point_time: Seconds per scanned channel
+            **kwargs: See SCPIInstrumentEmulator
+        """
+        self.board = dict(board or {})
+        self.point_time = point_time
+        self.scans = 0
+        super().__init__(**kwargs)
+    
+    def reset(self):
+        self.function = "RES"
+        self.range_value: Union[str, float] = "AUTO"
+        self.scan_channels: List[int] = []
+        self.data_format = "ASC"
+    
+    @staticmethod
+    def _channel_list(text: str) -> List[int]:
+        text = text.strip()
+        if not (text.startswith("(@") and text.endswith(")")):
+            raise ValueError(text)
+        channels = []
+        for item in text[2:-1].split(','):
+            first, _, last = item.partition(':')
+            channels.extend(range(int(first), int(last or first) + 1))
+        return channels
+    
+    def _read(self) -> Union[str, bytes]:
+        channels = sorted(self.scan_channels)
+        if self.point_time:
+            time.sleep(self.point_time * len(channels))
+        self.scans += 1
+        readings = []
+        for channel in channels:
+            value = self.board.get(channel)
+            # Relative noise only: capacitances are far below the default noise floor
+            value = OVERLOAD if value is None else self.add_noise(value, floor=0.0)
+            if self.range_value != "AUTO" and abs(value) > self.range_value * 1.2:
+                value = OVERLOAD
+            readings.append(value)
+        if self.data_format == "ASC":
+            return ",".join(self.format_number(value) for value in readings)
+        payload = struct.pack(f">{len(readings)}d", *readings)
+        length = str(len(payload))
+        return f"#{len(length)}{length}".encode() + payload
+    
+    def _execute(self, nodes: List[str], args: str, query: bool) -> Optional[Union[str, bytes]]:
+        command = nodes[0]
+        if command == "CONF" and not query and nodes[1:2] and nodes[1] in self.FUNCTIONS:
+            range_text, _, channels = args.partition(',')
+            self.function = nodes[1]
+            self.range_value = "AUTO" if range_text.strip().upper() in ("", "AUTO", "DEF") else float(range_text)
+            if channels:
+                self.scan_channels = self._channel_list(channels)
+        elif nodes == ["ROUT", "SCAN"]:
+            if query:
+                return ",".join(str(channel) for channel in self.scan_channels)
+            self.scan_channels = self._channel_list(args)
+        elif command == "READ" and query:
+            if not self.scan_channels:
+                self.push_error(-221, "Settings conflict")
+                return None
+            return self._read()
+        elif command == "FORM" and nodes[1:] in ([], ["DATA"]):
+            if query:
+                return self.data_format
+            data_format = args.upper().replace(" ", "")
+            if data_format not in ("ASC", "ASCII", "REAL", "REAL,64"):
+                raise ValueError(data_format)
+            self.data_format = "ASC" if data_format.startswith("ASC") else "REAL,64"
+        else:
+            raise KeyError(":".join(nodes))
+        return None
+
+def main():
+    """Main function for running the emulated bench"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="SCPI Instrument Emulator for PCBA Testing")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP bind address (default: 127.0.0.1)")
+    parser.add_argument("--dmm-port", type=int, default=5025, help="Multimeter TCP port (default: 5025)")
+    parser.add_argument("--psu-port", type=int, default=5026, help="Power supply TCP port (default: 5026)")
+    parser.add_argument("--scope-port", type=int, default=5027, help="Oscilloscope TCP port (default: 5027)")
+    parser.add_argument("--switch-port", type=int, default=5028, help="Relay multiplexer TCP port (default: 5028)")
+    parser.add_argument("--pty", action="store_true", help="Serve on pseudo terminals instead of TCP")
+    parser.add_argument("--latency", type=float, default=0.0, help="Query response delay in seconds")
+    parser.add_argument("--noise", type=float, default=1e-4, help="Relative reading noise (default: 1e-4)")
+    parser.add_argument("--load", type=float, default=100.0, help="DUT load resistance in ohms (default: 100)")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible readings")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    
+    args = parser.parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level))
+    
+    bench = SimulatedBench(args.load)
+    dmm = DMMEmulator(bench, latency=args.latency, noise=args.noise, seed=args.seed)
+    psu = PSUEmulator(bench, latency=args.latency, noise=args.noise, seed=args.seed)
+    scope = ScopeEmulator(bench, latency=args.latency, noise=args.noise, seed=args.seed)
+    switch = SwitchEmulator(bench=bench, latency=args.latency, seed=args.seed)
+    
+    if args.pty:
+        print(f"🔌 Multimeter: {dmm.start_pty()}")
+        print(f"🔌 Power supply: {psu.start_pty()}")
+        print(f"🔌 Oscilloscope: {scope.start_pty()}")
+        print(f"🔌 Relay multiplexer: {switch.start_pty()}")
+    else:
+        print(f"🔌 Multimeter: {args.host}:{dmm.start_tcp(args.host, args.dmm_port)}")
+        print(f"🔌 Power supply: {args.host}:{psu.start_tcp(args.host, args.psu_port)}")
+        print(f"🔌 Oscilloscope: {args.host}:{scope.start_tcp(args.host, args.scope_port)}")
+        print(f"🔌 Relay multiplexer: {args.host}:{switch.start_tcp(args.host, args.switch_port)}")
+    
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nShutting down emulator...")
+        dmm.stop()
+        psu.stop()
+        scope.stop()
+        switch.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+PCBA Test System - Instrument Session Pool
+Process-wide pool of instrument sessions keyed by physical address, so the
+test manager, the connection checks and the probes of the web app share one
+open port per instrument instead of reopening (and fighting over) it.
+"""
+
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from hardware_layer import ConnectionConfig, ConnectionType, HardwareInterface, SerialInterface, TCPInterface
+
+logger = logging.getLogger(__name__)
+
+SessionKey = Tuple[str, str, Optional[int]]
+
+def create_interface(config: ConnectionConfig) -> HardwareInterface:
+    """Create the hardware interface for a connection configuration"""
+    if config.connection_type == ConnectionType.SERIAL_RTU:
+        return SerialInterface(config)
+    if config.connection_type == ConnectionType.TCP_IP:
+        return TCPInterface(config)
+    raise ValueError(f"Unsupported connection type: {config.connection_type}")
+
+def is_healthy(interface: HardwareInterface) -> bool:
+    """Default health check: connected, and the circuit breaker is not failing fast"""
+    if not interface.is_connected():
+        return False
+    breaker = interface.circuit_breaker
+    return breaker is None or breaker.state != breaker.OPEN
+
+class _Session:
+    __slots__ = ("interface", "references", "last_used", "last_checked", "acquisitions")
+    
+    def __init__(self, interface: HardwareInterface):
+        self.interface = interface
+        self.references = 0
+        self.last_used = time.monotonic()
+        self.last_checked = 0.0
+        self.acquisitions = 0
+
+class SessionPool:
+    """
+    Shared, reference counted instrument sessions
+    
+    One interface exists per (transport, address, port); the first
+    configuration seen for an address is the one used. acquire() hands out
+    the interface connected and health checked and counts the reference;
+    release() gives it back. A session nobody holds stays open for
+    idle_timeout seconds, so back to back users do not reopen the port,
+    and is then disconnected and dropped.
+    """
+    
+    def __init__(self, idle_timeout: float = 60.0, health_check_interval: float = 10.0,
+                 factory: Callable[[ConnectionConfig], HardwareInterface] = create_interface,
+                 health_check: Callable[[HardwareInterface], bool] = is_healthy):
+        """
+        Initialize pool
+        
+        Args:
+            idle_timeout: Seconds an unreferenced session stays open
+            health_check_interval: Minimum seconds between health checks of a session
+            factory: Creates the interface for a new session
+            health_check: Decides whether a session needs to be reconnected
+        """
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.factory = factory
+        self.health_check = health_check
+        self.sessions: Dict[SessionKey, _Session] = {}
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._eviction_timer: Optional[threading.Timer] = None
+    
+    @staticmethod
+    def key(config: ConnectionConfig) -> SessionKey:
+        """Pool key of a configuration; host names and COM ports are case insensitive"""
+        address = config.address.strip()
+        if config.connection_type == ConnectionType.TCP_IP or address.upper().startswith("COM"):
+            address = address.lower()
+        return config.connection_type.value, address, config.port
+    
+    def _find(self, interface: HardwareInterface) -> Optional[_Session]:
+        for session in self.sessions.values():
+            if session.interface is interface:
+                return session
+        return None
+    
+    def owns(self, interface: HardwareInterface) -> bool:
+        with self._lock:
+            return self._find(interface) is not None
+    
+    def find(self, config: ConnectionConfig) -> Optional[HardwareInterface]:
+        """The pooled interface for config, None if there is no session (no reference taken)"""
+        with self._lock:
+            session = self.sessions.get(self.key(config))
+            return session.interface if session else None
+    
+    def get(self, config: ConnectionConfig) -> HardwareInterface:
+        """The shared interface for config, created if needed (not connected, no reference taken)"""
+        with self._lock:
+            key = self.key(config)
+            session = self.sessions.get(key)
+            if session is None:
+                session = self.sessions[key] = _Session(self.factory(config))
+            return session.interface
+    
+    def acquire(self, config: ConnectionConfig, connect: bool = True) -> HardwareInterface:
+        """
+        Take a reference to the session for config
+        
+        Args:
+            config: Connection configuration (its address identifies the session)
+            connect: Open the session, or reconnect it if its health check fails
+        
+        Raises:
+            ConnectionError: The session could not be opened (no reference is taken)
+        """
+        with self._lock:
+            key = self.key(config)
+            session = self.sessions.get(key)
+            if session is None:
+                session = self.sessions[key] = _Session(self.factory(config))
+            session.references += 1
+            session.acquisitions += 1
+            session.last_used = time.monotonic()
+        
+        if connect:
+            try:
+                self._ensure_healthy(session)
+            except Exception:
+                self.release(session.interface)
+                raise
+        return session.interface
+    
+    def _ensure_healthy(self, session: _Session):
+        interface = session.interface
+        if not interface.is_connected():
+            if not interface.connect():
+                raise ConnectionError(f"Failed to open {interface.config.address}: {interface.last_error}")
+            session.last_checked = time.monotonic()
+            return
+        if time.monotonic() - session.last_checked < self.health_check_interval:
+            return
+        session.last_checked = time.monotonic()
+        if not self.health_check(interface):
+            logger.warning(f"Session {interface.config.address} failed its health check; reconnecting")
+            if not interface.reconnect():
+                raise ConnectionError(f"Failed to reopen {interface.config.address}: {interface.last_error}")
+    
+    def release(self, interface: HardwareInterface):
+        """Give back a reference taken with acquire"""
+        with self._lock:
+            session = self._find(interface)
+            if session is None or session.references == 0:
+                logger.warning(f"Release of an unreferenced session {interface.config.address}")
+                return
+            session.references -= 1
+            session.last_used = time.monotonic()
+            if session.references == 0:
+                self._schedule_eviction()
+    
+    @contextmanager
+    def session(self, config: ConnectionConfig) -> Iterator[HardwareInterface]:
+        """Hold a session for the duration of a with block"""
+        interface = self.acquire(config)
+        try:
+            yield interface
+        finally:
+            self.release(interface)
+    
+    def _schedule_eviction(self):
+        # One timer at a time; it reschedules itself while idle sessions remain
+        if self._eviction_timer is None:
+            self._eviction_timer = threading.Timer(self.idle_timeout, self._evict_on_timer)
+            self._eviction_timer.daemon = True
+            self._eviction_timer.start()
+    
+    def _evict_on_timer(self):
+        with self._lock:
+            self._eviction_timer = None
+        self.evict_idle()
+        with self._lock:
+            if any(session.references == 0 for session in self.sessions.values()):
+                self._schedule_eviction()
+    
+    def evict_idle(self, idle_timeout: Optional[float] = None) -> int:
+        """Disconnect and drop sessions unreferenced for longer than idle_timeout; returns how many"""
+        if idle_timeout is None:
+            idle_timeout = self.idle_timeout
+        now = time.monotonic()
+        with self._lock:
+            expired = {key: session for key, session in self.sessions.items()
+                       if session.references == 0 and now - session.last_used >= idle_timeout}
+            for key in expired:
+                del self.sessions[key]
+            self.evictions += len(expired)
+        
+        for session in expired.values():
+            logger.info(f"Closing idle session {session.interface.config.address}")
+            session.interface.disconnect()
+        return len(expired)
+    
+    def close_all(self):
+        """Disconnect every session, referenced or not (shutdown)"""
+        with self._lock:
+            sessions, self.sessions = list(self.sessions.values()), {}
+            if self._eviction_timer:
+                self._eviction_timer.cancel()
+                self._eviction_timer = None
+        for session in sessions:
+            session.interface.disconnect()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Sessions with their reference counts for status reporting"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "evictions": self.evictions,
+                "sessions": [{
+                    "transport": key[0],
+                    "address": key[1],
+                    "port": key[2],
+                    "references": session.references,
+                    "acquisitions": session.acquisitions,
+                    "connected": bool(session.interface.is_connected()),
+                    "idle_s": now - session.last_used if session.references == 0 else 0.0
+                } for key, session in self.sessions.items()]
+            }
+
+_default_pool: Optional[SessionPool] = None
+_default_pool_lock = threading.Lock()
+
+def get_session_pool() -> SessionPool:
+    """The process-wide session pool"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = SessionPool()
+        return _default_pool
@@ -4,8 +4,16 @@ Tests the hardware abstraction layer and test manager functionality.
 """
 
 import unittest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, call
+import asyncio
+import base64
+import io
 import json
+import os
+import socket
+import sys
+import tempfile
+import threading
 import time
 from datetime import datetime
 
@@ -14,9 +22,25 @@ try:
     from hardware_layer import (
         ConnectionConfig, ConnectionType, TestEquipmentType,
         HardwareInterface, SerialInterface, TCPInterface,
-        TestEquipment, Multimeter, PowerSupply, HardwareManager,
-        TestMeasurement, TestResult
+        TestEquipment, Multimeter, PowerSupply, Oscilloscope, RelayBoard, ICTTester, HardwareManager,
+        TestMeasurement, BufferedMeasurement, TestResult
     )
+    import numpy as np
+    from rtt_estimator import RTTEstimator
+    from command_metrics import CommandMetrics
+    from instrument_session import CircuitBreaker, CircuitOpenError
+    from instrument_settling import SettlingProfile, SettlingModel, read_until_stable
+    from io_worker import IOWorker, PRIORITY_SAFETY, PRIORITY_NORMAL
+    from measurement_buffer import MeasurementBuffer
+    from async_hardware_layer import AsyncTCPInterface, AsyncSerialInterface
+    from scpi_instrument_emulator import SimulatedBench, DMMEmulator, PSUEmulator, ScopeEmulator, SwitchEmulator, ICTEmulator, sine_wave, square_wave
+    from list_sweep import SweepPoint, run_list_sweep
+    from session_pool import SessionPool
+    from equipment_reservations import ResourceManager, ReservationTimeout
+    from calibration import CalibrationStore, CalibrationTable
+    from frequency_analysis import analyze_tone, check_frequency, frequency_error, synthesize_tone
+    from ict_engine import ICTEngine, ICTTestTable, evaluate_limits
+    from waveform import Waveform
     from test_manager import (
         TestStep, TestStepType, TestStepStatus, TestSequence,
         TestExecutionEngine, TestSequenceBuilder, TestManager
@@ -49,6 +73,33 @@ class MockSerial:
         self.is_open = False
 
 
+class EmulatorTestCase(unittest.TestCase):
+    """Base fixture: SCPI emulators on loopback TCP ports, disconnected and stopped after each test"""
+    
+    def setUp(self):
+        self.emulators = []
+        self.interfaces = []
+    
+    def tearDown(self):
+        for interface in self.interfaces:
+            interface.disconnect()
+        for emulator in self.emulators:
+            emulator.stop()
+    
+    def _start(self, emulator):
+        """Start emulator on a loopback port and return the port"""
+        self.emulators.append(emulator)
+        return emulator.start_tcp()
+    
+    def _tcp(self, emulator, **config):
+        """Start emulator and return a (not yet connected) TCP interface to it"""
+        config.setdefault('timeout', 2.0)
+        interface = TCPInterface(ConnectionConfig(connection_type=ConnectionType.TCP_IP, address="127.0.0.1",
+                                                  port=self._start(emulator), **config))
+        self.interfaces.append(interface)
+        return interface
+
+
 class MockSocket:
     """Mock socket connection for testing"""
     def __init__(self):
@@ -63,6 +114,9 @@ class MockSocket:
     def send(self, data):
         self.sent_data.append(data)
     
+    def sendall(self, data):
+        self.sent_data.append(data)
+    
     def recv(self, size):
         if self.response_index < len(self.responses):
             response = self.responses[self.response_index]
@@ -70,6 +124,17 @@ class MockSocket:
             return response
         return b"OK\r\n"
     
+    def recv_into(self, buffer):
+        response = self.recv(len(buffer))
+        buffer[:len(response)] = response
+        return len(response)
+    
+    def setsockopt(self, level, option, value):
+        pass
+    
+    def gettimeout(self):
+        return None
+    
     def close(self):
         self.connected = False
     
@@ -202,6 +267,554 @@ class TestTCPInterface(unittest.TestCase):
         self.assertIn(b"*IDN?\r\n", mock_connection.sent_data)
 
 
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestTCPResponseFraming(unittest.TestCase):
+    """Test buffered response framing in TCPInterface over a loopback socket"""
+    
+    def setUp(self):
+        """Start a loopback server that replies with scripted chunks"""
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(1)
+        self.replies = []
+        
+        self.interface = TCPInterface(ConnectionConfig(
+            connection_type=ConnectionType.TCP_IP,
+            address="127.0.0.1",
+            port=self.server.getsockname()[1],
+            timeout=2.0
+        ))
+        self.assertTrue(self.interface.connect())
+        self.peer, _ = self.server.accept()
+    
+    def tearDown(self):
+        self.interface.disconnect()
+        self.peer.close()
+        self.server.close()
+    
+    def _reply(self, *chunks, delay=0.01):
+        """Send chunks to the interface with a pause between them"""
+        def run():
+            for chunk in chunks:
+                self.peer.sendall(chunk)
+                time.sleep(delay)
+        threading.Thread(target=run, daemon=True).start()
+    
+    def test_socket_options(self):
+        """Nagle is disabled and keepalive enabled on connect"""
+        sock = self.interface.socket_connection
+        
+        self.assertTrue(sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY))
+        self.assertTrue(sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE))
+    
+    def test_split_response_reassembled(self):
+        """A response arriving in several segments is returned whole"""
+        self._reply(b"KEYSIGHT,344", b"65A,MY123", b"45678,1.0\n")
+        
+        self.assertEqual(self.interface.send_command("*IDN?"), "KEYSIGHT,34465A,MY12345678,1.0")
+    
+    def test_large_response_not_truncated(self):
+        """Multi-kilobyte responses are read up to the terminator"""
+        values = ",".join(f"{i * 0.001:+.6E}" for i in range(2000))
+        self._reply(values.encode()[:7000], values.encode()[7000:] + b"\n")
+        
+        self.assertEqual(self.interface.send_command("FETC?").split(","), values.split(","))
+    
+    def test_back_to_back_responses_kept_apart(self):
+        """Bytes after one response stay buffered for the next"""
+        self._reply(b"1.0\n2.0\n")
+        
+        self.assertEqual(self.interface.send_batch(["READ?"]), ["1.0"])
+        self.assertEqual(self.interface.read_response(1.0), b"2.0\n")
+    
+    def test_block_containing_terminator(self):
+        """Definite-length blocks are read by length even if the payload contains newlines"""
+        payload = bytes(range(256)) * 40
+        block = b"#510240" + payload + b"\n"
+        self._reply(block[:5000], block[5000:])
+        
+        self.assertEqual(self.interface.query_binary_block("CURV?"), payload)
+    
+    def test_timeout_discards_late_response(self):
+        """A late answer to a timed out query is dropped before the next command"""
+        with self.assertRaises(TimeoutError):
+            self.interface.send_command("READ?", timeout=0.05)
+        
+        self.peer.sendall(b"9.99\n")
+        time.sleep(0.05)
+        threading.Timer(0.1, self.peer.sendall, [b"1.5\n"]).start()
+        
+        self.assertEqual(self.interface.send_command("READ?"), "1.5")
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestRTTEstimator(unittest.TestCase):
+    """Test RTTEstimator class"""
+    
+    def test_initial_timeout(self):
+        """Deadline starts at the initial timeout before any sample"""
+        estimator = RTTEstimator(initial_timeout=2.0, min_timeout=0.01, max_timeout=5.0)
+        
+        self.assertEqual(estimator.timeout, 2.0)
+    
+    def test_converges_to_observed_rtt(self):
+        """Stable round trips shrink the deadline towards the RTT"""
+        estimator = RTTEstimator(initial_timeout=5.0, min_timeout=0.001, max_timeout=5.0)
+        
+        for _ in range(50):
+            estimator.observe(0.004)
+        
+        self.assertAlmostEqual(estimator.srtt, 0.004)
+        self.assertLess(estimator.timeout, 0.01)
+    
+    def test_floor_and_ceiling(self):
+        """Deadline stays within the configured bounds"""
+        estimator = RTTEstimator(initial_timeout=1.0, min_timeout=0.05, max_timeout=2.0)
+        
+        estimator.observe(0.001)
+        self.assertEqual(estimator.timeout, 0.05)
+        
+        estimator.observe(10.0)
+        self.assertEqual(estimator.timeout, 2.0)
+    
+    def test_timeout_backoff(self):
+        """Each unanswered request doubles the deadline"""
+        estimator = RTTEstimator(initial_timeout=0.1, min_timeout=0.01, max_timeout=0.3)
+        
+        estimator.on_timeout()
+        self.assertAlmostEqual(estimator.timeout, 0.2)
+        estimator.on_timeout()
+        self.assertAlmostEqual(estimator.timeout, 0.3)
+        self.assertEqual(estimator.timeouts, 2)
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestAdaptiveInterfaceTimeouts(unittest.TestCase):
+    """Test adaptive response deadlines in SerialInterface"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.config = ConnectionConfig(
+            connection_type=ConnectionType.SERIAL_RTU,
+            address="COM1",
+            timeout=5.0,
+            min_timeout=0.05
+        )
+    
+    @patch('hardware_layer.serial.Serial')
+    def test_deadline_shrinks_after_responses(self, mock_serial):
+        """Fast answers lower the serial read timeout towards the floor"""
+        mock_connection = MockSerial()
+        mock_connection.read_responses = ["1.0\r\n"] * 10
+        mock_serial.return_value = mock_connection
+        
+        interface = SerialInterface(self.config)
+        interface.connect()
+        for _ in range(10):
+            interface.send_command("READ?")
+        
+        self.assertEqual(mock_connection.timeout, 0.05)
+        self.assertEqual(interface.get_timing_stats()["samples"], 10)
+    
+    @patch('hardware_layer.serial.Serial')
+    def test_slow_commands_use_full_timeout(self, mock_serial):
+        """Self-test keeps the configured timeout and is not sampled"""
+        mock_serial.return_value = MockSerial()
+        
+        interface = SerialInterface(self.config)
+        interface.connect()
+        interface.send_command("*TST?")
+        
+        self.assertEqual(interface.serial_connection.timeout, 5.0)
+        self.assertEqual(interface.get_timing_stats()["samples"], 0)
+    
+    @patch('hardware_layer.serial.Serial')
+    def test_unanswered_query_raises_timeout(self, mock_serial):
+        """A query without a complete response line raises TimeoutError and backs off"""
+        mock_connection = MockSerial()
+        mock_connection.readline = lambda: b""
+        mock_connection.reset_input_buffer = Mock()
+        mock_serial.return_value = mock_connection
+        
+        interface = SerialInterface(self.config)
+        interface.connect()
+        
+        with self.assertRaises(TimeoutError):
+            interface.send_command("READ?")
+        self.assertEqual(interface.get_timing_stats()["timeouts"], 1)
+        
+        # Stale input is flushed before the next command
+        interface.send_command("*CLS")
+        mock_connection.reset_input_buffer.assert_called_once()
+    
+    @patch('hardware_layer.serial.Serial')
+    def test_adaptive_timeout_disabled(self, mock_serial):
+        """Disabling adaptive timeouts keeps the configured deadline"""
+        mock_serial.return_value = MockSerial()
+        self.config.adaptive_timeout = False
+        
+        interface = SerialInterface(self.config)
+        interface.connect()
+        interface.send_command("*IDN?")
+        
+        self.assertEqual(interface.serial_connection.timeout, 5.0)
+        self.assertIsNone(interface.get_timing_stats())
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestCommandMetrics(EmulatorTestCase):
+    """Test per-command latency instrumentation"""
+    
+    def test_verbs_and_histogram(self):
+        """Commands are grouped by header; batches by the query they wait for"""
+        metrics = CommandMetrics()
+        self.assertEqual(metrics.verb("VOLT:DC:RANG 10"), "VOLT:DC:RANG")
+        self.assertEqual(metrics.verb("CONF:VOLT:DC;:SAMP:COUN 1;:READ?"), "READ?")
+        self.assertEqual(metrics.verb("VOLT 5.0;:CURR 0.5;:OUTP ON"), "VOLT")
+        
+        for elapsed in [0.002] * 95 + [0.2] * 5:
+            metrics.record("READ?", elapsed, 7, 16)
+        metrics.record("READ?", 1.5, 7, 0, timed_out=True, failed=True)
+        
+        stats = metrics.get_stats()["verbs"]["READ?"]
+        self.assertEqual(stats["count"], 101)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual(stats["errors"], 0)
+        self.assertEqual(stats["bytes_received"], 1600)
+        self.assertEqual(stats["p50_ms"], 2.5)
+        self.assertEqual(stats["p99_ms"], 250)
+        self.assertEqual(stats["histogram"], {"<=2.5ms": 95, "<=250ms": 5, "<=2500ms": 1})
+    
+    def test_dump_slowest(self):
+        """The slowest commands are kept in a bounded heap, slowest first"""
+        metrics = CommandMetrics(slowest_capacity=3)
+        for index, elapsed in enumerate([0.01, 0.5, 0.02, 0.3, 0.001, 0.4]):
+            metrics.record(f"CMD{index}?", elapsed, 6, 2)
+        
+        slowest = metrics.dump_slowest(2)
+        self.assertEqual([entry["command"] for entry in slowest], ["CMD1?", "CMD5?"])
+        self.assertEqual(len(metrics.dump_slowest(10)), 3)
+    
+    @patch('hardware_layer.serial.Serial')
+    def test_interface_records_commands(self, mock_serial):
+        """send_command records answered, timed out and write-only commands"""
+        mock_connection = MockSerial()
+        mock_connection.read_responses = ["1.0\r\n", ""]
+        mock_connection.reset_input_buffer = Mock()
+        mock_serial.return_value = mock_connection
+        
+        interface = SerialInterface(ConnectionConfig(
+            connection_type=ConnectionType.SERIAL_RTU, address="COM1", timeout=1.0))
+        interface.connect()
+        interface.send_command("READ?")
+        with self.assertRaises(TimeoutError):
+            interface.send_command("READ?")
+        interface.send_command("*RST")
+        
+        stats = interface.get_command_metrics(slowest=5)
+        self.assertEqual(stats["commands"], 3)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual(stats["verbs"]["READ?"]["bytes_sent"], 14)
+        self.assertEqual(stats["verbs"]["READ?"]["bytes_received"], 4)
+        self.assertEqual(len(stats["slowest"]), 3)
+    
+    def test_disabled(self):
+        """Metrics can be switched off per connection"""
+        interface = TCPInterface(ConnectionConfig(
+            connection_type=ConnectionType.TCP_IP, address="127.0.0.1", port=5025, command_metrics=False))
+        self.assertIsNone(interface.get_command_metrics())
+    
+    def test_manager_reports_per_instrument(self):
+        """HardwareManager groups the statistics by instrument"""
+        bench = SimulatedBench()
+        manager = HardwareManager()
+        manager.add_equipment(Multimeter("dmm", self._tcp(DMMEmulator(bench))))
+        manager.add_equipment(PowerSupply("psu", self._tcp(PSUEmulator(bench))))
+        manager.get_equipment("dmm").connect()
+        manager.get_equipment("psu").connect()
+        manager.get_equipment("psu").measure_output()
+        for _ in range(3):
+            manager.get_equipment("dmm").measure_voltage_dc()
+        
+        metrics = manager.get_command_metrics(slowest=1)
+        self.assertEqual(metrics["dmm"]["verbs"]["READ?"]["count"], 3)
+        self.assertEqual(metrics["psu"]["verbs"]["MEAS:CURR?"]["count"], 1)
+        self.assertEqual(len(metrics["dmm"]["slowest"]), 1)
+        self.assertIn("adaptive_timeout", metrics["dmm"])
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestResilientSessions(EmulatorTestCase):
+    """Test transparent reconnect and the circuit breaker"""
+    
+    def setUp(self):
+        """Connect a multimeter to an emulated instrument"""
+        super().setUp()
+        self.emulator = DMMEmulator(sample_time=0)
+        self.interface = self._tcp(self.emulator, timeout=1.0,
+                                   additional_params={'reconnect_attempts': 2, 'reconnect_delay': 0.01,
+                                                      'failure_threshold': 2, 'circuit_reset_timeout': 0.2})
+        self.port = self.interface.config.port
+        self.multimeter = Multimeter("DMM", self.interface)
+        self.assertTrue(self.multimeter.connect())
+    
+    def test_circuit_breaker_states(self):
+        """The circuit opens at the threshold and lets one trial through after the interval"""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05, max_reset_timeout=0.15)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow_request())
+        
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+        breaker.record_failure()
+        self.assertEqual(breaker.open_interval, 0.1)
+        
+        time.sleep(0.11)
+        self.assertTrue(breaker.allow_request())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.open_interval, 0.05)
+    
+    def test_reconnect_restores_configuration(self):
+        """A dropped link is reopened and the cached configuration replayed before the retry"""
+        self.multimeter.measure_voltage_dc(10.0, nplc=10)
+        
+        # Power cycle the instrument: connection lost and configuration back to defaults
+        self.emulator.drop_connections()
+        self.emulator.reset()
+        
+        self.multimeter.measure_voltage_dc(10.0, nplc=10)
+        
+        self.assertEqual(self.interface.reconnects, 1)
+        self.assertEqual(self.emulator.ranges["VOLT:DC"], 10.0)
+        self.assertEqual(self.emulator.nplc["VOLT:DC"], 10.0)
+        self.assertEqual(self.interface.get_session_stats()["circuit"]["state"], CircuitBreaker.CLOSED)
+    
+    def test_fails_fast_while_down(self):
+        """Once the instrument is known to be down, commands fail without touching the link"""
+        self.emulator.stop()
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                self.interface.send_command("*IDN?")
+        
+        start_time = time.time()
+        with self.assertRaises(CircuitOpenError):
+            self.interface.send_command("*IDN?")
+        self.assertLess(time.time() - start_time, 0.05)
+        
+        # Back up: the trial after the open interval reconnects and closes the circuit
+        self.emulator.start_tcp(port=self.port)
+        time.sleep(0.25)
+        self.assertIn("DMM-EMULATOR", self.interface.send_command("*IDN?"))
+        self.assertEqual(self.interface.get_session_stats()["circuit"]["state"], CircuitBreaker.CLOSED)
+    
+    @patch('hardware_layer.serial.Serial')
+    def test_timeouts_open_circuit(self, mock_serial):
+        """Repeated unanswered queries open the circuit too"""
+        mock_connection = MockSerial()
+        mock_connection.readline = lambda: b""
+        mock_connection.reset_input_buffer = Mock()
+        mock_serial.return_value = mock_connection
+        
+        interface = SerialInterface(ConnectionConfig(
+            connection_type=ConnectionType.SERIAL_RTU, address="COM1", timeout=0.1,
+            additional_params={'failure_threshold': 2}))
+        interface.connect()
+        for _ in range(2):
+            with self.assertRaises(TimeoutError):
+                interface.send_command("READ?")
+        with self.assertRaises(CircuitOpenError):
+            interface.send_command("READ?")
+    
+    def test_no_reconnect_after_disconnect(self):
+        """An explicitly closed session is not reopened"""
+        self.multimeter.disconnect()
+        with self.assertRaises(ConnectionError):
+            self.interface.send_command("*IDN?")
+        self.assertEqual(self.interface.reconnects, 0)
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestCommandBatching(unittest.TestCase):
+    """Test SCPI command batching in HardwareInterface"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.config = ConnectionConfig(
+            connection_type=ConnectionType.SERIAL_RTU,
+            address="COM1"
+        )
+    
+    def test_join_commands(self):
+        """Subsystem commands are rooted, common commands are left as is"""
+        message = HardwareInterface.join_commands(["*RST", "CONF:VOLT:DC", ":VOLT:DC:RANG 10", "READ?"])
+        
+        self.assertEqual(message, "*RST;:CONF:VOLT:DC;:VOLT:DC:RANG 10;:READ?")
+    
+    @patch('hardware_layer.serial.Serial')
+    def test_set_commands_are_not_answered(self, mock_serial):
+        """A batch without queries is one write and no read"""
+        mock_connection = MockSerial()
+        mock_connection.readline = Mock()
+        mock_serial.return_value = mock_connection
+        
+        interface = SerialInterface(self.config)
+        interface.connect()
+        responses = interface.send_batch(["VOLT 5.0", "CURR 0.5", "OUTP ON"])
+        
+        self.assertEqual(responses, [])
+        self.assertEqual(mock_connection.write_data, [b"VOLT 5.0;:CURR 0.5;:OUTP ON\r\n"])
+        mock_connection.readline.assert_not_called()
+    
+    @patch('hardware_layer.serial.Serial')
+    def test_compound_query_single_round_trip(self, mock_serial):
+        """Responses to all queries of a batch arrive on one line"""
+        mock_connection = MockSerial()
+        mock_connection.read_responses = ["+5.012;+0.251\r\n"]
+        mock_serial.return_value = mock_connection
+        
+        interface = SerialInterface(self.config)
+        interface.connect()
+        responses = interface.send_batch(["MEAS:VOLT?", "MEAS:CURR?"])
+        
+        self.assertEqual(responses, ["+5.012", "+0.251"])
+        self.assertEqual(len(mock_connection.write_data), 1)
+        self.assertEqual(mock_connection.response_index, 1)
+    
+    @patch('hardware_layer.serial.Serial')
+    def test_response_count_mismatch(self, mock_serial):
+        """A response that does not match the queries sent is rejected"""
+        mock_connection = MockSerial()
+        mock_connection.read_responses = ["+5.012\r\n"]
+        mock_serial.return_value = mock_connection
+        
+        interface = SerialInterface(self.config)
+        interface.connect()
+        
+        with self.assertRaises(ValueError):
+            interface.send_batch(["MEAS:VOLT?", "MEAS:CURR?"])
+    
+    @patch('hardware_layer.socket.socket')
+    def test_tcp_set_command_not_answered(self, mock_socket):
+        """TCP set commands return without waiting for data"""
+        mock_connection = MockSocket()
+        mock_connection.recv_into = Mock()
+        mock_socket.return_value = mock_connection
+        
+        interface = TCPInterface(ConnectionConfig(
+            connection_type=ConnectionType.TCP_IP, address="192.168.1.100", port=5025))
+        interface.connect()
+        
+        self.assertEqual(interface.send_command("OUTP OFF"), "")
+        mock_connection.recv_into.assert_not_called()
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestBufferedAcquisition(unittest.TestCase):
+    """Test buffered multi-sample acquisition and binary block transfers"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.samples = np.linspace(4.9, 5.1, 10000)
+        payload = self.samples.astype('>f8').tobytes()
+        self.block = f"#{len(str(len(payload)))}{len(payload)}".encode() + payload + b"\n"
+    
+    @patch('hardware_layer.serial.Serial')
+    def test_serial_binary_block(self, mock_serial):
+        """A definite-length block is read in full and its terminator consumed"""
+        mock_connection = MockSerial()
+        mock_connection.read = io.BytesIO(self.block + b"OK\n").read
+        mock_serial.return_value = mock_connection
+        
+        interface = SerialInterface(ConnectionConfig(connection_type=ConnectionType.SERIAL_RTU, address="COM1"))
+        interface.connect()
+        payload = interface.query_binary_block("FETC?")
+        
+        self.assertEqual(len(payload), 80000)
+        self.assertEqual(mock_connection.read(3), b"OK\n")
+    
+    @patch('hardware_layer.serial.Serial')
+    def test_truncated_block_times_out(self, mock_serial):
+        """A block shorter than its header announces raises TimeoutError"""
+        mock_connection = MockSerial()
+        mock_connection.read = io.BytesIO(self.block[:1000]).read
+        mock_connection.reset_input_buffer = Mock()
+        mock_serial.return_value = mock_connection
+        
+        interface = SerialInterface(ConnectionConfig(connection_type=ConnectionType.SERIAL_RTU, address="COM1"))
+        interface.connect()
+        
+        with self.assertRaises(TimeoutError):
+            interface.query_binary_block("FETC?")
+    
+    def test_multimeter_acquire_binary(self):
+        """10k samples arrive as one block and are decoded into an array-backed measurement"""
+        mock_interface = Mock(spec=HardwareInterface)
+        mock_interface.query_binary_block.return_value = self.block[7:-1]
+        multimeter = Multimeter("Test DMM", mock_interface)
+        
+        measurement = multimeter.acquire("VOLT:DC", count=10000, range_value=10)
+        
+        self.assertIsInstance(measurement, BufferedMeasurement)
+        self.assertEqual(measurement.parameter, "DC_VOLTAGE")
+        self.assertEqual(measurement.count, 10000)
+        self.assertAlmostEqual(measurement.mean, 5.0)
+        self.assertAlmostEqual(measurement.stdev, self.samples.std(ddof=1))
+        self.assertAlmostEqual(measurement.peak_to_peak, 0.2)
+        mock_interface.query_binary_block.assert_called_once_with(
+            "CONF:VOLT:DC;:VOLT:DC:RANG 10;:SAMP:COUN 10000;"
+            ":FORM:DATA REAL,64;:INIT;:FETC?", None)
+    
+    def test_multimeter_acquire_ascii(self):
+        """ASCII transfers are parsed into the same measurement"""
+        mock_interface = Mock(spec=HardwareInterface)
+        mock_interface.send_command.return_value = "+1.0E-3,+2.0E-3,+3.0E-3"
+        multimeter = Multimeter("Test DMM", mock_interface)
+        
+        measurement = multimeter.acquire("CURR:DC", count=3, binary=False)
+        
+        self.assertEqual(measurement.unit, "A")
+        self.assertAlmostEqual(measurement.value, 2.0e-3)
+        self.assertAlmostEqual(measurement.min_value, 1.0e-3)
+    
+    def test_sample_count_mismatch(self):
+        """Fewer samples than requested is an error"""
+        mock_interface = Mock(spec=HardwareInterface)
+        mock_interface.send_command.return_value = "1.0,2.0"
+        multimeter = Multimeter("Test DMM", mock_interface)
+        
+        with self.assertRaises(ValueError):
+            multimeter.acquire(count=3, binary=False)
+    
+    def test_empty_acquisition_rejected(self):
+        """An acquisition without samples is an error, and an empty measurement still serializes"""
+        mock_interface = Mock(spec=HardwareInterface)
+        mock_interface.send_command.return_value = ""
+        multimeter = Multimeter("Test DMM", mock_interface)
+        
+        with self.assertRaisesRegex(ValueError, "no samples"):
+            multimeter.acquire(count=0, binary=False)
+        data = BufferedMeasurement.from_samples("DC_VOLTAGE", np.array([]), "V").to_dict()
+        self.assertEqual(data["count"], 0)
+        self.assertEqual((data["value"], data["min_value"], data["max_value"]), (None, None, None))
+        json.dumps(data, default=str, allow_nan=False)
+    
+    def test_to_dict_reports_statistics(self):
+        """Serialized buffered measurements carry statistics, not the raw samples"""
+        measurement = BufferedMeasurement.from_samples("DC_VOLTAGE", self.samples, "V", max_limit=5.5)
+        
+        data = measurement.to_dict()
+        
+        self.assertNotIn("samples", data)
+        self.assertEqual(data["count"], 10000)
+        self.assertAlmostEqual(data["max_value"], 5.1)
+        self.assertTrue(measurement.is_within_limits())
+
+
 @unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
 class TestMultimeter(unittest.TestCase):
     """Test Multimeter class"""
@@ -212,39 +825,38 @@ class TestMultimeter(unittest.TestCase):
         self.mock_interface.connect.return_value = True
         self.mock_interface.is_connected.return_value = True
         self.mock_interface.send_command.return_value = "1.234"
+        self.mock_interface.send_batch.return_value = ["1.234"]
         
         self.multimeter = Multimeter("Test DMM", self.mock_interface)
     
     def test_initialize(self):
         """Test multimeter initialization"""
-        self.mock_interface.send_command.side_effect = [
-            "Test DMM Model 123",  # *IDN? response
-            "OK"  # *RST response
-        ]
+        self.mock_interface.send_batch.return_value = ["Test DMM Model 123"]  # *IDN? response
+        self.mock_interface.send_command.return_value = "1"  # *ESR? with operation complete set
         
         result = self.multimeter.initialize()
         
         self.assertTrue(result)
         self.mock_interface.connect.assert_called_once()
-        self.mock_interface.send_command.assert_any_call("*IDN?")
-        self.mock_interface.send_command.assert_any_call("*RST")
+        self.mock_interface.send_batch.assert_called_once_with(["*IDN?", "*RST"])
+        self.mock_interface.send_command.assert_has_calls([call("*OPC"), call("*ESR?")])
     
     def test_measure_voltage_dc(self):
         """Test DC voltage measurement"""
-        self.mock_interface.send_command.return_value = "3.14"
+        self.mock_interface.send_batch.return_value = ["3.14"]
         
         measurement = self.multimeter.measure_voltage_dc(10.0)
         
         self.assertEqual(measurement.parameter, "DC_VOLTAGE")
         self.assertEqual(measurement.value, 3.14)
         self.assertEqual(measurement.unit, "V")
-        self.mock_interface.send_command.assert_any_call("VOLT:DC:RANG 10.0")
-        self.mock_interface.send_command.assert_any_call("CONF:VOLT:DC")
-        self.mock_interface.send_command.assert_any_call("READ?")
+        self.mock_interface.send_batch.assert_called_once_with(
+            ["CONF:VOLT:DC", "VOLT:DC:RANG 10.0", "FORM:DATA ASC", "READ?"])
+        self.mock_interface.send_command.assert_not_called()
     
     def test_measure_current_dc(self):
         """Test DC current measurement"""
-        self.mock_interface.send_command.return_value = "0.123"
+        self.mock_interface.send_batch.return_value = ["0.123"]
         
         measurement = self.multimeter.measure_current_dc(1.0)
         
@@ -254,13 +866,14 @@ class TestMultimeter(unittest.TestCase):
     
     def test_measure_resistance(self):
         """Test resistance measurement"""
-        self.mock_interface.send_command.return_value = "1000.0"
+        self.mock_interface.send_batch.return_value = ["1000.0"]
         
         measurement = self.multimeter.measure_resistance()
         
         self.assertEqual(measurement.parameter, "RESISTANCE")
         self.assertEqual(measurement.value, 1000.0)
         self.assertEqual(measurement.unit, "Ohm")
+        self.mock_interface.send_batch.assert_called_once_with(["CONF:RES", "FORM:DATA ASC", "READ?"])
 
 
 @unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
@@ -278,23 +891,20 @@ class TestPowerSupply(unittest.TestCase):
     
     def test_initialize(self):
         """Test power supply initialization"""
-        self.mock_interface.send_command.side_effect = [
-            "Test PSU Model 456",  # *IDN? response
-            "OK",  # *RST response
-            "OK"   # OUTP OFF response
-        ]
+        self.mock_interface.send_batch.return_value = ["Test PSU Model 456"]  # *IDN? response
         
         result = self.power_supply.initialize()
         
         self.assertTrue(result)
         self.assertFalse(self.power_supply.output_enabled)
+        self.mock_interface.send_batch.assert_called_once_with(["*IDN?", "*RST", "OUTP OFF"])
     
     def test_set_voltage(self):
         """Test setting output voltage"""
         result = self.power_supply.set_voltage(5.0)
         
         self.assertTrue(result)
-        self.mock_interface.send_command.assert_called_with("VOLT 5.0")
+        self.mock_interface.send_batch.assert_called_with(["VOLT 5.0"])
     
     def test_enable_output(self):
         """Test enabling output"""
@@ -302,7 +912,7 @@ class TestPowerSupply(unittest.TestCase):
         
         self.assertTrue(result)
         self.assertTrue(self.power_supply.output_enabled)
-        self.mock_interface.send_command.assert_called_with("OUTP ON")
+        self.mock_interface.send_batch.assert_called_with(["OUTP ON"])
     
     def test_measure_output_voltage(self):
         """Test measuring output voltage"""
@@ -313,6 +923,1189 @@ class TestPowerSupply(unittest.TestCase):
         self.assertEqual(measurement.parameter, "OUTPUT_VOLTAGE")
         self.assertEqual(measurement.value, 5.01)
         self.assertEqual(measurement.unit, "V")
+    
+    def test_configure_output(self):
+        """Test setting voltage, current limit and output state in one batch"""
+        self.mock_interface.send_batch.return_value = []
+        
+        result = self.power_supply.configure_output(5.0, 0.5, enable=True)
+        
+        self.assertTrue(result)
+        self.assertTrue(self.power_supply.output_enabled)
+        self.mock_interface.send_batch.assert_called_once_with(["VOLT 5.0", "CURR 0.5", "OUTP ON"])
+    
+    def test_measure_output(self):
+        """Test measuring voltage and current with one compound query"""
+        self.mock_interface.send_batch.return_value = ["5.01", "0.25"]
+        
+        voltage, current = self.power_supply.measure_output()
+        
+        self.assertEqual(voltage.value, 5.01)
+        self.assertEqual(current.value, 0.25)
+        self.mock_interface.send_batch.assert_called_once_with(["MEAS:VOLT?", "MEAS:CURR?"])
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestInstrumentStateCache(unittest.TestCase):
+    """Test shadow configuration state in TestEquipment"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.mock_interface = Mock(spec=HardwareInterface)
+        self.mock_interface.connect.return_value = True
+        self.mock_interface.send_batch.return_value = ["1.0"]
+        self.multimeter = Multimeter("Test DMM", self.mock_interface)
+        self.power_supply = PowerSupply("Test PSU", self.mock_interface)
+    
+    def _sent(self):
+        return [command for call in self.mock_interface.send_batch.call_args_list for command in call[0][0]]
+    
+    def test_sweep_sends_only_reads(self):
+        """Repeated measurements in the same configuration only query"""
+        for _ in range(100):
+            self.multimeter.measure_voltage_dc(10.0)
+        
+        sent = self._sent()
+        self.assertEqual(sent[:4], ["CONF:VOLT:DC", "VOLT:DC:RANG 10.0", "FORM:DATA ASC", "READ?"])
+        self.assertEqual(sent[4:], ["READ?"] * 99)
+    
+    def test_changed_settings_are_sent(self):
+        """Only the settings that differ are sent; CONF restores auto range"""
+        self.multimeter.measure_voltage_dc(10.0, nplc=10)
+        self.mock_interface.send_batch.reset_mock()
+        
+        self.multimeter.measure_voltage_dc()
+        self.multimeter.measure_current_dc()
+        
+        self.assertEqual(self._sent(), ["VOLT:DC:RANG:AUTO ON", "READ?", "CONF:CURR:DC", "READ?"])
+    
+    def test_acquire_then_single_read(self):
+        """A single reading after a buffered acquisition restores the sample count and format"""
+        self.mock_interface.query_binary_block.return_value = np.zeros(10, dtype='>f8').tobytes()
+        self.multimeter.acquire("VOLT:DC", count=10)
+        
+        self.multimeter.measure_voltage_dc()
+        
+        self.assertEqual(self._sent(), ["SAMP:COUN 1", "FORM:DATA ASC", "READ?"])
+    
+    def test_invalidated_on_error_reset_and_reconnect(self):
+        """Errors, *RST and reconnects force the full configuration again"""
+        self.multimeter.measure_voltage_dc()
+        
+        for invalidate in (self.multimeter.reset, self.multimeter.connect):
+            invalidate()
+            self.mock_interface.send_batch.reset_mock()
+            self.multimeter.measure_voltage_dc()
+            self.assertEqual(self._sent(), ["CONF:VOLT:DC", "FORM:DATA ASC", "READ?"])
+        
+        self.mock_interface.send_batch.side_effect = TimeoutError("No response")
+        with self.assertRaises(TimeoutError):
+            self.multimeter.measure_voltage_dc()
+        self.assertEqual(self.multimeter.state, {})
+    
+    def test_power_supply_setpoints(self):
+        """Unchanged setpoints are skipped but output off is always sent"""
+        self.mock_interface.send_batch.return_value = []
+        self.power_supply.configure_output(5.0, 0.5, enable=True)
+        self.mock_interface.send_batch.reset_mock()
+        
+        self.assertTrue(self.power_supply.set_voltage(5.0))
+        self.assertTrue(self.power_supply.configure_output(5.0, 1.0, enable=True))
+        self.assertTrue(self.power_supply.enable_output(False))
+        self.assertTrue(self.power_supply.enable_output(False))
+        
+        self.assertEqual(self._sent(), ["CURR 1.0", "OUTP OFF", "OUTP OFF"])
+        self.assertFalse(self.power_supply.output_enabled)
+
+
+async def _fake_instrument(reader, writer, latency=0.05):
+    """Minimal SCPI responder for asyncio interface tests"""
+    answers = {"*IDN?": "FAKE,DMM,0,1.0", "READ?": "+5.000E+00", "MEAS:VOLT?": "5.0", "MEAS:CURR?": "0.1"}
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        commands = [command.lstrip(':') for command in line.decode().strip().split(';')]
+        if "FETC?" in commands:
+            payload = bytes(range(10)) * 100
+            block = b"#41000" + payload + b"\n"
+            writer.write(block[:500])
+            await writer.drain()
+            await asyncio.sleep(0.01)
+            writer.write(block[500:])
+            continue
+        responses = [answers[command] for command in commands if command in answers]
+        if responses:
+            await asyncio.sleep(latency)
+            writer.write((";".join(responses) + "\n").encode())
+            await writer.drain()
+    writer.close()
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestAsyncInterfaces(unittest.TestCase):
+    """Test asyncio interfaces and TestEquipment async wrappers"""
+    
+    def _run(self, coroutine):
+        return asyncio.run(asyncio.wait_for(coroutine, 10))
+    
+    async def _serve(self):
+        server = await asyncio.start_server(_fake_instrument, "127.0.0.1", 0)
+        return server, server.sockets[0].getsockname()[1]
+    
+    def _tcp_config(self, port):
+        return ConnectionConfig(connection_type=ConnectionType.TCP_IP, address="127.0.0.1",
+                                port=port, timeout=2.0)
+    
+    def test_one_loop_drives_many_instruments(self):
+        """Twenty instruments measured concurrently take about one round trip"""
+        async def scenario():
+            server, port = await self._serve()
+            meters = [Multimeter(f"DMM{i}", AsyncTCPInterface(self._tcp_config(port))) for i in range(20)]
+            connected = await asyncio.gather(*(meter.connect_async() for meter in meters))
+            
+            start = time.time()
+            readings = await asyncio.gather(*(meter.measure_async("VOLT:DC") for meter in meters))
+            elapsed = time.time() - start
+            
+            await asyncio.gather(*(meter.disconnect_async() for meter in meters))
+            server.close()
+            return connected, readings, elapsed
+        
+        connected, readings, elapsed = self._run(scenario())
+        
+        self.assertTrue(all(connected))
+        self.assertEqual([reading.value for reading in readings], [5.0] * 20)
+        self.assertLess(elapsed, 0.5)
+    
+    def test_batch_block_and_state(self):
+        """Compound queries, binary blocks and the shadow state work through the async path"""
+        async def scenario():
+            server, port = await self._serve()
+            interface = AsyncTCPInterface(self._tcp_config(port))
+            psu = PowerSupply("PSU", interface)
+            await psu.connect_async()
+            
+            identity = await psu.identify_async()
+            configured = await psu.configure_output_async(5.0, 0.5, enable=True)
+            voltage, current = await psu.measure_output_async()
+            block = await interface.query_binary_block("FETC?")
+            state = dict(psu.state)
+            await psu.disconnect_async()
+            server.close()
+            return identity, configured, state, voltage, current, block
+        
+        identity, configured, state, voltage, current, block = self._run(scenario())
+        
+        self.assertEqual(identity, "FAKE,DMM,0,1.0")
+        self.assertTrue(configured)
+        self.assertEqual(state, {"voltage": 5.0, "current": 0.5, "output": True})
+        self.assertEqual((voltage.value, current.value), (5.0, 0.1))
+        self.assertEqual(block, bytes(range(10)) * 100)
+    
+    def test_unanswered_query_times_out(self):
+        """A silent instrument raises TimeoutError without blocking the loop"""
+        async def scenario():
+            server, port = await self._serve()
+            interface = AsyncTCPInterface(self._tcp_config(port))
+            await interface.connect()
+            ticks = 0
+            
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+            
+            task = asyncio.ensure_future(ticker())
+            with self.assertRaises(TimeoutError):
+                await interface.query("SYST:ERR?", timeout=0.2)
+            task.cancel()
+            await interface.disconnect()
+            server.close()
+            return ticks
+        
+        self.assertGreater(self._run(scenario()), 10)
+    
+    @unittest.skipIf(sys.platform.startswith('win'), "pty not available")
+    def test_async_serial_interface(self):
+        """Serial responses are delivered through the event loop"""
+        import tty
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        
+        def responder():
+            request = b""
+            while not request.endswith(b"\n"):
+                request += os.read(master, 64)
+            os.write(master, b"+1.2345E+00\n")
+        
+        threading.Thread(target=responder, daemon=True).start()
+        
+        async def scenario():
+            interface = AsyncSerialInterface(ConnectionConfig(
+                connection_type=ConnectionType.SERIAL_RTU, address=os.ttyname(slave), timeout=2.0))
+            self.assertTrue(await interface.connect())
+            response = await interface.query("READ?")
+            await interface.disconnect()
+            return response
+        
+        try:
+            self.assertEqual(self._run(scenario()), "+1.2345E+00")
+        finally:
+            os.close(master)
+            os.close(slave)
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestSCPIEmulator(EmulatorTestCase):
+    """Test the drivers end to end against the emulated instruments"""
+    
+    def setUp(self):
+        """Start an emulated bench on loopback TCP ports"""
+        super().setUp()
+        self.bench = SimulatedBench(load_resistance=100.0)
+        # Readings integrate for 1 PLC (20 ms), which also lets PSU writes on the other connection land
+        self.dmm_emulator = DMMEmulator(self.bench, seed=1)
+        self.psu_emulator = PSUEmulator(self.bench, seed=1)
+        self.multimeter = Multimeter("DMM", self._tcp(self.dmm_emulator))
+        self.power_supply = PowerSupply("PSU", self._tcp(self.psu_emulator))
+        self.dmm_port = self.multimeter.interface.config.port
+        self.psu_port = self.power_supply.interface.config.port
+        self.assertTrue(self.multimeter.connect())
+        self.assertTrue(self.power_supply.connect())
+    
+    def test_supply_output_drives_dmm_reading(self):
+        """The DMM reads the PSU output across the load, current limited"""
+        self.assertIn("DMM-EMULATOR", self.multimeter.interface.send_command("*IDN?"))
+        self.assertTrue(self.multimeter.self_test())
+        self.assertAlmostEqual(self.multimeter.measure_voltage_dc(10.0).value, 0.0, places=4)
+        
+        self.assertTrue(self.power_supply.configure_output(5.0, 1.0, enable=True))
+        self.assertAlmostEqual(self.multimeter.measure_voltage_dc(10.0).value, 5.0, places=2)
+        self.assertAlmostEqual(self.multimeter.measure_current_dc().value, 0.05, places=4)
+        voltage, current = self.power_supply.measure_output()
+        self.assertAlmostEqual(voltage.value, 5.0, places=2)
+        self.assertAlmostEqual(current.value, 0.05, places=4)
+        
+        # 10 mA into 100 ohms limits the output to 1 V
+        self.assertTrue(self.power_supply.set_current_limit(0.01))
+        self.assertAlmostEqual(self.multimeter.measure_voltage_dc().value, 1.0, places=2)
+    
+    def test_buffered_acquisition(self):
+        """Binary and ASCII acquisitions return noisy samples around the true value"""
+        self.power_supply.configure_output(3.3, 1.0, enable=True)
+        
+        for binary in (True, False):
+            measurement = self.multimeter.acquire("VOLT:DC", count=20, binary=binary)
+            self.assertEqual(measurement.count, 20)
+            self.assertAlmostEqual(measurement.mean, 3.3, places=3)
+            self.assertGreater(measurement.stdev, 0)
+        
+        # A single reading after the binary acquisition is back in ASCII
+        self.assertAlmostEqual(self.multimeter.measure_voltage_dc().value, 3.3, places=2)
+        self.assertEqual(self.dmm_emulator.handle("SYST:ERR?"), b'+0,"No error"\n')
+    
+    def test_errors_are_queued(self):
+        """Unknown headers and bad arguments land in the error queue"""
+        self.assertIsNone(self.dmm_emulator.handle("BOGUS:CMD 1;VOLT:DC:NPLC fast"))
+        self.assertEqual(self.dmm_emulator.handle("SYST:ERR?;SYST:ERR?"),
+                         b'-113,"Undefined header";-104,"Data type error"\n')
+    
+    @unittest.skipUnless(hasattr(os, 'openpty'), "Pseudo terminals not available")
+    def test_pty_transport(self):
+        """A serial interface talks to the emulator through a pseudo terminal"""
+        emulator = DMMEmulator(self.bench, sample_time=0)
+        path = emulator.start_pty()
+        try:
+            interface = SerialInterface(ConnectionConfig(
+                connection_type=ConnectionType.SERIAL_RTU, address=path, baud_rate=115200, timeout=2.0))
+            multimeter = Multimeter("Serial DMM", interface)
+            self.assertTrue(multimeter.connect())
+            self.assertAlmostEqual(multimeter.measure_resistance().value, 100.0, places=1)
+            multimeter.disconnect()
+        finally:
+            emulator.stop()
+    
+    def test_voltage_sequence_end_to_end(self):
+        """A TestManager voltage sequence passes against the emulated bench"""
+        self.multimeter.disconnect()
+        self.power_supply.disconnect()
+        manager = TestManager(session_pool=SessionPool(idle_timeout=0.0))
+        configs = [
+            {'name': 'dmm', 'equipment_type': 'multimeter', 'connection_type': 'tcp_ip',
+             'address': '127.0.0.1', 'port': self.dmm_port},
+            {'name': 'psu', 'equipment_type': 'power_supply', 'connection_type': 'tcp_ip',
+             'address': '127.0.0.1', 'port': self.psu_port}
+        ]
+        self.assertEqual(manager.setup_hardware(configs), {'dmm': True, 'psu': True})
+        self.assertEqual(manager.connect_all_hardware(), {'dmm': True, 'psu': True})
+        
+        sequence = manager.create_voltage_test_sequence("Rails", [
+            {'voltage': voltage, 'min_limit': voltage * 0.99, 'max_limit': voltage * 1.01}
+            for voltage in (1.8, 3.3, 5.0)
+        ])
+        try:
+            self.assertTrue(manager.execute_test(sequence, "emulated"))
+            self.assertTrue(manager.execution_engine.wait_for_completion(10.0))
+        finally:
+            manager.disconnect_all_hardware()
+        
+        self.assertEqual([step.status for step in sequence.steps], [TestStepStatus.COMPLETED] * len(sequence.steps))
+        self.assertFalse(self.bench.output_enabled)
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestListSweep(EmulatorTestCase):
+    """Test hardware-timed list sweeps against the emulated bench"""
+    
+    def setUp(self):
+        """Start an emulated bench whose PSU trigger output drives the DMM trigger input"""
+        super().setUp()
+        self.bench = SimulatedBench(load_resistance=100.0)
+        self.dmm_emulator = DMMEmulator(self.bench, seed=1)
+        self.psu_emulator = PSUEmulator(self.bench, seed=1)
+        self.multimeter = Multimeter("dmm", self._tcp(self.dmm_emulator))
+        self.power_supply = PowerSupply("psu", self._tcp(self.psu_emulator))
+        self.assertTrue(self.multimeter.connect())
+        self.assertTrue(self.power_supply.connect())
+    
+    def test_sweep_reads_every_point_in_one_fetch(self):
+        """50 points cost a handful of round trips and come back mapped to their limits"""
+        points = [SweepPoint(0.1 * i, min_limit=0.1 * i * 0.98 - 0.01, max_limit=0.1 * i * 1.02 + 0.01)
+                  for i in range(1, 51)]
+        # Point 10 (1.0 V) is expected at 2 V, so it must be reported as the only failure
+        points[9].min_limit, points[9].max_limit = 1.9, 2.1
+        
+        buffer = run_list_sweep(self.power_supply, self.multimeter, points, dwell=0.005,
+                                range_value=10.0, nplc=0.02)
+        
+        self.assertEqual(len(buffer), 50)
+        np.testing.assert_allclose(buffer.values, [point.voltage for point in points], atol=0.01)
+        self.assertEqual(buffer.failures().tolist(), [9])
+        self.assertEqual(buffer[0].parameter, "DC_VOLTAGE")
+        self.assertEqual(self.multimeter.interface.metrics.get_stats()["commands"], 2)
+        self.assertEqual(self.power_supply.interface.metrics.get_stats()["commands"], 2)
+        self.assertEqual(self.dmm_emulator.handle("SYST:ERR?"), b'+0,"No error"\n')
+        self.assertEqual(self.psu_emulator.handle("SYST:ERR?"), b'+0,"No error"\n')
+    
+    def test_fixed_setpoints_after_list(self):
+        """The next fixed setpoint takes the supply out of list mode"""
+        run_list_sweep(self.power_supply, self.multimeter, [SweepPoint(1.0), SweepPoint(2.0)],
+                       dwell=0.005, range_value=10.0, nplc=0.02)
+        
+        self.assertTrue(self.power_supply.configure_output(3.0, 1.0, enable=True))
+        self.assertEqual(self.power_supply.interface.send_command("VOLT:MODE?"), "FIX")
+        self.assertAlmostEqual(self.multimeter.measure_voltage_dc(10.0).value, 3.0, places=2)
+    
+    def test_sweep_sequence(self):
+        """TestManager runs a voltage sweep sequence as one list sweep step"""
+        manager = TestManager()
+        manager.hardware_manager.add_equipment(self.multimeter)
+        manager.hardware_manager.add_equipment(self.power_supply)
+        points = [{'voltage': 1.0 + i, 'min_limit': 0.95 + i, 'max_limit': 1.05 + i} for i in range(5)]
+        sequence = manager.create_voltage_sweep_sequence("Sweep", points, dwell=0.005)
+        
+        self.assertTrue(manager.execute_test(sequence, "sweep"))
+        self.assertTrue(manager.execution_engine.wait_for_completion(10.0))
+        
+        sweep_step = sequence.steps[2]
+        self.assertEqual(sweep_step.status, TestStepStatus.COMPLETED, sweep_step.error_message)
+        self.assertEqual(len(sweep_step.measurements), 5)
+        self.assertTrue(all(measurement.is_within_limits() for measurement in sweep_step.measurements))
+    
+    def test_rejects_partial_current_limits(self):
+        """Current limits are given for all points or none"""
+        with self.assertRaises(ValueError):
+            run_list_sweep(self.power_supply, self.multimeter, [SweepPoint(1.0, 0.1), SweepPoint(2.0)])
+    
+    def test_failed_list_disarms_dmm(self):
+        """A list that cannot be loaded aborts the armed acquisition"""
+        psu = Mock(spec=PowerSupply)
+        psu.name = "psu"
+        psu.load_list.return_value = False
+        dmm = Mock(spec=Multimeter)
+        dmm.interface = self.multimeter.interface
+        
+        with self.assertRaises(RuntimeError):
+            run_list_sweep(psu, dmm, [SweepPoint(1.0)])
+        dmm.arm.assert_called_once_with("VOLT:DC", 1, None, None, "EXT", None)
+        dmm.abort.assert_called_once()
+        psu.start_list.assert_not_called()
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestSettling(EmulatorTestCase):
+    """Test adaptive settling and learned settling times"""
+    
+    def test_profile_learns_bound(self):
+        """The bound follows observed settling times and backs off when they are exceeded"""
+        profile = SettlingProfile(initial_wait=2.0, min_wait=0.01)
+        for _ in range(20):
+            profile.observe(0.1)
+        self.assertAlmostEqual(profile.bound, 0.1, delta=0.05)
+        
+        profile.observe(profile.bound, settled=False)
+        self.assertGreater(profile.bound, 0.15)
+        self.assertEqual(profile.estimator.timeouts, 1)
+    
+    def test_model_persists_profiles(self):
+        """Learned bounds survive a restart"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "settling.json")
+            model = SettlingModel(path)
+            self.assertFalse(model.save())  # Nothing learned yet
+            for _ in range(10):
+                model.observe("dmm", "reset", 0.2)
+            self.assertTrue(model.save())
+            
+            restored = SettlingModel(path)
+            self.assertAlmostEqual(restored.bound("dmm", "reset"), model.bound("dmm", "reset"))
+            self.assertEqual(restored.get_stats()["dmm"]["reset"]["samples"], 10)
+            self.assertEqual(restored.bound("psu", "reset"), 2.0)
+    
+    def test_read_until_stable(self):
+        """Readings are repeated until consecutive ones agree, bounded by max_wait"""
+        readings = iter([1.0, 3.0, 4.5, 4.9, 5.0, 5.0, 5.0, 7.0])
+        value, _, settled = read_until_stable(lambda: next(readings), 0.01, 1.0, consecutive=3)
+        self.assertTrue(settled)
+        self.assertEqual(value, 5.0)
+        
+        value, elapsed, settled = read_until_stable(time.monotonic, 1e-9, 0.05)
+        self.assertFalse(settled)
+        self.assertGreaterEqual(elapsed, 0.05)
+    
+    def test_settling_against_emulator(self):
+        """Reset waits only as long as the instrument needs and the supply output is re-read until settled"""
+        bench = SimulatedBench(load_resistance=100.0, time_constant=0.05)
+        manager = HardwareManager()
+        multimeter = Multimeter("dmm", self._tcp(DMMEmulator(bench, sample_time=0)))
+        power_supply = PowerSupply("psu", self._tcp(PSUEmulator(bench, noise=1e-6)))
+        manager.add_equipment(multimeter)
+        manager.add_equipment(power_supply)
+            
+        start = time.time()
+        self.assertTrue(multimeter.initialize())
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(manager.settling.get_stats()["dmm"]["reset"]["samples"], 1)
+        
+        self.assertTrue(power_supply.connect())
+        self.assertTrue(power_supply.configure_output(5.0, 1.0, enable=True))
+        self.assertLess(power_supply.measure_output_voltage().value, 4.9)
+        self.assertAlmostEqual(power_supply.wait_for_output(0.005).value, 5.0, delta=0.02)
+        self.assertAlmostEqual(multimeter.measure_until_stable("VOLT:DC", 0.005).value, 5.0, delta=0.02)
+        self.assertIn("output", manager.get_command_metrics()["psu"]["settling"])
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestIOWorker(EmulatorTestCase):
+    """Test the per-interface I/O worker"""
+    
+    def setUp(self):
+        super().setUp()
+        self.worker = IOWorker("test", queue_timeout=5.0)
+        self.gate = threading.Event()
+    
+    def tearDown(self):
+        self.gate.set()
+        super().tearDown()
+    
+    def _block_worker(self):
+        """Keep the worker busy until the gate opens"""
+        started = threading.Event()
+        self.worker.submit(lambda: started.set() or self.gate.wait(5.0))
+        self.assertTrue(started.wait(1.0))
+    
+    def test_safety_commands_jump_the_queue(self):
+        """Queued requests run in priority order once the current one finishes"""
+        self._block_worker()
+        order = []
+        futures = [self.worker.submit(order.append, command, priority=self.worker.priority(command))
+                   for command in ("VOLT 5", "MEAS:VOLT?", "VOLT 1;OUTP OFF")]
+        self.gate.set()
+        for future in futures:
+            future.result(1.0)
+        self.assertEqual(order, ["VOLT 1;OUTP OFF", "VOLT 5", "MEAS:VOLT?"])
+    
+    def test_priority_of_commands(self):
+        self.assertEqual(self.worker.priority(":OUTP 0"), PRIORITY_SAFETY)
+        self.assertEqual(self.worker.priority("abor"), PRIORITY_SAFETY)
+        self.assertEqual(self.worker.priority("OUTP ON"), PRIORITY_NORMAL)
+        self.assertEqual(self.worker.priority("*IDN?"), PRIORITY_NORMAL)
+    
+    def test_request_withdrawn_after_queue_timeout(self):
+        """A request that cannot start in time is withdrawn and never executed"""
+        self.worker.queue_timeout = 0.05
+        self._block_worker()
+        executed = []
+        with self.assertRaises(TimeoutError):
+            self.worker.call(executed.append, 1)
+        self.gate.set()
+        self.worker.call(executed.append, 2)
+        self.assertEqual(executed, [2])
+        self.assertEqual(self.worker.get_stats()["withdrawn"], 1)
+    
+    def test_calls_from_worker_run_inline(self):
+        """Reconnect callbacks issuing commands from the worker do not deadlock"""
+        result = self.worker.call(lambda: self.worker.call(lambda: threading.current_thread().name))
+        self.assertEqual(result, "io-test")
+    
+    def test_interface_shared_between_threads(self):
+        """Every thread gets the response to its own query"""
+        interface = self._tcp(DMMEmulator(sample_time=0))
+        self.assertTrue(interface.connect())
+        mismatches = []
+        
+        def query(thread_index):
+            for index in range(50):
+                count = thread_index * 1000 + index + 1
+                response = interface.send_command(f"TRIG:COUN {count};TRIG:COUN?")
+                if response != str(count):
+                    mismatches.append((count, response))
+        
+        threads = [threading.Thread(target=query, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30.0)
+        self.assertEqual(mismatches, [])
+        self.assertEqual(interface.get_queue_stats()["processed"], 401)  # Including connect
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestSessionPool(EmulatorTestCase):
+    """Test the shared instrument session pool"""
+    
+    def setUp(self):
+        super().setUp()
+        self.emulator = DMMEmulator(sample_time=0)
+        self.port = self._start(self.emulator)
+        self.pool = SessionPool(idle_timeout=60.0)
+    
+    def tearDown(self):
+        self.pool.close_all()
+        super().tearDown()
+    
+    def _config(self, address="127.0.0.1"):
+        return ConnectionConfig(connection_type=ConnectionType.TCP_IP, address=address, port=self.port, timeout=2.0)
+    
+    def test_same_address_shares_one_session(self):
+        """Users of one address get the same interface over a single connection"""
+        first = self.pool.acquire(self._config())
+        second = self.pool.acquire(self._config(" 127.0.0.1 "))
+        self.assertIs(first, second)
+        self.assertTrue(Multimeter("dmm", first).connect())
+        self.assertEqual(first.send_command("*IDN?").split(",")[0], second.send_command("*IDN?").split(",")[0])
+        self.assertEqual(len(self.emulator._clients), 1)
+        self.assertEqual(self.pool.get_stats()["sessions"][0]["references"], 2)
+    
+    def test_find_takes_no_reference(self):
+        """find() reports a pooled session without creating or holding one"""
+        self.assertIsNone(self.pool.find(self._config()))
+        self.assertEqual(self.pool.get_stats()["sessions"], [])
+        interface = self.pool.acquire(self._config())
+        self.assertIs(self.pool.find(self._config(" 127.0.0.1 ")), interface)
+        self.assertEqual(self.pool.get_stats()["sessions"][0]["references"], 1)
+    
+    def test_idle_session_evicted_after_last_release(self):
+        """A session stays open while referenced and for idle_timeout after the last release"""
+        interface = self.pool.acquire(self._config())
+        self.pool.acquire(self._config())
+        self.pool.release(interface)
+        self.assertEqual(self.pool.evict_idle(0.0), 0)
+        self.pool.release(interface)
+        self.assertEqual(self.pool.evict_idle(), 0)
+        self.assertTrue(interface.is_connected())
+        self.assertEqual(self.pool.evict_idle(0.0), 1)
+        self.assertFalse(interface.is_connected())
+        self.assertIsNot(self.pool.acquire(self._config()), interface)
+    
+    def test_unhealthy_session_reconnected(self):
+        pool = SessionPool(health_check_interval=0.0, health_check=lambda interface: False)
+        try:
+            interface = pool.acquire(self._config())
+            pool.acquire(self._config())
+            self.assertEqual(interface.reconnects, 1)
+            self.assertEqual(interface.send_command("TRIG:COUN 3;TRIG:COUN?"), "3")
+        finally:
+            pool.close_all()
+    
+    def test_failed_open_takes_no_reference(self):
+        self.emulator.stop()
+        with self.assertRaises(ConnectionError):
+            self.pool.acquire(self._config())
+        self.assertEqual(self.pool.get_stats()["sessions"][0]["references"], 0)
+    
+    def test_hardware_manager_releases_pooled_sessions(self):
+        """Disconnecting a manager leaves the pooled session open for the next user"""
+        manager = HardwareManager(session_pool=self.pool)
+        interface = self.pool.get(self._config())
+        manager.add_equipment(Multimeter("dmm", interface))
+        self.assertEqual(manager.connect_all(), {"dmm": True})
+        self.assertEqual(self.pool.get_stats()["sessions"][0]["references"], 1)
+        
+        self.assertEqual(manager.disconnect_all(), {"dmm": True})
+        self.assertTrue(interface.is_connected())
+        self.assertEqual(self.pool.get_stats()["sessions"][0]["references"], 0)
+        self.assertEqual(len(self.emulator._clients), 1)
+
+    def test_setup_again_replaces_reconnect_callback(self):
+        """Only the newest equipment on a shared session restores its configuration on reconnect"""
+        manager = TestManager(session_pool=self.pool)
+        config = {'name': "dmm", 'equipment_type': "multimeter", 'connection_type': "tcp_ip",
+                  'address': "127.0.0.1", 'port': self.port, 'timeout': 2.0}
+        for _ in range(3):
+            self.assertEqual(manager.setup_hardware([config]), {"dmm": True})
+            self.assertEqual(manager.connect_all_hardware(), {"dmm": True})
+        
+        dmm = manager.hardware_manager.get_equipment("dmm")
+        self.assertEqual(list(dmm.interface.reconnect_callbacks.values()), [dmm._restore_state])
+        self.assertEqual(self.pool.get_stats()["sessions"][0]["references"], 1)
+        manager.disconnect_all_hardware()
+        self.assertEqual(dmm.interface.reconnect_callbacks, {})
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestResourceManager(unittest.TestCase):
+    """Test equipment reservations for concurrent executions"""
+    
+    def setUp(self):
+        self.resources = ResourceManager()
+    
+    def _reserve_in_thread(self, resources, holder, granted):
+        """Reserve from another thread; granted collects holders in grant order"""
+        def reserve():
+            reservation = self.resources.reserve(resources, holder, timeout=5.0)
+            granted.append(holder)
+            reservation.release()
+        waiting = len(self.resources._waiting)
+        thread = threading.Thread(target=reserve)
+        thread.start()
+        deadline = time.monotonic() + 1.0
+        while len(self.resources._waiting) == waiting and thread.is_alive():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.001)
+        return thread
+    
+    def test_all_or_nothing(self):
+        """A request waiting for one instrument holds none of the others"""
+        held = self.resources.reserve(["psu"], "A")
+        granted = []
+        thread = self._reserve_in_thread(["psu", "dmm"], "B", granted)
+        self.assertEqual(self.resources.holders("dmm"), [])
+        held.release()
+        thread.join(1.0)
+        self.assertEqual(granted, ["B"])
+    
+    def test_waiters_served_in_arrival_order(self):
+        held = self.resources.reserve(["psu"], "A")
+        granted = []
+        first = self._reserve_in_thread(["psu"], "B", granted)
+        second = self._reserve_in_thread(["psu", "dmm"], "C", granted)
+        # D does not conflict with anyone holding, but must not overtake C waiting for dmm
+        third = self._reserve_in_thread(["dmm"], "D", granted)
+        self.assertEqual(granted, [])
+        held.release()
+        for thread in (first, second, third):
+            thread.join(1.0)
+        self.assertEqual(granted, ["B", "C", "D"])
+    
+    def test_channels(self):
+        """Channels of one instrument are reserved independently; the whole instrument overlaps all of them"""
+        first = self.resources.reserve(["psu:1"], "A")
+        second = self.resources.reserve(["psu:2"], "B", timeout=0.0)
+        with self.assertRaises(ReservationTimeout):
+            self.resources.reserve(["psu"], "C", timeout=0.01)
+        first.release()
+        second.release()
+        with self.resources.reserve(["psu"], "C", timeout=0.0):
+            self.assertEqual(self.resources.holders("psu"), ["C"])
+        
+        stats = self.resources.get_stats()["psu"]
+        self.assertEqual(stats["reservations"], 3)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual(stats["holders"], [])
+        self.assertGreater(stats["utilization"], 0.0)
+    
+    def test_concurrent_sequences_do_not_share_instruments(self):
+        """Sequences of two DUTs run one after the other on a shared instrument"""
+        active, overlaps = [], []
+        
+        def reset():
+            active.append(1)
+            overlaps.append(len(active))
+            time.sleep(0.02)
+            active.pop()
+            return True
+        
+        manager = TestManager(session_pool=SessionPool())
+        psu = Mock(spec=PowerSupply)
+        psu.name = "psu"
+        psu.is_connected.return_value = True
+        psu.reset.side_effect = reset
+        manager.hardware_manager.add_equipment(psu)
+        
+        for test_id in ("DUT1", "DUT2"):
+            sequence = TestSequenceBuilder(test_id).add_setup_step("Reset", "psu", "reset") \
+                .add_cleanup_step("Reset again", "psu", "reset").build()
+            self.assertTrue(manager.execute_test(sequence, test_id))
+        for test_id in ("DUT1", "DUT2"):
+            self.assertTrue(manager.wait_for_test(test_id, 5.0))
+        
+        self.assertEqual(overlaps, [1, 1, 1, 1])
+        self.assertEqual(manager.get_reservation_stats()["psu"]["reservations"], 2)
+        self.assertEqual(manager.engines, {})
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestWaveform(unittest.TestCase):
+    """Test waveform decoding and measurements"""
+    
+    def _square(self, frequency=1e3, points=5000, x_increment=1e-6, rise_samples=10):
+        """Synthetic 0 V / 2.55 V square wave as BYTE codes (10 mV per code)"""
+        phase = (np.arange(points) * x_increment * frequency) % 1.0
+        edge = rise_samples * x_increment * frequency
+        volts = np.clip(np.minimum(phase / edge, (0.5 + edge - phase) / edge), 0.0, 1.0) * 2.55 if edge else \
+            np.where(phase < 0.5, 2.55, 0.0)
+        codes = np.round(volts / 0.01).astype(np.uint8)
+        return Waveform(codes, x_increment, 0.0, 0.01, 0.0, 0.0)
+    
+    def test_from_block(self):
+        """BYTE and WORD blocks are scaled with the preamble"""
+        waveform = Waveform.from_block("0,0,3,1,+1.0E-06,-1.0E-03,0,+2.0E-02,+1.0E+00,128", bytes([128, 178, 78]))
+        np.testing.assert_allclose(waveform.volts, [1.0, 2.0, 0.0])
+        np.testing.assert_allclose(waveform.times, [-1e-3, -1e-3 + 1e-6, -1e-3 + 2e-6])
+        
+        waveform = Waveform.from_block("1,0,2,1,+1.0E-06,0,0,+1.0E-03,0,32768", b"\x80\x00\x81\x00")
+        np.testing.assert_allclose(waveform.volts, [0.0, 0.256])
+        with self.assertRaises(ValueError):
+            Waveform.from_block("0,0,4,1,1,0,0,1,0,0", bytes(3))
+    
+    def test_measurements(self):
+        waveform = self._square()
+        self.assertAlmostEqual(waveform.vpp(), 2.55)
+        self.assertAlmostEqual(waveform.mean(), 2.55 / 2, delta=0.02)
+        self.assertAlmostEqual(waveform.rms(), 2.55 / np.sqrt(2), delta=0.02)
+        self.assertAlmostEqual(waveform.frequency(), 1e3, delta=1.0)
+        # Linear 0 to 100 % edges over 10 samples
+        self.assertAlmostEqual(waveform.rise_time(), 8e-6, delta=0.5e-6)
+        self.assertAlmostEqual(waveform.fall_time(), 8e-6, delta=0.5e-6)
+        self.assertTrue(np.isnan(Waveform(np.full(100, 7, dtype=np.uint8), 1e-6, 0.0, 0.01, 0.0, 0.0).frequency()))
+    
+    def test_decimate_keeps_extremes(self):
+        codes = np.full(10000, 100, dtype=np.uint8)
+        codes[4321] = 255
+        times, minimum, maximum = Waveform(codes, 1e-6, 0.0, 0.01, 0.0, 0.0).decimate(100)
+        self.assertEqual(len(times), 100)
+        self.assertAlmostEqual(maximum.max(), 2.55)
+        self.assertAlmostEqual(minimum.min(), 1.0)
+    
+    def test_compact_storage(self):
+        waveform = self._square(points=1000)
+        data = waveform.to_bytes()
+        self.assertLess(len(data), 1100)
+        restored = Waveform.from_bytes(data)
+        np.testing.assert_array_equal(restored.codes, waveform.codes)
+        self.assertEqual((restored.x_increment, restored.source), (waveform.x_increment, waveform.source))
+        self.assertEqual(Waveform.from_bytes(base64.b64decode(waveform.to_dict()["data"])).vpp(), waveform.vpp())
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestOscilloscope(EmulatorTestCase):
+    """Test the oscilloscope driver against the emulated scope"""
+    
+    def setUp(self):
+        super().setUp()
+        self.emulator = ScopeEmulator(signals={1: square_wave(1e3, 0.0, 3.3, 20e-6), 2: sine_wave(2.5e3, 1.0, 0.5)},
+                                      seed=1)
+        self.scope = Oscilloscope("scope", self._tcp(self.emulator))
+        self.assertTrue(self.scope.initialize())
+        self.assertTrue(self.scope.configure_channel(1, 0.5, 1.65))
+        self.assertTrue(self.scope.configure_channel(2, 0.5, 0.5))
+        self.assertTrue(self.scope.configure_timebase(0.5e-3))
+        self.assertTrue(self.scope.configure_trigger(1, 1.65))
+    
+    def test_capture_and_measure(self):
+        """Two channels are captured in one acquisition and measured"""
+        waveforms = self.scope.capture([1, 2], points=2000)
+        self.assertEqual(sorted(waveforms), [1, 2])
+        self.assertEqual(len(waveforms[1]), 2000)
+        self.assertEqual(waveforms[1].codes.dtype, np.uint8)
+        
+        measurements = {m.parameter: m.value for m in self.scope.measure(waveforms[1], ["vpp", "frequency", "rise_time"])}
+        self.assertAlmostEqual(measurements["CHAN1_VPP"], 3.3, delta=0.05)
+        self.assertAlmostEqual(measurements["CHAN1_FREQUENCY"], 1e3, delta=1.0)
+        self.assertAlmostEqual(measurements["CHAN1_RISE_TIME"], 16e-6, delta=1e-6)
+        self.assertAlmostEqual(waveforms[2].frequency(), 2.5e3, delta=2.5)
+        self.assertAlmostEqual(waveforms[2].mean(), 0.5, delta=0.05)
+        
+        # The record is placed on the trigger: time 0 is a rising crossing of 1.65 V
+        index = int(round(-waveforms[1].x_origin / waveforms[1].x_increment))
+        self.assertLess(waveforms[1].volts[index - 2], 1.65)
+        self.assertGreater(waveforms[1].volts[index + 2], 1.65)
+    
+    def test_word_transfer(self):
+        waveform = self.scope.capture(1, points=1000, word=True)[1]
+        self.assertEqual(waveform.codes.dtype, np.uint16)
+        self.assertAlmostEqual(waveform.vpp(), 3.3, delta=0.01)
+    
+    def test_unchanged_setup_not_resent(self):
+        """A repeated capture sends only the acquisition, not the waveform setup"""
+        self.scope.capture(1)
+        received = self.emulator.commands_received
+        self.scope.capture(1)
+        # DIG, WAV:PRE? and WAV:DATA?
+        self.assertEqual(self.emulator.commands_received - received, 3)
+    
+    def test_capture_step(self):
+        """A capture step stores the waveform and checks the measurement limits"""
+        manager = HardwareManager()
+        manager.add_equipment(self.scope)
+        engine = TestExecutionEngine(manager)
+        step = TestStep("Clock", TestStepType.MEASUREMENT, "scope", "capture_waveform",
+                        {'channel': 1, 'measurements': ['frequency', 'vpp'],
+                         'limits': {'frequency': {'min_limit': 990, 'max_limit': 1010}, 'vpp': {'max_limit': 3.0}}})
+        engine._execute_step(step)
+        
+        self.assertEqual(step.status, TestStepStatus.FAILED)
+        self.assertIn("CHAN1_VPP", step.error_message)
+        self.assertNotIn("CHAN1_FREQUENCY", step.error_message)
+        self.assertEqual(len(step.waveforms), 1)
+        self.assertEqual(step.to_dict()['waveforms'][0]['points'], 1000)
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestFrequencyAnalysis(EmulatorTestCase):
+    """Test FFT frequency and THD estimation"""
+    
+    def test_interpolated_frequency(self):
+        """Tones between bins are resolved to a small fraction of the 15.6 Hz bin width"""
+        rng = np.random.default_rng(1)
+        for frequency in (1000.0, 1003.7, 1007.8, 2345.6):
+            samples = synthesize_tone(frequency, 16000, 1024, 1.65, noise=0.005, phase=rng.uniform(0, 6), rng=rng)
+            analysis = analyze_tone(samples, 16000)
+            self.assertAlmostEqual(analysis.frequency, frequency, delta=0.05)
+            self.assertAlmostEqual(analysis.amplitude, 1.65, delta=0.01)
+    
+    def test_thd(self):
+        samples = synthesize_tone(1234.5, 48000, 4096, harmonics={2: 0.01, 3: 0.005})
+        analysis = analyze_tone(samples, 48000)
+        self.assertAlmostEqual(analysis.thd_percent, np.hypot(1.0, 0.5), delta=0.01)
+        self.assertAlmostEqual(analysis.harmonics[0], 0.01, delta=1e-4)
+        self.assertEqual(len(analysis.harmonics), 4)
+        self.assertAlmostEqual(analyze_tone(synthesize_tone(1234.5, 48000, 4096), 48000).thd, 0.0, delta=1e-5)
+    
+    def test_large_record(self):
+        """A million samples are analyzed in well under a second"""
+        samples = synthesize_tone(12345.678, 1e6, 1_000_000, noise=0.01, rng=np.random.default_rng(2))
+        start = time.perf_counter()
+        analysis = analyze_tone(samples, 1e6)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertAlmostEqual(analysis.frequency, 12345.678, delta=0.01)
+    
+    def test_check_frequency(self):
+        analysis = analyze_tone(synthesize_tone(1008.0, 20000, 1000, harmonics={3: 0.05}), 20000)
+        result = check_frequency(analysis, 1000, 10)
+        self.assertEqual(result['status'], 'PASS')
+        self.assertEqual((result['min_acceptable'], result['max_acceptable']), (990, 1010))
+        self.assertEqual(check_frequency(analysis, 1000, 5)['status'], 'FAIL')
+        self.assertEqual(check_frequency(analysis, 1000, 10, max_thd_percent=1.0)['status'], 'FAIL')
+        unmeasured = frequency_error(1000, 10, "No instrument")
+        self.assertEqual((unmeasured['status'], unmeasured['measured']), ('ERROR', None))
+        with self.assertRaises(ValueError):
+            analyze_tone(np.ones(100), 1000)
+    
+    def test_scope_record(self):
+        scope = Oscilloscope("scope", self._tcp(ScopeEmulator(signals={1: sine_wave(2.5e3, 1.0, 0.5)}, seed=1)))
+        self.assertTrue(scope.initialize())
+        self.assertTrue(scope.configure_channel(1, 0.5, 0.5))
+        self.assertTrue(scope.configure_timebase(2e-3))
+        waveform = scope.capture(1, points=10000)[1]
+        measurements = {m.parameter: m.value for m in scope.measure(waveform, ["fft_frequency", "thd"])}
+        self.assertAlmostEqual(measurements["CHAN1_FFT_FREQUENCY"], 2.5e3, delta=0.5)
+        self.assertLess(measurements["CHAN1_THD"], 1.0)
+    
+    def test_dmm_digitize_step(self):
+        """A multimeter frequency step digitizes the input at the sample timer rate"""
+        emulator = DMMEmulator(signal=sine_wave(437.0, 2.0), seed=1)
+        dmm = Multimeter("dmm", self._tcp(emulator))
+        manager = HardwareManager()
+        manager.add_equipment(dmm)
+        self.assertTrue(dmm.initialize())
+        step = TestStep("Clock", TestStepType.MEASUREMENT, "dmm", "measure_frequency",
+                        {'count': 1000, 'sample_interval': 1e-4, 'min_limit': 430, 'max_limit': 440})
+        TestExecutionEngine(manager)._execute_step(step)
+            
+        self.assertEqual(step.status, TestStepStatus.COMPLETED, step.error_message)
+        self.assertAlmostEqual(step.measurements[0].value, 437.0, delta=0.1)
+        self.assertEqual(emulator.sample_source, "TIM")
+        self.assertEqual(emulator.sample_interval, 1e-4)
+            
+        # A normal reading afterwards switches back to immediate sampling
+        dmm.measure_voltage_dc()
+        self.assertEqual(emulator.sample_source, "IMM")
+
+    def test_frequency_check_busy(self):
+        """A frequency check gives up after its reservation timeout while an execution holds the instrument"""
+        dmm = Multimeter("dmm", self._tcp(DMMEmulator(signal=sine_wave(437.0, 2.0), seed=1)))
+        manager = TestManager(session_pool=SessionPool())
+        manager.hardware_manager.add_equipment(dmm)
+        try:
+            self.assertEqual(manager.connect_all_hardware(), {"dmm": True})
+            with manager.hardware_manager.reservations.reserve(["dmm"], "execution"):
+                start = time.monotonic()
+                with self.assertRaises(ReservationTimeout):
+                    manager.measure_frequency(437.0, reservation_timeout=0.1)
+                self.assertLess(time.monotonic() - start, 1.0)
+            self.assertAlmostEqual(manager.measure_frequency(437.0, reservation_timeout=0.1).frequency, 437.0,
+                                   delta=0.5)
+        finally:
+            manager.disconnect_all_hardware()
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestRelayBoard(EmulatorTestCase):
+    """Test the SCPI relay board driver against the emulated multiplexer"""
+    
+    def setUp(self):
+        super().setUp()
+        self.emulator = SwitchEmulator()
+        self.board = RelayBoard("mux", self._tcp(self.emulator), list(range(101, 121)))
+        self.assertTrue(self.board.initialize())
+        self.emulator.operations.clear()
+    
+    def _sync(self):
+        """Wait until the emulator has executed every command sent (switching commands are not answered)"""
+        self.assertEqual(self.board.interface.send_command("*OPC?"), "1")
+    
+    def test_switching_is_one_message(self):
+        """Any number of channels move in one message, opening before closing"""
+        self.assertTrue(self.board.set_channels([101, 102, 103, 110]))
+        with patch.object(self.board.interface, 'send_command', wraps=self.board.interface.send_command) as send:
+            self.assertTrue(self.board.set_channels([103, 104, 105, 106]))
+        
+        send.assert_called_once_with("ROUT:OPEN (@101:102,110);:ROUT:CLOS (@104:106)", None)
+        self._sync()
+        self.assertEqual(self.emulator.operations[-2:], [("OPEN", [101, 102, 110]), ("CLOS", [104, 105, 106])])
+        self.assertEqual(self.emulator.closed, {103, 104, 105, 106})
+        self.assertEqual(self.board.closed_channels, [103, 104, 105, 106])
+    
+    def test_no_op_switching_skipped(self):
+        self.assertTrue(self.board.close([101, 102]))
+        self._sync()
+        received = self.emulator.commands_received
+        self.assertTrue(self.board.close([102]))
+        self.assertTrue(self.board.open([120]))
+        self._sync()
+        self.assertEqual(self.emulator.commands_received, received + 1)
+        self.assertEqual(self.board.get_switch_stats()["skipped"], 2)
+        self.assertEqual(self.board.get_switch_stats()["cycles"][101], 1)
+    
+    def test_unknown_state_read_back(self):
+        """After the relay state is lost the board is read back and only the change is sent"""
+        self.emulator.closed = {105}
+        self.board.invalidate_state()
+        self.assertTrue(self.board.close([106]))
+        self._sync()
+        self.assertEqual(self.emulator.operations, [("CLOS", [106])])
+        self.assertEqual(self.board.closed_channels, [105, 106])
+        with self.assertRaises(ValueError):
+            self.board.mask([99])
+    
+    def test_relay_steps(self):
+        manager = HardwareManager()
+        manager.add_equipment(self.board)
+        engine = TestExecutionEngine(manager)
+        for action, params in (("set_channels", {'channels': [101, 111]}), ("open_channels", {'channels': [101]}),
+                               ("open_all", {})):
+            step = TestStep(action, TestStepType.SETUP, "mux", action, params)
+            engine._execute_step(step)
+            self.assertEqual(step.status, TestStepStatus.COMPLETED, step.error_message)
+        self._sync()
+        self.assertEqual(self.emulator.operations, [("CLOS", [101, 111]), ("OPEN", [101]), ("OPEN", [111])])
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestICTEngine(EmulatorTestCase):
+    """Test the ICT engine against the emulated in-circuit tester"""
+    
+    def setUp(self):
+        super().setUp()
+        # 2000 points: resistors on 1-1200, capacitors on 1201-1800, diodes on 1801-2000
+        self.records = [{'name': f"R{index}", 'kind': "R", 'channel': index, 'nominal': 1000.0, 'tolerance': 5,
+                         'range': 10000} for index in range(1, 1201)]
+        self.records += [{'name': f"C{index}", 'kind': "C", 'channel': index, 'nominal': 1e-7,
+                          'tolerance': 10} for index in range(1201, 1801)]
+        self.records += [{'name': f"D{index}", 'kind': "D", 'channel': index, 'min_limit': 0.5,
+                          'max_limit': 0.8} for index in range(1801, 2001)]
+        board = {index: 1000.0 for index in range(1, 1201)}
+        board.update({index: 1e-7 for index in range(1201, 1801)})
+        board.update({index: 0.65 for index in range(1801, 2001)})
+        board[17] = 1200.0  # Wrong resistor fitted
+        del board[1500]  # Missing capacitor
+        self.emulator = ICTEmulator(board, noise=1e-4, seed=7)
+        self.tester = ICTTester("ict", self._tcp(self.emulator), max_scan=500)
+        self.assertTrue(self.tester.initialize())
+    
+    def test_plan_groups_by_function_and_range(self):
+        table = ICTTestTable.from_records(self.records)
+        batches = table.plan(500)
+        self.assertEqual([(batch.function, batch.range_value, batch.channels.size) for batch in batches],
+                         [("RES", 10000.0, 500), ("RES", 10000.0, 500), ("RES", 10000.0, 200),
+                          ("CAP", None, 500), ("CAP", None, 100), ("DIOD", None, 200)])
+        self.assertTrue(all((np.diff(batch.channels) > 0).all() for batch in batches))
+        self.assertEqual(ICTTester.scan_list(np.array([1, 2, 3, 7, 9, 10])), "(@1:3,7,9:10)")
+        self.assertAlmostEqual(table.min_limits[0], 950.0)
+        self.assertAlmostEqual(table.max_limits[1200], 1.1e-7)
+        with self.assertRaises(ValueError):
+            ICTTestTable.from_records(self.records + [{'name': "X1", 'kind': "R", 'channel': 5, 'nominal': 1.0}])
+    
+    def test_board_scanned_in_batches(self):
+        """2000 points take one message per scan list and one limit evaluation"""
+        engine = ICTEngine(self.tester, ICTTestTable.from_records(self.records))
+        received = self.emulator.commands_received
+        result = engine.run()
+        
+        self.assertEqual(self.emulator.scans, 6)
+        self.assertLessEqual(self.emulator.commands_received - received, 6 * 3 + 1)
+        self.assertEqual(len(result), 2000)
+        self.assertLess(result.elapsed, 5.0)
+        self.assertEqual(result.table.names[result.failures()].tolist(), ["R17", "C1500"])
+        failed = result.failed_points()
+        self.assertAlmostEqual(failed[0]['value'], 1200.0, delta=1.0)
+        self.assertEqual(failed[1]['value'], 9.9e37)
+        
+        buffer = result.to_buffer()
+        self.assertEqual(len(buffer), 2000)
+        self.assertEqual(buffer.failures().size, 2)
+        self.assertEqual(int(buffer.select("DIODE_VOLTAGE").sum()), 200)
+        data = result.to_dict()
+        self.assertEqual(set(data['calibration_version']), {None})
+        self.assertEqual(data['failed'], 2)
+        self.assertEqual(data['kind'][1200], "C")
+    
+    def test_calibration_applied_before_limits(self):
+        """Every reading records the version of the table for its own function and range"""
+        self.tester.calibration = CalibrationStore([CalibrationTable("ict", "RES", 10000, version=5, gain=1 / 1.2),
+                                                    CalibrationTable("ict", "DIOD", version=2)])
+        result = ICTEngine(self.tester, ICTTestTable.from_records(self.records)).run()
+        self.assertEqual(result.calibration_versions[[0, 1199, 1200, 1800]].tolist(), [5, 5, 0, 2])
+        self.assertTrue(result.passed[16])
+        self.assertEqual(result.failures().size, 1199 + 1)
+        self.assertEqual(result.to_dict()['calibration_version'][1200:1802:600], [None, 2])
+        buffer = result.to_buffer()
+        self.assertEqual(buffer[0].calibration_version, 5)
+        self.assertIsNone(buffer[1200].calibration_version)
+    
+    def test_unmeasured_point_fails(self):
+        values = np.array([1.0, np.nan, np.nan])
+        passed = evaluate_limits(values, np.array([0.5, 0.5, np.nan]), np.array([1.5, 1.5, np.nan]))
+        self.assertEqual(passed.tolist(), [True, False, True])
+    
+    def test_ict_step(self):
+        manager = HardwareManager()
+        manager.add_equipment(self.tester)
+        engine = TestExecutionEngine(manager)
+        step = TestStep("ICT", TestStepType.MEASUREMENT, "ict", "run_ict", {'points': self.records[:1000]})
+        engine._execute_step(step)
+        self.assertEqual(step.status, TestStepStatus.FAILED)
+        self.assertIn("1 of 1000 ICT points out of limits: R17", step.error_message)
+        self.assertEqual(step.to_dict()['ict_results'][0]['count'], 1000)
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestCalibration(EmulatorTestCase):
+    """Test calibration tables and their application to instrument readings"""
+    
+    def setUp(self):
+        super().setUp()
+        self.bench = SimulatedBench(load_resistance=1000.0)
+        self.bench.set_supply(voltage=5.0, output=True)
+        self.emulator = DMMEmulator(self.bench, noise=0.0, sample_time=0.0)
+        self.multimeter = Multimeter("dmm", self._tcp(self.emulator))
+        self.manager = HardwareManager()
+        self.manager.add_equipment(self.multimeter)
+        self.assertTrue(self.multimeter.connect())
+    
+    def test_gain_offset_and_piecewise_tables(self):
+        linear = CalibrationTable("dmm", "VOLT:DC", gain=1.01, offset=-0.02)
+        self.assertAlmostEqual(linear.apply(5.0), 5.03)
+        np.testing.assert_allclose(linear.apply(np.array([0.0, 1.0])), [-0.02, 0.99])
+        
+        piecewise = CalibrationTable("dmm", "RES", 1000, raw=[0.0, 100.0, 1000.0], reference=[0.5, 101.0, 1002.0])
+        np.testing.assert_allclose(piecewise.apply(np.array([50.0, 100.0, 550.0, 2000.0, -10.0, 9.9e37])),
+                                   [50.75, 101.0, 551.5, 1002.0 + 1000 * 901 / 900, -9.55, 9.9e37])
+        self.assertTrue(np.isnan(piecewise.apply(float('nan'))))
+        with self.assertRaises(ValueError):
+            CalibrationTable("dmm", "RES", raw=[1.0, 1.0], reference=[1.0, 2.0])
+    
+    def test_store_prefers_exact_range(self):
+        store = CalibrationStore([CalibrationTable("dmm", "VOLT:DC", gain=2.0, version=3),
+                                  CalibrationTable("dmm", "VOLT:DC", 10.0, offset=1.0, version=3)])
+        self.assertEqual(store.apply("dmm", "VOLT:DC", 10, 1.0), (2.0, 3))
+        self.assertEqual(store.apply("dmm", "VOLT:DC", "AUTO", 1.0), (2.0, 3))
+        self.assertEqual(store.apply("dmm", "VOLT:DC", 100.0, 1.0), (2.0, 3))
+        self.assertEqual(store.apply("dmm", "CURR:DC", None, 1.0), (1.0, None))
+        store.update("dmm", [CalibrationTable("dmm", "VOLT:DC", gain=0.5, version=4)])
+        self.assertEqual(store.apply("dmm", "VOLT:DC", 10.0, 1.0), (0.5, 4))
+    
+    def test_readings_corrected_and_versioned(self):
+        self.assertFalse(self.multimeter.calibrated)
+        self.assertIsNone(self.multimeter.measure_voltage_dc().calibration_version)
+        
+        self.manager.update_calibration("dmm", [
+            CalibrationTable("dmm", "VOLT:DC", 10.0, version=2, gain=1.02, calibrated_at=datetime(2026, 1, 5)),
+            CalibrationTable("dmm", "RES", version=2, offset=-1.5)])
+        self.assertTrue(self.multimeter.calibrated)
+        self.assertEqual(self.multimeter.last_calibration, datetime(2026, 1, 5))
+        
+        measurement = self.multimeter.measure_voltage_dc(10.0)
+        self.assertAlmostEqual(measurement.value, 5.1, places=4)
+        self.assertEqual(measurement.to_dict()["calibration_version"], 2)
+        self.assertAlmostEqual(self.multimeter.measure_resistance().value, 998.5, places=3)
+        
+        buffered = self.multimeter.acquire("VOLT:DC", 20, 10.0)
+        np.testing.assert_allclose(buffered.samples, 5.1, rtol=1e-5)
+        self.assertEqual(buffered.calibration_version, 2)
+        # Auto range has no table of its own and no range-independent VOLT:DC table exists
+        self.assertIsNone(self.multimeter.measure_voltage_dc().calibration_version)
+    
+    def test_psu_and_scope_readings_corrected(self):
+        """Power supply readback and oscilloscope records are corrected like meter readings"""
+        psu = PowerSupply("psu", self._tcp(PSUEmulator(self.bench, noise=0.0)))
+        scope = Oscilloscope("scope", self._tcp(ScopeEmulator(signals={1: lambda t: 1.0}, noise=0.0)))
+        self.manager.add_equipment(psu)
+        self.manager.add_equipment(scope)
+        self.assertTrue(psu.initialize() and psu.configure_output(5.0, 0.1, True))
+        self.assertTrue(scope.initialize() and scope.configure_channel(1, 0.5))
+        self.manager.update_calibration("psu", [CalibrationTable("psu", "VOLT:DC", version=4, offset=0.05),
+                                                CalibrationTable("psu", "CURR:DC", version=4, gain=2.0)])
+        self.manager.update_calibration("scope", [CalibrationTable("scope", "CHAN1", 0.5, version=6, offset=0.1)])
+            
+        voltage, current = psu.measure_output()
+        self.assertAlmostEqual(voltage.value, 5.05, places=3)
+        self.assertAlmostEqual(current.value, 2 * 5.0 / 1000.0, places=4)
+        self.assertEqual((voltage.calibration_version, current.calibration_version), (4, 4))
+        self.assertEqual(psu.measure_output_voltage().calibration_version, 4)
+        self.assertEqual(psu.wait_for_output(max_wait=0.5).calibration_version, 4)
+            
+        waveform = scope.capture(1, points=500)[1]
+        self.assertEqual(waveform.calibration_version, 6)
+        mean = scope.measure(waveform, ["mean"])[0]
+        self.assertAlmostEqual(mean.value, 1.1, delta=0.02)
+        self.assertEqual(mean.calibration_version, 6)
+    
+    def test_buffer_keeps_version(self):
+        """Readings taken across a calibration update keep their own versions"""
+        buffer = MeasurementBuffer()
+        buffer.extend("VOLTAGE", np.ones(3), "V", min_limit=0.5, calibration_version=7)
+        buffer.add(TestMeasurement("VOLTAGE", 1.0, "V", calibration_version=8))
+        buffer.append("VOLTAGE", 1.0, "V")
+        restored = MeasurementBuffer.from_bytes(buffer.to_bytes())
+        self.assertEqual(restored.calibration_versions.tolist(), [7, 7, 7, 8, 0])
+        self.assertEqual(restored[2].calibration_version, 7)
+        self.assertIsNone(restored[4].calibration_version)
+        self.assertEqual(buffer.to_dict()["calibration_version"], [7, 7, 7, 8, None])
 
 
 @unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
@@ -369,6 +2162,59 @@ class TestHardwareManager(unittest.TestCase):
         self.assertTrue(results["Test DMM"])
         self.mock_dmm.self_test.assert_called_once()
 
+    def test_connect_all_runs_in_parallel(self):
+        """Startup takes as long as the slowest instrument, not the sum"""
+        self.mock_dmm.initialize.side_effect = lambda: time.sleep(0.3) or True
+        self.mock_psu.initialize.side_effect = lambda: time.sleep(0.3) or True
+        self.manager.add_equipment(self.mock_dmm)
+        self.manager.add_equipment(self.mock_psu)
+        
+        start = time.time()
+        results = self.manager.connect_all()
+        
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(results, {"Test DMM": True, "Test PSU": True})
+        self.assertCountEqual(self.manager.active_connections, ["Test DMM", "Test PSU"])
+    
+    def test_results_reported_in_completion_order(self):
+        """A hung instrument misses its deadline without holding up the others"""
+        self.mock_dmm.initialize.side_effect = lambda: time.sleep(1.0) or True
+        self.manager.add_equipment(self.mock_dmm, timeout=0.2)
+        self.manager.add_equipment(self.mock_psu)
+        completed = []
+        
+        start = time.time()
+        results = self.manager.connect_all(on_result=lambda name, success: completed.append((name, success)))
+        
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(completed, [("Test PSU", True), ("Test DMM", False)])
+        self.assertFalse(results["Test DMM"])
+        self.assertEqual(self.manager.active_connections, ["Test PSU"])
+    
+    def test_late_connection_closed(self):
+        """An instrument that connects after its deadline is disconnected again"""
+        self.mock_dmm.initialize.side_effect = lambda: time.sleep(0.3) or True
+        self.manager.add_equipment(self.mock_dmm, timeout=0.1)
+        
+        results = self.manager.connect_all()
+        self.assertFalse(results["Test DMM"])
+        self.mock_dmm.disconnect.assert_not_called()
+        
+        time.sleep(0.4)
+        self.mock_dmm.disconnect.assert_called_once()
+        self.assertEqual(self.manager.active_connections, [])
+    
+    def test_system_check_failure_isolated(self):
+        """An exception in one self-test fails only that instrument"""
+        self.mock_dmm.self_test.side_effect = Exception("Instrument not responding")
+        self.manager.add_equipment(self.mock_dmm)
+        self.manager.add_equipment(self.mock_psu)
+        self.manager.active_connections.extend(["Test DMM", "Test PSU"])
+        
+        results = self.manager.perform_system_check(timeout=1.0)
+        
+        self.assertEqual(results, {"Test DMM": False, "Test PSU": True})
+
 
 @unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
 class TestTestMeasurement(unittest.TestCase):
@@ -410,6 +2256,73 @@ class TestTestMeasurement(unittest.TestCase):
         
         self.assertFalse(measurement.is_within_limits())
 
+    def test_measurement_is_slotted(self):
+        """Measurements carry no per-instance __dict__"""
+        measurement = TestMeasurement("VOLTAGE", 5.0, "V")
+        
+        self.assertFalse(hasattr(measurement, "__dict__"))
+        self.assertEqual(measurement.to_dict()["value"], 5.0)
+
+
+@unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
+class TestMeasurementBuffer(unittest.TestCase):
+    """Test the columnar MeasurementBuffer"""
+    
+    def setUp(self):
+        """Fill a buffer past its initial capacity"""
+        self.buffer = MeasurementBuffer(capacity=4)
+        self.buffer.add(TestMeasurement("VOLTAGE", 5.0, "V", min_limit=4.5, max_limit=5.5))
+        self.buffer.append("CURRENT", 0.8, "A", max_limit=0.5)
+        self.buffer.append("RESISTANCE", 1000.0, "Ohm")
+        self.buffer.extend("VOLTAGE", np.linspace(4.0, 6.0, 9), "V", min_limit=4.5, max_limit=5.5)
+    
+    def test_columns_and_records(self):
+        """Readings are stored column wise and materialize as TestMeasurements"""
+        self.assertEqual(len(self.buffer), 12)
+        self.assertEqual(self.buffer.keys, [("VOLTAGE", "V"), ("CURRENT", "A"), ("RESISTANCE", "Ohm")])
+        self.assertEqual(int(self.buffer.select("VOLTAGE").sum()), 10)
+        
+        record = self.buffer[1]
+        self.assertEqual((record.parameter, record.value, record.unit), ("CURRENT", 0.8, "A"))
+        self.assertIsNone(record.min_limit)
+        self.assertEqual(record.max_limit, 0.5)
+        self.assertEqual([m.parameter for m in self.buffer][-1], "VOLTAGE")
+        self.assertTrue(np.all(np.diff(self.buffer.timestamps) >= 0))
+        self.assertLess(self.buffer.nbytes / len(self.buffer), 40)
+    
+    def test_vectorized_limits_match_records(self):
+        """within_limits agrees with TestMeasurement.is_within_limits"""
+        expected = [m.is_within_limits() for m in self.buffer]
+        
+        self.assertEqual(self.buffer.within_limits().tolist(), expected)
+        self.assertEqual(self.buffer.failures().tolist(), [1, 3, 4, 10, 11])
+        self.assertFalse(self.buffer.all_within_limits())
+    
+    def test_serialization_round_trip(self):
+        """JSON is columnar and the binary form restores the buffer exactly"""
+        data = json.loads(self.buffer.to_json())
+        self.assertEqual(data["count"], 12)
+        self.assertEqual(data["min_limit"][1], None)
+        self.assertEqual(data["passed"][:3], [True, False, True])
+        
+        restored = MeasurementBuffer.from_bytes(self.buffer.to_bytes())
+        self.assertEqual(len(restored), 12)
+        self.assertEqual(restored.keys, self.buffer.keys)
+        np.testing.assert_array_equal(restored.values, self.buffer.values)
+        np.testing.assert_array_equal(restored.max_limits, self.buffer.max_limits)
+        self.assertEqual(restored[1].to_dict(), self.buffer[1].to_dict())
+        
+        with self.assertRaises(ValueError):
+            MeasurementBuffer.from_bytes(b"XXXX" + self.buffer.to_bytes()[4:])
+
+    def test_missing_value_is_null(self):
+        """A NaN reading (e.g. from an empty sample set) serializes as null, keeping the JSON valid"""
+        self.buffer.append("VOLTAGE", float('nan'), "V")
+        
+        data = json.loads(json.dumps(self.buffer.to_dict(), allow_nan=False))
+        self.assertIsNone(data["value"][-1])
+        self.assertEqual(data["value"][0], 5.0)
+
 
 @unittest.skipUnless(HARDWARE_AVAILABLE, "Hardware modules not available")
 class TestTestSequence(unittest.TestCase):
@@ -505,10 +2418,32 @@ if __name__ == '__main__':
         suite.addTest(loader.loadTestsFromTestCase(TestConnectionConfig))
         suite.addTest(loader.loadTestsFromTestCase(TestSerialInterface))
         suite.addTest(loader.loadTestsFromTestCase(TestTCPInterface))
+        suite.addTest(loader.loadTestsFromTestCase(TestTCPResponseFraming))
+        suite.addTest(loader.loadTestsFromTestCase(TestRTTEstimator))
+        suite.addTest(loader.loadTestsFromTestCase(TestAdaptiveInterfaceTimeouts))
+        suite.addTest(loader.loadTestsFromTestCase(TestCommandMetrics))
+        suite.addTest(loader.loadTestsFromTestCase(TestResilientSessions))
+        suite.addTest(loader.loadTestsFromTestCase(TestCommandBatching))
+        suite.addTest(loader.loadTestsFromTestCase(TestBufferedAcquisition))
         suite.addTest(loader.loadTestsFromTestCase(TestMultimeter))
         suite.addTest(loader.loadTestsFromTestCase(TestPowerSupply))
+        suite.addTest(loader.loadTestsFromTestCase(TestInstrumentStateCache))
+        suite.addTest(loader.loadTestsFromTestCase(TestAsyncInterfaces))
+        suite.addTest(loader.loadTestsFromTestCase(TestSCPIEmulator))
+        suite.addTest(loader.loadTestsFromTestCase(TestListSweep))
+        suite.addTest(loader.loadTestsFromTestCase(TestSettling))
+        suite.addTest(loader.loadTestsFromTestCase(TestIOWorker))
+        suite.addTest(loader.loadTestsFromTestCase(TestSessionPool))
+        suite.addTest(loader.loadTestsFromTestCase(TestResourceManager))
+        suite.addTest(loader.loadTestsFromTestCase(TestWaveform))
+        suite.addTest(loader.loadTestsFromTestCase(TestOscilloscope))
+        suite.addTest(loader.loadTestsFromTestCase(TestFrequencyAnalysis))
+        suite.addTest(loader.loadTestsFromTestCase(TestRelayBoard))
+        suite.addTest(loader.loadTestsFromTestCase(TestICTEngine))
+        suite.addTest(loader.loadTestsFromTestCase(TestCalibration))
         suite.addTest(loader.loadTestsFromTestCase(TestHardwareManager))
         suite.addTest(loader.loadTestsFromTestCase(TestTestMeasurement))
+        suite.addTest(loader.loadTestsFromTestCase(TestMeasurementBuffer))
         suite.addTest(loader.loadTestsFromTestCase(TestTestSequence))
         suite.addTest(loader.loadTestsFromTestCase(TestTestSequenceBuilder))
     else:
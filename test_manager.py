@@ -13,8 +13,14 @@ import logging
 
 from hardware_layer import (
     HardwareManager, TestEquipment, TestMeasurement, TestResult,
-    Multimeter, PowerSupply, ConnectionConfig, ConnectionType
+    Multimeter, PowerSupply, Oscilloscope, RelayBoard, ModbusRelayBoard, ICTTester, ConnectionConfig, ConnectionType
 )
+from calibration import CalibrationTable
+from frequency_analysis import ToneAnalysis
+from ict_engine import ICTEngine, ICTResult, ICTTestTable
+from list_sweep import SweepPoint, run_list_sweep
+from session_pool import SessionPool, get_session_pool
+from waveform import Waveform
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -50,6 +56,8 @@ class TestStep:
         self.error_message = None
         self.execution_time = 0.0
         self.measurements: List[TestMeasurement] = []
+        self.waveforms: List[Waveform] = []
+        self.ict_results: List[ICTResult] = []
         
     def to_dict(self) -> Dict[str, Any]:
         """Convert step to dictionary"""
@@ -63,7 +71,9 @@ class TestStep:
             'result': self.result.value if self.result else None,
             'error_message': self.error_message,
             'execution_time': self.execution_time,
-            'measurements': [m.__dict__ for m in self.measurements] if self.measurements else []
+            'measurements': [m.to_dict() for m in self.measurements] if self.measurements else [],
+            'waveforms': [waveform.to_dict() for waveform in self.waveforms],
+            'ict_results': [result.to_dict() for result in self.ict_results]
         }
 
 class TestSequence:
@@ -78,6 +88,9 @@ class TestSequence:
         self.failed_steps = 0
         self.start_time = None
         self.end_time = None
+        # Hold the instruments for the whole sequence, or only while each step runs
+        # (lets DUTs sharing an instrument interleave, but other executions may change it between steps)
+        self.reservation_scope = "sequence"
         
     def add_step(self, step: TestStep):
         """Add a test step to the sequence"""
@@ -107,9 +120,14 @@ class TestSequence:
 class TestExecutionEngine:
     """Engine for executing test sequences"""
     
+    # Longest wait for another execution to free the instruments
+    DEFAULT_RESERVATION_TIMEOUT = 300.0
+    
     def __init__(self, hardware_manager: HardwareManager):
         self.hardware_manager = hardware_manager
         self.current_sequence = None
+        self.reservation = None
+        self.reservation_timeout = self.DEFAULT_RESERVATION_TIMEOUT
         self.is_running = False
         self.stop_requested = False
         self.execution_thread = None
@@ -124,8 +142,9 @@ class TestExecutionEngine:
         """Set callback for step completion"""
         self.step_callback = callback
     
-    def execute_sequence(self, sequence: TestSequence) -> bool:
-        """Execute a test sequence"""
+    def execute_sequence(self, sequence: TestSequence,
+                         completion_callback: Optional[Callable[[], None]] = None) -> bool:
+        """Execute a test sequence (completion_callback runs when it has finished, whatever the outcome)"""
         if self.is_running:
             logger.warning("Test execution already in progress")
             return False
@@ -135,7 +154,7 @@ class TestExecutionEngine:
         self.stop_requested = False
         
         # Start execution in separate thread
-        self.execution_thread = threading.Thread(target=self._execute_sequence_thread)
+        self.execution_thread = threading.Thread(target=self._execute_sequence_thread, args=(completion_callback,))
         self.execution_thread.start()
         
         return True
@@ -152,7 +171,7 @@ class TestExecutionEngine:
             return not self.execution_thread.is_alive()
         return True
     
-    def _execute_sequence_thread(self):
+    def _execute_sequence_thread(self, completion_callback: Optional[Callable[[], None]] = None):
         """Execute test sequence in separate thread"""
         sequence = self.current_sequence
         sequence.start_time = datetime.now()
@@ -160,6 +179,12 @@ class TestExecutionEngine:
         try:
             logger.info(f"Starting test sequence: {sequence.name}")
             
+            if sequence.reservation_scope == "sequence":
+                # Everything at once, so two sequences can never each hold what the other waits for
+                resources = {resource for step in sequence.steps for resource in self._step_resources(step)}
+                self.reservation = self.hardware_manager.reservations.reserve(
+                    resources, sequence.name, self.reservation_timeout)
+            
             for i, step in enumerate(sequence.steps):
                 if self.stop_requested:
                     logger.info("Test execution stopped by user request")
@@ -188,8 +213,15 @@ class TestExecutionEngine:
         except Exception as e:
             logger.error(f"Test sequence execution error: {e}")
         finally:
+            if self.reservation:
+                self.reservation.release()
+                self.reservation = None
             sequence.end_time = datetime.now()
             self.is_running = False
+            if completion_callback:
+                completion_callback()
+            # Keep what was learned about settling times for the next run
+            self.hardware_manager.settling.save()
             logger.info(f"Test sequence completed: {sequence.name}")
     
     def _execute_step(self, step: TestStep):
@@ -209,7 +241,13 @@ class TestExecutionEngine:
                 raise Exception(f"Equipment not connected: {step.equipment_name}")
             
             # Execute action based on step type and action
-            self._execute_action(step, equipment)
+            if self.reservation is None:
+                holder = f"{self.current_sequence.name}: {step.name}" if self.current_sequence else step.name
+                with self.hardware_manager.reservations.reserve(self._step_resources(step), holder,
+                                                                self.reservation_timeout):
+                    self._execute_action(step, equipment)
+            else:
+                self._execute_action(step, equipment)
             
             step.status = TestStepStatus.COMPLETED
             step.result = TestResult.PASS
@@ -222,31 +260,49 @@ class TestExecutionEngine:
         finally:
             step.execution_time = time.time() - start_time
     
+    @staticmethod
+    def _step_resources(step: TestStep) -> List[str]:
+        """Instruments, or "instrument:channel" with a channel parameter, a step drives"""
+        channel = step.parameters.get('channel')
+        resources = [step.equipment_name if channel is None else f"{step.equipment_name}:{channel}"]
+        if step.action.lower() == "list_sweep":
+            resources.append(step.parameters.get('dmm', 'dmm'))
+        return resources
+    
     def _execute_action(self, step: TestStep, equipment: TestEquipment):
         """Execute specific action on equipment"""
         action = step.action.lower()
         params = step.parameters
         
-        if isinstance(equipment, Multimeter):
+        # Reset and self-test apply to every kind of equipment
+        if action == "reset":
+            if not equipment.reset():
+                raise Exception("Equipment reset failed")
+        elif action == "self_test":
+            if not equipment.self_test():
+                raise Exception("Equipment self-test failed")
+        elif isinstance(equipment, Multimeter):
             self._execute_multimeter_action(step, equipment, action, params)
         elif isinstance(equipment, PowerSupply):
             self._execute_power_supply_action(step, equipment, action, params)
+        elif isinstance(equipment, Oscilloscope):
+            self._execute_oscilloscope_action(step, equipment, action, params)
+        elif isinstance(equipment, RelayBoard):
+            self._execute_relay_action(step, equipment, action, params)
+        elif isinstance(equipment, ICTTester):
+            self._execute_ict_action(step, equipment, action, params)
         else:
-            # Generic equipment actions
-            if action == "reset":
-                equipment.reset()
-            elif action == "self_test":
-                result = equipment.self_test()
-                if not result:
-                    raise Exception("Equipment self-test failed")
-            else:
-                raise Exception(f"Unknown action: {action}")
+            raise Exception(f"Unknown action: {action}")
     
     def _execute_multimeter_action(self, step: TestStep, dmm: Multimeter, action: str, params: Dict):
         """Execute multimeter-specific actions"""
         if action == "measure_voltage_dc":
             range_val = params.get('range')
-            measurement = dmm.measure_voltage_dc(range_val)
+            if params.get('settle_tolerance') is not None:
+                # Re-read until settled instead of trusting the first reading
+                measurement = dmm.measure_until_stable("VOLT:DC", params['settle_tolerance'], range_val)
+            else:
+                measurement = dmm.measure_voltage_dc(range_val)
             step.measurements.append(measurement)
             
             # Check limits if specified
@@ -262,7 +318,11 @@ class TestExecutionEngine:
                 
         elif action == "measure_current_dc":
             range_val = params.get('range')
-            measurement = dmm.measure_current_dc(range_val)
+            if params.get('settle_tolerance') is not None:
+                # Re-read until settled instead of trusting the first reading
+                measurement = dmm.measure_until_stable("CURR:DC", params['settle_tolerance'], range_val)
+            else:
+                measurement = dmm.measure_current_dc(range_val)
             step.measurements.append(measurement)
             
             # Check limits
@@ -278,7 +338,11 @@ class TestExecutionEngine:
                 
         elif action == "measure_resistance":
             range_val = params.get('range')
-            measurement = dmm.measure_resistance(range_val)
+            if params.get('settle_tolerance') is not None:
+                # Re-read until settled instead of trusting the first reading
+                measurement = dmm.measure_until_stable("RES", params['settle_tolerance'], range_val)
+            else:
+                measurement = dmm.measure_resistance(range_val)
             step.measurements.append(measurement)
             
             # Check limits
@@ -291,6 +355,21 @@ class TestExecutionEngine:
             
             if not measurement.is_within_limits():
                 raise Exception(f"Measurement out of limits: {measurement.value} {measurement.unit}")
+        
+        elif action == "measure_frequency":
+            # Digitize and take the frequency from the spectrum instead of counting edges
+            tone = dmm.measure_tone(params.get('count', 4096), params.get('sample_interval', 1e-4),
+                                    range_value=params.get('range'), nplc=params.get('nplc', 0.001))
+            measurements = [
+                TestMeasurement("FREQUENCY", tone.frequency, "Hz", params.get('min_limit'), params.get('max_limit')),
+                TestMeasurement("THD", tone.thd_percent, "%", max_limit=params.get('max_thd'))
+            ]
+            step.measurements.extend(measurements)
+            
+            failed = [f"{measurement.parameter} {measurement.value:g} {measurement.unit}"
+                      for measurement in measurements if not measurement.is_within_limits()]
+            if failed:
+                raise Exception(f"Measurement out of limits: {', '.join(failed)}")
         else:
             raise Exception(f"Unknown multimeter action: {action}")
     
@@ -302,6 +381,8 @@ class TestExecutionEngine:
                 raise Exception("Voltage parameter required")
             if not psu.set_voltage(voltage):
                 raise Exception("Failed to set voltage")
+            if params.get('settle_tolerance') is not None:
+                psu.wait_for_output(params['settle_tolerance'])
                 
         elif action == "set_current_limit":
             current = params.get('current')
@@ -315,6 +396,15 @@ class TestExecutionEngine:
             if not psu.enable_output(enable):
                 raise Exception("Failed to enable/disable output")
                 
+        elif action == "configure_output":
+            voltage = params.get('voltage')
+            if voltage is None:
+                raise Exception("Voltage parameter required")
+            if not psu.configure_output(voltage, params.get('current'), params.get('enable')):
+                raise Exception("Failed to configure output")
+            if params.get('settle_tolerance') is not None:
+                psu.wait_for_output(params['settle_tolerance'])
+        
         elif action == "measure_output_voltage":
             measurement = psu.measure_output_voltage()
             step.measurements.append(measurement)
@@ -322,9 +412,95 @@ class TestExecutionEngine:
         elif action == "measure_output_current":
             measurement = psu.measure_output_current()
             step.measurements.append(measurement)
+        
+        elif action == "list_sweep":
+            dmm = self.hardware_manager.get_equipment(params.get('dmm', 'dmm'))
+            if not isinstance(dmm, Multimeter):
+                raise Exception("List sweep requires a multimeter")
+            points = [SweepPoint.from_dict(point) for point in params.get('points', [])]
+            buffer = run_list_sweep(psu, dmm, points, dwell=params.get('dwell', 0.05),
+                                    range_value=params.get('range'), nplc=params.get('nplc'),
+                                    trigger_source=params.get('trigger_source', 'EXT'),
+                                    trigger_delay=params.get('trigger_delay'))
+            step.measurements.extend(buffer)
+            
+            failures = buffer.failures()
+            if failures.size:
+                raise Exception(f"{failures.size} of {len(buffer)} sweep points out of limits")
         else:
             raise Exception(f"Unknown power supply action: {action}")
 
+    def _execute_oscilloscope_action(self, step: TestStep, scope: Oscilloscope, action: str, params: Dict):
+        """Execute oscilloscope-specific actions"""
+        if action == "configure_channel":
+            if not scope.configure_channel(params.get('channel', 1), params['scale'], params.get('offset', 0.0),
+                                           params.get('coupling', 'DC')):
+                raise Exception("Failed to configure channel")
+        
+        elif action == "configure_timebase":
+            if not scope.configure_timebase(params['scale'], params.get('position', 0.0)):
+                raise Exception("Failed to configure timebase")
+        
+        elif action == "configure_trigger":
+            if not scope.configure_trigger(params.get('channel', 1), params['level'], params.get('slope', 'POS')):
+                raise Exception("Failed to configure trigger")
+        
+        elif action == "capture_waveform":
+            channel = params.get('channel', 1)
+            waveform = scope.capture(channel, params.get('points', 1000), params.get('word', False))[channel]
+            step.waveforms.append(waveform)
+            
+            # Limits are given per measurement, e.g. limits={'frequency': {'min_limit': 990, 'max_limit': 1010}}
+            limits = params.get('limits', {})
+            failed = []
+            for name, measurement in zip(params.get('measurements', []),
+                                         scope.measure(waveform, params.get('measurements', []))):
+                measurement.min_limit = limits.get(name, {}).get('min_limit')
+                measurement.max_limit = limits.get(name, {}).get('max_limit')
+                step.measurements.append(measurement)
+                if not measurement.is_within_limits():
+                    failed.append(f"{measurement.parameter} {measurement.value:g} {measurement.unit}")
+            
+            if failed:
+                raise Exception(f"Measurement out of limits: {', '.join(failed)}")
+        else:
+            raise Exception(f"Unknown oscilloscope action: {action}")
+
+    def _execute_relay_action(self, step: TestStep, relays: RelayBoard, action: str, params: Dict):
+        """Execute relay board actions; each switches all listed channels in one transaction"""
+        if action == "set_channels":
+            success = relays.set_channels(params.get('channels', []))
+        elif action == "close_channels":
+            success = relays.close(params['channels'])
+        elif action == "open_channels":
+            success = relays.open(params['channels'])
+        elif action == "open_all":
+            success = relays.open_all()
+        else:
+            raise Exception(f"Unknown relay board action: {action}")
+        
+        if not success:
+            raise Exception(f"Failed to switch relays ({action})")
+
+    def _execute_ict_action(self, step: TestStep, tester: ICTTester, action: str, params: Dict):
+        """Execute ICT tester actions"""
+        if action == "run_ict":
+            # Points as records (see ICTTestTable.from_records) or a CSV file of them
+            if params.get('table_file'):
+                table = ICTTestTable.from_csv(params['table_file'])
+            else:
+                table = ICTTestTable.from_records(params.get('points', []))
+            result = ICTEngine(tester, table, params.get('point_time', 0.005)).run()
+            step.ict_results.append(result)
+            
+            failures = result.failures()
+            if failures.size:
+                names = ", ".join(table.names[failures[:10]].tolist())
+                raise Exception(f"{failures.size} of {len(result)} ICT points out of limits: {names}"
+                                + (", ..." if failures.size > 10 else ""))
+        else:
+            raise Exception(f"Unknown ICT tester action: {action}")
+
 class TestSequenceBuilder:
     """Builder for creating test sequences"""
     
@@ -362,11 +538,13 @@ class TestSequenceBuilder:
 class TestManager:
     """High-level test manager"""
     
-    def __init__(self):
-        self.hardware_manager = HardwareManager()
+    def __init__(self, settling_file: Optional[str] = None, session_pool: Optional[SessionPool] = None):
+        self.session_pool = session_pool or get_session_pool()
+        self.hardware_manager = HardwareManager(settling_file, self.session_pool)
         self.execution_engine = TestExecutionEngine(self.hardware_manager)
         self.test_templates: Dict[str, TestSequence] = {}
         self.active_tests: Dict[str, TestSequence] = {}
+        self.engines: Dict[str, TestExecutionEngine] = {}
         
     def setup_hardware(self, config_list: List[Dict[str, Any]]) -> Dict[str, bool]:
         """Setup hardware from configuration"""
@@ -380,18 +558,14 @@ class TestManager:
                     address=config['address'],
                     port=config.get('port'),
                     baud_rate=config.get('baud_rate', 9600),
-                    timeout=config.get('timeout', 5.0)
+                    timeout=config.get('timeout', 5.0),
+                    adaptive_timeout=config.get('adaptive_timeout', True),
+                    min_timeout=config.get('min_timeout', 0.05),
+                    command_metrics=config.get('command_metrics', True)
                 )
                 
-                # Create hardware interface
-                if conn_config.connection_type == ConnectionType.SERIAL_RTU:
-                    from hardware_layer import SerialInterface
-                    interface = SerialInterface(conn_config)
-                elif conn_config.connection_type == ConnectionType.TCP_IP:
-                    from hardware_layer import TCPInterface
-                    interface = TCPInterface(conn_config)
-                else:
-                    raise Exception(f"Unsupported connection type: {conn_config.connection_type}")
+                # Share the session of an instrument that is already open (e.g. by a connection check)
+                interface = self.session_pool.get(conn_config)
                 
                 # Create equipment
                 equipment_type = config['equipment_type']
@@ -401,11 +575,22 @@ class TestManager:
                     equipment = Multimeter(name, interface)
                 elif equipment_type == 'power_supply':
                     equipment = PowerSupply(name, interface)
+                elif equipment_type == 'oscilloscope':
+                    equipment = Oscilloscope(name, interface)
+                elif equipment_type == 'relay_board':
+                    equipment = RelayBoard(name, interface, config['channels'],
+                                           config.get('break_before_make', True))
+                elif equipment_type == 'modbus_relay_board':
+                    equipment = ModbusRelayBoard(name, interface, config['coil_count'], config.get('start_coil', 0),
+                                                 config.get('unit_id', 1), config.get('first_channel', 1),
+                                                 config.get('break_before_make', True))
+                elif equipment_type == 'ict_tester':
+                    equipment = ICTTester(name, interface, config.get('max_scan', 1000))
                 else:
                     raise Exception(f"Unsupported equipment type: {equipment_type}")
                 
                 # Add to hardware manager
-                success = self.hardware_manager.add_equipment(equipment)
+                success = self.hardware_manager.add_equipment(equipment, config.get('operation_timeout'))
                 results[name] = success
                 
             except Exception as e:
@@ -414,9 +599,9 @@ class TestManager:
         
         return results
     
-    def connect_all_hardware(self) -> Dict[str, bool]:
-        """Connect to all configured hardware"""
-        return self.hardware_manager.connect_all()
+    def connect_all_hardware(self, timeout: Optional[float] = None) -> Dict[str, bool]:
+        """Connect to all configured hardware in parallel (timeout is per instrument)"""
+        return self.hardware_manager.connect_all(timeout)
     
     def disconnect_all_hardware(self) -> Dict[str, bool]:
         """Disconnect from all hardware"""
@@ -428,8 +613,7 @@ class TestManager:
         
         # Setup steps
         builder.add_setup_step("Reset DMM", "dmm", "reset")
-        builder.add_setup_step("Setup Power Supply", "psu", "set_voltage", voltage=0.0)
-        builder.add_setup_step("Enable Power Supply", "psu", "enable_output", enable=True)
+        builder.add_setup_step("Setup Power Supply", "psu", "configure_output", voltage=0.0, enable=True)
         
         # Measurement steps for each voltage point
         for i, point in enumerate(voltage_points):
@@ -440,7 +624,7 @@ class TestManager:
             builder.add_setup_step(f"Set Voltage {voltage}V", "psu", "set_voltage", voltage=voltage)
             builder.add_measurement_step(
                 f"Measure Voltage {voltage}V", "dmm", "measure_voltage_dc",
-                min_limit=min_limit, max_limit=max_limit
+                min_limit=min_limit, max_limit=max_limit, settle_tolerance=point.get('settle_tolerance')
             )
         
         # Cleanup steps
@@ -449,14 +633,36 @@ class TestManager:
         
         return builder.build()
     
+    def create_voltage_sweep_sequence(self, name: str, voltage_points: List[Dict], dwell: float = 0.05,
+                                      range_value: Optional[float] = None) -> TestSequence:
+        """Create a voltage test sequence run as one hardware-timed list sweep"""
+        builder = TestSequenceBuilder(name, "Voltage list sweep test sequence")
+        
+        # Setup steps
+        builder.add_setup_step("Reset DMM", "dmm", "reset")
+        builder.add_setup_step("Setup Power Supply", "psu", "configure_output", voltage=0.0, enable=False)
+        
+        # One step sweeps all points; a fixed range avoids autoranging between them
+        if range_value is None:
+            range_value = max(abs(point['voltage']) for point in voltage_points)
+        builder.add_measurement_step(
+            f"Sweep {len(voltage_points)} Voltage Points", "psu", "list_sweep",
+            points=voltage_points, dwell=dwell, range=range_value
+        )
+        
+        # Cleanup steps
+        builder.add_cleanup_step("Disable Power Supply", "psu", "enable_output", enable=False)
+        builder.add_cleanup_step("Reset Power Supply", "psu", "reset")
+        
+        return builder.build()
+    
     def create_current_test_sequence(self, name: str, current_points: List[Dict]) -> TestSequence:
         """Create a current measurement test sequence"""
         builder = TestSequenceBuilder(name, "Current measurement test sequence")
         
         # Setup steps
         builder.add_setup_step("Reset DMM", "dmm", "reset")
-        builder.add_setup_step("Setup Power Supply", "psu", "set_voltage", voltage=5.0)
-        builder.add_setup_step("Enable Power Supply", "psu", "enable_output", enable=True)
+        builder.add_setup_step("Setup Power Supply", "psu", "configure_output", voltage=5.0, enable=True)
         
         # Measurement steps for each current point
         for i, point in enumerate(current_points):
@@ -482,20 +688,38 @@ class TestManager:
             logger.warning(f"Test {test_id} already active")
             return False
         
-        self.active_tests[test_id] = sequence
-        success = self.execution_engine.execute_sequence(sequence)
+        engine = self.execution_engine
+        if engine.is_running:
+            # Another DUT is under test; run alongside it, the reservations keep them off each other's instruments
+            engine = TestExecutionEngine(self.hardware_manager)
+            engine.progress_callback = self.execution_engine.progress_callback
+            engine.step_callback = self.execution_engine.step_callback
         
-        if not success:
-            del self.active_tests[test_id]
+        self.active_tests[test_id] = sequence
+        self.engines[test_id] = engine
+        success = False
+        try:
+            # The engine is dropped when the sequence has finished, however it ends
+            success = engine.execute_sequence(sequence, lambda: self.engines.pop(test_id, None))
+        finally:
+            if not success:
+                del self.active_tests[test_id]
+                self.engines.pop(test_id, None)
         
         return success
     
+    def wait_for_test(self, test_id: str, timeout: Optional[float] = None) -> bool:
+        """Wait for a test to complete"""
+        engine = self.engines.get(test_id)
+        return engine.wait_for_completion(timeout) if engine else True
+    
     def stop_test(self, test_id: str) -> bool:
         """Stop a running test"""
-        if test_id not in self.active_tests:
+        engine = self.engines.get(test_id)
+        if test_id not in self.active_tests or engine is None:
             return False
         
-        self.execution_engine.stop_execution()
+        engine.stop_execution()
         return True
     
     def get_test_status(self, test_id: str) -> Optional[Dict[str, Any]]:
@@ -511,6 +735,65 @@ class TestManager:
         connected = self.hardware_manager.get_connected_equipment()
         return [eq.name for eq in connected]
     
-    def perform_equipment_health_check(self) -> Dict[str, bool]:
-        """Perform health check on all equipment"""
-        return self.hardware_manager.perform_system_check()
\ No newline at end of file
+    def perform_equipment_health_check(self, timeout: Optional[float] = None) -> Dict[str, bool]:
+        """Perform health check on all equipment in parallel (timeout is per instrument)"""
+        return self.hardware_manager.perform_system_check(timeout)
+    
+    def get_command_metrics(self, slowest: int = 0) -> Dict[str, Dict[str, Any]]:
+        """Per-instrument command latency statistics (see HardwareManager.get_command_metrics)"""
+        return self.hardware_manager.get_command_metrics(slowest)
+    
+    def get_reservation_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-instrument utilization and reservation waiting time"""
+        return self.hardware_manager.get_reservation_stats()
+    
+    def load_calibration(self, tables: List[CalibrationTable]):
+        """Put the given calibration tables in force, replacing all others"""
+        self.hardware_manager.load_calibration(tables)
+    
+    def update_calibration(self, equipment_name: str, tables: List[CalibrationTable]):
+        """Put a new calibration of one instrument in force"""
+        self.hardware_manager.update_calibration(equipment_name, tables)
+    
+    def get_calibration_status(self) -> Dict[str, Dict[str, Any]]:
+        """Calibration version and tables in force per instrument"""
+        return self.hardware_manager.calibration.to_dict()
+    
+    def measure_frequency(self, expected: float, equipment_name: Optional[str] = None, channel: int = 1,
+                          cycles: int = 50, samples_per_cycle: int = 20,
+                          reservation_timeout: float = TestExecutionEngine.DEFAULT_RESERVATION_TIMEOUT
+                          ) -> Optional[ToneAnalysis]:
+        """
+        Measure frequency and THD of the DUT signal by FFT
+        
+        An oscilloscope captures the signal on channel; a multimeter
+        digitizes it. The record holds about cycles periods of the expected
+        frequency at samples_per_cycle samples each.
+        
+        Args:
+            expected: Nominal frequency in Hz, used to size the record
+            equipment_name: Instrument to use (the first connected oscilloscope, else multimeter, if None)
+            channel: Oscilloscope channel the signal is connected to
+            reservation_timeout: Seconds to wait for a running execution to free the instrument
+        
+        Returns:
+            Tone analysis, or None if no suitable instrument is connected
+        
+        Raises:
+            ReservationTimeout: The instrument stayed reserved for reservation_timeout
+        """
+        connected = [equipment for equipment in self.hardware_manager.get_connected_equipment()
+                     if isinstance(equipment, (Oscilloscope, Multimeter))
+                     and equipment_name in (None, equipment.name)]
+        if not connected:
+            return None
+        equipment = sorted(connected, key=lambda equipment: not isinstance(equipment, Oscilloscope))[0]
+        points = cycles * samples_per_cycle
+        
+        with self.hardware_manager.reservations.reserve([equipment.name], "frequency check", reservation_timeout):
+            if isinstance(equipment, Multimeter):
+                return equipment.measure_tone(points, 1.0 / (expected * samples_per_cycle))
+            # The record spans the ten horizontal divisions
+            if not equipment.configure_timebase(cycles / expected / 10):
+                raise Exception("Failed to configure timebase")
+            return equipment.capture(channel, points)[channel].tone()
\ No newline at end of file
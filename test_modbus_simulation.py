@@ -0,0 +1,485 @@
+"""
+Unit tests for the Modbus RTU simulation stack
+Runs the PLC simulator, RTU client and gateway against each other over a local pty bridge.
+"""
+
+import unittest
+import socket
+import struct
+import sys
+import threading
+import time
+import zlib
+
+try:
+    from modbus_plc_simulator import ModbusRTUSimulator
+    from modbus_test_client import ModbusRTUTestClient
+    from modbus_tcp_gateway import ModbusTCPGateway, FairRequestQueue, GatewayRequest
+    from modbus_discovery import ModbusBusScanner
+    from virtual_serial_port_manager import PtyBridge
+    from frequency_analysis import analyze_tone, samples_from_registers
+    from hardware_layer import ConnectionConfig, ConnectionType, SerialInterface, ModbusRelayBoard
+    MODBUS_AVAILABLE = True
+except ImportError as e:
+    MODBUS_AVAILABLE = False
+    print(f"Modbus modules not available for testing: {e}")
+
+PTY_AVAILABLE = MODBUS_AVAILABLE and not sys.platform.startswith('win')
+
+
+class SimulatedBusTestCase(unittest.TestCase):
+    """Base fixture: simulator on one end of a pty bridge, RTU client on the other"""
+    
+    device_id = 1
+    client_timeout = 0.3
+    
+    def setUp(self):
+        self.bridge = PtyBridge()
+        ports = self.ports = self.bridge.start()
+        self.assertIsNotNone(ports)
+        
+        self.simulator = ModbusRTUSimulator(port=ports[0], device_id=self.device_id, timeout=0.1)
+        self.simulator_thread = threading.Thread(target=self.simulator.start)
+        self.simulator_thread.daemon = True
+        self.simulator_thread.start()
+        
+        deadline = time.time() + 2
+        while not self.simulator.running and time.time() < deadline:
+            time.sleep(0.01)
+        
+        self.client = ModbusRTUTestClient(port=ports[1], device_id=self.device_id,
+                                          timeout=self.client_timeout)
+        self.assertTrue(self.client.connect())
+    
+    def tearDown(self):
+        self.client.disconnect()
+        self.simulator.stop()
+        self.simulator_thread.join(timeout=2)
+        self.bridge.stop()
+
+
+@unittest.skipUnless(MODBUS_AVAILABLE, "Modbus modules not available")
+class TestFairRequestQueue(unittest.TestCase):
+    """Test FairRequestQueue scheduling"""
+    
+    def _request(self, client_id, transaction_id, priority=1):
+        return GatewayRequest(client_id, transaction_id, 1, b'\x03\x00\x00\x00\x01',
+                              priority, time.time(), lambda request, pdu: None)
+    
+    def test_round_robin_between_clients(self):
+        """A client with a deep backlog does not starve the others"""
+        queue = FairRequestQueue()
+        for tid in range(3):
+            queue.put(self._request(1, tid))
+        queue.put(self._request(2, 100))
+        
+        order = [queue.get(timeout=0).client_id for _ in range(4)]
+        
+        self.assertEqual(order, [1, 2, 1, 1])
+        self.assertEqual(len(queue), 0)
+    
+    def test_priority_served_first(self):
+        """Higher priority requests jump ahead of queued lower priority ones"""
+        queue = FairRequestQueue()
+        queue.put(self._request(1, 1, priority=1))
+        queue.put(self._request(2, 2, priority=5))
+        
+        self.assertEqual(queue.get(timeout=0).transaction_id, 2)
+        self.assertEqual(queue.get(timeout=0).transaction_id, 1)
+    
+    def test_get_times_out_when_empty(self):
+        """Empty queue returns None after the timeout"""
+        self.assertIsNone(FairRequestQueue().get(timeout=0.01))
+
+
+@unittest.skipUnless(PTY_AVAILABLE, "pty bridge not available")
+class TestModbusTCPGateway(SimulatedBusTestCase):
+    """Test ModbusTCPGateway against the simulator"""
+    
+    def setUp(self):
+        super().setUp()
+        self.gateway = ModbusTCPGateway(host="127.0.0.1", port=0)
+        self.gateway.add_bus("bus0", self.client)
+        self.assertTrue(self.gateway.start())
+    
+    def tearDown(self):
+        self.gateway.stop()
+        super().tearDown()
+    
+    def _connect(self):
+        conn = socket.create_connection(("127.0.0.1", self.gateway.port), timeout=2)
+        self.addCleanup(conn.close)
+        return conn
+    
+    def _send(self, conn, transaction_id, unit_id, pdu):
+        conn.sendall(struct.pack('>HHHB', transaction_id, 0, len(pdu) + 1, unit_id) + pdu)
+    
+    def _recv(self, conn):
+        header = b""
+        while len(header) < 7:
+            header += conn.recv(7 - len(header))
+        transaction_id, _, length, unit_id = struct.unpack('>HHHB', header)
+        pdu = b""
+        while len(pdu) < length - 1:
+            pdu += conn.recv(length - 1 - len(pdu))
+        return transaction_id, unit_id, pdu
+    
+    def test_read_holding_registers(self):
+        """TCP request is executed on the RTU bus and answered"""
+        conn = self._connect()
+        self._send(conn, 7, 1, struct.pack('>BHH', 0x03, 0, 3))
+        
+        transaction_id, unit_id, pdu = self._recv(conn)
+        
+        self.assertEqual(transaction_id, 7)
+        self.assertEqual(unit_id, 1)
+        self.assertEqual(pdu[:2], b'\x03\x06')
+        self.assertEqual(struct.unpack('>HHH', pdu[2:]), (1, 0, 100))
+    
+    def test_pipelined_requests_routed_by_transaction_id(self):
+        """Several clients pipelining requests each get their own answers"""
+        connections = [self._connect() for _ in range(3)]
+        for index, conn in enumerate(connections):
+            for tid in range(4):
+                self._send(conn, index * 100 + tid, 1, struct.pack('>BHH', 0x03, 2, 1))
+        
+        for index, conn in enumerate(connections):
+            received = sorted(self._recv(conn)[0] for _ in range(4))
+            self.assertEqual(received, [index * 100 + tid for tid in range(4)])
+        
+        metrics = self.gateway.get_metrics()["buses"]["bus0"]
+        self.assertEqual(metrics["requests_processed"], 12)
+        self.assertGreaterEqual(metrics["max_queue_depth"], 1)
+    
+    def test_missing_slave_returns_gateway_exception(self):
+        """Unanswered requests become gateway target failed exceptions"""
+        conn = self._connect()
+        self._send(conn, 1, 9, struct.pack('>BHH', 0x03, 0, 1))
+        
+        _, unit_id, pdu = self._recv(conn)
+        
+        self.assertEqual(unit_id, 9)
+        self.assertEqual(pdu, b'\x83\x0b')
+        self.assertEqual(self.gateway.get_metrics()["buses"]["bus0"]["timeouts"], 1)
+    
+    def test_broadcast_read_rejected(self):
+        """A read sent to the broadcast address is answered with illegal function, not dropped"""
+        conn = self._connect()
+        self._send(conn, 3, 0, struct.pack('>BHH', 0x03, 0, 1))
+        
+        self.assertEqual(self._recv(conn), (3, 0, b'\x83\x01'))
+        self.assertEqual(self.gateway.get_metrics()["buses"]["bus0"]["requests_processed"], 0)
+
+
+
+@unittest.skipUnless(PTY_AVAILABLE, "pty bridge not available")
+class TestDiagnosticsAndIdentification(SimulatedBusTestCase):
+    """Test function codes 0x08 and 0x2B/0x0E"""
+    
+    def test_diagnostics_echo(self):
+        """Return query data echoes the data word"""
+        result = self.client.diagnostics(0x0000, 0x1234)
+        
+        self.assertTrue(result.success)
+        self.assertEqual(result.values["data"], 0x1234)
+    
+    def test_diagnostics_unknown_sub_function(self):
+        """Unsupported sub-functions return illegal function"""
+        result = self.client.diagnostics(0x00FF)
+        
+        self.assertFalse(result.success)
+        self.assertEqual(result.error_message, "Modbus error code: 1")
+    
+    def test_read_device_identification(self):
+        """Regular identification returns all simulator objects"""
+        result = self.client.read_device_identification(read_code=0x02)
+        
+        self.assertTrue(result.success)
+        self.assertEqual(result.values["vendor_name"], "PCBA Test System")
+        self.assertEqual(result.values["model_name"], "SIM-001")
+    
+    def test_read_single_identification_object(self):
+        """Individual access returns only the requested object"""
+        result = self.client.read_device_identification(read_code=0x04, object_id=0x01)
+        
+        self.assertTrue(result.success)
+        self.assertEqual(result.values["product_code"], "PLC-SIM")
+        self.assertNotIn("vendor_name", result.values)
+
+
+@unittest.skipUnless(PTY_AVAILABLE, "pty bridge not available")
+class TestModbusBusScanner(SimulatedBusTestCase):
+    """Test ModbusBusScanner against a multi-slave simulated bus"""
+    
+    def setUp(self):
+        super().setUp()
+        for device_id in (5, 17):
+            self.simulator.attach_slave(ModbusRTUSimulator(port=self.simulator.port, device_id=device_id))
+    
+    def test_full_address_scan(self):
+        """A 247 address scan finds every slave within seconds"""
+        scanner = ModbusBusScanner()
+        
+        result = scanner.scan_port(self.client.port, client=self.client)
+        
+        self.assertIsNone(result["error"])
+        self.assertEqual(result["probed"], 247)
+        self.assertEqual([device.unit_id for device in result["devices"]], [1, 5, 17])
+        self.assertEqual(result["devices"][1].identification["model_name"], "SIM-005")
+        self.assertLess(result["scan_time"], 15)
+    
+    def test_adaptive_probe_timeout(self):
+        """Probe timeout is learned from answers; absent addresses do not back it off"""
+        scanner = ModbusBusScanner(initial_timeout=0.05, min_timeout=0.01, max_timeout=0.5, identify=False)
+        
+        silent = scanner.scan_port(self.client.port, range(30, 40), client=self.client)
+        self.assertEqual(silent["devices"], [])
+        self.assertEqual(silent["probe_timeout"], 0.05)
+        
+        scanner.initial_timeout = 0.4
+        result = scanner.scan_port(self.client.port, range(1, 7), client=self.client)
+        self.assertEqual([device.unit_id for device in result["devices"]], [1, 5])
+        self.assertGreaterEqual(result["probe_timeout"], 0.01)
+        self.assertLess(result["probe_timeout"], 0.4)
+
+
+
+@unittest.skipUnless(PTY_AVAILABLE, "pty bridge not available")
+class TestParallelBusScan(SimulatedBusTestCase):
+    """Test ModbusBusScanner.scan over two independent simulated buses"""
+    
+    def setUp(self):
+        super().setUp()
+        self.simulator.attach_slave(ModbusRTUSimulator(port=self.simulator.port, device_id=5))
+        self.simulator.attach_slave(ModbusRTUSimulator(port=self.simulator.port, device_id=17))
+        self.client.disconnect()  # The scanner opens each port itself
+        
+        self.second_bridge = PtyBridge()
+        second_ports = self.second_bridge.start()
+        self.assertIsNotNone(second_ports)
+        self.second_simulator = ModbusRTUSimulator(port=second_ports[0], device_id=9, timeout=0.1)
+        self.second_thread = threading.Thread(target=self.second_simulator.start)
+        self.second_thread.daemon = True
+        self.second_thread.start()
+        deadline = time.time() + 2
+        while not self.second_simulator.running and time.time() < deadline:
+            time.sleep(0.01)
+        self.scan_ports = [self.ports[1], second_ports[1]]
+    
+    def tearDown(self):
+        self.second_simulator.stop()
+        self.second_thread.join(timeout=2)
+        self.second_bridge.stop()
+        super().tearDown()
+    
+    def test_ports_scanned_concurrently(self):
+        """Both buses' devices are found in about the time of the slower bus alone"""
+        scanner = ModbusBusScanner()
+        unit_ids = range(1, 101)
+        single = [scanner.scan_port(port, unit_ids)["scan_time"] for port in self.scan_ports]
+        
+        inventory = scanner.scan(self.scan_ports, unit_ids)
+        
+        self.assertEqual(inventory["ports"][self.scan_ports[0]]["device_ids"], [1, 5, 17])
+        self.assertEqual(inventory["ports"][self.scan_ports[1]]["device_ids"], [9])
+        self.assertEqual(inventory["total_devices"], 4)
+        self.assertLess(inventory["scan_time"], max(single) * 1.5)
+        self.assertLess(inventory["scan_time"], sum(single))
+
+
+
+@unittest.skipUnless(PTY_AVAILABLE, "pty bridge not available")
+class TestAdaptiveTimeouts(SimulatedBusTestCase):
+    """Test per-slave adaptive response deadlines"""
+    
+    client_timeout = 2.0
+    
+    def test_dead_device_detected_quickly(self):
+        """Once RTT is learned, a vanished slave fails in milliseconds, not the full timeout"""
+        for _ in range(10):
+            self.assertTrue(self.client.read_holding_registers(0, 1).success)
+        
+        learned_timeout = self.client.get_timing_stats()[1]["timeout_ms"]
+        self.assertLess(learned_timeout, 200)
+        
+        self.simulator.device_id = 99  # Slave 1 stops answering
+        result = self.client.read_holding_registers(0, 1)
+        
+        self.assertFalse(result.success)
+        self.assertLess(result.duration, 0.25)
+        self.assertEqual(self.client.get_timing_stats()[1]["timeouts"], 1)
+
+
+
+@unittest.skipUnless(PTY_AVAILABLE, "pty bridge not available")
+class TestBroadcastWrites(SimulatedBusTestCase):
+    """Test slave address 0 broadcast writes"""
+    
+    def setUp(self):
+        super().setUp()
+        self.slaves = [self.simulator]
+        for device_id in (2, 3):
+            slave = ModbusRTUSimulator(port=self.simulator.port, device_id=device_id)
+            self.simulator.attach_slave(slave)
+            self.slaves.append(slave)
+    
+    def test_broadcast_registers_reach_every_slave(self):
+        """One broadcast configures all slaves and nobody answers"""
+        result = self.client.broadcast_write_registers(50, [11, 22, 33], turnaround_delay=0.05)
+        self.assertTrue(result.success)
+        
+        time.sleep(0.1)
+        self.assertEqual(self.client.serial_conn.in_waiting, 0)
+        for slave in self.slaves:
+            self.assertEqual(slave.holding_registers[50:53], [11, 22, 33])
+            self.assertEqual(slave.stats["broadcasts_received"], 1)
+    
+    def test_broadcast_single_coil(self):
+        """Single value broadcasts use write single coil"""
+        result = self.client.broadcast_write_coils(40, [True])
+        
+        self.assertEqual(result.request_data[:2], b'\x00\x05')
+        self.assertTrue(self.client.read_coils(40, 1).values["coil_40"])
+    
+    def test_turnaround_delay_before_next_request(self):
+        """The request following a broadcast waits out the turnaround delay"""
+        self.client.broadcast_write_coils(10, [True, False, True], turnaround_delay=0.2)
+        
+        start = time.time()
+        result = self.client.read_coils(10, 3)
+        
+        self.assertGreaterEqual(time.time() - start, 0.15)
+        self.assertEqual([result.values[f"coil_{i}"] for i in (10, 11, 12)], [True, False, True])
+    
+    def test_read_requests_cannot_be_broadcast(self):
+        """Broadcast is limited to write function codes"""
+        result = self.client.broadcast(0x03, struct.pack('>HH', 0, 1))
+        
+        self.assertFalse(result.success)
+    
+    def test_write_multiple_registers_unicast(self):
+        """Write multiple registers is answered with the address/quantity echo"""
+        result = self.client.write_multiple_registers(60, [1, 2])
+        
+        self.assertTrue(result.success)
+        self.assertEqual(self.simulator.holding_registers[60:62], [1, 2])
+        self.assertEqual(self.slaves[1].holding_registers[60:62], [0, 0])
+
+
+@unittest.skipUnless(PTY_AVAILABLE, "pty bridge not available")
+class TestFileRecordTransfer(SimulatedBusTestCase):
+    """Test file record transfer (0x14 / 0x15)"""
+    
+    image = bytes((i * 31 + 7) & 0xFF for i in range(1001))
+    
+    def test_image_round_trip_with_crc(self):
+        """A multi-block odd-length image is written, verified and read back intact"""
+        result = self.client.write_file(3, self.image)
+        
+        self.assertTrue(result.success, result.error_message)
+        self.assertTrue(result.values["verified"])
+        self.assertEqual(result.values["crc32"], zlib.crc32(self.image))
+        self.assertGreater(result.values["bytes_per_second"], 0)
+        
+        read_back = self.client.read_file(3, len(self.image), expected_crc=zlib.crc32(self.image))
+        self.assertTrue(read_back.success)
+        self.assertEqual(bytes.fromhex(read_back.values["data"]), self.image)
+    
+    def test_image_spans_file_numbers(self):
+        """Records past 9999 continue at record 0 of the next file"""
+        result = self.client.write_file(1, self.image[:400], start_record=9900)
+        
+        self.assertTrue(result.success, result.error_message)
+        self.assertEqual(len(self.simulator.file_records[2]), 10000)
+        self.assertEqual(self.simulator.file_records[2][99],
+                         struct.unpack('>H', self.image[398:400])[0])
+    
+    def test_read_missing_file(self):
+        """Reading a file that was never written returns illegal data address"""
+        self.assertIsNone(self.client.read_file_record(42, 0, 4))
+        
+        result = self.client.read_file(42, 8)
+        self.assertFalse(result.success)
+    
+    def test_invalid_write_leaves_storage_untouched(self):
+        """A rejected request does not partially apply its sub-requests"""
+        self.assertFalse(self.client.write_file_record(1, 9999, [1, 2]))
+        self.assertNotIn(1, self.simulator.file_records)
+
+
+@unittest.skipUnless(PTY_AVAILABLE, "Modbus modules or pty not available")
+class TestWaveformRegisters(SimulatedBusTestCase):
+    """Test reading the simulated DUT clock waveform and measuring its frequency"""
+    
+    def _analyze(self):
+        result = self.client.read_waveform()
+        self.assertTrue(result.success, result.error_message)
+        self.assertEqual(len(result.values["registers"]), result.values["points"])
+        return analyze_tone(samples_from_registers(result.values["registers"], 0.001), result.values["sample_rate"])
+    
+    def test_default_clock(self):
+        analysis = self._analyze()
+        self.assertAlmostEqual(analysis.frequency, 1000.0, delta=0.5)
+        self.assertAlmostEqual(analysis.amplitude, 1.65, delta=0.01)
+        self.assertAlmostEqual(analysis.thd_percent, 2.0, delta=0.1)
+    
+    def test_changed_frequency(self):
+        """Writing the frequency register recaptures the waveform"""
+        self.assertTrue(self.client.write_single_register(10, 1234).success)
+        deadline = time.time() + 3
+        while self.simulator.waveform_frequency != 1234 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertAlmostEqual(self._analyze().frequency, 1234.0, delta=0.5)
+
+
+@unittest.skipUnless(PTY_AVAILABLE, "Modbus modules or pty not available")
+class TestModbusRelayBoard(SimulatedBusTestCase):
+    """Test switching relays on simulator coils with FC15 bitmask writes"""
+    
+    def setUp(self):
+        super().setUp()
+        # The relay board takes over the client's end of the line
+        self.client.disconnect()
+        self.interface = SerialInterface(ConnectionConfig(connection_type=ConnectionType.SERIAL_RTU,
+                                                          address=self.ports[1], timeout=0.5))
+        self.board = ModbusRelayBoard("relays", self.interface, 16, start_coil=100)
+        self.assertTrue(self.board.initialize())
+    
+    def tearDown(self):
+        self.board.disconnect()
+        super().tearDown()
+    
+    def _coils(self):
+        return [channel for channel in range(1, 17) if self.simulator.coils[99 + channel]]
+    
+    def test_bitmask_switching(self):
+        """A change of many relays is one write; opening and closing together is two (break-before-make)"""
+        transactions = self.board.transactions
+        self.assertTrue(self.board.set_channels([1, 3, 9, 16]))
+        self.assertEqual(self._coils(), [1, 3, 9, 16])
+        self.assertEqual(self.board.transactions - transactions, 1)
+        
+        self.assertTrue(self.board.set_channels([2, 3]))
+        self.assertEqual(self._coils(), [2, 3])
+        self.assertEqual(self.board.transactions - transactions, 3)
+        
+        self.assertTrue(self.board.close([3]))
+        self.assertEqual(self.board.transactions - transactions, 3)
+        self.assertEqual(self.board.get_switch_stats()["skipped"], 1)
+    
+    def test_unknown_state_read_back(self):
+        self.simulator.coils[104] = True
+        self.board.invalidate_state()
+        self.assertTrue(self.board.close([1]))
+        self.assertEqual(self._coils(), [1, 5])
+        self.assertEqual(self.board.closed_channels, [1, 5])
+        self.assertTrue(self.board.self_test())
+    
+    def test_exception_response(self):
+        board = ModbusRelayBoard("relays", self.interface, 16, start_coil=990)
+        self.assertFalse(board.set_channels([1]))
+        self.assertIsNone(board.closed_channels)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -8,10 +8,82 @@ import subprocess
 import os
 import sys
 import time
+import select
+import threading
 import psutil
 from typing import Tuple, Optional, List
 import logging
 
+class PtyBridge:
+    """
+    Pure-Python null-modem cable built from two pseudo-terminals (Linux/macOS only)
+    Bytes written to one end are forwarded to the other, like a socat pty pair
+    """
+    
+    def __init__(self):
+        self.logger = logging.getLogger("PtyBridge")
+        self.ports: Optional[Tuple[str, str]] = None
+        self.running = False
+        self._masters: List[int] = []
+        self._slaves: List[int] = []
+        self._thread = None
+    
+    def start(self) -> Optional[Tuple[str, str]]:
+        """Create the pty pair and start forwarding, returns the two device paths"""
+        try:
+            import tty
+            
+            for _ in range(2):
+                master, slave = os.openpty()
+                tty.setraw(slave)
+                self._masters.append(master)
+                self._slaves.append(slave)
+            
+            self.ports = (os.ttyname(self._slaves[0]), os.ttyname(self._slaves[1]))
+            self.running = True
+            
+            self._thread = threading.Thread(target=self._forward_loop)
+            self._thread.daemon = True
+            self._thread.start()
+            
+            self.logger.info(f"Created pty bridge: {self.ports[0]} <-> {self.ports[1]}")
+            return self.ports
+        except Exception as e:
+            self.logger.error(f"Failed to create pty bridge: {e}")
+            self.stop()
+            return None
+    
+    def _forward_loop(self):
+        """Copy bytes between the two master ends until stopped"""
+        peer = {self._masters[0]: self._masters[1], self._masters[1]: self._masters[0]}
+        
+        while self.running:
+            try:
+                readable, _, _ = select.select(self._masters, [], [], 0.1)
+                for fd in readable:
+                    data = os.read(fd, 4096)
+                    if data:
+                        os.write(peer[fd], data)
+            except OSError:
+                if self.running:
+                    time.sleep(0.01)
+    
+    def stop(self):
+        """Stop forwarding and release the pty file descriptors"""
+        self.running = False
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=1)
+        
+        for fd in self._masters + self._slaves:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        
+        self._masters.clear()
+        self._slaves.clear()
+        self.ports = None
+
 class VirtualSerialPortManager:
     """
     Manages virtual serial port pairs for testing
@@ -21,6 +93,7 @@ class VirtualSerialPortManager:
     def __init__(self):
         self.logger = logging.getLogger("VirtualSerialPort")
         self.created_ports = []
+        self.pty_bridges: List[PtyBridge] = []
         self.is_windows = sys.platform.startswith('win')
         
     def check_prerequisites(self) -> bool:
@@ -149,8 +222,8 @@ Example commands in setupc:
         """Create virtual port pair on Linux using socat"""
         try:
             if not self._check_socat():
-                self.logger.error("socat not available")
-                return None
+                self.logger.warning("socat not available, falling back to built-in pty bridge")
+                return self.create_pty_bridge()
             
             # Use default port names if not specified
             port1 = port1 or "/tmp/ttyV0"
@@ -182,6 +255,19 @@ Example commands in setupc:
             self.logger.error(f"Failed to create Linux port pair: {e}")
             return None
     
+    def create_pty_bridge(self) -> Optional[Tuple[str, str]]:
+        """Create a virtual port pair without external tools using a pty bridge"""
+        if self.is_windows:
+            self.logger.error("pty bridge is not supported on Windows")
+            return None
+        
+        bridge = PtyBridge()
+        ports = bridge.start()
+        if ports:
+            self.pty_bridges.append(bridge)
+            self.created_ports.append(ports)
+        return ports
+    
     def _find_available_com_ports(self) -> List[str]:
         """Find available COM ports on Windows"""
         import serial.tools.list_ports
@@ -216,6 +302,11 @@ Example commands in setupc:
             except Exception as e:
                 self.logger.error(f"Error during cleanup: {e}")
         
+        # Stop built-in pty bridges
+        for bridge in self.pty_bridges:
+            bridge.stop()
+        self.pty_bridges.clear()
+        
         self.created_ports.clear()
     
     def get_recommended_setup(self) -> dict:
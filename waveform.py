@@ -0,0 +1,242 @@
+"""
+PCBA Test System - Oscilloscope Waveforms
+Waveform records kept as the raw integer codes the oscilloscope sends, with
+NumPy scaling to volts, vectorized amplitude and timing measurements, FFT
+frequency and distortion, min/max decimation for display and a compact
+binary form for storage.
+"""
+
+import base64
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from frequency_analysis import ToneAnalysis, analyze_tone
+
+class Waveform:
+    """
+    One oscilloscope channel record
+    
+    Samples are stored as the uint8 (BYTE) or uint16 (WORD) codes of the
+    transfer; volts = (code - y_reference) * y_increment + y_origin and the
+    time of sample i is x_origin + i * x_increment, as given by the
+    waveform preamble. Volts are computed once, on first use.
+    """
+    
+    MAGIC = b"PWF1"
+    # Magic, bytes per code, point count, x increment, x origin, y increment, y origin, y reference,
+    # length of the source name
+    HEADER = struct.Struct("<4sBI5dH")
+    
+    def __init__(self, codes: np.ndarray, x_increment: float, x_origin: float, y_increment: float,
+                 y_origin: float, y_reference: float, source: str = "CHAN1"):
+        self.codes = codes
+        self.x_increment = x_increment
+        self.x_origin = x_origin
+        self.y_increment = y_increment
+        self.y_origin = y_origin
+        self.y_reference = y_reference
+        self.source = source
+        self._volts: Optional[np.ndarray] = None
+        self._tone: Optional[ToneAnalysis] = None
+        self.calibration_version: Optional[int] = None  # Version of the correction applied to volts
+    
+    @classmethod
+    def from_block(cls, preamble: str, payload: bytes, source: str = "CHAN1") -> 'Waveform':
+        """
+        Decode a WAV:DATA? block with the WAV:PRE? preamble it was sent with
+        
+        The preamble is format, type, points, count, x increment, x origin,
+        x reference, y increment, y origin, y reference; format 0 is BYTE
+        (unsigned 8 bit) and 1 is WORD (unsigned 16 bit, most significant
+        byte first).
+        """
+        fields = preamble.split(',')
+        data_format, points = int(float(fields[0])), int(float(fields[2]))
+        x_increment, x_origin, x_reference, y_increment, y_origin, y_reference = map(float, fields[4:10])
+        if data_format not in (0, 1):
+            raise ValueError(f"Unsupported waveform format {data_format}")
+        codes = np.frombuffer(payload, dtype='u1' if data_format == 0 else '>u2')
+        if codes.size != points:
+            raise ValueError(f"Expected {points} waveform points, received {codes.size}")
+        # Keep native byte order so the codes are cheap to scale and serialize
+        return cls(codes.astype(codes.dtype.newbyteorder('=')), x_increment, x_origin - x_reference * x_increment,
+                   y_increment, y_origin, y_reference, source)
+    
+    def __len__(self) -> int:
+        return int(self.codes.size)
+    
+    @property
+    def volts(self) -> np.ndarray:
+        if self._volts is None:
+            self._volts = (self.codes - self.y_reference) * self.y_increment + self.y_origin
+        return self._volts
+    
+    def correct(self, volts: np.ndarray, version: Optional[int]):
+        """Use corrected volts (e.g. after a calibration table) in place of those scaled from the codes"""
+        self._volts = volts
+        self._tone = None
+        self.calibration_version = version
+    
+    @property
+    def times(self) -> np.ndarray:
+        return self.x_origin + np.arange(self.codes.size) * self.x_increment
+    
+    @property
+    def sample_rate(self) -> float:
+        return 1.0 / self.x_increment
+    
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes)
+    
+    def clipped(self) -> bool:
+        """Whether the signal ran off screen (codes at the ends of the ADC range)"""
+        top = np.iinfo(self.codes.dtype).max
+        return bool(((self.codes == 0) | (self.codes == top)).any())
+    
+    def vpp(self) -> float:
+        return float(self.volts.max() - self.volts.min())
+    
+    def mean(self) -> float:
+        return float(self.volts.mean())
+    
+    def rms(self) -> float:
+        """True RMS (AC + DC)"""
+        return float(np.sqrt(np.mean(np.square(self.volts))))
+    
+    def levels(self) -> Tuple[float, float]:
+        """Base and top level; percentiles keep noise spikes and overshoot out"""
+        base, top = np.percentile(self.volts, [5, 95])
+        return float(base), float(top)
+    
+    def _rising(self, volts: np.ndarray, low: float, high: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rising transitions from below low to above high
+        
+        Samples between the thresholds are ignored, which gives the crossing
+        detection hysteresis against noise. Returns for each transition the
+        index of the last sample below low and of the first sample above high.
+        """
+        state = np.where(volts > high, 1, np.where(volts < low, -1, 0))
+        index = np.flatnonzero(state)
+        state = state[index]
+        transitions = np.flatnonzero((state[:-1] == -1) & (state[1:] == 1))
+        return index[transitions], index[transitions + 1]
+    
+    @staticmethod
+    def _crossing(volts: np.ndarray, before: np.ndarray, level: float) -> np.ndarray:
+        """Fractional sample positions where volts crosses level between before and before + 1"""
+        start, end = volts[before], volts[before + 1]
+        return before + (level - start) / (end - start)
+    
+    def _edges(self, volts: np.ndarray) -> np.ndarray:
+        """Fractional sample positions of the rising edges at mid level"""
+        base, top = self.levels()
+        amplitude = top - base
+        middle = base + amplitude / 2
+        _, above = self._rising(volts, middle - amplitude * 0.1, middle + amplitude * 0.1)
+        # The sample before the first one above the upper threshold is at or below it
+        return self._crossing(volts, above - 1, middle + amplitude * 0.1)
+    
+    def period(self) -> float:
+        """Mean period from the rising edges, NaN with fewer than two edges"""
+        edges = self._edges(self.volts)
+        if edges.size < 2:
+            return float('nan')
+        return float((edges[-1] - edges[0]) / (edges.size - 1) * self.x_increment)
+    
+    def frequency(self) -> float:
+        """Frequency in Hz, NaN with fewer than two rising edges"""
+        return 1.0 / self.period()
+    
+    def tone(self) -> ToneAnalysis:
+        """Windowed FFT analysis of the record, computed once, on first use"""
+        if self._tone is None:
+            self._tone = analyze_tone(self.volts, self.sample_rate)
+        return self._tone
+    
+    def fft_frequency(self) -> float:
+        """
+        Frequency in Hz from the spectrum peak
+        
+        Unlike frequency() this needs no clean edges, so it also works on
+        noisy or distorted sine waves and on records holding only a few cycles.
+        """
+        return self.tone().frequency
+    
+    def thd(self) -> float:
+        """Total harmonic distortion in percent"""
+        return self.tone().thd_percent
+    
+    def _transition_time(self, volts: np.ndarray, low_level: float, high_level: float) -> float:
+        below, above = self._rising(volts, low_level, high_level)
+        if below.size == 0:
+            return float('nan')
+        start = self._crossing(volts, below, low_level)
+        end = self._crossing(volts, above - 1, high_level)
+        return float(np.mean(end - start) * self.x_increment)
+    
+    def rise_time(self, low: float = 0.1, high: float = 0.9) -> float:
+        """Mean 10 % to 90 % (by default) rise time of the edges, NaN without a rising edge"""
+        base, top = self.levels()
+        amplitude = top - base
+        return self._transition_time(self.volts, base + low * amplitude, base + high * amplitude)
+    
+    def fall_time(self, low: float = 0.1, high: float = 0.9) -> float:
+        """Mean 90 % to 10 % (by default) fall time of the edges, NaN without a falling edge"""
+        base, top = self.levels()
+        amplitude = top - base
+        return self._transition_time(-self.volts, -(top - low * amplitude), -(top - high * amplitude))
+    
+    def decimate(self, max_points: int = 1000) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Reduce to at most max_points buckets for display
+        
+        Each bucket keeps its minimum and maximum, so glitches stay visible
+        however far the record is reduced.
+        
+        Returns:
+            Bucket start times, minimum and maximum volts
+        """
+        volts = self.volts
+        if volts.size <= max_points:
+            return self.times, volts, volts
+        size = -(-volts.size // max_points)
+        buckets = -(-volts.size // size)
+        # Pad the last bucket with its own last value so reshape sees whole buckets
+        padded = np.pad(volts, (0, buckets * size - volts.size), mode='edge').reshape(buckets, size)
+        times = self.x_origin + np.arange(buckets) * size * self.x_increment
+        return times, padded.min(axis=1), padded.max(axis=1)
+    
+    def to_bytes(self) -> bytes:
+        """Compact binary form: header, source name, then the raw codes little-endian"""
+        source = self.source.encode()
+        header = self.HEADER.pack(self.MAGIC, self.codes.itemsize, self.codes.size, self.x_increment,
+                                  self.x_origin, self.y_increment, self.y_origin, self.y_reference, len(source))
+        return header + source + self.codes.astype(f'<u{self.codes.itemsize}').tobytes()
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Waveform':
+        """Rebuild a waveform serialized with to_bytes"""
+        magic, itemsize, count, x_increment, x_origin, y_increment, y_origin, y_reference, source_length = \
+            cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise ValueError(f"Not a waveform (magic {magic!r})")
+        offset = cls.HEADER.size
+        source = data[offset:offset + source_length].decode()
+        codes = np.frombuffer(data, dtype=f'<u{itemsize}', count=count, offset=offset + source_length)
+        return cls(codes.astype(f'=u{itemsize}'), x_increment, x_origin, y_increment, y_origin, y_reference, source)
+    
+    def to_dict(self, max_points: int = 500) -> Dict[str, Any]:
+        """JSON representation: the compact record (base64) and a decimated trace for display"""
+        times, minimum, maximum = self.decimate(max_points)
+        return {
+            "source": self.source,
+            "points": len(self),
+            "x_increment": self.x_increment,
+            "x_origin": self.x_origin,
+            "data": base64.b64encode(self.to_bytes()).decode(),
+            "display": {"time": times.tolist(), "min": minimum.tolist(), "max": maximum.tolist()}
+        }